@@ -3,16 +3,20 @@
 Anime 路由模块（原 Shots 模块）
 统一使用 MySQL/MongoDB 存储
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, Response, stream_with_context
 from utils.response_helper import error_response, api_response
-from utils.decorators import handle_errors, audit_log
+from utils.decorators import handle_errors, audit_log, conditional_get, no_compression
 from utils.general_helper import validate_required_fields
-from db import MySQLService, MongoService, asset_service
+from db import MySQLService, MongoService, asset_service, oss_service
 from db.anime import anime_service
 from db.mongo_anime import anime_details_service
 from services.video_generation_service import video_generation_service
+from services.generation_dedup_service import generation_dedup_service
+from services.job_event_service import job_event_service
 from utils.constants import RequestParams
 from utils.picture_uploader import upload_picture_file
+from utils.resource_helper import get_full_anime_by_id, cached_version
+from services.entity_cache_service import ENTITY_ANIME
 import logging
 import uuid
 
@@ -216,12 +220,20 @@ def generate_video_endpoint():
     if error:
         return error
 
-    # 调用视频生成服务
-    try:
+    webhook_url, error = _get_webhook_url(data)
+    if error:
+        return error
+
+    job_id = job_event_service.create_job(user_id, 'single_image_video', webhook_url)
+
+    def run_generation():
+        # 调用视频生成服务（任务 ID 即 video_tasks 中的持久化任务 ID）
         video_result = video_generation_service.generate_single_image_anime(
             image_url=picture_url,
             prompt=prompt,
-            duration=duration
+            duration=duration,
+            user_id=user_id,
+            job_id=job_id
         )
 
         # 更新 MongoDB 中的 anime_details
@@ -243,15 +255,71 @@ def generate_video_endpoint():
                 asset_data={
                     'video_url': video_result.get('video_url'),
                     'task_id': video_result.get('task_id'),
+                    'job_id': job_id,
                     'prompt': prompt,
                     'model_used': video_result.get('model_used', 'wan2.6-i2v')
                 }
             )
             video_result['video_asset_id'] = video_asset_id
 
+        return video_result
+
+    return _dispatch_generation_job(data, job_id, run_generation, 'Video generation task created')
+
+
+def _get_webhook_url(data):
+    """
+    获取并校验任务完成回调 URL（可选）
+
+    Returns:
+        tuple: (webhook_url, error_response)
+    """
+    webhook_url = data.get('webhook_url')
+    if not webhook_url:
+        return None, None
+    if not isinstance(webhook_url, str):
+        return None, error_response('Invalid webhook_url: must be an http(s) URL', 400)
+    rejected = job_event_service.validate_webhook_url(webhook_url)
+    if rejected:
+        return None, error_response(f'Invalid webhook_url: {rejected}', 400)
+    return webhook_url, None
+
+
+def _dispatch_generation_job(data, job_id, run_generation, message):
+    """
+    执行视频生成任务
+
+    async 为 true 时在后台执行并立即返回 job_id（通过 /jobEvents 或 webhook 获取结果），
+    否则同步等待生成完成后返回结果
+
+    Args:
+        data: 请求数据
+        job_id: 任务 ID
+        run_generation: 执行生成并返回结果字典的函数
+        message: 同步模式的响应消息
+
+    Returns:
+        Flask 响应
+    """
+    if data.get('async'):
+        job_event_service.submit_job(job_id, run_generation)
         return api_response(
             success=True,
-            message='Video generation task created',
+            message='Video generation job queued',
+            data={
+                'job_id': job_id,
+                'status': 'queued',
+                'events_url': f'/rest/v1/anime/jobEvents?job_id={job_id}'
+            },
+            status_code=202,
+            count=1
+        )
+
+    try:
+        video_result = job_event_service.run_job(job_id, run_generation)
+        return api_response(
+            success=True,
+            message=message,
             data=video_result,
             count=1
         )
@@ -362,11 +430,42 @@ def generate_multi_image_video_endpoint():
     if error:
         return error
 
-    # 调用视频生成服务
-    try:
+    webhook_url, error = _get_webhook_url(data)
+    if error:
+        return error
+
+    transition = data.get('transition', 'fade')
+    clip_duration = duration / len(picture_urls)  # 平均分配时长
+    total = len(picture_urls)
+    job_id = job_event_service.create_job(user_id, 'multi_image_video', webhook_url, total=total)
+
+    def run_generation():
+        # 1. 为每张图片生成视频片段
+        clip_urls = []
+        for i, picture_url in enumerate(picture_urls):
+            job_event_service.publish(job_id, 'running',
+                                      progress={'completed': i, 'total': total, 'stage': 'generating'})
+            clip_result = video_generation_service.generate_single_image_anime(
+                image_url=picture_url,
+                prompt=prompt,
+                duration=clip_duration,
+                user_id=user_id
+            )
+            if not clip_result.get('success'):
+                return {
+                    'success': False,
+                    'error': f"Failed to generate clip {i + 1}/{total}: {clip_result.get('error')}"
+                }
+            clip_urls.append(clip_result.get('video_url'))
+
+        # 2. 拼接视频片段
+        job_event_service.publish(job_id, 'running',
+                                  progress={'completed': total, 'total': total, 'stage': 'stitching'})
         video_result = video_generation_service.merge_videos(
-            video_urls=picture_urls,
-            transition_duration=duration / len(picture_urls)  # 平均分配时长
+            video_urls=clip_urls,
+            transition_type=transition,
+            progress_callback=job_event_service.progress_callback(
+                job_id, completed=total, total=total, stage='uploading')
         )
 
         # 更新 MongoDB 中的 anime_details
@@ -388,20 +487,115 @@ def generate_multi_image_video_endpoint():
                 asset_type='video',
                 asset_data={
                     'video_url': video_result.get('video_url'),
+                    'job_id': job_id,
                     'model_used': video_result.get('model_used', 'wan2.6-i2v')
                 }
             )
             video_result['video_asset_id'] = video_asset_id
 
-        return api_response(
-            success=True,
-            message='Multi-image video generation task created',
-            data=video_result,
-            count=1
-        )
-    except Exception as e:
-        logger.error(f"Multi-image video generation failed: {str(e)}")
-        return error_response(f'Video generation failed: {str(e)}', 500)
+        return video_result
+
+    return _dispatch_generation_job(data, job_id, run_generation, 'Multi-image video generation task created')
+
+
+@anime_bp.route('/jobEvents', methods=['GET'])
+@handle_errors
+def job_events():
+    """订阅视频生成任务状态事件（SSE，按 job_id 或 user_id）"""
+    job_id = request.args.get('job_id')
+    user_id = request.args.get('user_id')
+    if not job_id and not user_id:
+        return error_response('job_id or user_id is required', 400)
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    return Response(
+        stream_with_context(job_event_service.stream(job_id, user_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _get_byte_range():
+    """
+    解析请求的 Range 头为 OSS byte_range
+
+    只支持单个字节范围；多范围或无法解析的 Range 按完整内容返回
+
+    Returns:
+        tuple: (start, end)，end 包含在内；后缀范围为 (None, n)；无 Range 时返回 None
+    """
+    byte_range = request.range
+    if byte_range is None or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+    start, stop = byte_range.ranges[0]
+    if start < 0:
+        return None, -start
+    return start, stop - 1 if stop is not None else None
+
+
+@anime_bp.route('/streamVideo', methods=['GET'])
+@handle_errors
+@no_compression
+def stream_video():
+    """
+    流式播放 OSS 中的私有视频（支持 Range 拖动和 If-None-Match 缓存校验）
+
+    请求参数：
+    - asset_id: 视频资产 ID (必填)
+    - user_id: 用户 ID (必填，用于权限验证)
+
+    返回：
+    - 200 完整视频 / 206 Partial Content / 304 Not Modified / 416 Range Not Satisfiable
+    """
+    validate_required_fields(request.args, [RequestParams.ASSET_ID, RequestParams.USER_ID])
+    asset_id = request.args.get(RequestParams.ASSET_ID)
+    user_id = request.args.get(RequestParams.USER_ID)
+
+    mysql_row = MySQLService().fetch_asset_by_id(asset_id)
+    if not mysql_row:
+        return error_response('Asset not found', 404)
+    if mysql_row[RequestParams.USER_ID] != user_id:
+        return error_response('Unauthorized: Asset does not belong to user', 403)
+
+    asset_data = MongoService().fetch_asset_data(asset_id) or {}
+    object_key = asset_data.get(RequestParams.OSS_OBJECT_KEY)
+    if not object_key:
+        return error_response('Video not found', 404)
+
+    try:
+        result = oss_service.get_video_stream(object_key, _get_byte_range(),
+                                              request.headers.get('If-None-Match'))
+    except RuntimeError as e:
+        logger.error(f"OSS service not available: {e}")
+        return error_response('Video service not available (OSS not configured)', 503)
+
+    headers = {'Accept-Ranges': 'bytes', 'Cache-Control': 'private, no-cache'}
+    if result.get('etag'):
+        headers['ETag'] = f'"{result["etag"]}"'
+
+    if result.get('not_modified'):
+        return Response(status=304, headers=headers)
+    if result.get('not_found'):
+        return error_response('Video not found', 404)
+    if result.get('range_not_satisfiable'):
+        if result.get('size') is not None:
+            headers['Content-Range'] = f"bytes */{result['size']}"
+        return Response(status=416, headers=headers)
+    if not result.get('success'):
+        return error_response(f"Failed to stream video: {result.get('error')}", 502)
+
+    headers['Content-Length'] = str(result['content_length'])
+    if result.get('content_range'):
+        headers['Content-Range'] = result['content_range']
+    if result.get('last_modified'):
+        headers['Last-Modified'] = result['last_modified']
+
+    return Response(result['chunks'], status=result['status'], headers=headers,
+                    mimetype=result.get('content_type') or 'video/mp4', direct_passthrough=True)
 
 
 @anime_bp.route('/confirm', methods=['POST'])
@@ -429,29 +623,17 @@ def confirm_anime():
 
 @anime_bp.route('/getVideoDetails', methods=['GET'])
 @handle_errors
+@conditional_get('private, no-cache', version=cached_version(ENTITY_ANIME, 'anime_id'))
 def get_video_details():
     """获取视频镜头详情（包含 asset 信息）"""
     validate_required_fields(request.args, ['anime_id'])
     anime_id = request.args.get('anime_id')
 
-    # 获取 anime 基本信息
-    anime = anime_service.fetch_anime_by_id(anime_id)
+    # 获取 anime 基本信息和 MongoDB 中的 details（经由读穿缓存）
+    anime = get_full_anime_by_id(anime_id)
     if not anime:
         return error_response('Anime not found', 404)
 
-    # 获取 MongoDB 中的 details
-    details = anime_details_service.fetch_anime_details(anime_id)
-
-    # 合并数据
-    if details:
-        anime['asset_ids'] = details.get('asset_ids', [])
-        anime['video_assets'] = details.get('video_assets', [])
-        anime['picture_assets'] = details.get('picture_assets', [])
-    else:
-        anime['asset_ids'] = []
-        anime['video_assets'] = []
-        anime['picture_assets'] = []
-
     return api_response(
         success=True,
         message='Video details fetched successfully',
@@ -460,6 +642,21 @@ def get_video_details():
     )
 
 
+@anime_bp.route('/getGenerationDedupStats', methods=['GET'])
+@handle_errors
+def get_generation_dedup_stats():
+    """获取视频生成请求去重命中统计（可按 user_id 过滤）"""
+    user_id = request.args.get('user_id')
+
+    stats = generation_dedup_service.get_stats(user_id)
+    return api_response(
+        success=True,
+        message='Generation dedup stats fetched successfully',
+        data=stats,
+        count=len(stats)
+    )
+
+
 @anime_bp.route('/health', methods=['GET'])
 @handle_errors
 def health_check():
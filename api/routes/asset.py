@@ -5,14 +5,16 @@
 """
 from flask import Blueprint, request
 from utils.response_helper import error_response, api_response
-from utils.decorators import handle_errors
+from utils.decorators import handle_errors, conditional_get
 from utils.general_helper import validate_required_fields
 from utils.resource_helper import (
     get_full_asset_by_id,
+    cached_version,
     parse_pagination_args,
     delete_asset_cascade
 )
 from db import MySQLService, MongoService, work_service
+from services.entity_cache_service import entity_cache_service, ENTITY_ASSET
 import logging
 
 asset_bp = Blueprint('asset', __name__)
@@ -137,6 +139,7 @@ def update_asset():
 
 @asset_bp.route('/getAssetById', methods=['GET'])
 @handle_errors
+@conditional_get('private, no-cache', version=cached_version(ENTITY_ASSET, 'asset_id'))
 def get_asset():
     """获取单个资产详情"""
     validate_required_fields(request.args, ['asset_id'])
@@ -155,6 +158,19 @@ def get_asset():
     )
 
 
+@asset_bp.route('/getCacheStats', methods=['GET'])
+@handle_errors
+def get_cache_stats():
+    """获取 work/asset/anime 读穿缓存的命中统计"""
+    stats = entity_cache_service.get_stats()
+    return api_response(
+        success=True,
+        message='Cache stats fetched successfully',
+        data=stats,
+        count=len(stats)
+    )
+
+
 @asset_bp.route('/getAssetsByUserId', methods=['GET'])
 @handle_errors
 def get_user_assets():
@@ -3,9 +3,9 @@
 Novel 路由模块（原 Chapter 模块）
 统一使用 MySQL/MongoDB 存储
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, g
 from utils.response_helper import error_response, api_response
-from utils.decorators import handle_errors
+from utils.decorators import handle_errors, conditional_get
 from utils.general_helper import validate_required_fields
 from utils.resource_helper import (
     build_novel_data,
@@ -87,6 +87,7 @@ def update_novel():
 
 @novel_bp.route('/getNovelByWorkId', methods=['GET'])
 @handle_errors
+@conditional_get('private, no-cache')
 def get_novel_by_work_id():
     """根据 work_id 获取 novel 章节列表"""
     validate_required_fields(request.args, ['work_id'])
@@ -99,6 +100,7 @@ def get_novel_by_work_id():
         return error_response(str(e), 400)
 
     novels = MySQLService().fetch_novels_by_work_id(work_id, status, limit, offset)
+    g.last_modified = max((novel['updated_at'] for novel in novels), default=None)
     return api_response(
         success=True,
         message='Novels fetched successfully',
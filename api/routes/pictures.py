@@ -3,12 +3,15 @@
 Picture Routes 模块
 提供漫画图片上传、获取、删除等功能
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, g
 from utils.response_helper import error_response, api_response
-from utils.decorators import handle_errors
+from utils.decorators import handle_errors, conditional_get
 from utils.general_helper import validate_required_fields
-from utils.constants import RequestParams, ResponseMessage
-from utils.picture_uploader import upload_picture_file
+from utils.constants import RequestParams, ResponseMessage, AssetType, AssetDataType, Pagination
+from utils.picture_uploader import (
+    stream_picture_file, create_streamed_picture_asset, create_direct_upload, complete_direct_upload,
+    release_picture_objects
+)
 from db import MySQLService, MongoService, oss_service
 import logging
 
@@ -31,6 +34,7 @@ def upload_picture():
     - asset_id: 创建的资产 ID
     - url: 图片访问 URL
     - object_key: OSS 中的对象键
+    - deduplicated: 相同内容已存在，未重复上传
     """
     # 检查是否有文件上传
     if RequestParams.PICTURE not in request.files:
@@ -47,8 +51,12 @@ def upload_picture():
     user_id = data.get(RequestParams.USER_ID)
     work_id = data.get(RequestParams.WORK_ID, None)
 
-    # 调用统一的图片上传函数
-    picture_url, asset_id, error = upload_picture_file(file, user_id, work_id)
+    # 分块流式上传到 OSS（同时计算大小和内容哈希），再创建 asset 记录
+    upload_result, error = stream_picture_file(file, user_id)
+    if error:
+        return error
+
+    picture_url, asset_id, error = create_streamed_picture_asset(user_id, work_id, upload_result, file)
     if error:
         return error
 
@@ -57,8 +65,10 @@ def upload_picture():
         RequestParams.USER_ID: user_id,
         RequestParams.WORK_ID: work_id,
         'url': picture_url,
+        'object_key': upload_result['object_key'],
         RequestParams.ORIGINAL_FILENAME: file.filename,
-        RequestParams.FILE_SIZE: len(file.read())
+        RequestParams.FILE_SIZE: upload_result['size'],
+        'deduplicated': upload_result['deduplicated']
     }
 
     return api_response(
@@ -69,6 +79,124 @@ def upload_picture():
     )
 
 
+@picture_bp.route('/createUploadPolicy', methods=['POST'])
+@handle_errors
+def create_upload_policy():
+    """
+    签发浏览器直传 OSS 的上传凭证（文件不经过应用服务器）
+
+    请求参数（JSON）：
+    - user_id: 用户 ID (必填)
+    - filename: 原始文件名 (必填)
+    - content_type: 文件类型 (必填，image/jpeg, image/png, image/gif, image/webp)
+    - work_id: 作品 ID (可选)
+    - file_size: 文件大小（字节，可选，用于提前校验）
+    - method: post（PostObject 表单，默认）或 put（签名 URL）
+
+    返回：
+    - url / fields: PostObject 上传地址和表单字段（method=post）
+    - url / headers: PUT 签名 URL 和必须携带的请求头（method=put）
+    - object_key, upload_token, max_size, expires_at
+    """
+    data = request.get_json() or {}
+    validate_required_fields(data, [RequestParams.USER_ID, 'filename', 'content_type'])
+
+    file_size = data.get(RequestParams.FILE_SIZE)
+    if file_size is not None and not isinstance(file_size, int):
+        return error_response('file_size must be an integer', 400)
+
+    upload_info, error = create_direct_upload(
+        user_id=data.get(RequestParams.USER_ID),
+        filename=data.get('filename'),
+        content_type=data.get('content_type'),
+        work_id=data.get(RequestParams.WORK_ID),
+        file_size=file_size,
+        method=(data.get('method') or 'post').lower()
+    )
+    if error:
+        return error
+
+    return api_response(
+        success=True,
+        message='Upload policy created successfully',
+        data=upload_info,
+        count=1
+    )
+
+
+@picture_bp.route('/completeUpload', methods=['POST'])
+@handle_errors
+def complete_upload():
+    """
+    完成浏览器直传：校验 OSS 对象（存在、大小、类型）并创建 asset 记录
+
+    请求参数（JSON）：
+    - user_id: 用户 ID (必填)
+    - upload_token: createUploadPolicy 返回的上传凭证 (必填)
+
+    返回：
+    - asset_id, url, oss_object_key, original_filename, file_size
+    """
+    data = request.get_json() or {}
+    validate_required_fields(data, [RequestParams.USER_ID, 'upload_token'])
+
+    result, error = complete_direct_upload(data.get('upload_token'), data.get(RequestParams.USER_ID))
+    if error:
+        return error
+
+    return api_response(
+        success=True,
+        message=ResponseMessage.UPLOAD_SUCCESS,
+        data=result,
+        count=1
+    )
+
+
+def _is_true(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _attach_renditions(asset_data_map, renditions_only=False):
+    """
+    为列表中的图片附加副本 URL 和 srcset（所有副本一次批量签名）
+
+    asset_data.renditions 替换为带 url 的副本列表，srcset 按 Content-Type 分组
+    （如 {"image/webp": "url1 320w, url2 1280w"}），可直接用于 <picture><source>；
+    renditions_only 为 true 时，已生成副本的图片不再返回原图 URL
+
+    Args:
+        asset_data_map: asset_id -> asset_data 映射（原地修改）
+        renditions_only: 是否去除原图 URL
+    """
+    keys = [item['object_key'] for asset_data in asset_data_map.values()
+            for item in (asset_data or {}).get(AssetDataType.RENDITIONS) or []]
+    if not keys:
+        return
+
+    try:
+        urls = oss_service.get_picture_urls(keys).get('urls', {})
+    except RuntimeError as e:
+        logger.warning(f"OSS service not available, skipping renditions: {e}")
+        return
+
+    for asset_data in asset_data_map.values():
+        renditions = (asset_data or {}).get(AssetDataType.RENDITIONS)
+        if not renditions:
+            continue
+        renditions = [dict(item, url=urls.get(item['object_key'])) for item in renditions]
+        srcset, widths = {}, {}
+        for item in sorted(renditions, key=lambda r: r['width']):
+            # 同一类型的宽度描述符必须唯一（小图的多个尺寸可能得到相同宽度）
+            if item['url'] and item['width'] not in widths.setdefault(item['content_type'], set()):
+                widths[item['content_type']].add(item['width'])
+                srcset.setdefault(item['content_type'], []).append(f"{item['url']} {item['width']}w")
+        asset_data[AssetDataType.RENDITIONS] = renditions
+        asset_data[AssetDataType.SRCSET] = {content_type: ', '.join(entries)
+                                            for content_type, entries in srcset.items()}
+        if renditions_only:
+            asset_data.pop(AssetDataType.OSS_URL, None)
+
+
 @picture_bp.route('/fetchPictureByAssetId', methods=['GET'])
 @handle_errors
 def fetch_picture_by_asset_id():
@@ -124,6 +252,7 @@ def fetch_picture_by_asset_id():
 
 @picture_bp.route('/fetchPicturesByWorkId', methods=['GET'])
 @handle_errors
+@conditional_get('private, max-age=60')
 def fetch_pictures_by_work_id():
     """
     通过 work_id 获取漫画图片列表（无或一或多）
@@ -133,9 +262,10 @@ def fetch_pictures_by_work_id():
     - user_id: 用户 ID (必填，用于权限验证)
     - limit: 返回数量限制 (可选，默认 100)
     - offset: 偏移量 (可选，默认 0)
+    - renditions_only: 为 true 时不返回原图 URL，只返回缩略图/预览图 (可选，默认 false)
 
     返回：
-    - assets: 资产列表（每个元素包含 asset 和 asset_data）
+    - assets: 资产列表（每个元素包含 asset 和 asset_data，asset_data 含 renditions 和 srcset）
     """
     validate_required_fields(request.args, [RequestParams.WORK_ID, RequestParams.USER_ID])
 
@@ -165,6 +295,8 @@ def fetch_pictures_by_work_id():
     # 获取 MongoDB 中的 asset_data
     asset_ids = [row[RequestParams.ASSET_ID] for row in mysql_rows]
     asset_data_map = MongoService().fetch_multiple_asset_data(asset_ids)
+    _attach_renditions(asset_data_map, _is_true(request.args.get('renditions_only')))
+    g.last_modified = max(row['updated_at'] for row in mysql_rows)
 
     # 构建返回结果 - 标准 asset 格式
     results = []
@@ -201,9 +333,10 @@ def fetch_pictures_by_user_id():
     - work_id: 作品 ID (可选，筛选特定作品的图片)
     - limit: 返回数量限制 (可选，默认 100)
     - offset: 偏移量 (可选，默认 0)
+    - renditions_only: 为 true 时不返回原图 URL，只返回缩略图/预览图 (可选，默认 false)
 
     返回：
-    - assets: 资产列表（每个元素包含 asset 和 asset_data）
+    - assets: 资产列表（每个元素包含 asset 和 asset_data，asset_data 含 renditions 和 srcset）
     """
     validate_required_fields(request.args, [RequestParams.USER_ID])
 
@@ -233,6 +366,7 @@ def fetch_pictures_by_user_id():
     # 获取 MongoDB 中的 asset_data
     asset_ids = [row[RequestParams.ASSET_ID] for row in mysql_rows]
     asset_data_map = MongoService().fetch_multiple_asset_data(asset_ids)
+    _attach_renditions(asset_data_map, _is_true(request.args.get('renditions_only')))
 
     # 构建返回结果 - 标准 asset 格式
     results = []
@@ -291,22 +425,22 @@ def delete_picture():
     asset_data = MongoService().fetch_asset_data(asset_id)
     oss_object_key = asset_data.get(RequestParams.OSS_OBJECT_KEY) if asset_data else None
 
-    # 删除 OSS 中的图片
-    if oss_object_key:
-        try:
-            delete_result = oss_service.delete_picture(oss_object_key)
-            if not delete_result.get('success'):
-                logger.warning(f"Failed to delete picture from OSS: {delete_result.get('error')}")
-                # 继续删除数据库记录，即使 OSS 删除失败
-        except Exception as e:
-            logger.error(f"Error deleting picture from OSS: {str(e)}")
-
     # 级联删除数据库中的记录
     try:
         MongoService().delete_asset_data(asset_id)
     except Exception as e:
         logger.error(f"Error deleting asset data from MongoDB: {str(e)}")
 
+    # 释放 OSS 图片引用（相同内容的图片共享对象，引用数为 0 时才删除）
+    if oss_object_key:
+        try:
+            delete_result = release_picture_objects([oss_object_key])
+            for item in delete_result.get('failed', []):
+                logger.warning(f"Failed to delete picture from OSS: {item['error']}")
+                # 继续删除数据库记录，即使 OSS 删除失败
+        except Exception as e:
+            logger.error(f"Error deleting picture from OSS: {str(e)}")
+
     deleted = MySQLService().delete_asset(asset_id)
 
     if deleted:
@@ -5,9 +5,10 @@
 from flask import Blueprint, request, g
 from utils.response_helper import api_response, error_response
 from utils.decorators import handle_errors, jwt_required
-from db import mysql_service, mongo_service, oss_service
+from db import mysql_service, mongo_service
 from services.jwt_service import jwt_service
 from services.token_blacklist_service import token_blacklist_service
+from utils.picture_uploader import release_picture_objects
 import logging
 
 logger = logging.getLogger(__name__)
@@ -314,22 +315,17 @@ def delete_user(user_id: str):
     # 1. 获取用户的所有 assets
     user_assets = mysql_service.fetch_assets(user_id, limit=1000, offset=0)
 
-    # 2. 删除每个 asset 及其关联的 OSS 图片和 MongoDB 数据
+    # 2. 删除每个 asset 关联的 MongoDB 数据，收集 OSS 图片对象键
     deleted_assets_count = 0
+    oss_object_keys = []
     for asset in user_assets:
         asset_id = asset['asset_id']
         asset_type = asset['asset_type']
         asset_data = mongo_service.fetch_asset_data(asset_id)
 
-        # 如果是 comic 类型，删除 OSS 中的图片
-        if asset_type == 'comic' and asset_data:
-            oss_object_key = asset_data.get('oss_object_key')
-            if oss_object_key:
-                try:
-                    oss_service.delete_picture(oss_object_key)
-                    logger.info(f"Deleted OSS picture for asset: {asset_id}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete OSS picture {asset_id}: {e}")
+        # 如果是 comic 类型，记录 OSS 中的图片
+        if asset_type == 'comic' and asset_data and asset_data.get('oss_object_key'):
+            oss_object_keys.append(asset_data['oss_object_key'])
 
         # 删除 MongoDB 中的 asset_data
         try:
@@ -338,6 +334,16 @@ def delete_user(user_id: str):
         except Exception as e:
             logger.error(f"Error deleting asset data {asset_id}: {e}")
 
+    # 批量释放 OSS 中的图片（仍被其他用户的 asset 引用的对象保留）
+    if oss_object_keys:
+        try:
+            delete_result = release_picture_objects(oss_object_keys)
+            logger.info(f"Deleted {len(delete_result.get('deleted_keys', []))} OSS pictures for user: {user_id}")
+            for item in delete_result.get('failed', []):
+                logger.warning(f"Failed to delete OSS picture {item['object_key']}: {item['error']}")
+        except Exception as e:
+            logger.warning(f"Failed to delete OSS pictures for user {user_id}: {e}")
+
     # 3. 从 MySQL 中删除 assets
     for asset in user_assets:
         try:
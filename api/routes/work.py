@@ -3,18 +3,21 @@
 作品路由模块
 统一使用 MySQL/MongoDB 存储
 """
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from utils.response_helper import error_response, api_response
-from utils.decorators import handle_errors
+from utils.decorators import handle_errors, conditional_get
 from utils.general_helper import validate_required_fields
 from utils.resource_helper import (
     get_full_asset_by_id,
     get_full_work_by_id,
+    get_full_entities,
+    cached_version,
     build_work_data,
     parse_pagination_args,
     delete_work_cascade
 )
 from db import MySQLService, MongoService
+from services.entity_cache_service import ENTITY_WORK
 import logging
 
 work_bp = Blueprint('work', __name__)
@@ -87,6 +90,7 @@ def update_work():
 
 @work_bp.route('/getWorkById', methods=['GET'])
 @handle_errors
+@conditional_get('private, no-cache', version=cached_version(ENTITY_WORK, 'work_id'))
 def get_work():
     """获取单个作品详情"""
     validate_required_fields(request.args, ['work_id'])
@@ -104,6 +108,32 @@ def get_work():
     )
 
 
+@work_bp.route('/batchGet', methods=['POST'])
+@handle_errors
+def batch_get():
+    """批量获取作品、小说章节、anime 镜头和资产（替代逐个请求重建作品页面）"""
+    data = request.get_json()
+    if data is None:
+        return error_response('Request body must be JSON', 400)
+
+    result = get_full_entities(
+        work_ids=data.get('work_ids'),
+        novel_ids=data.get('novel_ids'),
+        anime_ids=data.get('anime_ids'),
+        asset_ids=data.get('asset_ids'),
+        expand=bool(data.get('expand', False)),
+        max_ids=current_app.config.get('BATCH_FETCH_MAX_IDS', 200)
+    )
+
+    count = sum(len(result[key]) for key in ('works', 'novels', 'animes', 'assets'))
+    return api_response(
+        success=True,
+        message='Entities fetched successfully',
+        data=result,
+        count=count
+    )
+
+
 @work_bp.route('/getWorksByAuthorId', methods=['GET'])
 @handle_errors
 def get_works_by_author_id():
@@ -1,6 +1,3 @@
-import os
-import logging
-from logging.handlers import TimedRotatingFileHandler
 from flask import Flask, jsonify
 
 def create_app(config_name='default'):
@@ -11,82 +8,151 @@ def create_app(config_name='default'):
     app.config.from_object(Config)
     Config.init_app(app)
 
-    # 配置日志处理器
+    # 配置 JSON 序列化（orjson，datetime 原生输出 ISO 8601）
+    from utils.json_provider import init_json_provider
+    init_json_provider(app)
+
+    # 配置服务初始化方式与存活/就绪探针（/rest/v1/health/live、/rest/v1/health/ready）
+    init_startup_service(app)
+
+    # 配置请求耗时分解（Server-Timing，先于压缩注册，统计包含压缩耗时）
+    init_request_timing(app)
+
+    # 配置 Prometheus 指标（/metrics；须在数据库客户端之前初始化，以监听 MongoDB 连接池）
+    init_metrics(app)
+
+    # 配置响应压缩（zstd/br/gzip 协商）
+    init_compression(app)
+
+    # 配置日志处理器（QueueHandler + 后台写入线程）
     _setup_logging(app)
 
-    # 初始化数据库客户端
+    # 登记数据库客户端（按 SERVICE_INIT_MODE 后台预热、首次使用时初始化或同步初始化）
     init_mysql(app)
     init_mongo(app)
 
+    # 登记实体读穿缓存
+    init_entity_cache_service(app)
+
     # 初始化 AI 服务
     init_ai_service(app)
 
-    # 初始化对话历史服务
+    # 登记对话历史服务
     init_conversation_history(app)
 
-    # 初始化 OSS 服务（统一对象存储接口，包含 Picture 和 Video 服务）
+    # 登记 OSS 服务（统一对象存储接口，包含 Picture 和 Video 服务）
     init_oss_service(app)
 
+    # 初始化图片处理服务（分格裁剪、下载缓存）
+    init_image_processing_service(app)
+
+    # 初始化视频拼接服务（本地 ffmpeg）
+    init_video_stitching_service(app)
+
     # 初始化 Anime 服务（动画生成）
     init_anime_service(app)
 
+    # 初始化视频生成请求去重服务
+    init_generation_dedup_service(app)
+
+    # 初始化生成任务事件服务（SSE、Webhook）
+    init_job_event_service(app)
+
     # 初始化视频生成服务
     init_video_generation_service(app)
 
     # 注册 Flask Blueprints
     register_blueprints(app)
 
+    # 记录应用初始化耗时，启动后台预热
+    from services.startup_service import startup_service
+    startup_service.start()
+
     return app
 
 
 def _setup_logging(app):
-    """配置日志处理器，将日志写入 logs/narloom.log"""
-    # 确保 logs 目录存在
-    logs_dir = os.path.join(os.path.dirname(__file__), 'logs')
-    os.makedirs(logs_dir, exist_ok=True)
-
-    # 配置文件处理器
-    log_file = os.path.join(logs_dir, 'narloom.log')
-    file_handler = TimedRotatingFileHandler(
-        log_file,
-        when='D',
-        interval=1,
-        backupCount=7,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
+    """配置日志：经队列由后台线程写入 logs/narloom.log（JSON 格式）"""
+    from utils.logging_helper import setup_logging
 
-    # 设置日志格式
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(formatter)
+    setup_logging(app)
 
-    # 添加到应用日志
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
 
+def init_request_timing(app):
+    """初始化请求耗时中间件"""
+    from services.request_timing import request_timing
 
-def init_mysql(app):
-    """初始化 MySQL 客户端"""
-    from services.mysql_service import mysql_service
+    request_timing.init_app(app)
 
-    mysql_service.init_app(app)
 
-    # 触发初始化
-    if not mysql_service._initialized:
-        app.logger.error("Failed to initialize MySQL service.")
+def init_metrics(app):
+    """初始化 Prometheus 指标"""
+    from services.metrics import metrics
 
-def init_mongo(app):
-    """初始化 MongoDB 客户端"""
-    from services.mongo_service import mongo_service
+    metrics.init_app(app)
 
-    mongo_service.init_app(app)
 
-    # 触发初始化
-    if not mongo_service._initialized:
-        app.logger.error("Failed to initialize MongoDB service.")
+def init_compression(app):
+    """初始化响应压缩中间件"""
+    from utils.compression import compression
+
+    compression.init_app(app)
+
+def init_startup_service(app):
+    """初始化服务启动管理（初始化方式、存活/就绪探针）"""
+    from services.startup_service import startup_service
+
+    startup_service.init_app(app)
+
+def init_mysql(app):
+    """登记 MySQL 客户端"""
+    from services.mysql_service import mysql_service
+    from services.startup_service import startup_service
+
+    startup_service.register(
+        'mysql',
+        init=lambda: mysql_service.init_app(app),
+        ready=lambda: mysql_service._initialized
+    )
+
+def init_mongo(app):
+    """登记 MongoDB 客户端（每个集合服务单独初始化和计时）"""
+    from db.mongo_asset import asset_data_service
+    from db.mongo_work import work_details_service
+    from db.mongo_novel import novel_details_service
+    from db.mongo_anime import anime_details_service
+    from db.mongo_vision_cache import vision_cache_service
+    from db.mongo_video_task import video_task_service
+    from db.mongo_generation_job import generation_job_service
+    from services.startup_service import startup_service
+
+    services = {
+        'mongo.asset_data': asset_data_service,
+        'mongo.work_details': work_details_service,
+        'mongo.novel_details': novel_details_service,
+        'mongo.anime_details': anime_details_service,
+        'mongo.vision_cache': vision_cache_service,
+        'mongo.video_tasks': video_task_service,
+        'mongo.generation_jobs': generation_job_service,
+    }
+    for name, service in services.items():
+        startup_service.register(
+            name,
+            init=lambda s=service: s.init_app(app),
+            ready=lambda s=service: s._initialized
+        )
+
+def init_entity_cache_service(app):
+    """登记实体读穿缓存服务"""
+    from services.entity_cache_service import entity_cache_service
+    from services.startup_service import startup_service
+
+    startup_service.register(
+        'entity_cache',
+        init=lambda: entity_cache_service.init_app(app),
+        ready=lambda: entity_cache_service._initialized,
+        critical=False
+    )
 
 def init_ai_service(app):
     """初始化 AI Service"""
@@ -99,11 +165,16 @@ def init_ai_service(app):
         app.logger.error("Failed to initialize Qwen AI Service.")
 
 def init_conversation_history(app):
-    """初始化对话历史服务"""
+    """登记对话历史服务"""
     from services.conversation_history import conversation_history
+    from services.startup_service import startup_service
 
-    conversation_history.init_app(app)
-    app.logger.info("Conversation history service initialized.")
+    startup_service.register(
+        'conversation_history',
+        init=lambda: conversation_history.init_app(app),
+        ready=lambda: conversation_history.initialized,
+        critical=False
+    )
 
 def init_anime_service(app):
     """初始化 Anime Generation Service（动画生成业务逻辑）"""
@@ -120,15 +191,52 @@ def init_video_generation_service(app):
     if not VideoGenerationService()._initialized:
         app.logger.error("Failed to initialize video generation service.")
 
-def init_oss_service(app):
-    """初始化 OSS Service（统一对象存储接口，包含 Picture 和 Video 服务）"""
-    from db import oss_service
+    # 恢复进程重启前未完成的视频生成任务（启动任务，在 MongoDB 就绪后执行）
+    if app.config.get('VIDEO_TASK_RECOVERY_ENABLED', True) and not app.config.get('TESTING'):
+        from services.startup_service import startup_service
 
-    oss_service.init_app(app)
+        startup_service.defer('video_task_recovery', lambda: VideoGenerationService().recover_video_tasks())
 
-    # 触发初始化
-    if not oss_service._initialized:
-        app.logger.error("Failed to initialize OSS service.")
+def init_generation_dedup_service(app):
+    """初始化视频生成请求去重服务"""
+    from services.generation_dedup_service import generation_dedup_service
+
+    generation_dedup_service.init_app(app)
+
+def init_job_event_service(app):
+    """初始化生成任务事件服务"""
+    from services.job_event_service import job_event_service
+
+    job_event_service.init_app(app)
+
+def init_image_processing_service(app):
+    """初始化图片处理服务"""
+    from services.image_processing_service import image_processing_service
+
+    image_processing_service.init_app(app)
+
+def init_video_stitching_service(app):
+    """初始化视频拼接服务"""
+    from services.video_stitching_service import video_stitching_service
+
+    video_stitching_service.init_app(app)
+
+    if not video_stitching_service.is_available():
+        app.logger.warning("ffmpeg not found, multi-video stitching is unavailable.")
+
+def init_oss_service(app):
+    """登记 OSS Service（统一对象存储接口，包含 Picture 和 Video 服务）"""
+    from db import oss_service
+    from services.startup_service import startup_service
+
+    # lazy 模式下首次使用可能发生在工作线程中，预先记录应用
+    oss_service.bind_app(app)
+    startup_service.register(
+        'oss',
+        init=lambda: oss_service.init_app(app),
+        ready=lambda: oss_service._initialized,
+        critical=False
+    )
 
 def register_blueprints(app):
     from api.routes.user import user_bp
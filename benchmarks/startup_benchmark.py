@@ -0,0 +1,271 @@
+"""
+启动性能基准
+在全新的子进程中多次启动应用，测量：
+- 导入耗时分解（python -X importtime，按顶层包汇总）
+- 导入 app、create_app、首个请求的耗时，以及从启动进程到首个请求完成的时间
+- 首个请求后的常驻内存（RSS）
+- 首个请求后已导入的重量级依赖（oss2、bcrypt 等应在首次使用时才导入）
+
+结果追加写入 benchmarks/startup_history.jsonl，并与上一次记录比较
+
+使用示例:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --label "defer oss2"
+    python benchmarks/startup_benchmark.py --no-save
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'startup_history.jsonl')
+
+# 检查首个请求后是否已导入的依赖
+HEAVY_MODULES = ('oss2', 'bcrypt', 'jwt', 'pymysql', 'pymongo', 'requests', 'prometheus_client')
+
+# 对比上一次记录的指标
+METRICS = ('import_ms', 'create_app_ms', 'first_request_ms', 'time_to_first_request_ms', 'rss_mb')
+
+# 在子进程中执行：导入应用、创建应用并处理首个请求
+CHILD_SCRIPT = """
+import os, sys, json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/rest/v1/health/live')
+finished = time.perf_counter()
+finished_at = time.time()
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+except (OSError, StopIteration):
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss_kb //= 1024
+
+print(json.dumps({
+    'status_code': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (finished - created) * 1000,
+    'time_to_first_request_ms': (finished_at - float(os.environ['STARTUP_BENCHMARK_SPAWNED_AT'])) * 1000,
+    'rss_mb': rss_kb / 1024,
+    'loaded_modules': [name for name in json.loads(os.environ['STARTUP_BENCHMARK_MODULES']) if name in sys.modules],
+}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    解析 python -X importtime 的输出
+
+    Args:
+        output: 子进程 stderr
+
+    Returns:
+        List[Dict]: [{module, self_us, cumulative_us, depth}]，按导入完成顺序
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            entries.append({
+                'module': name.strip(),
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def summarize_imports(entries: List[Dict], top: int = 15) -> List[Dict]:
+    """
+    按顶层包汇总导入耗时（各模块自身耗时之和）
+
+    Args:
+        entries: parse_importtime 的结果
+        top: 返回耗时最高的包数量
+
+    Returns:
+        List[Dict]: [{package, ms, modules}]，按耗时降序
+    """
+    totals = defaultdict(lambda: {'us': 0, 'modules': 0})
+    for entry in entries:
+        package = entry['module'].split('.')[0]
+        totals[package]['us'] += entry['self_us']
+        totals[package]['modules'] += 1
+    packages = [{'package': name, 'ms': round(value['us'] / 1000, 2), 'modules': value['modules']}
+                for name, value in totals.items()]
+    return sorted(packages, key=lambda p: p['ms'], reverse=True)[:top]
+
+
+def _child_env(init_mode: str, log_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    env.update(
+        SERVICE_INIT_MODE=init_mode,
+        VIDEO_TASK_RECOVERY_ENABLED='False',
+        LOG_DIR=log_dir,
+        LOG_CONSOLE='False',
+        STARTUP_BENCHMARK_MODULES=json.dumps(HEAVY_MODULES),
+    )
+    return env
+
+
+def run_once(init_mode: str = 'lazy', importtime: bool = False, python: str = sys.executable) -> Dict:
+    """
+    在新的子进程中启动一次应用
+
+    Args:
+        init_mode: SERVICE_INIT_MODE（默认 lazy，不连接数据库，只测量应用自身的启动开销）
+        importtime: 是否同时收集 -X importtime 输出
+        python: Python 解释器路径
+
+    Returns:
+        Dict: 各项耗时（毫秒）、rss_mb、loaded_modules，importtime 为 True 时包含 imports
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        env = _child_env(init_mode, log_dir)
+        command = [python] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD_SCRIPT]
+        env['STARTUP_BENCHMARK_SPAWNED_AT'] = repr(time.time())
+        result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Application failed to start:\n{result.stderr[-2000:]}")
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        sample['imports'] = parse_importtime(result.stderr)
+    return sample
+
+
+def run_benchmark(runs: int = 5, init_mode: str = 'lazy', top: int = 15) -> Dict:
+    """
+    多次启动应用并汇总结果（先执行一次预热运行，生成 .pyc 后再计时）
+
+    Args:
+        runs: 计时运行次数
+        init_mode: SERVICE_INIT_MODE
+        top: 导入耗时分解中保留的包数量
+
+    Returns:
+        Dict: 基准记录（各指标取中位数和最小值）
+    """
+    run_once(init_mode)
+    samples = [run_once(init_mode) for _ in range(runs)]
+    profile = run_once(init_mode, importtime=True)
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'init_mode': init_mode,
+        'runs': runs,
+    }
+    for metric in METRICS:
+        values = [sample[metric] for sample in samples]
+        record[metric] = round(statistics.median(values), 2)
+        record[f'{metric}_min'] = round(min(values), 2)
+    record['loaded_modules'] = profile['loaded_modules']
+    record['imports'] = summarize_imports(profile['imports'], top)
+    record['slowest_modules'] = [
+        {'module': entry['module'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 2)}
+        for entry in sorted(profile['imports'], key=lambda e: e['cumulative_us'], reverse=True)
+        if not entry['module'].startswith(('encodings', 'site'))
+    ][:top]
+    return record
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict]:
+    """读取历史记录（每行一个 JSON 对象）"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_record(path: str, record: Dict):
+    """追加一条记录到历史文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def print_report(record: Dict, previous: Optional[Dict] = None):
+    """打印结果，有上一次记录时显示变化"""
+    print("=" * 60)
+    print(f" 启动基准  commit={record['commit']}  python={record['python']}  "
+          f"mode={record['init_mode']}  runs={record['runs']}")
+    print("=" * 60)
+    for metric in METRICS:
+        line = f"  {metric:<28}{record[metric]:>10.2f}  (min {record[f'{metric}_min']:.2f})"
+        if previous and previous.get(metric):
+            delta = record[metric] - previous[metric]
+            line += f"  {delta:+.2f} ({delta / previous[metric] * 100:+.1f}%) vs {previous.get('commit')}"
+        print(line)
+
+    print(f"\n  首个请求后已导入: {', '.join(record['loaded_modules']) or '-'}")
+    deferred = [name for name in HEAVY_MODULES if name not in record['loaded_modules']]
+    print(f"  首个请求后未导入: {', '.join(deferred) or '-'}")
+
+    print("\n  导入耗时（按顶层包，自身耗时之和）:")
+    for package in record['imports']:
+        print(f"    {package['package']:<30}{package['ms']:>10.2f} ms  ({package['modules']} modules)")
+
+    print("\n  导入耗时（按模块，累计耗时）:")
+    for module in record['slowest_modules']:
+        print(f"    {module['module']:<40}{module['cumulative_ms']:>10.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量应用导入耗时、首个请求耗时和启动后内存')
+    parser.add_argument('--runs', type=int, default=5, help='计时运行次数（默认 5）')
+    parser.add_argument('--init-mode', default='lazy', choices=('lazy', 'background', 'eager'),
+                        help='SERVICE_INIT_MODE（默认 lazy，不连接数据库）')
+    parser.add_argument('--top', type=int, default=15, help='导入耗时分解显示的条目数')
+    parser.add_argument('--label', help='记录备注（如本次改动说明）')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='历史记录文件')
+    parser.add_argument('--no-save', action='store_true', help='不写入历史记录')
+    args = parser.parse_args(argv)
+
+    record = run_benchmark(runs=args.runs, init_mode=args.init_mode, top=args.top)
+    if args.label:
+        record['label'] = args.label
+
+    history = load_history(args.history)
+    previous = next((r for r in reversed(history) if r.get('init_mode') == record['init_mode']), None)
+    print_report(record, previous)
+
+    if not args.no_save:
+        save_record(args.history, record)
+        print(f"\n结果已写入 {os.path.relpath(args.history, ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,8 @@ def create_app():
 
 def clear_all_assets():
     """清空所有 asset 数据和 OSS 图片"""
-    from db import mysql_service, MongoService, mysql_base_service, oss_service
+    from db import mysql_service, MongoService, mysql_base_service
+    from utils.picture_uploader import release_picture_objects
 
     print("开始清空所有资产数据...")
 
@@ -35,26 +36,18 @@ def clear_all_assets():
     deleted_count = 0
     oss_deleted_count = 0
     mongo_deleted_count = 0
+    oss_object_keys = []
 
     for asset in all_assets:
         asset_id = asset['asset_id']
         asset_type = asset['asset_type']
 
-        # 删除 OSS 上的图片（仅 comic 类型）
+        # 收集 OSS 上的图片（仅 comic 类型），稍后批量删除
         if asset_type == 'comic':
             # 从 MongoDB 获取 oss_object_key
             asset_data = MongoService().fetch_asset_data(asset_id)
             if asset_data and asset_data.get('oss_object_key'):
-                oss_object_key = asset_data['oss_object_key']
-                try:
-                    delete_result = oss_service.delete_picture(oss_object_key)
-                    if delete_result.get('success'):
-                        oss_deleted_count += 1
-                        print(f"  已删除 OSS 图片：{oss_object_key}")
-                    else:
-                        print(f"  OSS 删除失败：{oss_object_key} - {delete_result.get('error')}")
-                except Exception as e:
-                    print(f"  OSS 删除异常：{oss_object_key} - {str(e)}")
+                oss_object_keys.append(asset_data['oss_object_key'])
 
             # 删除 MongoDB 中的 asset_data
             try:
@@ -71,6 +64,17 @@ def clear_all_assets():
         except Exception as e:
             print(f"  MySQL 删除异常：{asset_id} - {str(e)}")
 
+    # 3. 批量释放 OSS 图片（无 asset 引用的原图连同 rendition/ 下的副本一并删除，分块并发）
+    if oss_object_keys:
+        try:
+            delete_result = release_picture_objects(oss_object_keys)
+            originals = set(oss_object_keys)
+            oss_deleted_count = len([key for key in delete_result.get('deleted_keys', []) if key in originals])
+            for item in delete_result.get('failed', []):
+                print(f"  OSS 删除失败：{item['object_key']} - {item['error']}")
+        except Exception as e:
+            print(f"  OSS 删除异常：{str(e)}")
+
     print(f"\n清空完成!")
     print(f"  - MySQL 删除 asset 记录：{deleted_count} 条")
     print(f"  - OSS 删除图片：{oss_deleted_count} 张")
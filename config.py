@@ -41,6 +41,34 @@ class Config:
     # Token Blacklist 配置
     JWT_BLACKLIST_ENABLED = os.getenv('JWT_BLACKLIST_ENABLED', 'True').lower() == 'true'
 
+    # JSON 序列化配置（orjson：基于 orjson 的快速 Provider；stdlib：Flask 默认 Provider）
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+
+    # 响应压缩配置（编码按优先级排列；br 需要 brotli 包，zstd 需要 zstandard 包）
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_ALGORITHMS = os.getenv('COMPRESSION_ALGORITHMS', 'zstd,br,gzip')
+    COMPRESSION_LEVELS = os.getenv('COMPRESSION_LEVELS', 'zstd:3,br:5,gzip:6')
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_MIMETYPES = os.getenv('COMPRESSION_MIMETYPES', '')
+
+    # 请求耗时分解配置（Server-Timing 响应头；超过 REQUEST_TIMING_SLOW_MS 的请求按 WARNING 记录）
+    REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'True').lower() == 'true'
+    REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 1000))
+
+    # Prometheus 指标配置（多进程部署时另需设置环境变量 PROMETHEUS_MULTIPROC_DIR）
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+
+    # 日志配置（LOG_FORMAT：json 或 text；LOG_DEBUG_SAMPLE_RATE：DEBUG 日志采样比例 0-1）
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_DIR = os.getenv('LOG_DIR', '')
+    LOG_CONSOLE = os.getenv('LOG_CONSOLE', 'True').lower() == 'true'
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+    # 服务初始化方式（background：后台预热；lazy：首次使用时初始化；eager：启动时同步初始化）
+    SERVICE_INIT_MODE = os.getenv('SERVICE_INIT_MODE', 'background')
+    SERVICE_WARMUP_RETRY_INTERVAL = float(os.getenv('SERVICE_WARMUP_RETRY_INTERVAL', 5))
+
     # 文件上传配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
@@ -81,6 +109,87 @@ class Config:
     ALIYUN_OSS_BUCKET_NAME = os.getenv('ALIYUN_OSS_BUCKET_NAME', 'narloom-comic')
     ALIYUN_OSS_CDN_DOMAIN = os.getenv('ALIYUN_OSS_CDN_DOMAIN', '')
 
+    # 签名 URL 缓存配置（未配置 CDN 时生效，过期时间按桶对齐以复用签名）
+    SIGNED_URL_CACHE_SIZE = int(os.getenv('SIGNED_URL_CACHE_SIZE', 10000))
+    SIGNED_URL_EXPIRY_BUCKET = int(os.getenv('SIGNED_URL_EXPIRY_BUCKET', 300))
+
+    # OSS 批量删除配置（每块最多 1000 个对象，分块并发删除）
+    OSS_DELETE_CHUNK_SIZE = int(os.getenv('OSS_DELETE_CHUNK_SIZE', 1000))
+    OSS_DELETE_WORKERS = int(os.getenv('OSS_DELETE_WORKERS', 4))
+
+    # OSS 大文件上传配置（超过阈值时分片并发上传，断点信息保存在 OSS_CHECKPOINT_DIR）
+    OSS_MULTIPART_THRESHOLD = int(os.getenv('OSS_MULTIPART_THRESHOLD', 20 * 1024 * 1024))
+    OSS_MULTIPART_PART_SIZE = int(os.getenv('OSS_MULTIPART_PART_SIZE', 10 * 1024 * 1024))
+    OSS_UPLOAD_THREADS = int(os.getenv('OSS_UPLOAD_THREADS', 4))
+    OSS_UPLOAD_RETRIES = int(os.getenv('OSS_UPLOAD_RETRIES', 2))
+    OSS_CHECKPOINT_DIR = os.getenv('OSS_CHECKPOINT_DIR', '')
+
+    # OSS 流式下载每次读取的字节数（视频 Range 代理）
+    OSS_STREAM_CHUNK_SIZE = int(os.getenv('OSS_STREAM_CHUNK_SIZE', 256 * 1024))
+
+    # 浏览器直传 OSS 配置（签名有效期、完成上传凭证有效期，秒）
+    DIRECT_UPLOAD_EXPIRES = int(os.getenv('DIRECT_UPLOAD_EXPIRES', 600))
+    DIRECT_UPLOAD_TOKEN_TTL = int(os.getenv('DIRECT_UPLOAD_TOKEN_TTL', 3600))
+
+    # 图片处理配置（分格裁剪、本地下载缓存）
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', '')
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+    IMAGE_DOWNLOAD_TIMEOUT = int(os.getenv('IMAGE_DOWNLOAD_TIMEOUT', 10))
+    IMAGE_DOWNLOAD_MAX_BYTES = int(os.getenv('IMAGE_DOWNLOAD_MAX_BYTES', 50 * 1024 * 1024))
+    PANEL_MAX_SIDE = int(os.getenv('PANEL_MAX_SIDE', 1280))
+    PANEL_JPEG_QUALITY = int(os.getenv('PANEL_JPEG_QUALITY', 90))
+    VISION_MAX_PIXELS = int(os.getenv('VISION_MAX_PIXELS', 1280 * 28 * 28))
+    VISION_MAX_BYTES = int(os.getenv('VISION_MAX_BYTES', 2 * 1024 * 1024))
+    VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', 85))
+
+    # 图片副本配置（上传后后台生成，列表接口返回 srcset）
+    PICTURE_RENDITIONS = os.getenv('PICTURE_RENDITIONS', 'thumb:320,preview:1280')
+    PICTURE_RENDITION_FORMATS = os.getenv('PICTURE_RENDITION_FORMATS', 'WEBP')
+    PICTURE_RENDITION_QUALITY = int(os.getenv('PICTURE_RENDITION_QUALITY', 80))
+
+    # 视频拼接配置（本地 ffmpeg）
+    FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
+    FFPROBE_PATH = os.getenv('FFPROBE_PATH', 'ffprobe')
+    VIDEO_STITCH_WORKERS = int(os.getenv('VIDEO_STITCH_WORKERS', 2))
+    VIDEO_STITCH_TIMEOUT = int(os.getenv('VIDEO_STITCH_TIMEOUT', 300))
+    VIDEO_STITCH_TMP_DIR = os.getenv('VIDEO_STITCH_TMP_DIR', '')
+
+    # 视频生成请求去重配置（相同请求在 TTL 内复用结果）
+    VIDEO_DEDUP_TTL = int(os.getenv('VIDEO_DEDUP_TTL', 1800))
+    VIDEO_DEDUP_MAX_ENTRIES = int(os.getenv('VIDEO_DEDUP_MAX_ENTRIES', 1000))
+
+    # 实体读穿缓存配置（work/asset/anime 聚合读取，TTL 格式 entity:seconds；Redis 共享层可选）
+    ENTITY_CACHE_ENABLED = os.getenv('ENTITY_CACHE_ENABLED', 'True').lower() == 'true'
+    ENTITY_CACHE_TTLS = os.getenv('ENTITY_CACHE_TTLS', 'asset:300,work:120,anime:60')
+    ENTITY_CACHE_DEFAULT_TTL = int(os.getenv('ENTITY_CACHE_DEFAULT_TTL', 60))
+    ENTITY_CACHE_MAX_ENTRIES = int(os.getenv('ENTITY_CACHE_MAX_ENTRIES', 5000))
+    ENTITY_CACHE_REDIS_URL = os.getenv('ENTITY_CACHE_REDIS_URL', '')
+
+    # 批量读取配置（work/batchGet 每种实体的 ID 上限、MongoDB 并发查询线程数）
+    BATCH_FETCH_MAX_IDS = int(os.getenv('BATCH_FETCH_MAX_IDS', 200))
+    BATCH_FETCH_WORKERS = int(os.getenv('BATCH_FETCH_WORKERS', 4))
+
+    # 视频任务持久化配置（进程重启后恢复未完成任务的轮询）
+    VIDEO_TASK_RECOVERY_ENABLED = os.getenv('VIDEO_TASK_RECOVERY_ENABLED', 'True').lower() == 'true'
+    VIDEO_TASK_LEASE_SECONDS = int(os.getenv('VIDEO_TASK_LEASE_SECONDS', 60))
+    VIDEO_TASK_RESUME_MAX_WAIT = int(os.getenv('VIDEO_TASK_RESUME_MAX_WAIT', 1800))
+
+    # 生成任务事件配置（SSE 推送、后台执行、完成 Webhook）
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_EVENT_RETENTION = int(os.getenv('JOB_EVENT_RETENTION', 3600))
+    JOB_EVENT_BUFFER = int(os.getenv('JOB_EVENT_BUFFER', 2000))
+    SSE_HEARTBEAT_INTERVAL = int(os.getenv('SSE_HEARTBEAT_INTERVAL', 15))
+    # 跨进程订阅：轮询 generation_jobs 的间隔（秒），任务一直未找到时关闭连接的超时（秒）
+    JOB_STORE_POLL_INTERVAL = float(os.getenv('JOB_STORE_POLL_INTERVAL', 2))
+    JOB_STREAM_UNKNOWN_TIMEOUT = int(os.getenv('JOB_STREAM_UNKNOWN_TIMEOUT', 120))
+    GENERATION_JOB_TTL = int(os.getenv('GENERATION_JOB_TTL', 7 * 24 * 3600))
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', 5))
+    WEBHOOK_TIMEOUT = int(os.getenv('WEBHOOK_TIMEOUT', 5))
+    # Webhook 允许的域名（逗号分隔，".example.com" 匹配子域名；为空时允许所有公网地址）
+    WEBHOOK_ALLOWED_HOSTS = os.getenv('WEBHOOK_ALLOWED_HOSTS', '')
+
     # MySQL 配置
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
@@ -101,6 +210,9 @@ class Config:
     MONGO_WORK_DETAILS_COLLECTION = os.getenv('MONGO_WORK_DETAILS_COLLECTION', 'work_details')
     MONGO_NOVEL_DETAILS_COLLECTION = os.getenv('MONGO_NOVEL_DETAILS_COLLECTION', 'novel_details')
     MONGO_ANIME_DETAILS_COLLECTION = os.getenv('MONGO_ANIME_DETAILS_COLLECTION', 'anime_details')
+    MONGO_VISION_CACHE_COLLECTION = os.getenv('MONGO_VISION_CACHE_COLLECTION', 'vision_cache')
+    MONGO_VIDEO_TASKS_COLLECTION = os.getenv('MONGO_VIDEO_TASKS_COLLECTION', 'video_tasks')
+    MONGO_GENERATION_JOBS_COLLECTION = os.getenv('MONGO_GENERATION_JOBS_COLLECTION', 'generation_jobs')
     @staticmethod
     def init_app(app):
         """初始化应用配置"""
@@ -16,6 +16,9 @@ from .mongo_asset import asset_data_service, AssetDataService
 from .mongo_work import work_details_service, WorkDetailsService
 from .mongo_novel import novel_details_service, NovelDetailsService
 from .mongo_anime import anime_details_service, AnimeDetailsService
+from .mongo_vision_cache import vision_cache_service, VisionCacheService
+from .mongo_video_task import video_task_service, VideoTaskService
+from .mongo_generation_job import generation_job_service, GenerationJobService
 
 # Storage/OSS Services
 from .storage.oss import oss_service, OSSService
@@ -59,6 +62,12 @@ __all__ = [
     'NovelDetailsService',
     'anime_details_service',
     'AnimeDetailsService',
+    'vision_cache_service',
+    'VisionCacheService',
+    'video_task_service',
+    'VideoTaskService',
+    'generation_job_service',
+    'GenerationJobService',
     'MongoService',
     'mongo_service',
     # Storage/OSS
@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime
 from typing import Optional, Dict, List
 from .base_service import mysql_base_service
+from services.entity_cache_service import invalidates_cache, ENTITY_ANIME
 
 
 class AnimeService:
@@ -37,10 +38,11 @@ class AnimeService:
             "description": description,
             "notes": notes,
             "status": status,
-            "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": now.strftime("%Y-%m-%d %H:%M:%S")
+            "created_at": now,
+            "updated_at": now
         }
 
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def update_anime(self, anime_id: str, update_data: Dict) -> Optional[Dict]:
         """更新 anime 镜头记录"""
         conn = mysql_base_service._ensure_connection()
@@ -76,9 +78,6 @@ class AnimeService:
 
             cursor.execute(f"SELECT * FROM {table} WHERE anime_id = %s", (anime_id,))
             row = cursor.fetchone()
-            if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_anime_by_id(self, anime_id: str) -> Optional[Dict]:
@@ -92,8 +91,6 @@ class AnimeService:
             row = cursor.fetchone()
             if row:
                 row['anime_number'] = row['anime_number']
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_anime_by_work_id(self, work_id: str, status: Optional[str] = None,
@@ -115,12 +112,30 @@ class AnimeService:
         with conn.cursor() as cursor:
             cursor.execute(sql, params)
             rows = cursor.fetchall()
-            if rows:
-                for row in rows:
-                    row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                    row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return rows
 
+    def fetch_anime_by_ids(self, anime_ids: List[str]) -> List[Dict]:
+        """根据 anime 镜头 ID 列表批量获取记录（单条 IN 查询）"""
+        return self._fetch_anime_in('anime_id', anime_ids)
+
+    def fetch_anime_by_work_ids(self, work_ids: List[str]) -> List[Dict]:
+        """根据作品 ID 列表批量获取 anime 镜头（按作品、镜头序号排序）"""
+        return self._fetch_anime_in('work_id', work_ids)
+
+    def _fetch_anime_in(self, column: str, values: List[str]) -> List[Dict]:
+        if not values:
+            return []
+        conn = mysql_base_service._ensure_connection()
+        table = mysql_base_service._validate_table_name(
+            mysql_base_service._get_config('MYSQL_TABLE_ANIME', 'anime'))
+        placeholders = ', '.join(['%s'] * len(values))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM {table} WHERE {column} IN ({placeholders}) "
+                           f"ORDER BY work_id, anime_number ASC", list(values))
+            return list(cursor.fetchall())
+
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def delete_anime(self, anime_id: str) -> bool:
         """删除 anime 镜头记录"""
         conn = mysql_base_service._ensure_connection()
@@ -6,6 +6,7 @@ import uuid
 from datetime import datetime
 from typing import Optional, Dict, List
 from .base_service import mysql_base_service
+from services.entity_cache_service import invalidates_cache, ENTITY_ASSET
 
 
 class AssetService:
@@ -32,10 +33,11 @@ class AssetService:
             'user_id': user_id,
             'asset_type': asset_type,
             'work_id': work_id,
-            'created_at': now.strftime("%Y-%m-%d %H:%M:%S"),
-            'updated_at': now.strftime("%Y-%m-%d %H:%M:%S")
+            'created_at': now,
+            'updated_at': now
         }
 
+    @invalidates_cache(ENTITY_ASSET, 'asset_id')
     def update_asset(self, asset_id: str, update_data: Dict) -> Optional[Dict]:
         """更新资产记录"""
         conn = mysql_base_service._ensure_connection()
@@ -67,6 +69,7 @@ class AssetService:
             cursor.execute(f"SELECT * FROM {table} WHERE asset_id = %s", (asset_id,))
             return cursor.fetchone()
 
+    @invalidates_cache(ENTITY_ASSET, 'asset_id')
     def delete_asset(self, asset_id: str) -> bool:
         """删除资产记录"""
         conn = mysql_base_service._ensure_connection()
@@ -90,6 +93,19 @@ class AssetService:
             cursor.execute(sql, (asset_id,))
             return cursor.fetchone()
 
+    def fetch_assets_by_ids(self, asset_ids: List[str]) -> List[Dict]:
+        """根据 asset_id 列表批量获取资产记录（单条 IN 查询）"""
+        if not asset_ids:
+            return []
+        conn = mysql_base_service._ensure_connection()
+        table = mysql_base_service._validate_table_name(
+            mysql_base_service._get_config('MYSQL_TABLE_ASSETS', 'assets'))
+        placeholders = ', '.join(['%s'] * len(asset_ids))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM {table} WHERE asset_id IN ({placeholders})", list(asset_ids))
+            return list(cursor.fetchall())
+
     def fetch_assets(self, user_id: str, asset_type: Optional[str] = None,
                      work_id: Optional[str] = None, limit: int = 100,
                      offset: int = 0) -> List[Dict]:
@@ -7,6 +7,8 @@ from typing import Dict, Optional, Any
 import pymysql
 import pymysql.cursors
 from services.base_service import BaseService
+from services.request_timing import track, MYSQL
+from services.metrics import metrics
 
 # 表名白名单，防止 SQL 注入
 TABLE_WHITELIST = {
@@ -15,6 +17,14 @@ TABLE_WHITELIST = {
 }
 
 
+class TimedDictCursor(pymysql.cursors.DictCursor):
+    """记录查询耗时的 DictCursor（executemany 内部同样经由 execute）"""
+
+    def execute(self, query, args=None):
+        with track(MYSQL):
+            return super().execute(query, args)
+
+
 class MySQLBaseService(BaseService):
     """
     MySQL 基础服务类（单例）
@@ -36,7 +46,7 @@ class MySQLBaseService(BaseService):
     # ---------- 初始化 ----------
     def init_app(self, app):
         """Flask 应用初始化时调用"""
-        with app.app_context():
+        with app.app_context(), self._lock:
             self._initialize()
 
     def _initialize(self):
@@ -57,9 +67,10 @@ class MySQLBaseService(BaseService):
                 password=config['password'],
                 database=config['database'],
                 charset=config['charset'],
-                cursorclass=pymysql.cursors.DictCursor,
+                cursorclass=TimedDictCursor,
                 autocommit=False
             )
+            metrics.inc('mysql_connections')
             self._initialized = True
         except Exception as e:
             self._log(f"Error initializing MySQL service: {e}", level='error')
@@ -85,7 +96,9 @@ class MySQLBaseService(BaseService):
     def _ensure_connection(self):
         """确保连接有效，若断开则重连"""
         if not self._connection:
-            self._initialize()
+            with self._lock:
+                if not self._connection:
+                    self._initialize()
         try:
             self._connection.ping(reconnect=True)
         except Exception:
@@ -9,6 +9,8 @@ from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
 from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+from services.entity_cache_service import invalidates_cache, ENTITY_ANIME
 
 
 class AnimeDetailsService(BaseService):
@@ -28,7 +30,7 @@ class AnimeDetailsService(BaseService):
         return cls._instance
 
     def init_app(self, app):
-        with app.app_context():
+        with app.app_context(), self._lock:
             self._initialize()
 
     def _initialize(self):
@@ -44,7 +46,7 @@ class AnimeDetailsService(BaseService):
             raise RuntimeError("MongoDB configuration incomplete")
 
         try:
-            self._client = MongoClient(mongo_uri)
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
             db = self._client[mongo_db]
             self._collection = db[collection_name]
 
@@ -62,9 +64,12 @@ class AnimeDetailsService(BaseService):
 
     def _ensure_collection(self) -> Collection:
         if self._collection is None:
-            self._initialize()
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
         return self._collection
 
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def insert_anime_details(self, anime_id: str, work_id: str,
                             asset_ids: List[str] = None,
                             video_assets: List[Dict] = None,
@@ -87,6 +92,7 @@ class AnimeDetailsService(BaseService):
             self._log(f"MongoDB insert failed for anime {anime_id}: {str(e)}", level='error')
             raise
 
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def update_anime_details(self, anime_id: str, asset_ids: List[str] = None,
                             video_assets: List[Dict] = None,
                             picture_assets: List[Dict] = None) -> bool:
@@ -120,12 +126,28 @@ class AnimeDetailsService(BaseService):
         docs = collection.find({'work_id': work_id})
         return list(docs) if docs else []
 
+    def fetch_multiple_anime_details(self, anime_ids: List[str] = None,
+                                     work_ids: List[str] = None) -> Dict[str, Dict]:
+        """批量获取 anime details（按 anime_id 列表和/或 work_id 列表）"""
+        conditions = []
+        if anime_ids:
+            conditions.append({'anime_id': {'$in': list(anime_ids)}})
+        if work_ids:
+            conditions.append({'work_id': {'$in': list(work_ids)}})
+        if not conditions:
+            return {}
+        collection = self._ensure_collection()
+        query = conditions[0] if len(conditions) == 1 else {'$or': conditions}
+        return {doc['anime_id']: doc for doc in collection.find(query)}
+
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def delete_anime_details(self, anime_id: str) -> bool:
         """从 MongoDB 中删除 anime details"""
         collection = self._ensure_collection()
         result = collection.delete_one({'anime_id': anime_id})
         return result.deleted_count > 0
 
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def add_asset_to_anime(self, anime_id: str, asset_id: str,
                           asset_type: str = 'video',
                           asset_data: Dict = None) -> bool:
@@ -146,6 +168,7 @@ class AnimeDetailsService(BaseService):
         )
         return result.matched_count > 0
 
+    @invalidates_cache(ENTITY_ANIME, 'anime_id')
     def remove_asset_from_anime(self, anime_id: str, asset_id: str) -> bool:
         """从 anime 的 asset_ids 中移除 asset_id"""
         collection = self._ensure_collection()
@@ -4,10 +4,12 @@ MongoDB 数据访问层 - AssetData
 """
 import threading
 from typing import Optional, Dict, List
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateMany
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
 from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+from services.entity_cache_service import entity_cache_service, invalidates_cache, ENTITY_ASSET
 
 
 class AssetDataService(BaseService):
@@ -27,7 +29,7 @@ class AssetDataService(BaseService):
         return cls._instance
 
     def init_app(self, app):
-        with app.app_context():
+        with app.app_context(), self._lock:
             self._initialize()
 
     def _initialize(self):
@@ -43,13 +45,15 @@ class AssetDataService(BaseService):
             raise RuntimeError("MongoDB configuration incomplete")
 
         try:
-            self._client = MongoClient(mongo_uri)
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
             db = self._client[mongo_db]
             self._collection = db[collection_name]
 
             # 创建索引
             self._collection.create_index('asset_id', unique=True)
-            
+            self._collection.create_index('asset_data.oss_object_key')
+            self._collection.create_index('asset_data.content_hash')
+
             self._initialized = True
         except Exception as e:
             self._log(f"MongoDB initialization error: {str(e)}", level='error')
@@ -57,9 +61,12 @@ class AssetDataService(BaseService):
 
     def _ensure_collection(self) -> Collection:
         if self._collection is None:
-            self._initialize()
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
         return self._collection
 
+    @invalidates_cache(ENTITY_ASSET, 'asset_id')
     def insert_asset_data(self, asset_id: str, asset_data: Dict = None) -> None:
         """插入 asset_data 到 MongoDB"""
         collection = self._ensure_collection()
@@ -72,6 +79,7 @@ class AssetDataService(BaseService):
             self._log(f"MongoDB insert failed for asset {asset_id}: {str(e)}", level='error')
             raise
 
+    @invalidates_cache(ENTITY_ASSET, 'asset_id')
     def update_asset_data(self, asset_id: str, asset_data: Dict) -> bool:
         """更新 asset_data 到 MongoDB"""
         collection = self._ensure_collection()
@@ -87,12 +95,81 @@ class AssetDataService(BaseService):
         doc = collection.find_one({'asset_id': asset_id})
         return doc['asset_data'] if doc else None
 
+    def fetch_asset_by_object_key(self, object_key: str) -> Optional[Dict]:
+        """根据 OSS 对象键获取 asset（包含 asset_id 和 asset_data）"""
+        collection = self._ensure_collection()
+        return collection.find_one({'asset_data.oss_object_key': object_key}, {'_id': 0})
+
+    def fetch_asset_by_content_hash(self, content_hash: str) -> Optional[Dict]:
+        """根据文件内容 SHA-256 获取引用该内容的任一 asset（包含 asset_id 和 asset_data）"""
+        collection = self._ensure_collection()
+        return collection.find_one({'asset_data.content_hash': content_hash}, {'_id': 0})
+
+    def refresh_object_references(self, object_keys: List[str]) -> Dict[str, int]:
+        """
+        重新统计 OSS 对象的引用数，并写回引用这些对象的 asset_data.ref_count
+
+        引用数以实际引用该对象键的 asset 数量为准，并发上传/删除后再次调用即可修正
+
+        Args:
+            object_keys: OSS 对象键列表
+
+        Returns:
+            Dict: 对象键 -> 引用数（无引用的对象键为 0）
+        """
+        collection = self._ensure_collection()
+        keys = list(dict.fromkeys(k for k in object_keys if k))
+        if not keys:
+            return {}
+
+        counts = {key: 0 for key in keys}
+        cursor = collection.aggregate([
+            {'$match': {'asset_data.oss_object_key': {'$in': keys}}},
+            {'$group': {'_id': '$asset_data.oss_object_key', 'count': {'$sum': 1}}}
+        ])
+        for doc in cursor:
+            counts[doc['_id']] = doc['count']
+
+        updates = [UpdateMany({'asset_data.oss_object_key': key}, {'$set': {'asset_data.ref_count': count}})
+                   for key, count in counts.items() if count]
+        if updates:
+            collection.bulk_write(updates, ordered=False)
+            self._invalidate_object_assets([key for key, count in counts.items() if count])
+        return counts
+
+    def fetch_object_renditions(self, object_key: str) -> Optional[List[Dict]]:
+        """获取引用该 OSS 对象的 asset 已记录的图片副本，未生成时返回 None"""
+        collection = self._ensure_collection()
+        doc = collection.find_one(
+            {'asset_data.oss_object_key': object_key, 'asset_data.renditions': {'$exists': True}},
+            {'_id': 0, 'asset_data.renditions': 1}
+        )
+        return doc['asset_data']['renditions'] if doc else None
+
+    def set_object_renditions(self, object_key: str, renditions: List[Dict]) -> int:
+        """将图片副本写入所有引用该 OSS 对象的 asset_data，返回更新的记录数"""
+        collection = self._ensure_collection()
+        result = collection.update_many(
+            {'asset_data.oss_object_key': object_key},
+            {'$set': {'asset_data.renditions': renditions}}
+        )
+        if result.modified_count:
+            self._invalidate_object_assets([object_key])
+        return result.modified_count
+
+    def _invalidate_object_assets(self, object_keys: List[str]) -> None:
+        """删除引用这些 OSS 对象的 asset 的读穿缓存（按对象键批量更新后调用）"""
+        collection = self._ensure_collection()
+        asset_ids = collection.distinct('asset_id', {'asset_data.oss_object_key': {'$in': object_keys}})
+        entity_cache_service.invalidate_many(ENTITY_ASSET, asset_ids)
+
     def fetch_multiple_asset_data(self, asset_ids: List[str]) -> Dict[str, Dict]:
         """批量获取多个 asset_id 的 asset_data"""
         collection = self._ensure_collection()
         cursor = collection.find({'asset_id': {'$in': asset_ids}})
         return {doc['asset_id']: doc['asset_data'] for doc in cursor}
 
+    @invalidates_cache(ENTITY_ASSET, 'asset_id')
     def delete_asset_data(self, asset_id: str) -> bool:
         """从 MongoDB 中删除 asset_data"""
         collection = self._ensure_collection()
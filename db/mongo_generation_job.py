@@ -0,0 +1,111 @@
+"""
+MongoDB 数据访问层 - GenerationJob
+负责 generation_jobs 集合的读写
+记录每个对外返回的 job_id 的最新事件（状态、进度、结果），
+包括多图片任务、去重合并/复用的任务和尚未提交的异步任务，供其他进程的事件订阅轮询
+"""
+import threading
+from datetime import datetime
+from typing import Optional, Dict
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+# 事件中写入任务记录的字段
+EVENT_FIELDS = ('user_id', 'status', 'seq', 'progress', 'task_id', 'video_url', 'video_asset_id',
+                'error', 'message')
+
+
+class GenerationJobService(BaseService):
+    """GenerationJob 数据访问类"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _client = None
+    _collection: Optional[Collection] = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context(), self._lock:
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        mongo_uri = self._get_config('MONGO_URI')
+        mongo_db = self._get_config('MONGO_DB')
+        collection_name = self._get_config('MONGO_GENERATION_JOBS_COLLECTION', 'generation_jobs')
+        ttl = int(self._get_config('GENERATION_JOB_TTL', 7 * 24 * 3600))
+
+        if not mongo_uri or not mongo_db:
+            self._log("MongoDB configuration incomplete", level='error')
+            raise RuntimeError("MongoDB configuration incomplete")
+
+        try:
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
+            db = self._client[mongo_db]
+            self._collection = db[collection_name]
+
+            # 创建索引
+            self._collection.create_index('job_id', unique=True)
+            self._collection.create_index([('user_id', 1), ('updated_at', -1)])
+
+            # 过期清理
+            self._collection.create_index('updated_at', expireAfterSeconds=ttl)
+
+            self._initialized = True
+        except Exception as e:
+            self._log(f"MongoDB initialization error: {str(e)}", level='error')
+            raise
+
+    def _ensure_collection(self) -> Collection:
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
+        return self._collection
+
+    def save_event(self, event: Dict, job_type: str = None) -> None:
+        """
+        按事件更新任务记录（不存在时插入，已结束的任务不再更新）
+
+        Args:
+            event: job_event_service 发布的事件
+            job_type: 任务类型（首次写入时记录）
+        """
+        collection = self._ensure_collection()
+        now = datetime.now()
+        fields = {key: event[key] for key in EVENT_FIELDS if event.get(key) is not None}
+        fields['updated_at'] = now
+        try:
+            collection.update_one(
+                {'job_id': event['job_id'], 'status': {'$nin': list(TERMINAL_STATUSES)}},
+                {'$set': fields, '$setOnInsert': {'job_type': job_type, 'created_at': now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # 任务已结束：过滤条件不匹配且 job_id 已存在
+            pass
+        except PyMongoError as e:
+            self._log(f"MongoDB upsert failed for generation job {event['job_id']}: {str(e)}", level='error')
+            raise
+
+    def fetch_job(self, job_id: str) -> Optional[Dict]:
+        """根据 job_id 获取任务记录"""
+        collection = self._ensure_collection()
+        return collection.find_one({'job_id': job_id}, {'_id': 0})
+
+
+generation_job_service = GenerationJobService()
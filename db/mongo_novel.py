@@ -9,6 +9,7 @@ from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
 from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
 
 
 class NovelDetailsService(BaseService):
@@ -28,7 +29,7 @@ class NovelDetailsService(BaseService):
         return cls._instance
 
     def init_app(self, app):
-        with app.app_context():
+        with app.app_context(), self._lock:
             self._initialize()
 
     def _initialize(self):
@@ -44,7 +45,7 @@ class NovelDetailsService(BaseService):
             raise RuntimeError("MongoDB configuration incomplete")
 
         try:
-            self._client = MongoClient(mongo_uri)
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
             db = self._client[mongo_db]
             self._collection = db[collection_name]
 
@@ -63,7 +64,9 @@ class NovelDetailsService(BaseService):
 
     def _ensure_collection(self) -> Collection:
         if self._collection is None:
-            self._initialize()
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
         return self._collection
 
     def insert_novel_details(self, work_id: str, asset_ids: List[str] = None,
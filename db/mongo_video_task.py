@@ -0,0 +1,209 @@
+"""
+MongoDB 数据访问层 - VideoTask
+负责 video_tasks 集合的 CRUD 操作
+记录每个视频生成任务的提交参数、DashScope 任务 ID、状态、轮询次数和结果 URL，
+进程重启后可据此恢复未完成任务的轮询
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List
+from pymongo import MongoClient, ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_SUBMITTED = 'submitted'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_SUBMITTED, STATUS_RUNNING)
+
+
+class VideoTaskService(BaseService):
+    """VideoTask 数据访问类"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _client = None
+    _collection: Optional[Collection] = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context(), self._lock:
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        mongo_uri = self._get_config('MONGO_URI')
+        mongo_db = self._get_config('MONGO_DB')
+        collection_name = self._get_config('MONGO_VIDEO_TASKS_COLLECTION', 'video_tasks')
+
+        if not mongo_uri or not mongo_db:
+            self._log("MongoDB configuration incomplete", level='error')
+            raise RuntimeError("MongoDB configuration incomplete")
+
+        try:
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
+            db = self._client[mongo_db]
+            self._collection = db[collection_name]
+
+            # 创建索引
+            self._collection.create_index('job_id', unique=True)
+            self._collection.create_index('task_id')
+
+            # 复合索引（启动恢复、按用户查询）
+            self._collection.create_index([('status', 1), ('lease_until', 1)])
+            self._collection.create_index([('user_id', 1), ('created_at', -1)])
+
+            self._initialized = True
+        except Exception as e:
+            self._log(f"MongoDB initialization error: {str(e)}", level='error')
+            raise
+
+    def _ensure_collection(self) -> Collection:
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
+        return self._collection
+
+    def insert_task(self, job_id: str, user_id: Optional[str], model: str, api_endpoint: str,
+                    api_base: str, payload: Dict, owner: str, lease_seconds: int,
+                    fingerprint: str = None, webhook_url: str = None) -> Dict:
+        """插入新的视频生成任务（queued 状态，由当前进程持有租约）"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        doc = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'fingerprint': fingerprint,
+            'model': model,
+            'api_endpoint': api_endpoint,
+            'api_base': api_base,
+            'payload': payload,
+            'task_id': None,
+            'status': STATUS_QUEUED,
+            'attempts': 0,
+            'result_url': None,
+            'error': None,
+            'webhook_url': webhook_url,
+            'owner': owner,
+            'lease_until': now + timedelta(seconds=lease_seconds),
+            'created_at': now,
+            'updated_at': now,
+            'submitted_at': None,
+            'finished_at': None
+        }
+        try:
+            collection.insert_one(doc)
+        except PyMongoError as e:
+            self._log(f"MongoDB insert failed for video task {job_id}: {str(e)}", level='error')
+            raise
+        doc.pop('_id', None)
+        return doc
+
+    def mark_submitted(self, job_id: str, task_id: str) -> None:
+        """记录 DashScope 任务 ID"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        collection.update_one(
+            {'job_id': job_id},
+            {'$set': {'task_id': task_id, 'status': STATUS_SUBMITTED,
+                      'submitted_at': now, 'updated_at': now}}
+        )
+
+    def record_poll(self, job_id: str, status: str, lease_seconds: int) -> None:
+        """记录一次状态轮询（累加轮询次数并续租）"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        collection.update_one(
+            {'job_id': job_id, 'status': {'$in': list(ACTIVE_STATUSES)}},
+            {
+                '$set': {'status': status, 'updated_at': now,
+                         'lease_until': now + timedelta(seconds=lease_seconds)},
+                '$inc': {'attempts': 1}
+            }
+        )
+
+    def mark_succeeded(self, job_id: str, result_url: str, result: Dict = None) -> None:
+        """标记任务成功并记录结果 URL"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        collection.update_one(
+            {'job_id': job_id},
+            {'$set': {'status': STATUS_SUCCEEDED, 'result_url': result_url, 'result': result,
+                      'error': None, 'updated_at': now, 'finished_at': now, 'lease_until': None}}
+        )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """标记任务失败"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        collection.update_one(
+            {'job_id': job_id},
+            {'$set': {'status': STATUS_FAILED, 'error': error,
+                      'updated_at': now, 'finished_at': now, 'lease_until': None}}
+        )
+
+    def fetch_task(self, job_id: str) -> Optional[Dict]:
+        """根据 job_id 获取任务"""
+        collection = self._ensure_collection()
+        return collection.find_one({'job_id': job_id}, {'_id': 0})
+
+    def count_by_status(self) -> Dict[str, int]:
+        """按状态统计任务数量"""
+        collection = self._ensure_collection()
+        return {doc['_id']: doc['count'] for doc in collection.aggregate([
+            {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+        ])}
+
+    def fetch_recoverable_tasks(self, limit: int = 100) -> List[Dict]:
+        """获取未完成且租约已过期的任务（持有进程已退出）"""
+        collection = self._ensure_collection()
+        now = datetime.now()
+        cursor = collection.find(
+            {
+                'status': {'$in': list(ACTIVE_STATUSES)},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]
+            },
+            {'_id': 0}
+        ).sort('created_at', 1).limit(limit)
+        return list(cursor)
+
+    def claim_task(self, job_id: str, owner: str, lease_seconds: int) -> Optional[Dict]:
+        """
+        抢占任务租约（多进程同时恢复时只有一个进程成功）
+
+        Returns:
+            Dict: 抢占成功返回任务文档，否则返回 None
+        """
+        collection = self._ensure_collection()
+        now = datetime.now()
+        return collection.find_one_and_update(
+            {
+                'job_id': job_id,
+                'status': {'$in': list(ACTIVE_STATUSES)},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]
+            },
+            {'$set': {'owner': owner, 'lease_until': now + timedelta(seconds=lease_seconds),
+                      'updated_at': now}},
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+video_task_service = VideoTaskService()
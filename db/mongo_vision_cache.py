@@ -0,0 +1,124 @@
+"""
+MongoDB 数据访问层 - VisionCache
+负责 vision_cache 集合的 CRUD 操作
+按图片内容哈希 + 模型 + 提示词版本缓存视觉模型的分析结果
+"""
+import threading
+from datetime import datetime
+from typing import Optional, Any
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+
+
+class VisionCacheService(BaseService):
+    """VisionCache 数据访问类"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _client = None
+    _collection: Optional[Collection] = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context(), self._lock:
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        mongo_uri = self._get_config('MONGO_URI')
+        mongo_db = self._get_config('MONGO_DB')
+        collection_name = self._get_config('MONGO_VISION_CACHE_COLLECTION', 'vision_cache')
+
+        if not mongo_uri or not mongo_db:
+            self._log("MongoDB configuration incomplete", level='error')
+            raise RuntimeError("MongoDB configuration incomplete")
+
+        try:
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
+            db = self._client[mongo_db]
+            self._collection = db[collection_name]
+
+            # 创建索引
+            self._collection.create_index('cache_key', unique=True)
+
+            # 复合索引（按任务清理旧提示词版本）
+            self._collection.create_index([('task', 1), ('prompt_version', 1)])
+            self._collection.create_index('content_hash')
+
+            self._initialized = True
+        except Exception as e:
+            self._log(f"MongoDB initialization error: {str(e)}", level='error')
+            raise
+
+    def _ensure_collection(self) -> Collection:
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
+        return self._collection
+
+    @staticmethod
+    def build_cache_key(content_hash: str, model: str, task: str, prompt_version: str) -> str:
+        """构建缓存键：内容哈希 + 模型 + 任务 + 提示词版本"""
+        return f"{content_hash}:{model}:{task}:{prompt_version}"
+
+    def fetch_result(self, cache_key: str) -> Optional[Any]:
+        """从 MongoDB 中获取缓存的分析结果，命中时累加命中次数"""
+        collection = self._ensure_collection()
+        doc = collection.find_one_and_update(
+            {'cache_key': cache_key},
+            {'$inc': {'hit_count': 1}, '$set': {'last_hit_at': datetime.now()}}
+        )
+        return doc['result'] if doc else None
+
+    def save_result(self, cache_key: str, content_hash: str, model: str, task: str,
+                    prompt_version: str, result: Any, image_url: str = None) -> None:
+        """保存分析结果到 MongoDB（已存在则覆盖）"""
+        collection = self._ensure_collection()
+        try:
+            collection.update_one(
+                {'cache_key': cache_key},
+                {
+                    '$set': {
+                        'content_hash': content_hash,
+                        'model': model,
+                        'task': task,
+                        'prompt_version': prompt_version,
+                        'result': result,
+                        'source_url': image_url.split('?')[0] if image_url else None,
+                        'updated_at': datetime.now()
+                    },
+                    '$setOnInsert': {'created_at': datetime.now(), 'hit_count': 0}
+                },
+                upsert=True
+            )
+        except PyMongoError as e:
+            self._log(f"MongoDB upsert failed for vision cache {cache_key}: {str(e)}", level='error')
+            raise
+
+    def delete_stale_results(self, task: str, prompt_version: str) -> int:
+        """删除指定任务下非当前提示词版本的缓存（提示词模板变更后失效）"""
+        collection = self._ensure_collection()
+        result = collection.delete_many({'task': task, 'prompt_version': {'$ne': prompt_version}})
+        return result.deleted_count
+
+    def delete_results_by_content_hash(self, content_hash: str) -> int:
+        """删除某张图片的所有缓存结果"""
+        collection = self._ensure_collection()
+        result = collection.delete_many({'content_hash': content_hash})
+        return result.deleted_count
+
+
+vision_cache_service = VisionCacheService()
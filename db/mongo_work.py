@@ -8,6 +8,8 @@ from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
 from services.base_service import BaseService
+from services.request_timing import mongo_command_timer
+from services.entity_cache_service import invalidates_cache, ENTITY_WORK
 
 
 class WorkDetailsService(BaseService):
@@ -27,7 +29,7 @@ class WorkDetailsService(BaseService):
         return cls._instance
 
     def init_app(self, app):
-        with app.app_context():
+        with app.app_context(), self._lock:
             self._initialize()
 
     def _initialize(self):
@@ -43,7 +45,7 @@ class WorkDetailsService(BaseService):
             raise RuntimeError("MongoDB configuration incomplete")
 
         try:
-            self._client = MongoClient(mongo_uri)
+            self._client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
             db = self._client[mongo_db]
             self._collection = db[collection_name]
 
@@ -62,9 +64,12 @@ class WorkDetailsService(BaseService):
 
     def _ensure_collection(self) -> Collection:
         if self._collection is None:
-            self._initialize()
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
         return self._collection
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def insert_work_details(self, work_id: str, asset_ids: List[str] = None,
                             chapter_ids: List[str] = None) -> None:
         """插入 work details 到 MongoDB"""
@@ -79,6 +84,7 @@ class WorkDetailsService(BaseService):
             self._log(f"MongoDB insert failed for work {work_id}: {str(e)}", level='error')
             raise
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def update_work_details(self, work_id: str, asset_ids: List[str] = None,
                             chapter_ids: List[str] = None) -> bool:
         """更新 work details 到 MongoDB"""
@@ -103,12 +109,22 @@ class WorkDetailsService(BaseService):
         doc = collection.find_one({'work_id': work_id})
         return doc if doc else None
 
+    def fetch_multiple_work_details(self, work_ids: List[str]) -> Dict[str, Dict]:
+        """批量获取多个 work_id 的 work details"""
+        if not work_ids:
+            return {}
+        collection = self._ensure_collection()
+        cursor = collection.find({'work_id': {'$in': list(work_ids)}})
+        return {doc['work_id']: doc for doc in cursor}
+
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def delete_work_details(self, work_id: str) -> bool:
         """从 MongoDB 中删除 work details"""
         collection = self._ensure_collection()
         result = collection.delete_one({'work_id': work_id})
         return result.deleted_count > 0
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def add_asset_to_work(self, work_id: str, asset_id: str) -> bool:
         """将 asset_id 添加到 work 的 asset_ids"""
         collection = self._ensure_collection()
@@ -118,6 +134,7 @@ class WorkDetailsService(BaseService):
         )
         return result.matched_count > 0
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def remove_asset_from_work(self, work_id: str, asset_id: str) -> bool:
         """从 work 的 asset_ids 中移除 asset_id"""
         collection = self._ensure_collection()
@@ -127,6 +144,7 @@ class WorkDetailsService(BaseService):
         )
         return result.matched_count > 0
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def add_chapter_to_work(self, work_id: str, chapter_id: str) -> bool:
         """将 chapter_id 添加到 work 的 chapter_ids"""
         collection = self._ensure_collection()
@@ -136,6 +154,7 @@ class WorkDetailsService(BaseService):
         )
         return result.matched_count > 0
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def remove_chapter_from_work(self, work_id: str, chapter_id: str) -> bool:
         """从 work 的 chapter_ids 中移除 chapter_id"""
         collection = self._ensure_collection()
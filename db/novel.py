@@ -43,8 +43,8 @@ class NovelService:
             "word_count": word_count,
             "description": description,
             "notes": notes,
-            "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": now.strftime("%Y-%m-%d %H:%M:%S")
+            "created_at": now,
+            "updated_at": now
         }
 
     def update_novel(self, novel_id: str, update_data: Dict) -> Optional[Dict]:
@@ -84,9 +84,6 @@ class NovelService:
 
             cursor.execute(f"SELECT * FROM {table} WHERE novel_id = %s", (novel_id,))
             row = cursor.fetchone()
-            if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_novel_by_id(self, novel_id: str) -> Optional[Dict]:
@@ -103,8 +100,6 @@ class NovelService:
                     row['novel_number'] = row['novel_number']
                 if 'notes' in row:
                     row['description'] = row.pop('notes')
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_novels_by_work_id(self, work_id: str, status: Optional[str] = None,
@@ -130,10 +125,33 @@ class NovelService:
                 for row in rows:
                     if 'notes' in row:
                         row['description'] = row.pop('notes')
-                    row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                    row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return rows
 
+    def fetch_novels_by_ids(self, novel_ids: List[str]) -> List[Dict]:
+        """根据小说章节 ID 列表批量获取记录（单条 IN 查询）"""
+        return self._fetch_novels_in('novel_id', novel_ids)
+
+    def fetch_novels_by_work_ids(self, work_ids: List[str]) -> List[Dict]:
+        """根据作品 ID 列表批量获取小说章节（按作品、章节序号排序）"""
+        return self._fetch_novels_in('work_id', work_ids)
+
+    def _fetch_novels_in(self, column: str, values: List[str]) -> List[Dict]:
+        if not values:
+            return []
+        conn = mysql_base_service._ensure_connection()
+        table = mysql_base_service._validate_table_name(
+            mysql_base_service._get_config('MYSQL_TABLE_NOVELS', 'novels'))
+        placeholders = ', '.join(['%s'] * len(values))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM {table} WHERE {column} IN ({placeholders}) "
+                           f"ORDER BY work_id, novel_number ASC", list(values))
+            rows = cursor.fetchall()
+            for row in rows:
+                if 'notes' in row:
+                    row['description'] = row.pop('notes')
+            return list(rows)
+
     def delete_novel(self, novel_id: str) -> bool:
         """删除小说章节记录"""
         conn = mysql_base_service._ensure_connection()
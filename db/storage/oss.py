@@ -9,6 +9,7 @@ OSS 服务模块
 - video_service: 具体执行视频相关的 OSS 操作
 """
 import logging
+import threading
 from typing import Dict, List
 
 logger = logging.getLogger(__name__)
@@ -21,10 +22,12 @@ class OSSService:
     """
 
     _instance = None
+    _lock = threading.Lock()
     _initialized = False
     _picture_service = None
     _video_service = None
     _initialized_flag = False  # 用于内部状态追踪，避免与 property 冲突
+    _app = None                # 初始化底层服务时使用的 Flask 应用（首次使用可能发生在应用上下文之外）
 
     def __new__(cls):
         if cls._instance is None:
@@ -33,9 +36,19 @@ class OSSService:
 
     def init_app(self, app):
         """初始化 OSS 服务"""
-        with app.app_context():
+        self.bind_app(app)
+        with app.app_context(), self._lock:
             self._initialize()
 
+    def bind_app(self, app):
+        """
+        记录 Flask 应用，首次使用时（lazy 模式，可能在工作线程等应用上下文之外）用它初始化底层服务
+
+        Args:
+            app: Flask 应用
+        """
+        self.__class__._app = app
+
     def _initialize(self):
         """初始化底层服务"""
         if self._initialized:
@@ -47,7 +60,7 @@ class OSSService:
         self._picture_service = picture_service
         self._video_service = video_service
 
-        # 触发底层服务初始化（允许 OSS 未配置时跳过）
+        # 触发底层服务初始化（允许 OSS 未配置时跳过；初始化失败时不标记为已初始化，下次使用时重试）
         try:
             if not self._picture_service._initialized:
                 self._picture_service.init_app(self._get_app())
@@ -62,13 +75,18 @@ class OSSService:
             logger.warning(f"Video service not initialized: {e}")
             self._video_service = None
 
+        if self._picture_service is None or self._video_service is None:
+            return
+
         self._initialized = True
         logger.info("OSS Service initialized successfully (Picture + Video services)")
 
     def _get_app(self):
-        """获取当前 Flask 应用"""
+        """获取 Flask 应用（优先使用 init_app/bind_app 记录的应用，应用上下文之外也可用）"""
+        if self._app is not None:
+            return self._app
         from flask import current_app
-        return current_app
+        return current_app._get_current_object()
 
     @property
     def _initialized(self):
@@ -80,9 +98,11 @@ class OSSService:
         self.__class__._initialized_flag = value
 
     def _ensure_initialized(self):
-        """确保服务已初始化"""
+        """确保服务已初始化（首次使用时初始化）"""
         if not self._initialized:
-            raise RuntimeError("OSS Service not initialized. Call init_app first.")
+            with self._lock:
+                if not self._initialized:
+                    self._initialize()
 
     # ==================== 图片操作（委托给 picture_service）====================
     def upload_picture(self, file_content: bytes, object_key: str,
@@ -93,6 +113,13 @@ class OSSService:
             raise RuntimeError("Picture service not available (OSS not configured)")
         return self._picture_service.upload_picture(file_content, object_key, content_type)
 
+    def upload_picture_stream(self, stream, object_key: str, content_type: str = 'image/jpeg') -> Dict:
+        """分块流式上传文件流（同时计算大小和 SHA-256）"""
+        self._ensure_initialized()
+        if self._picture_service is None:
+            raise RuntimeError("Picture service not available (OSS not configured)")
+        return self._picture_service.upload_picture_stream(stream, object_key, content_type)
+
     def upload_picture_from_file(self, file_path: str, object_key: str,
                                   content_type: str = 'image/jpeg') -> Dict:
         """从本地文件路径上传图片"""
@@ -104,6 +131,11 @@ class OSSService:
         self._ensure_initialized()
         return self._picture_service.get_picture_url(object_key, expires)
 
+    def get_picture_urls(self, object_keys: List[str], expires: int = 3600) -> Dict:
+        """批量获取图片的访问 URL"""
+        self._ensure_initialized()
+        return self._picture_service.get_picture_urls(object_keys, expires)
+
     def download_picture(self, object_key: str, local_file_path: str) -> Dict:
         """下载图片到本地"""
         self._ensure_initialized()
@@ -114,6 +146,27 @@ class OSSService:
         self._ensure_initialized()
         return self._picture_service.get_picture_content(object_key)
 
+    def object_exists(self, object_key: str) -> bool:
+        """检查 OSS 中对象是否存在"""
+        self._ensure_initialized()
+        return self._picture_service.object_exists(object_key)
+
+    def get_object_meta(self, object_key: str) -> Dict:
+        """获取 OSS 对象元数据（大小、类型、ETag）"""
+        self._ensure_initialized()
+        return self._picture_service.get_object_meta(object_key)
+
+    def generate_post_policy(self, object_key: str, content_type: str, max_size: int,
+                             expires: int = 600) -> Dict:
+        """生成浏览器直传 OSS 的 PostObject 签名表单"""
+        self._ensure_initialized()
+        return self._picture_service.generate_post_policy(object_key, content_type, max_size, expires)
+
+    def generate_put_url(self, object_key: str, content_type: str, expires: int = 600) -> Dict:
+        """生成浏览器直传 OSS 的 PUT 签名 URL"""
+        self._ensure_initialized()
+        return self._picture_service.generate_put_url(object_key, content_type, expires)
+
     def delete_picture(self, object_key: str) -> Dict:
         """删除 OSS 中的图片"""
         self._ensure_initialized()
@@ -132,16 +185,26 @@ class OSSService:
 
     # ==================== 视频操作（委托给 video_service）====================
     def upload_video(self, video_content: bytes, object_key: str,
-                     content_type: str = 'video/mp4') -> Dict:
+                     content_type: str = 'video/mp4', progress_callback=None) -> Dict:
         """上传视频到 OSS"""
         self._ensure_initialized()
-        return self._video_service.upload_video(video_content, object_key, content_type)
+        return self._video_service.upload_video(video_content, object_key, content_type, progress_callback)
 
     def upload_video_from_file(self, file_path: str, object_key: str,
-                                content_type: str = 'video/mp4') -> Dict:
+                                content_type: str = 'video/mp4', progress_callback=None) -> Dict:
         """从本地文件路径上传视频"""
         self._ensure_initialized()
-        return self._video_service.upload_video_from_file(file_path, object_key, content_type)
+        return self._video_service.upload_video_from_file(file_path, object_key, content_type,
+                                                          progress_callback)
+
+    def upload_video_multipart(self, file_path: str, object_key: str,
+                               content_type: str = 'video/mp4', progress_callback=None) -> Dict:
+        """断点续传上传本地视频文件到 OSS"""
+        self._ensure_initialized()
+        if self._video_service is None:
+            raise RuntimeError("Video service not available (OSS not configured)")
+        return self._video_service.upload_video_multipart(file_path, object_key, content_type,
+                                                          progress_callback)
 
     def get_video_url(self, object_key: str, expires: int = 3600) -> Dict:
         """获取视频的访问 URL"""
@@ -158,6 +221,11 @@ class OSSService:
         self._ensure_initialized()
         return self._video_service.get_video_content(object_key)
 
+    def get_video_stream(self, object_key: str, byte_range=None, if_none_match: str = None) -> Dict:
+        """分块流式读取视频（支持 Range 和 If-None-Match）"""
+        self._ensure_initialized()
+        return self._video_service.get_video_stream(object_key, byte_range, if_none_match)
+
     def delete_video(self, object_key: str) -> Dict:
         """删除 OSS 中的视频"""
         self._ensure_initialized()
@@ -174,10 +242,10 @@ class OSSService:
         self._ensure_initialized()
         return self._video_service.list_videos(prefix, max_codes, marker)
 
-    def save_video_from_url(self, video_url: str, object_key: str) -> Dict:
+    def save_video_from_url(self, video_url: str, object_key: str, progress_callback=None) -> Dict:
         """从 URL 下载视频并保存到 OSS"""
         self._ensure_initialized()
-        return self._video_service.save_video_from_url(video_url, object_key)
+        return self._video_service.save_video_from_url(video_url, object_key, progress_callback)
 
     # ==================== 辅助方法 ====================
     def generate_picture_object_key(self, user_id: str, file_extension: str,
@@ -235,6 +303,19 @@ class OSSService:
         unique_id = str(uuid4())[:8]
         return f"{file_type}/{user_id}/{now.year}/{now.month:02d}/{unique_id}.{file_extension}"
 
+    def generate_content_object_key(self, content_hash: str, file_extension: str) -> str:
+        """
+        生成按内容寻址的图片对象键（相同内容只存储一份）
+
+        Args:
+            content_hash: 文件内容 SHA-256
+            file_extension: 文件扩展名
+
+        Returns:
+            str: 生成的对象键，格式 comic/sha256/{hash[:2]}/{hash}.{ext}
+        """
+        return f"comic/sha256/{content_hash[:2]}/{content_hash}.{file_extension}"
+
     def health_check(self) -> Dict:
         """健康检查"""
         self._ensure_initialized()
@@ -2,10 +2,104 @@
 阿里云 OSS 服务类，负责漫画图片的上传、下载、删除操作。
 使用单例模式，线程安全。
 """
+import io
 import os
-import oss2
-from typing import Optional, Dict, List, BinaryIO
+import hmac
+import math
+import time
+import json
+import base64
+import hashlib
+import tempfile
+import threading
+import contextvars
+from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, BinaryIO, Callable, Tuple
+from urllib.parse import quote
 from services.base_service import BaseService
+from services.request_timing import track, OSS
+from services.metrics import metrics
+from utils.lazy_import import lazy_import
+
+# oss2 导入耗时约 0.25s，首次使用 OSS 时才导入
+oss2 = lazy_import('oss2')
+
+# OSS 单次批量删除的对象数量上限
+OSS_BATCH_DELETE_LIMIT = 1000
+
+# 上传进度回调：(已上传字节数, 总字节数)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+@lru_cache(maxsize=None)
+def _timed_session_class():
+    """创建 TimedOSSSession 类（继承 oss2.Session，需在导入 oss2 后定义）"""
+
+    class TimedOSSSession(oss2.Session):
+        """记录 OSS 请求耗时和传输字节数的 Session（所有 Bucket 操作都经由 do_request）"""
+
+        def do_request(self, req, timeout):
+            started = time.perf_counter()
+            response = None
+            try:
+                with track(OSS):
+                    response = super().do_request(req, timeout)
+                return response
+            finally:
+                metrics.record_oss(req, response, time.perf_counter() - started)
+
+    return TimedOSSSession
+
+
+class _HashingReader:
+    """读取上传流时同步统计字节数和 SHA-256（只读一遍）"""
+
+    def __init__(self, stream: BinaryIO, size: Optional[int] = None):
+        self._stream = stream
+        self._hash = hashlib.sha256()
+        self.size = size
+        self.bytes_read = 0
+
+    @property
+    def len(self) -> Optional[int]:
+        # oss2 通过 len 属性获取上传内容长度
+        return self.size
+
+    def read(self, amt: int = -1) -> bytes:
+        data = self._stream.read(amt)
+        if data:
+            self._hash.update(data)
+            self.bytes_read += len(data)
+        return data
+
+    def read_exact(self, amt: int) -> bytes:
+        """读取 amt 字节（不足时读到流结束）"""
+        chunks = []
+        remaining = amt
+        while remaining > 0:
+            data = self.read(remaining)
+            if not data:
+                break
+            chunks.append(data)
+            remaining -= len(data)
+        return b''.join(chunks)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def _remaining_size(stream: BinaryIO) -> Optional[int]:
+    """获取可 seek 流从当前位置到结尾的字节数，不可 seek 时返回 None"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
 
 
 class PictureService(BaseService):
@@ -15,6 +109,8 @@ class PictureService(BaseService):
     _initialized = False
     _auth = None
     _bucket = None
+    _delete_executor = None
+    _executor_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -45,10 +141,34 @@ class PictureService(BaseService):
             # 初始化 OSS 认证
             self._auth = oss2.Auth(access_key_id, access_key_secret)
             # 初始化 Bucket
-            self._bucket = oss2.Bucket(self._auth, endpoint, bucket_name)
+            self._bucket = oss2.Bucket(self._auth, endpoint, bucket_name, session=_timed_session_class()())
             self._cdn_domain = cdn_domain
             self._endpoint = endpoint
             self._bucket_name = bucket_name
+
+            # 签名 URL 缓存：(object_key, 过期时间桶) -> URL
+            self._url_cache_size = int(self._get_config('SIGNED_URL_CACHE_SIZE', 10000))
+            self._url_expiry_bucket = max(1, int(self._get_config('SIGNED_URL_EXPIRY_BUCKET', 300)))
+            self._url_cache: 'OrderedDict[tuple, str]' = OrderedDict()
+            self._url_cache_lock = threading.Lock()
+            self._url_cache_stats = {'hits': 0, 'misses': 0}
+
+            # 批量删除配置
+            self._delete_chunk_size = min(OSS_BATCH_DELETE_LIMIT,
+                                          int(self._get_config('OSS_DELETE_CHUNK_SIZE', OSS_BATCH_DELETE_LIMIT)))
+            self._delete_workers = int(self._get_config('OSS_DELETE_WORKERS', 4))
+
+            # 大文件上传配置（超过阈值时分片并发上传）
+            self._multipart_threshold = int(self._get_config('OSS_MULTIPART_THRESHOLD', 20 * 1024 * 1024))
+            self._part_size = int(self._get_config('OSS_MULTIPART_PART_SIZE', 10 * 1024 * 1024))
+            self._upload_threads = int(self._get_config('OSS_UPLOAD_THREADS', 4))
+            self._upload_retries = int(self._get_config('OSS_UPLOAD_RETRIES', 2))
+            checkpoint_dir = self._get_config('OSS_CHECKPOINT_DIR') or os.path.join(
+                tempfile.gettempdir(), 'narloom_oss_checkpoints')
+            self._resumable_store = oss2.ResumableStore(root=checkpoint_dir, dir='upload')
+
+            # 流式下载每次读取的字节数（内存中最多保留一个分块）
+            self._stream_chunk_size = int(self._get_config('OSS_STREAM_CHUNK_SIZE', 256 * 1024))
             self._initialized = True
         except Exception as e:
             self._log(f"Error initializing Aliyun OSS service: {e}", level='error')
@@ -61,23 +181,33 @@ class PictureService(BaseService):
         return self._bucket
 
     # ---------- 图片上传操作 ----------
-    def upload_picture(self, file_content: bytes, object_key: str, content_type: str = 'image/jpeg') -> Dict:
+    def upload_picture(self, file_content: bytes, object_key: str, content_type: str = 'image/jpeg',
+                       progress_callback: ProgressCallback = None) -> Dict:
         """
         上传图片到阿里云 OSS
 
+        小于 OSS_MULTIPART_THRESHOLD 的内容使用 put_object，否则分片并发上传
+
         Args:
             file_content: 图片文件的二进制内容
             object_key: OSS 中的对象键（路径）
             content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含上传结果和访问 URL 的字典
         """
         bucket = self._ensure_bucket()
 
+        if len(file_content) >= self._multipart_threshold:
+            return self._upload_stream_multipart(bucket, _HashingReader(io.BytesIO(file_content)),
+                                                 len(file_content), object_key, content_type,
+                                                 progress_callback)
+
         try:
             # 上传文件
-            result = bucket.put_object(object_key, file_content, headers={'Content-Type': content_type})
+            result = bucket.put_object(object_key, file_content, headers={'Content-Type': content_type},
+                                       progress_callback=progress_callback)
 
             if result.status == 200:
                 # 生成访问 URL
@@ -102,22 +232,62 @@ class PictureService(BaseService):
                 'object_key': object_key
             }
 
-    def upload_picture_from_file(self, file_path: str, object_key: str, content_type: str = 'image/jpeg') -> Dict:
+    def upload_picture_from_file(self, file_path: str, object_key: str, content_type: str = 'image/jpeg',
+                                 progress_callback: ProgressCallback = None) -> Dict:
         """
-        从本地文件路径上传图片
+        从本地文件路径上传图片（大文件走断点续传分片上传）
 
         Args:
             file_path: 本地文件路径
             object_key: OSS 中的对象键
             content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含上传结果和访问 URL 的字典
         """
+        self._ensure_bucket()
+
         try:
+            if os.path.getsize(file_path) >= self._multipart_threshold:
+                return self.upload_file_multipart(file_path, object_key, content_type,
+                                                  progress_callback=progress_callback)
             with open(file_path, 'rb') as f:
                 file_content = f.read()
-            return self.upload_picture(file_content, object_key, content_type)
+            return self.upload_picture(file_content, object_key, content_type, progress_callback)
+        except Exception as e:
+            self._log(f"Error reading file {file_path}: {str(e)}", level='error')
+            return {
+                'success': False,
+                'error': str(e),
+                'object_key': object_key
+            }
+
+    def upload_file_multipart(self, file_path: str, object_key: str,
+                              content_type: str = 'application/octet-stream',
+                              part_size: int = None,
+                              progress_callback: ProgressCallback = None) -> Dict:
+        """
+        断点续传上传本地文件（适用于视频等大文件）
+
+        超过 OSS_MULTIPART_THRESHOLD 时分片并发上传，已完成的分片记录在 OSS_CHECKPOINT_DIR 中，
+        上传中断后重试（或进程重启后再次上传同一文件到同一对象键）只上传缺失的分片
+
+        Args:
+            file_path: 本地文件路径
+            object_key: OSS 中的对象键
+            content_type: 文件类型
+            part_size: 期望分片大小（字节），默认 OSS_MULTIPART_PART_SIZE，实际大小由 oss2 按分片数上限调整
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            Dict: 包含上传结果和访问 URL 的字典
+        """
+        bucket = self._ensure_bucket()
+
+        try:
+            total_size = os.path.getsize(file_path)
+            part_size = oss2.determine_part_size(total_size, preferred_size=part_size or self._part_size)
         except Exception as e:
             self._log(f"Error reading file {file_path}: {str(e)}", level='error')
             return {
@@ -126,6 +296,172 @@ class PictureService(BaseService):
                 'object_key': object_key
             }
 
+        error = None
+        for attempt in range(self._upload_retries + 1):
+            try:
+                oss2.resumable_upload(
+                    bucket, object_key, file_path,
+                    store=self._resumable_store,
+                    headers={'Content-Type': content_type},
+                    multipart_threshold=self._multipart_threshold,
+                    part_size=part_size,
+                    progress_callback=progress_callback,
+                    num_threads=self._upload_threads
+                )
+                return {
+                    'success': True,
+                    'object_key': object_key,
+                    'url': self._get_file_url(object_key),
+                    'size': total_size,
+                    'message': 'File uploaded successfully'
+                }
+            except Exception as e:
+                error = e
+                self._log(f"Error uploading {file_path} to OSS (attempt {attempt + 1}): {str(e)}",
+                          level='warning')
+
+        self._log(f"Error multipart uploading {file_path} to OSS: {str(error)}", level='error')
+        return {
+            'success': False,
+            'error': str(error),
+            'object_key': object_key
+        }
+
+    def upload_picture_stream(self, stream: BinaryIO, object_key: str, content_type: str = 'image/jpeg',
+                              progress_callback: ProgressCallback = None) -> Dict:
+        """
+        分块流式上传文件流到 OSS，同时计算文件大小和 SHA-256（只读一遍，内存占用有界）
+
+        小于 OSS_MULTIPART_THRESHOLD 的流使用 put_object 分块发送，否则按分片并发上传
+
+        Args:
+            stream: 文件流（如 Werkzeug FileStorage.stream）
+            object_key: OSS 中的对象键
+            content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            Dict: 包含上传结果、访问 URL、size 和 sha256 的字典
+        """
+        bucket = self._ensure_bucket()
+        size = _remaining_size(stream)
+        reader = _HashingReader(stream, size)
+
+        if size is None or size >= self._multipart_threshold:
+            result = self._upload_stream_multipart(bucket, reader, size, object_key, content_type,
+                                                   progress_callback)
+        else:
+            try:
+                response = bucket.put_object(object_key, reader, headers={'Content-Type': content_type},
+                                             progress_callback=progress_callback)
+                if response.status != 200:
+                    return {
+                        'success': False,
+                        'error': f'Upload failed with status {response.status}',
+                        'object_key': object_key
+                    }
+                result = {
+                    'success': True,
+                    'object_key': object_key,
+                    'url': self._get_file_url(object_key),
+                    'message': 'Picture uploaded successfully'
+                }
+            except Exception as e:
+                self._log(f"Error uploading picture stream to OSS: {str(e)}", level='error')
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'object_key': object_key
+                }
+
+        if result.get('success'):
+            result['size'] = reader.bytes_read
+            result['sha256'] = reader.hexdigest()
+        return result
+
+    def _upload_stream_multipart(self, bucket, reader: _HashingReader, total_size: Optional[int],
+                                 object_key: str, content_type: str,
+                                 progress_callback: ProgressCallback = None) -> Dict:
+        """
+        分片并发上传文件流
+
+        主线程按顺序读取分片，最多 OSS_UPLOAD_THREADS 个分片同时上传，内存占用不超过
+        (OSS_UPLOAD_THREADS + 1) 个分片
+
+        Args:
+            bucket: OSS Bucket
+            reader: 文件流读取器
+            total_size: 文件总大小（未知时为 None）
+            object_key: OSS 中的对象键
+            content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            Dict: 包含上传结果和访问 URL 的字典
+        """
+        part_size = (oss2.determine_part_size(total_size, preferred_size=self._part_size)
+                     if total_size else self._part_size)
+        slots = threading.BoundedSemaphore(self._upload_threads)
+        progress_lock = threading.Lock()
+        uploaded = [0]
+        upload_id = None
+
+        def upload_part(part_number: int, data: bytes):
+            try:
+                result = bucket.upload_part(object_key, upload_id, part_number, data)
+                if progress_callback:
+                    with progress_lock:
+                        uploaded[0] += len(data)
+                        progress_callback(uploaded[0], total_size)
+                return oss2.models.PartInfo(part_number, result.etag, size=len(data))
+            finally:
+                slots.release()
+
+        try:
+            upload_id = bucket.init_multipart_upload(
+                object_key, headers={'Content-Type': content_type}).upload_id
+            futures = []
+            with ThreadPoolExecutor(max_workers=self._upload_threads,
+                                    thread_name_prefix='oss-upload') as executor:
+                part_number = 1
+                while True:
+                    slots.acquire()
+                    # 已有分片失败时停止读取
+                    if any(f.done() and f.exception() for f in futures):
+                        slots.release()
+                        break
+                    data = reader.read_exact(part_size)
+                    if not data and part_number > 1:
+                        slots.release()
+                        break
+                    # 分片在线程池中上传，复制上下文以计入当前请求的耗时统计
+                    futures.append(executor.submit(contextvars.copy_context().run,
+                                                   upload_part, part_number, data))
+                    part_number += 1
+                    if len(data) < part_size:
+                        break
+                parts = [f.result() for f in futures]
+            bucket.complete_multipart_upload(object_key, upload_id, parts)
+            return {
+                'success': True,
+                'object_key': object_key,
+                'url': self._get_file_url(object_key),
+                'size': reader.bytes_read,
+                'message': 'Picture uploaded successfully'
+            }
+        except Exception as e:
+            self._log(f"Error multipart uploading {object_key} to OSS: {str(e)}", level='error')
+            if upload_id:
+                try:
+                    bucket.abort_multipart_upload(object_key, upload_id)
+                except Exception:
+                    pass
+            return {
+                'success': False,
+                'error': str(e),
+                'object_key': object_key
+            }
+
     # ---------- 图片获取操作 ----------
     def get_picture_url(self, object_key: str, expires: int = 3600) -> Dict:
         """
@@ -152,6 +488,29 @@ class PictureService(BaseService):
                 'object_key': object_key
             }
 
+    def get_picture_urls(self, object_keys: List[str], expires: int = 3600) -> Dict:
+        """
+        批量获取图片的访问 URL（列表场景，批量签名）
+
+        Args:
+            object_keys: OSS 中的对象键列表
+            expires: URL 过期时间（秒），默认 1 小时
+
+        Returns:
+            Dict: 包含 object_key -> URL 映射的字典
+        """
+        try:
+            return {
+                'success': True,
+                'urls': self._get_file_urls(object_keys, expires)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'urls': {}
+            }
+
     def download_picture(self, object_key: str, local_file_path: str) -> Dict:
         """
         下载图片到本地
@@ -210,6 +569,193 @@ class PictureService(BaseService):
                 'object_key': object_key
             }
 
+    def get_object_stream(self, object_key: str, byte_range: Tuple = None,
+                          if_none_match: str = None, chunk_size: int = None) -> Dict:
+        """
+        分块流式读取 OSS 对象（支持字节范围和 ETag 条件请求），内存中最多保留一个分块
+
+        Args:
+            object_key: OSS 中的对象键
+            byte_range: 字节范围 (start, end)，end 包含在内；(None, n) 表示最后 n 个字节
+            if_none_match: 客户端缓存的 ETag（If-None-Match 原样转发），未变化时 not_modified 为 True
+            chunk_size: 每次读取的字节数，默认 OSS_STREAM_CHUNK_SIZE
+
+        Returns:
+            Dict: 包含 chunks（分块迭代器，迭代结束或关闭时释放连接）、status（200/206）、
+                  content_length、content_range、content_type、etag、last_modified 的字典；
+                  对象不存在时 not_found 为 True，范围无效时 range_not_satisfiable 为 True
+        """
+        bucket = self._ensure_bucket()
+        chunk_size = chunk_size or self._stream_chunk_size
+        # standard：范围越界时返回 416，而不是整个对象
+        headers = {'x-oss-range-behavior': 'standard'}
+        if if_none_match:
+            headers['If-None-Match'] = if_none_match
+
+        try:
+            result = bucket.get_object(object_key, byte_range=byte_range, headers=headers)
+        except oss2.exceptions.NotModified as e:
+            return {'success': True, 'not_modified': True, 'object_key': object_key,
+                    'etag': (e.headers.get('ETag') or '').strip('"') or None}
+        except oss2.exceptions.NotFound:
+            return {'success': False, 'error': 'Object not found', 'not_found': True,
+                    'object_key': object_key}
+        except oss2.exceptions.OssError as e:
+            if e.status == 416:
+                return {'success': False, 'error': 'Range not satisfiable', 'range_not_satisfiable': True,
+                        'size': e.details.get('ActualObjectSize'), 'object_key': object_key}
+            self._log(f"Error streaming object from OSS: {str(e)}", level='error')
+            return {'success': False, 'error': str(e), 'object_key': object_key}
+
+        def iter_chunks():
+            try:
+                while True:
+                    chunk = result.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                result.close()
+
+        return {
+            'success': True,
+            'object_key': object_key,
+            'chunks': iter_chunks(),
+            'status': result.status,
+            'content_length': result.content_length,
+            'content_range': result.headers.get('Content-Range'),
+            'content_type': result.content_type,
+            'etag': result.etag,
+            'last_modified': result.headers.get('Last-Modified')
+        }
+
+    def object_exists(self, object_key: str) -> bool:
+        """
+        检查 OSS 中对象是否存在
+
+        Args:
+            object_key: OSS 中的对象键
+
+        Returns:
+            bool: 对象是否存在
+        """
+        bucket = self._ensure_bucket()
+        return bucket.object_exists(object_key)
+
+    def get_object_meta(self, object_key: str) -> Dict:
+        """
+        获取 OSS 对象元数据（HEAD 请求）
+
+        Args:
+            object_key: OSS 中的对象键
+
+        Returns:
+            Dict: 包含 size, content_type, etag 的字典，对象不存在时 not_found 为 True
+        """
+        bucket = self._ensure_bucket()
+
+        try:
+            result = bucket.head_object(object_key)
+            return {
+                'success': True,
+                'object_key': object_key,
+                'size': result.content_length,
+                'content_type': result.content_type,
+                'etag': result.etag
+            }
+        except oss2.exceptions.NotFound:
+            return {
+                'success': False,
+                'error': 'Object not found',
+                'not_found': True,
+                'object_key': object_key
+            }
+        except Exception as e:
+            self._log(f"Error fetching object meta from OSS: {str(e)}", level='error')
+            return {
+                'success': False,
+                'error': str(e),
+                'object_key': object_key
+            }
+
+    # ---------- 客户端直传 ----------
+    def generate_post_policy(self, object_key: str, content_type: str, max_size: int,
+                             expires: int = 600) -> Dict:
+        """
+        生成浏览器直传 OSS 的 PostObject 签名表单
+
+        Policy 限定对象键、Content-Type 和文件大小范围，客户端将 fields 与文件一起以
+        multipart/form-data POST 到 url，上传数据不经过应用服务器
+
+        Args:
+            object_key: 允许上传的对象键
+            content_type: 允许的 Content-Type
+            max_size: 允许的最大文件大小（字节）
+            expires: 签名有效期（秒）
+
+        Returns:
+            Dict: 包含 url, fields, expires_at 的字典
+        """
+        self._ensure_bucket()
+        credentials = self._auth.credentials_provider.get_credentials()
+
+        expires_at = datetime.fromtimestamp(int(time.time()) + expires, tz=timezone.utc)
+        policy = {
+            'expiration': expires_at.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'conditions': [
+                {'bucket': self._bucket_name},
+                ['eq', '$key', object_key],
+                ['eq', '$Content-Type', content_type],
+                ['eq', '$success_action_status', '200'],
+                ['content-length-range', 1, max_size]
+            ]
+        }
+        encoded_policy = base64.b64encode(json.dumps(policy, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        signature = base64.b64encode(hmac.new(credentials.get_access_key_secret().encode('utf-8'),
+                                              encoded_policy.encode('ascii'), hashlib.sha1).digest()).decode('ascii')
+
+        fields = {
+            'key': object_key,
+            'OSSAccessKeyId': credentials.get_access_key_id(),
+            'policy': encoded_policy,
+            'Signature': signature,
+            'Content-Type': content_type,
+            'success_action_status': '200'
+        }
+        if credentials.get_security_token():
+            fields['x-oss-security-token'] = credentials.get_security_token()
+
+        return {
+            'url': self._get_bucket_endpoint_url(),
+            'fields': fields,
+            'expires_at': expires_at.isoformat()
+        }
+
+    def generate_put_url(self, object_key: str, content_type: str, expires: int = 600) -> Dict:
+        """
+        生成浏览器直传 OSS 的 PUT 签名 URL（客户端必须使用相同的 Content-Type）
+
+        Args:
+            object_key: 允许上传的对象键
+            content_type: 签名中的 Content-Type
+            expires: 签名有效期（秒）
+
+        Returns:
+            Dict: 包含 url, headers, expires_at 的字典
+        """
+        bucket = self._ensure_bucket()
+        url = bucket.sign_url('PUT', object_key, expires, headers={'Content-Type': content_type})
+        return {
+            'url': url,
+            'headers': {'Content-Type': content_type},
+            'expires_at': datetime.fromtimestamp(int(time.time()) + expires, tz=timezone.utc).isoformat()
+        }
+
+    def _get_bucket_endpoint_url(self) -> str:
+        """获取 Bucket 的访问域名（https://<bucket>.<endpoint>）"""
+        endpoint = self._endpoint.split('://', 1)[-1].rstrip('/')
+        return f"https://{self._bucket_name}.{endpoint}"
+
     # ---------- 图片删除操作 ----------
     def delete_picture(self, object_key: str) -> Dict:
         """
@@ -249,28 +795,76 @@ class PictureService(BaseService):
         """
         批量删除图片
 
+        按 OSS 单次 1000 个对象的上限分块，多个分块在线程池中并发删除
+
         Args:
             object_keys: OSS 对象键列表
 
         Returns:
-            Dict: 包含批量删除结果的字典
+            Dict: 包含批量删除结果的字典（deleted_keys 为已删除的键，failed 为删除失败的键及原因）
         """
         bucket = self._ensure_bucket()
 
-        try:
-            result = bucket.batch_delete_objects(object_keys)
+        keys = list(dict.fromkeys(key for key in object_keys if key))
+        if not keys:
             return {
                 'success': True,
-                'deleted_keys': result.deleted_keys,
-                'message': f'Successfully deleted {len(result.deleted_keys)} pictures'
+                'deleted_keys': [],
+                'failed': [],
+                'message': 'No pictures to delete'
             }
-        except Exception as e:
-            self._log(f"Error batch deleting pictures from OSS: {str(e)}", level='error')
+
+        chunk_size = self._delete_chunk_size
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        if len(chunks) == 1:
+            results = [self._delete_chunk(bucket, chunks[0])]
+        else:
+            results = list(self._get_delete_executor().map(lambda chunk: self._delete_chunk(bucket, chunk), chunks))
+
+        deleted_keys = [key for deleted, _ in results for key in deleted]
+        failed = [item for _, chunk_failed in results for item in chunk_failed]
+
+        if failed:
+            self._log(f"Batch delete: {len(failed)} of {len(keys)} pictures failed", level='error')
             return {
                 'success': False,
-                'error': str(e),
-                'deleted_keys': []
+                'error': f'Failed to delete {len(failed)} of {len(keys)} pictures',
+                'deleted_keys': deleted_keys,
+                'failed': failed
             }
+        return {
+            'success': True,
+            'deleted_keys': deleted_keys,
+            'failed': [],
+            'message': f'Successfully deleted {len(deleted_keys)} pictures'
+        }
+
+    def _delete_chunk(self, bucket, keys: List[str]) -> tuple:
+        """
+        删除一个分块（不超过 OSS 单次上限）
+
+        Returns:
+            tuple: (已删除的键列表, 失败列表 [{'object_key', 'error'}])
+        """
+        try:
+            result = bucket.batch_delete_objects(keys)
+        except Exception as e:
+            self._log(f"Error batch deleting pictures from OSS: {str(e)}", level='error')
+            return [], [{'object_key': key, 'error': str(e)} for key in keys]
+
+        deleted = set(result.deleted_keys)
+        failed = [{'object_key': key, 'error': 'Not reported as deleted'}
+                  for key in keys if key not in deleted]
+        return [key for key in keys if key in deleted], failed
+
+    def _get_delete_executor(self) -> ThreadPoolExecutor:
+        """获取批量删除线程池（懒加载）"""
+        if self._delete_executor is None:
+            with self._executor_lock:
+                if self._delete_executor is None:
+                    PictureService._delete_executor = ThreadPoolExecutor(
+                        max_workers=self._delete_workers, thread_name_prefix='oss-delete')
+        return self._delete_executor
 
     # ---------- 图片列表操作 ----------
     def list_pictures(self, prefix: str = 'comic/', max_codes: int = 100, marker: str = '') -> Dict:
@@ -289,6 +883,7 @@ class PictureService(BaseService):
 
         try:
             result = bucket.list_objects(prefix=prefix, max_codes=max_codes, marker=marker)
+            urls = self._get_file_urls([obj.key for obj in result.object_list])
 
             pictures = []
             for obj in result.object_list:
@@ -297,7 +892,7 @@ class PictureService(BaseService):
                     'size': obj.size,
                     'last_modified': obj.last_modified,
                     'etag': obj.etag,
-                    'url': self._get_file_url(obj.key)
+                    'url': urls[obj.key]
                 })
 
             return {
@@ -328,13 +923,107 @@ class PictureService(BaseService):
         Returns:
             str: 文件访问 URL
         """
+        return self._get_file_urls([object_key], expires)[object_key]
+
+    def _get_file_urls(self, object_keys: List[str], expires: int = 3600) -> Dict[str, str]:
+        """
+        批量生成文件访问 URL
+
+        签名 URL 的过期时间向上取整到 SIGNED_URL_EXPIRY_BUCKET 秒的边界，同一时间桶内
+        同一对象的 URL 相同，可直接复用缓存；时间桶推进后自动生成新的 URL，
+        因此返回的 URL 剩余有效期始终不少于 expires 秒
+
+        Args:
+            object_keys: OSS 中的对象键列表
+            expires: URL 过期时间（秒）
+
+        Returns:
+            Dict: object_key -> 文件访问 URL
+        """
         # 如果配置了 CDN 域名，使用 CDN 域名
         if self._cdn_domain:
-            return f"https://{self._cdn_domain}/{object_key}"
+            return {key: f"https://{self._cdn_domain}/{key}" for key in object_keys}
 
-        # 否则生成签名 URL
         bucket = self._ensure_bucket()
-        return bucket.sign_url('GET', object_key, expires)
+        now = time.time()
+        expires_at = int(math.ceil((now + expires) / self._url_expiry_bucket) * self._url_expiry_bucket)
+
+        urls = {}
+        missing = []
+        with self._url_cache_lock:
+            for key in object_keys:
+                url = self._url_cache.get((key, expires_at))
+                if url is None:
+                    missing.append(key)
+                else:
+                    self._url_cache.move_to_end((key, expires_at))
+                    urls[key] = url
+            self._url_cache_stats['hits'] += len(object_keys) - len(missing)
+            self._url_cache_stats['misses'] += len(missing)
+        metrics.record_cache('signed_url', 'hit', len(object_keys) - len(missing))
+        metrics.record_cache('signed_url', 'miss', len(missing))
+
+        if not missing:
+            return urls
+
+        signed = self._sign_urls(bucket, missing, expires_at, now)
+        urls.update(signed)
+
+        with self._url_cache_lock:
+            for key, url in signed.items():
+                self._url_cache[(key, expires_at)] = url
+            self._prune_url_cache(now)
+        return urls
+
+    def _sign_urls(self, bucket, object_keys: List[str], expires_at: int, now: float) -> Dict[str, str]:
+        """
+        按绝对过期时间批量生成 GET 签名 URL
+
+        签名版本 1（oss2.Auth）时复用同一个 HMAC 密钥状态逐个签名，结果与 bucket.sign_url 一致；
+        其它认证方式（STS、V2/V4 签名）回退到 bucket.sign_url
+
+        Args:
+            bucket: OSS Bucket
+            object_keys: OSS 中的对象键列表
+            expires_at: 过期时间（Unix 时间戳）
+            now: 当前时间
+
+        Returns:
+            Dict: object_key -> 签名 URL
+        """
+        credentials = None
+        if type(self._auth) is oss2.Auth:
+            credentials = self._auth.credentials_provider.get_credentials()
+        if credentials is None or credentials.get_security_token():
+            return {key: bucket.sign_url('GET', key, max(1, expires_at - int(now)))
+                    for key in object_keys}
+
+        base_mac = hmac.new(credentials.get_access_key_secret().encode('utf-8'), digestmod=hashlib.sha1)
+        query_prefix = (f"?OSSAccessKeyId={quote(credentials.get_access_key_id(), safe='')}"
+                        f"&Expires={expires_at}&Signature=")
+        string_prefix = f"GET\n\n\n{expires_at}\n/{self._bucket_name}/".encode('utf-8')
+
+        urls = {}
+        for key in object_keys:
+            mac = base_mac.copy()
+            mac.update(string_prefix + key.encode('utf-8'))
+            signature = base64.b64encode(mac.digest()).decode('ascii')
+            urls[key] = bucket._make_url(self._bucket_name, key) + query_prefix + quote(signature, safe='')
+        return urls
+
+    def _prune_url_cache(self, now: float):
+        """清理已过期的签名 URL，超过条目上限时淘汰最久未使用的 URL（调用方持有锁）"""
+        while self._url_cache and (len(self._url_cache) > self._url_cache_size
+                                   or next(iter(self._url_cache))[1] <= now):
+            self._url_cache.popitem(last=False)
+
+    def get_url_cache_stats(self) -> Dict:
+        """获取签名 URL 缓存命中统计"""
+        with self._url_cache_lock:
+            stats = dict(self._url_cache_stats, size=len(self._url_cache))
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
 
     def generate_object_key(self, user_id: str, file_extension: str) -> str:
         """
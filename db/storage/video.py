@@ -3,7 +3,9 @@ Video Service 模块
 统一管理阿里云 OSS 服务的视频文件上传、下载、删除等操作
 作为路由层与底层 OSS 服务之间的中间层，专门处理视频相关文件
 """
+import os
 import logging
+import tempfile
 import requests
 from typing import Dict, List
 from datetime import datetime
@@ -37,7 +39,7 @@ class VideoService:
         if self._initialized:
             return
 
-        from .picture_service import picture_service
+        from .picture import picture_service
         self._picture_service = picture_service
 
         # 触发底层服务初始化
@@ -63,37 +65,58 @@ class VideoService:
 
     # ==================== 视频上传操作 ====================
     def upload_video(self, video_content: bytes, object_key: str,
-                     content_type: str = 'video/mp4') -> Dict:
+                     content_type: str = 'video/mp4', progress_callback=None) -> Dict:
         """
-        上传视频到阿里云 OSS
+        上传视频到阿里云 OSS（大文件自动分片并发上传）
 
         Args:
             video_content: 视频文件的二进制内容
             object_key: OSS 中的对象键（路径）
             content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含上传结果和访问 URL 的字典
         """
         self._ensure_initialized()
         # 视频上传复用 picture_service 的 upload_picture 方法
-        return self._picture_service.upload_picture(video_content, object_key, content_type)
+        return self._picture_service.upload_picture(video_content, object_key, content_type, progress_callback)
 
     def upload_video_from_file(self, file_path: str, object_key: str,
-                                content_type: str = 'video/mp4') -> Dict:
+                                content_type: str = 'video/mp4', progress_callback=None) -> Dict:
         """
-        从本地文件路径上传视频
+        从本地文件路径上传视频（大文件走断点续传分片上传）
 
         Args:
             file_path: 本地文件路径
             object_key: OSS 中的对象键
             content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含上传结果和访问 URL 的字典
         """
         self._ensure_initialized()
-        return self._picture_service.upload_picture_from_file(file_path, object_key, content_type)
+        return self._picture_service.upload_picture_from_file(file_path, object_key, content_type,
+                                                              progress_callback)
+
+    def upload_video_multipart(self, file_path: str, object_key: str,
+                               content_type: str = 'video/mp4', progress_callback=None) -> Dict:
+        """
+        断点续传上传本地视频文件
+
+        Args:
+            file_path: 本地文件路径
+            object_key: OSS 中的对象键
+            content_type: 文件类型
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            Dict: 包含上传结果和访问 URL 的字典
+        """
+        self._ensure_initialized()
+        return self._picture_service.upload_file_multipart(file_path, object_key, content_type,
+                                                           progress_callback=progress_callback)
 
     # ==================== 视频获取操作 ====================
     def get_video_url(self, object_key: str, expires: int = 3600) -> Dict:
@@ -137,6 +160,21 @@ class VideoService:
         self._ensure_initialized()
         return self._picture_service.get_picture_content(object_key)
 
+    def get_video_stream(self, object_key: str, byte_range=None, if_none_match: str = None) -> Dict:
+        """
+        分块流式读取视频（支持 Range 和 If-None-Match）
+
+        Args:
+            object_key: OSS 中的对象键
+            byte_range: 字节范围 (start, end)，end 包含在内
+            if_none_match: 客户端缓存的 ETag
+
+        Returns:
+            Dict: 包含分块迭代器和响应头信息的字典
+        """
+        self._ensure_initialized()
+        return self._picture_service.get_object_stream(object_key, byte_range, if_none_match)
+
     # ==================== 视频删除操作 ====================
     def delete_video(self, object_key: str) -> Dict:
         """
@@ -182,36 +220,44 @@ class VideoService:
         return self._picture_service.list_pictures(prefix, max_codes, marker)
 
     # ==================== 视频 URL 保存操作 ====================
-    def save_video_from_url(self, video_url: str, object_key: str) -> Dict:
+    def save_video_from_url(self, video_url: str, object_key: str, progress_callback=None) -> Dict:
         """
         从 URL 下载视频并保存到 OSS
 
+        视频流式下载到临时文件，再按大小选择普通上传或断点续传分片上传
+
         Args:
             video_url: 视频的临时 URL
             object_key: OSS 中的对象键
+            progress_callback: 上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含保存结果的字典
         """
         self._ensure_initialized()
 
+        tmp_path = None
         try:
             # 下载视频内容
             logger.info(f"Downloading video from: {video_url}")
-            response = requests.get(video_url, timeout=60)
+            with requests.get(video_url, timeout=60, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to download video: HTTP {response.status_code}")
+                    return {
+                        'success': False,
+                        'error': f'Failed to download video: HTTP {response.status_code}'
+                    }
 
-            if response.status_code != 200:
-                logger.error(f"Failed to download video: HTTP {response.status_code}")
-                return {
-                    'success': False,
-                    'error': f'Failed to download video: HTTP {response.status_code}'
-                }
+                with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+                    tmp_path = f.name
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
 
-            video_content = response.content
-            logger.info(f"Video downloaded successfully, size: {len(video_content)} bytes")
+            logger.info(f"Video downloaded successfully, size: {os.path.getsize(tmp_path)} bytes")
 
             # 上传到 OSS
-            upload_result = self.upload_video(video_content, object_key)
+            upload_result = self.upload_video_from_file(tmp_path, object_key,
+                                                        progress_callback=progress_callback)
 
             if upload_result.get('success'):
                 logger.info(f"Video uploaded to OSS: {object_key}")
@@ -240,6 +286,9 @@ class VideoService:
                 'success': False,
                 'error': f'Error saving video: {str(e)}'
             }
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     # ==================== 辅助方法 ====================
     def generate_object_key(self, user_id: str, file_extension: str = 'mp4') -> str:
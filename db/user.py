@@ -3,10 +3,13 @@
 负责 users 表的 CRUD 操作
 """
 import uuid
-import bcrypt
 from datetime import datetime
 from typing import Optional, Dict, List
 from .base_service import mysql_base_service
+from utils.lazy_import import lazy_import
+
+# 只在注册和登录时使用，首次使用时才导入
+bcrypt = lazy_import('bcrypt')
 
 
 class UserService:
@@ -33,8 +36,8 @@ class UserService:
             'email': email,
             'name': name,
             'bio': bio,
-            'created_at': now.strftime("%Y-%m-%d %H:%M:%S"),
-            'updated_at': now.strftime("%Y-%m-%d %H:%M:%S")
+            'created_at': now,
+            'updated_at': now
         }
 
     def update_user(self, user_id: str, update_data: Dict) -> Optional[Dict]:
@@ -78,9 +81,6 @@ class UserService:
 
             cursor.execute(f"SELECT * FROM {table} WHERE user_id = %s", (user_id,))
             row = cursor.fetchone()
-            if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_user_by_id(self, user_id: str) -> Optional[Dict]:
@@ -92,9 +92,6 @@ class UserService:
         with conn.cursor() as cursor:
             cursor.execute(f"SELECT * FROM {table} WHERE user_id = %s", (user_id,))
             row = cursor.fetchone()
-            if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def fetch_user_by_email(self, email: str) -> Optional[Dict]:
@@ -106,9 +103,6 @@ class UserService:
         with conn.cursor() as cursor:
             cursor.execute(f"SELECT * FROM {table} WHERE email = %s", (email,))
             row = cursor.fetchone()
-            if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
             return row
 
     def register_user(self, email: str, password: str, name: str = '', bio: str = '') -> Optional[Dict]:
@@ -7,6 +7,7 @@ import json
 from datetime import datetime
 from typing import Optional, Dict, List
 from .base_service import mysql_base_service
+from services.entity_cache_service import invalidates_cache, ENTITY_WORK
 
 
 class WorkService:
@@ -46,10 +47,11 @@ class WorkService:
             'word_count': word_count,
             'description': description,
             'work_type': work_type,
-            'created_at': now.strftime("%Y-%m-%d %H:%M:%S"),
-            'updated_at': now.strftime("%Y-%m-%d %H:%M:%S"),
+            'created_at': now,
+            'updated_at': now,
         }
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def update_work(self, work_id: str, update_data: Dict) -> Optional[Dict]:
         """更新作品记录"""
         conn = mysql_base_service._ensure_connection()
@@ -85,8 +87,6 @@ class WorkService:
             cursor.execute(f"SELECT * FROM {table} WHERE work_id = %s", (work_id,))
             row = cursor.fetchone()
             if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
                 # tags 字段从 JSON 字符串转回 Python 列表
                 if row.get('tags'):
                     try:
@@ -105,8 +105,6 @@ class WorkService:
             cursor.execute(f"SELECT * FROM {table} WHERE work_id = %s", (work_id,))
             row = cursor.fetchone()
             if row:
-                row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
                 # tags 字段从 JSON 字符串转回 Python 列表
                 if row.get('tags'):
                     try:
@@ -115,6 +113,27 @@ class WorkService:
                         pass
             return row
 
+    def fetch_works_by_ids(self, work_ids: List[str]) -> List[Dict]:
+        """根据 work_id 列表批量获取作品记录（单条 IN 查询）"""
+        if not work_ids:
+            return []
+        conn = mysql_base_service._ensure_connection()
+        table = mysql_base_service._validate_table_name(
+            mysql_base_service._get_config('MYSQL_TABLE_WORKS', 'works'))
+        placeholders = ', '.join(['%s'] * len(work_ids))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM {table} WHERE work_id IN ({placeholders})", list(work_ids))
+            rows = cursor.fetchall()
+            for row in rows:
+                # tags 字段从 JSON 字符串转回 Python 列表
+                if row.get('tags'):
+                    try:
+                        row['tags'] = json.loads(row['tags'])
+                    except (json.JSONDecodeError, TypeError):
+                        pass
+            return list(rows)
+
     def fetch_works_by_author_id(self, author_id: str, status: Optional[str] = None,
                                  limit: int = 100, offset: int = 0) -> List[Dict]:
         """根据作者 ID 获取作品列表"""
@@ -136,8 +155,6 @@ class WorkService:
             rows = cursor.fetchall()
             if rows:
                 for row in rows:
-                    row['created_at'] = row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-                    row['updated_at'] = row['updated_at'].strftime("%Y-%m-%d %H:%M:%S")
                     # tags 字段从 JSON 字符串转回 Python 列表
                     if row.get('tags'):
                         try:
@@ -146,6 +163,7 @@ class WorkService:
                             pass
             return rows
 
+    @invalidates_cache(ENTITY_WORK, 'work_id')
     def delete_work(self, work_id: str) -> bool:
         """删除作品记录"""
         conn = mysql_base_service._ensure_connection()
@@ -6,6 +6,7 @@ from flask import current_app, g
 from datetime import datetime
 import uuid
 import time
+from services.metrics import metrics
 
 class QwenAIService:
     """阿里云千问 AI 服务类，处理阿里云百炼 API 调用"""
@@ -183,12 +184,14 @@ class QwenAIService:
         current_app.logger.debug(f"Qwen request: model={model}, messages={len(messages)}")
 
         try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=data.get('timeout', 60)
-            )
+            with metrics.dashscope_call(model, 'chat') as call:
+                response = requests.post(
+                    f"{self.api_base}/chat/completions",
+                    headers=headers,
+                    json=payload,
+                    timeout=data.get('timeout', 60)
+                )
+                call.status_code = response.status_code
 
             current_app.logger.debug(f"Qwen response status: {response.status_code}")
 
@@ -528,11 +531,13 @@ class QwenAIService:
         try:
             # 尝试一个简单的 API 调用测试连接
             headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(
-                f"{self.api_base}/models",
-                headers=headers,
-                timeout=10
-            )
+            with metrics.dashscope_call(None, 'models') as call:
+                response = requests.get(
+                    f"{self.api_base}/models",
+                    headers=headers,
+                    timeout=10
+                )
+                call.status_code = response.status_code
 
             if response.status_code == 200:
                 return {
@@ -93,6 +93,7 @@ class AnimeGenerationService:
             # 调用首尾帧模式
             return self._generate_start_end_frame_anime(
                 session_id=session_id,
+                user_id=user_id,
                 payload=payload,
                 api_endpoint='/services/aigc/image2video/video-synthesis',
                 work_id=work_id,
@@ -115,6 +116,7 @@ class AnimeGenerationService:
             # 调用单帧模式
             return self._generate_single_frame_anime(
                 session_id=session_id,
+                user_id=user_id,
                 payload=payload,
                 api_endpoint='/services/aigc/video-generation/video-synthesis',
                 work_id=work_id,
@@ -122,6 +124,7 @@ class AnimeGenerationService:
             )
 
     def _generate_single_frame_anime(self, session_id: str,
+                                      user_id: str,
                                       payload: Dict,
                                       api_endpoint: str,
                                       work_id: str = None,
@@ -131,6 +134,7 @@ class AnimeGenerationService:
 
         Args:
             session_id: 会话 ID
+            user_id: 用户 ID
             payload: 完整的 API payload
             api_endpoint: API 端点路径
             work_id: 作品 ID (可选，原样返回)
@@ -143,7 +147,8 @@ class AnimeGenerationService:
             payload=payload,
             api_endpoint=api_endpoint,
             session_id=session_id,
-            conversation_history=self.conversation_history
+            conversation_history=self.conversation_history,
+            user_id=user_id
         )
 
         if result.get('success'):
@@ -155,6 +160,7 @@ class AnimeGenerationService:
                 'total_duration': result.get('duration', payload['parameters'].get('duration', 5)),
                 'frame_mode': 'single',
                 'task_id': result.get('task_id'),
+                'job_id': result.get('job_id'),
                 'work_id': work_id,
                 'shot_id': shot_id
             }
@@ -164,6 +170,7 @@ class AnimeGenerationService:
         }
 
     def _generate_start_end_frame_anime(self, session_id: str,
+                                         user_id: str,
                                          payload: Dict,
                                          api_endpoint: str,
                                          work_id: str = None,
@@ -173,6 +180,7 @@ class AnimeGenerationService:
 
         Args:
             session_id: 会话 ID
+            user_id: 用户 ID
             payload: 完整的 API payload
             api_endpoint: API 端点路径
             work_id: 作品 ID (可选，原样返回)
@@ -185,7 +193,8 @@ class AnimeGenerationService:
             payload=payload,
             api_endpoint=api_endpoint,
             session_id=session_id,
-            conversation_history=self.conversation_history
+            conversation_history=self.conversation_history,
+            user_id=user_id
         )
 
         if result.get('success'):
@@ -197,6 +206,7 @@ class AnimeGenerationService:
                 'total_duration': result.get('duration', payload['parameters'].get('duration', 5)),
                 'frame_mode': 'start_end',
                 'task_id': result.get('task_id'),
+                'job_id': result.get('job_id'),
                 'work_id': work_id,
                 'shot_id': shot_id
             }
@@ -281,7 +291,8 @@ class AnimeGenerationService:
                 payload=payload,
                 api_endpoint=api_endpoint,
                 session_id=session_id,
-                conversation_history=self.conversation_history
+                conversation_history=self.conversation_history,
+                user_id=user_id
             )
 
             if result.get('success'):
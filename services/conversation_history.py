@@ -6,7 +6,9 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from services.request_timing import mongo_command_timer
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -25,19 +27,32 @@ class ConversationHistory:
     def __init__(self):
         self._mongo_client = None
         self._collection = None
+        self._lock = threading.Lock()
 
     def init_app(self, app):
         """初始化 MongoDB 连接"""
-        with app.app_context():
-            from flask import current_app
-            mongo_uri = current_app.config.get('MONGO_URI')
-            mongo_db = current_app.config.get('MONGO_DB')
-            if mongo_uri and mongo_db:
-                self._mongo_client = MongoClient(mongo_uri)
-                self._collection = self._mongo_client[mongo_db][self.COLLECTION_NAME]
+        with app.app_context(), self._lock:
+            self._initialize()
+
+    @property
+    def initialized(self) -> bool:
+        return self._collection is not None
+
+    def _initialize(self):
+        """根据应用配置创建 MongoDB 连接"""
+        from flask import current_app
+        mongo_uri = current_app.config.get('MONGO_URI')
+        mongo_db = current_app.config.get('MONGO_DB')
+        if mongo_uri and mongo_db:
+            self._mongo_client = MongoClient(mongo_uri, event_listeners=[mongo_command_timer])
+            self._collection = self._mongo_client[mongo_db][self.COLLECTION_NAME]
 
     def _get_collection(self) -> Optional[Collection]:
-        """获取 MongoDB collection"""
+        """获取 MongoDB collection（首次使用时初始化）"""
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._initialize()
         if self._collection is None:
             raise RuntimeError("MongoDB service not initialized. Call init_app first.")
         return self._collection
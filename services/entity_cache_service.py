@@ -0,0 +1,433 @@
+"""
+实体读穿缓存服务类
+缓存按实体 ID 聚合 MySQL 行和 MongoDB 文档后的读取结果（work、asset、anime）
+
+- 进程内 LRU：按实体类型配置 TTL，超过条目上限时淘汰最久未使用的条目
+- 共享层（可选）：配置 ENTITY_CACHE_REDIS_URL 后同时读写 Redis，多个 worker 共享缓存
+  每个实体在 Redis 中有版本号，失效时递增；进程内命中时比对版本号，其他 worker 的写入立即可见；
+  共享层只在版本号未变化时写入（加载期间发生的失效不会把旧值写回）。值以 JSON 保存
+- 未配置 Redis 时只保证单个 worker 内一致：其他 worker 的写入最多在 TTL 后可见
+- 单飞加载：同一实体的并发未命中只执行一次加载，其他请求等待同一结果
+- 写入失效：db 层的写操作通过 invalidates_cache 装饰器删除对应实体的缓存
+- 命中统计：按实体类型统计命中、未命中、合并加载、失效次数
+- 版本标识：缓存条目附带由 updated_at 和内容哈希生成的版本（用于 ETag，条件请求无需访问数据库）
+"""
+import copy
+import json
+import time
+import decimal
+import hashlib
+import logging
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from services.base_service import BaseService
+from services.metrics import metrics
+from utils.json_provider import _default
+
+logger = logging.getLogger(__name__)
+
+# 实体类型
+ENTITY_ASSET = 'asset'
+ENTITY_WORK = 'work'
+ENTITY_ANIME = 'anime'
+
+# 共享层键前缀
+REDIS_KEY_PREFIX = 'narloom:entity'
+
+# 版本号未变化时才写入共享层（KEYS: 数据键, 版本键；ARGV: 加载前的版本号, 数据, TTL）
+REDIS_STORE_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') == tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# 版本键的最短保留时间（秒，至少为最长 TTL 的两倍）
+REDIS_VERSION_TTL = 86400
+
+# 统计计数 -> Prometheus 缓存查找结果
+CACHE_RESULTS = {'hits': 'hit', 'shared_hits': 'shared_hit', 'misses': 'miss', 'coalesced': 'coalesced'}
+
+
+def _parse_ttls(value: str) -> Dict[str, int]:
+    """解析实体 TTL 配置，格式 entity:seconds,...（如 asset:300,work:120）"""
+    ttls = {}
+    for item in (value or '').split(','):
+        entity, _, seconds = item.strip().partition(':')
+        if entity and seconds:
+            ttls[entity.strip()] = int(seconds)
+    return ttls
+
+
+def entity_version(value: Any) -> Tuple[str, Optional[datetime]]:
+    """
+    计算实体的版本标识（updated_at 时间戳 + 内容哈希）
+
+    Args:
+        value: 实体数据
+
+    Returns:
+        Tuple: (版本标识, updated_at)，实体没有 updated_at 时后者为 None
+    """
+    updated_at = value.get('updated_at') if isinstance(value, dict) else None
+    if not isinstance(updated_at, datetime):
+        updated_at = None
+    content = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode('utf-8')
+    digest = hashlib.sha1(content).hexdigest()[:16]
+    timestamp = int(updated_at.timestamp()) if updated_at else 0
+    return f"{timestamp:x}-{digest}", updated_at
+
+
+def _encode_shared(value: Any) -> str:
+    """序列化共享层的值（datetime、date、Decimal 带类型标记，读取时还原）"""
+    def default(o):
+        if isinstance(o, datetime):
+            return {'__datetime__': o.isoformat()}
+        if isinstance(o, date):
+            return {'__date__': o.isoformat()}
+        if isinstance(o, decimal.Decimal):
+            return {'__decimal__': str(o)}
+        return _default(o)
+    return json.dumps(value, default=default, ensure_ascii=False)
+
+
+def _decode_shared(data) -> Any:
+    def hook(obj):
+        if len(obj) == 1:
+            if '__datetime__' in obj:
+                return datetime.fromisoformat(obj['__datetime__'])
+            if '__date__' in obj:
+                return date.fromisoformat(obj['__date__'])
+            if '__decimal__' in obj:
+                return decimal.Decimal(obj['__decimal__'])
+        return obj
+    return json.loads(data, object_hook=hook)
+
+
+class EntityCacheService(BaseService):
+    """实体读穿缓存服务类（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context():
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        self._enabled = bool(self._get_config('ENTITY_CACHE_ENABLED', True))
+        self._default_ttl = int(self._get_config('ENTITY_CACHE_DEFAULT_TTL', 60))
+        self._ttls = _parse_ttls(self._get_config('ENTITY_CACHE_TTLS', 'asset:300,work:120,anime:60'))
+        self._max_entries = int(self._get_config('ENTITY_CACHE_MAX_ENTRIES', 5000))
+
+        self._state_lock = threading.Lock()
+        # (entity, entity_id) -> (过期时间, 实体数据, 版本标识, 加载时的共享层版本号)
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, Any, Tuple, Optional[int]]]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        # 失效版本号：加载期间发生失效时，加载结果不写入缓存
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._redis = self._connect_redis(self._get_config('ENTITY_CACHE_REDIS_URL'))
+        self._initialized = True
+
+    def _connect_redis(self, redis_url: Optional[str]):
+        """连接可选的 Redis 共享层（未配置或 redis 包未安装时只使用进程内缓存）"""
+        if not redis_url or not self._enabled:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            client.ping()
+            return client
+        except Exception as e:
+            self._log(f"Entity cache shared tier unavailable, using local cache only: {e}", level='warning')
+            return None
+
+    def ttl_for(self, entity: str) -> int:
+        """获取实体类型的缓存 TTL（秒）"""
+        self._ensure_initialized()
+        return self._ttls.get(entity, self._default_ttl)
+
+    def get_or_load(self, entity: str, entity_id: str, loader: Callable[[], Any]) -> Any:
+        """
+        读穿获取实体（未命中时调用 loader 加载并写入缓存）
+
+        loader 返回 None（实体不存在）时不缓存；返回值为深拷贝，调用方可以直接修改
+
+        Args:
+            entity: 实体类型（asset/work/anime）
+            entity_id: 实体 ID
+            loader: 从 MySQL/MongoDB 加载聚合结果的函数
+
+        Returns:
+            Any: 实体数据，不存在时为 None
+        """
+        self._ensure_initialized()
+        if not self._enabled or not entity_id:
+            return loader()
+
+        key = (entity, entity_id)
+        cached = self._get_fresh_entry(key)
+        if cached is not None:
+            with self._state_lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self._record(entity, 'hits')
+            return copy.deepcopy(cached[1])
+
+        with self._state_lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._record(entity, 'coalesced')
+                owner = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                version = self._versions.get(key, 0)
+                owner = True
+
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            # 加载前读取共享层版本号，加载期间其他 worker 的失效会使写入被放弃
+            shared_version = self._shared_version(entity, entity_id)
+            value, source = self._load_shared(entity, entity_id, shared_version), 'shared_hits'
+            if value is None:
+                value, source = loader(), 'misses'
+        except BaseException as e:
+            with self._state_lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._state_lock:
+            self._in_flight.pop(key, None)
+            self._record(entity, source)
+            unchanged = self._versions.get(key, 0) == version
+            if value is not None and unchanged:
+                self._entries[key] = (time.time() + self.ttl_for(entity), copy.deepcopy(value),
+                                      entity_version(value), shared_version)
+                self._entries.move_to_end(key)
+                self._prune()
+        if value is not None and unchanged and source == 'misses':
+            self._store_shared(entity, entity_id, value, shared_version)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def is_shared(self) -> bool:
+        """是否已连接共享层（版本号在多个 worker 间一致）"""
+        self._ensure_initialized()
+        return self._enabled and self._redis is not None
+
+    def get_version(self, entity: str, entity_id: str) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        获取已缓存实体的版本标识（不触发加载，未缓存或已过期时返回 None）
+
+        Args:
+            entity: 实体类型
+            entity_id: 实体 ID
+
+        Returns:
+            Tuple: (版本标识, updated_at)，未缓存时为 None
+        """
+        self._ensure_initialized()
+        if not self._enabled or not entity_id:
+            return None
+        cached = self._get_fresh_entry((entity, entity_id))
+        return cached[2] if cached is not None else None
+
+    def _get_fresh_entry(self, key: Tuple[str, str]) -> Optional[Tuple]:
+        """
+        获取未过期的进程内条目；配置共享层时比对版本号，其他 worker 已失效的条目视为未命中并删除
+
+        共享层暂时不可用时按本地 TTL 判断
+        """
+        with self._state_lock:
+            cached = self._entries.get(key)
+        if not cached or cached[0] <= time.time():
+            return None
+        if self._redis is None:
+            return cached
+
+        current = self._shared_version(*key)
+        if current is None or current == cached[3]:
+            return cached
+        with self._state_lock:
+            if self._entries.get(key) is cached:
+                del self._entries[key]
+        return None
+
+    def invalidate(self, entity: str, entity_id: str):
+        """删除实体的缓存（本地和共享层）"""
+        self.invalidate_many(entity, [entity_id])
+
+    def invalidate_many(self, entity: str, entity_ids: Iterable[str]):
+        """
+        批量删除实体的缓存
+
+        Args:
+            entity: 实体类型
+            entity_ids: 实体 ID 列表
+        """
+        self._ensure_initialized()
+        keys = [(entity, entity_id) for entity_id in entity_ids if entity_id]
+        if not keys or not self._enabled:
+            return
+
+        with self._state_lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._record(entity, 'invalidations')
+            # 版本号只需在加载期间保留
+            for key in [k for k in self._versions if k not in self._in_flight]:
+                del self._versions[key]
+
+        if self._redis is not None:
+            try:
+                version_ttl = max([REDIS_VERSION_TTL, self._default_ttl * 2] + [t * 2 for t in self._ttls.values()])
+                pipe = self._redis.pipeline(transaction=True)
+                for key in keys:
+                    pipe.incr(self._redis_version_key(*key))
+                    pipe.expire(self._redis_version_key(*key), version_ttl)
+                    pipe.delete(self._redis_key(*key))
+                pipe.execute()
+            except Exception as e:
+                self._log(f"Failed to invalidate shared entity cache: {e}", level='warning')
+
+    def clear(self):
+        """清空进程内缓存和统计"""
+        self._ensure_initialized()
+        with self._state_lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        获取缓存命中统计
+
+        Returns:
+            Dict: 实体类型 -> 统计数据（hits, shared_hits, misses, coalesced, invalidations, size, hit_ratio）
+        """
+        self._ensure_initialized()
+        with self._state_lock:
+            sizes: Dict[str, int] = {}
+            for entity, _ in self._entries:
+                sizes[entity] = sizes.get(entity, 0) + 1
+            stats = {entity: dict(values) for entity, values in self._stats.items()}
+
+        report = {}
+        for entity, values in stats.items():
+            hits = values['hits'] + values['shared_hits'] + values['coalesced']
+            lookups = hits + values['misses']
+            report[entity] = dict(values, size=sizes.get(entity, 0), ttl=self.ttl_for(entity),
+                                  hit_ratio=round(hits / lookups, 4) if lookups else 0.0)
+        return report
+
+    def _record(self, entity: str, counter: str):
+        """记录统计（调用方持有锁）"""
+        stats = self._stats.setdefault(entity, {
+            'hits': 0, 'shared_hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0
+        })
+        stats[counter] += 1
+        if counter in CACHE_RESULTS:
+            metrics.record_cache(f'entity.{entity}', CACHE_RESULTS[counter])
+
+    def _prune(self):
+        """清理过期条目，超过条目上限时淘汰最久未使用的条目（调用方持有锁）"""
+        now = time.time()
+        for key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _redis_key(entity: str, entity_id: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{entity}:{entity_id}"
+
+    @staticmethod
+    def _redis_version_key(entity: str, entity_id: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:{entity}:{entity_id}:version"
+
+    def _shared_version(self, entity: str, entity_id: str) -> Optional[int]:
+        """读取共享层版本号（未配置或读取失败时返回 None）"""
+        if self._redis is None:
+            return None
+        try:
+            return int(self._redis.get(self._redis_version_key(entity, entity_id)) or 0)
+        except Exception as e:
+            self._log(f"Failed to read shared entity cache version: {e}", level='warning')
+            return None
+
+    def _load_shared(self, entity: str, entity_id: str, shared_version: Optional[int]) -> Any:
+        if self._redis is None or shared_version is None:
+            return None
+        try:
+            data = self._redis.get(self._redis_key(entity, entity_id))
+            if not data:
+                return None
+            payload = _decode_shared(data)
+            return payload['value'] if payload.get('version') == shared_version else None
+        except Exception as e:
+            self._log(f"Failed to read shared entity cache: {e}", level='warning')
+            return None
+
+    def _store_shared(self, entity: str, entity_id: str, value: Any, shared_version: Optional[int]):
+        """版本号仍为加载前的值时写入共享层"""
+        if self._redis is None or shared_version is None:
+            return
+        try:
+            data = _encode_shared({'version': shared_version, 'value': value})
+            self._redis.eval(REDIS_STORE_SCRIPT, 2, self._redis_key(entity, entity_id),
+                             self._redis_version_key(entity, entity_id),
+                             shared_version, data, self.ttl_for(entity))
+        except Exception as e:
+            self._log(f"Failed to write shared entity cache: {e}", level='warning')
+
+
+# 全局实例
+entity_cache_service = EntityCacheService()
+
+
+def invalidates_cache(entity: str, id_param: str):
+    """
+    写操作装饰器：方法执行后（无论成功与否）删除对应实体的缓存
+
+    Args:
+        entity: 实体类型
+        id_param: 方法参数中实体 ID 的参数名
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entity_id = signature.bind(*args, **kwargs).arguments.get(id_param)
+                try:
+                    entity_cache_service.invalidate(entity, entity_id)
+                except Exception as e:
+                    logger.warning(f"Failed to invalidate {entity} cache for {entity_id}: {e}")
+        return wrapper
+    return decorator
@@ -0,0 +1,211 @@
+"""
+视频生成请求去重服务类
+按请求指纹（模型 + 端点 + 规范化 payload）合并重复的视频生成请求
+
+- 进行中合并：相同指纹的请求在任务完成前到达时，等待同一个任务的结果，不重复提交
+- 结果复用：成功的结果在 TTL 内直接返回，不再提交新的付费任务
+- 命中统计：按用户统计请求数、提交数、合并数、缓存命中数（按用户 LRU，条目数有上限）
+"""
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from services.base_service import BaseService
+from services.image_processing_service import SIGNATURE_QUERY_PARAMS
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 未提供用户 ID 时的统计分组
+ANONYMOUS_USER = 'anonymous'
+
+
+def _normalize_value(value: Any) -> Any:
+    """规范化 payload 中的值：URL 去除签名参数，字符串合并空白，整数值浮点数转为整数"""
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 6)
+    if isinstance(value, str):
+        if value.startswith('http://') or value.startswith('https://'):
+            parts = urlsplit(value)
+            query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                     if k not in SIGNATURE_QUERY_PARAMS]
+            return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ''))
+        return ' '.join(value.split())
+    return value
+
+
+class GenerationDedupService(BaseService):
+    """视频生成请求去重服务类（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context():
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        self._ttl = int(self._get_config('VIDEO_DEDUP_TTL', 1800))
+        self._max_entries = int(self._get_config('VIDEO_DEDUP_MAX_ENTRIES', 1000))
+
+        self._state_lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._results: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._stats: 'OrderedDict[str, Dict[str, int]]' = OrderedDict()
+        self._initialized = True
+
+    @staticmethod
+    def fingerprint(model: str, api_endpoint: str, payload: Dict) -> str:
+        """
+        计算视频生成请求指纹
+
+        Args:
+            model: 视频生成模型
+            api_endpoint: API 端点路径
+            payload: 完整的 API payload
+
+        Returns:
+            str: 十六进制指纹
+        """
+        normalized = json.dumps(
+            {'model': model, 'endpoint': api_endpoint, 'payload': _normalize_value(payload)},
+            sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def run(self, fingerprint: str, user_id: Optional[str],
+            submit: Callable[[], Dict]) -> Tuple[Dict, str]:
+        """
+        执行视频生成请求（相同指纹的请求合并到同一个任务）
+
+        Args:
+            fingerprint: 请求指纹
+            user_id: 用户 ID（用于命中统计）
+            submit: 实际提交并等待任务完成的函数，返回结果字典
+
+        Returns:
+            Tuple: (结果字典, 来源) 来源为 submitted / coalesced / cached
+        """
+        self._ensure_initialized()
+
+        with self._state_lock:
+            cached = self._results.get(fingerprint)
+            if cached and cached[0] > time.time():
+                self._record(user_id, 'cached')
+                return copy.deepcopy(cached[1]), 'cached'
+
+            future = self._in_flight.get(fingerprint)
+            if future is not None:
+                self._record(user_id, 'coalesced')
+                owner = False
+            else:
+                future = Future()
+                self._in_flight[fingerprint] = future
+                self._record(user_id, 'submitted')
+                owner = True
+
+        if not owner:
+            logger.info(f"Coalescing duplicate video generation request {fingerprint[:12]}")
+            return copy.deepcopy(future.result()), 'coalesced'
+
+        try:
+            result = submit()
+        except BaseException as e:
+            with self._state_lock:
+                self._in_flight.pop(fingerprint, None)
+            future.set_exception(e)
+            raise
+
+        with self._state_lock:
+            self._in_flight.pop(fingerprint, None)
+            # 只缓存成功结果，失败的请求允许用户立即重试
+            if result.get('success'):
+                self._results[fingerprint] = (time.time() + self._ttl, copy.deepcopy(result))
+                self._results.move_to_end(fingerprint)
+                self._prune()
+        # 等待方拿到独立副本：调用方会在返回的结果上写入自己的 job_id 等字段
+        future.set_result(copy.deepcopy(result))
+        return result, 'submitted'
+
+    def _prune(self):
+        """清理过期结果，超过条目上限时淘汰最早的结果（调用方持有锁）"""
+        now = time.time()
+        for key in [k for k, (expires_at, _) in self._results.items() if expires_at <= now]:
+            del self._results[key]
+        while len(self._results) > self._max_entries:
+            self._results.popitem(last=False)
+
+    def _record(self, user_id: Optional[str], source: str):
+        """
+        记录用户的请求来源（调用方持有锁）
+
+        user_id 来自请求参数，统计按用户 LRU 保留，超过条目上限时淘汰最久未请求的用户
+        """
+        key = user_id or ANONYMOUS_USER
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {'requests': 0, 'submitted': 0, 'coalesced': 0, 'cached': 0}
+            while len(self._stats) > self._max_entries:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        stats['requests'] += 1
+        stats[source] += 1
+        metrics.record_cache('generation_dedup', {'cached': 'hit', 'submitted': 'miss'}.get(source, source))
+
+    def invalidate(self, fingerprint: str) -> bool:
+        """删除指定指纹的缓存结果（如生成的视频已被删除）"""
+        self._ensure_initialized()
+        with self._state_lock:
+            return self._results.pop(fingerprint, None) is not None
+
+    def get_stats(self, user_id: str = None) -> Dict[str, Dict]:
+        """
+        获取去重命中统计
+
+        Args:
+            user_id: 用户 ID，为 None 时返回所有用户
+
+        Returns:
+            Dict: 用户 ID -> 统计数据（requests, submitted, coalesced, cached, hit_rate）
+        """
+        self._ensure_initialized()
+        with self._state_lock:
+            items = ([(user_id, self._stats.get(user_id))] if user_id
+                     else list(self._stats.items()))
+
+        report = {}
+        for uid, stats in items:
+            if not stats:
+                continue
+            hits = stats['coalesced'] + stats['cached']
+            report[uid] = dict(stats, hit_rate=round(hits / stats['requests'], 4) if stats['requests'] else 0.0)
+        return report
+
+
+# 全局实例
+generation_dedup_service = GenerationDedupService()
@@ -0,0 +1,684 @@
+"""
+图片处理服务类
+负责漫画图片的本地下载缓存、分格裁剪、缩放与重新编码，以及裁剪结果上传 OSS
+
+- 下载缓存：按 URL（去除签名参数）哈希存放在本地磁盘，超过容量上限时按最近访问时间淘汰
+- 裁剪处理：Pillow 在进程池中完成裁剪、缩放、编码，不阻塞请求线程
+- 结果复用：裁剪结果按确定性对象键上传到 OSS，同一分格重复请求直接复用
+- 视觉预处理：送入视觉模型前按模型有效分辨率缩放并重新编码，减小 base64 请求体
+- 图片副本：上传后在后台生成缩略图、预览图（WebP/AVIF），列表接口只需加载小尺寸副本
+"""
+import os
+import io
+import math
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+
+from services.base_service import BaseService
+
+logger = logging.getLogger(__name__)
+
+# 签名类查询参数，不参与缓存键计算（同一对象的不同签名 URL 命中同一缓存）
+SIGNATURE_QUERY_PARAMS = {'Expires', 'OSSAccessKeyId', 'Signature', 'security-token',
+                          'x-oss-signature', 'x-oss-credential', 'x-oss-date',
+                          'x-oss-expires', 'x-oss-signature-version'}
+
+# 编码格式对应的扩展名和 Content-Type
+IMAGE_FORMATS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+    'AVIF': ('avif', 'image/avif'),
+}
+
+
+def _parse_rendition_sizes(value: str) -> List[Tuple[str, int]]:
+    """解析图片副本尺寸配置，格式 name:max_side,...（如 thumb:320,preview:1280）"""
+    sizes = []
+    for item in (value or '').split(','):
+        name, _, max_side = item.strip().partition(':')
+        if name and max_side:
+            sizes.append((name.strip(), int(max_side)))
+    return sizes
+
+
+def _crop_resize_encode(source_path: str, bbox: List[int], max_side: int,
+                        image_format: str, quality: int) -> bytes:
+    """
+    裁剪、缩放并重新编码图片（在进程池中执行）
+
+    Args:
+        source_path: 本地源图片路径
+        bbox: 裁剪区域 [x1, y1, x2, y2]，为 None 时不裁剪
+        max_side: 输出图片最长边（像素），0 表示不缩放
+        image_format: 输出格式（JPEG/PNG/WEBP）
+        quality: 编码质量 1-100
+
+    Returns:
+        bytes: 编码后的图片内容
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as img:
+        img.load()
+        if bbox:
+            width, height = img.size
+            x1, y1, x2, y2 = [int(v) for v in bbox]
+            x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+            y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+            if x2 <= x1 or y2 <= y1:
+                raise ValueError(f"Invalid crop region {bbox} for image size {img.size}")
+            img = img.crop((x1, y1, x2, y2))
+
+        if max_side and max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        if image_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        buffer = io.BytesIO()
+        save_kwargs = {'optimize': True}
+        if image_format in ('JPEG', 'WEBP'):
+            save_kwargs['quality'] = quality
+        img.save(buffer, format=image_format, **save_kwargs)
+        return buffer.getvalue()
+
+
+def _render_renditions(source_path: str, sizes: List[Tuple[str, int]], formats: List[str],
+                       quality: int) -> List[Dict]:
+    """
+    生成图片的各尺寸副本（在进程池中执行）
+
+    原图只解码一次，每个尺寸缩放一次后按各格式编码；不放大小于目标尺寸的图片，
+    缩放结果与已生成的副本尺寸相同时（小图的多个尺寸）跳过，
+    当前 Pillow 不支持的格式（如未编译 AVIF）会被跳过
+
+    Args:
+        source_path: 本地源图片路径
+        sizes: [(副本名称, 最长边)] 列表
+        formats: 输出格式列表（WEBP/AVIF/JPEG/PNG）
+        quality: 编码质量 1-100
+
+    Returns:
+        List[Dict]: 每个副本包含 name、format、width、height、content
+    """
+    from PIL import Image, ImageOps, features
+
+    formats = [f for f in formats if f != 'AVIF' or features.check('avif')]
+    renditions = []
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            has_alpha = img.mode in ('P', 'LA', 'PA') or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+
+        emitted = set()
+        for name, max_side in sizes:
+            rendition = img.copy()
+            rendition.thumbnail((max_side, max_side), Image.LANCZOS)
+            if rendition.size in emitted:
+                continue
+            emitted.add(rendition.size)
+            for image_format in formats:
+                encoded = rendition
+                if image_format == 'JPEG' and encoded.mode == 'RGBA':
+                    encoded = encoded.convert('RGB')
+                buffer = io.BytesIO()
+                save_kwargs = {} if image_format == 'PNG' else {'quality': quality}
+                encoded.save(buffer, format=image_format, **save_kwargs)
+                renditions.append({
+                    'name': name,
+                    'format': image_format,
+                    'width': rendition.size[0],
+                    'height': rendition.size[1],
+                    'content': buffer.getvalue(),
+                })
+    return renditions
+
+
+def _encode_for_vision(source_path: str, max_pixels: int, max_bytes: int, quality: int) -> Dict:
+    """
+    按视觉模型有效分辨率缩放并编码为 base64（在进程池中执行）
+
+    原图格式受支持且像素数、文件大小均未超限时直接使用原图；
+    否则按像素预算等比缩放，编码为 JPEG 并逐步降低质量直到满足大小上限
+
+    Args:
+        source_path: 本地源图片路径
+        max_pixels: 像素总数上限（宽 x 高）
+        max_bytes: 编码后大小上限（字节）
+        quality: 初始 JPEG 质量
+
+    Returns:
+        Dict: 包含 data（base64）、mime_type、width、height、original_width、original_height
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as img:
+        original_width, original_height = img.size
+        source_format = img.format
+        file_size = os.path.getsize(source_path)
+
+        if (source_format in IMAGE_FORMATS and original_width * original_height <= max_pixels
+                and file_size <= max_bytes):
+            with open(source_path, 'rb') as f:
+                data = base64.b64encode(f.read()).decode('ascii')
+            return {
+                'data': data,
+                'mime_type': IMAGE_FORMATS[source_format][1],
+                'width': original_width,
+                'height': original_height,
+                'original_width': original_width,
+                'original_height': original_height,
+            }
+
+        img.load()
+        if original_width * original_height > max_pixels:
+            ratio = math.sqrt(max_pixels / float(original_width * original_height))
+            target = (max(1, int(original_width * ratio)), max(1, int(original_height * ratio)))
+            img = img.resize(target, Image.LANCZOS)
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # 透明背景铺白，漫画页面按白底处理
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        buffer = io.BytesIO()
+        while True:
+            buffer.seek(0)
+            buffer.truncate()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes or quality <= 40:
+                break
+            quality -= 10
+
+        return {
+            'data': base64.b64encode(buffer.getbuffer()).decode('ascii'),
+            'mime_type': 'image/jpeg',
+            'width': img.size[0],
+            'height': img.size[1],
+            'original_width': original_width,
+            'original_height': original_height,
+        }
+
+
+class ImageProcessingService(BaseService):
+    """图片处理服务类（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _executor: Optional[ProcessPoolExecutor] = None
+    _rendition_executor: Optional[ThreadPoolExecutor] = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context():
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        default_cache_dir = os.path.join(tempfile.gettempdir(), 'narloom_image_cache')
+        self._cache_dir = self._get_config('IMAGE_CACHE_DIR') or default_cache_dir
+        self._cache_max_bytes = int(self._get_config('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        self._max_workers = int(self._get_config('IMAGE_PROCESS_WORKERS', 2))
+        self._panel_max_side = int(self._get_config('PANEL_MAX_SIDE', 1280))
+        self._panel_quality = int(self._get_config('PANEL_JPEG_QUALITY', 90))
+        self._download_timeout = int(self._get_config('IMAGE_DOWNLOAD_TIMEOUT', 10))
+        self._download_max_bytes = int(self._get_config('IMAGE_DOWNLOAD_MAX_BYTES', 50 * 1024 * 1024))
+        self._vision_max_pixels = int(self._get_config('VISION_MAX_PIXELS', 1280 * 28 * 28))
+        self._vision_max_bytes = int(self._get_config('VISION_MAX_BYTES', 2 * 1024 * 1024))
+        self._vision_quality = int(self._get_config('VISION_JPEG_QUALITY', 85))
+        self._rendition_sizes = _parse_rendition_sizes(
+            self._get_config('PICTURE_RENDITIONS', 'thumb:320,preview:1280'))
+        self._rendition_formats = [f.strip().upper() for f in
+                                   self._get_config('PICTURE_RENDITION_FORMATS', 'WEBP').split(',')
+                                   if f.strip().upper() in IMAGE_FORMATS]
+        self._rendition_quality = int(self._get_config('PICTURE_RENDITION_QUALITY', 80))
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        self._cache_lock = threading.Lock()
+        self._cache_bytes: Optional[int] = None  # 缓存目录总大小（首次写入时扫描一次，之后增量累计）
+        self._initialized = True
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """懒加载进程池"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+        return self._executor
+
+    def _run_in_pool(self, func, *args):
+        """在进程池中执行任务，进程池不可用时回退到当前进程"""
+        try:
+            return self._get_executor().submit(func, *args).result()
+        except (OSError, RuntimeError) as e:
+            # BrokenProcessPool 是 RuntimeError 子类；重置进程池，下次重新创建
+            logger.warning(f"Image process pool unavailable, running inline: {e}")
+            self._executor = None
+            return func(*args)
+
+    # ==================== 下载缓存 ====================
+    @staticmethod
+    def cache_key(image_url: str) -> str:
+        """
+        计算图片 URL 的缓存键（去除签名参数后取 SHA-256）
+
+        Args:
+            image_url: 图片 URL
+
+        Returns:
+            str: 十六进制缓存键
+        """
+        parts = urlsplit(image_url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                 if k not in SIGNATURE_QUERY_PARAMS]
+        normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ''))
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key[:2], key)
+
+    def fetch_image(self, image_url: str) -> Optional[str]:
+        """
+        获取图片的本地缓存路径，未命中时下载一次并写入缓存
+
+        Args:
+            image_url: 图片 URL
+
+        Returns:
+            str: 本地文件路径，下载失败返回 None
+        """
+        self._ensure_initialized()
+        path = self._cache_path(self.cache_key(image_url))
+
+        if os.path.exists(path):
+            # 更新访问时间，用于 LRU 淘汰
+            try:
+                os.utime(path, None)
+                return path
+            except FileNotFoundError:
+                pass
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with requests.get(image_url, timeout=self._download_timeout, stream=True) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Failed to download image: HTTP {response.status_code}")
+                    return None
+                content_length = response.headers.get('Content-Length')
+                if content_length and content_length.isdigit() and int(content_length) > self._download_max_bytes:
+                    logger.warning(f"Image {image_url} too large: {content_length} bytes")
+                    return None
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+                size = 0
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            size += len(chunk)
+                            # 未声明长度（或声明不实）时边下载边检查，超过上限立即停止
+                            if size > self._download_max_bytes:
+                                raise ValueError(f"image exceeds {self._download_max_bytes} bytes")
+                            f.write(chunk)
+                    # 原子替换，避免并发读取到半截文件
+                    os.replace(tmp_path, path)
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+        except Exception as e:
+            logger.warning(f"Failed to download image {image_url}: {e}")
+            return None
+
+        self._evict_if_needed(size)
+        return path
+
+    def get_image_bytes(self, image_url: str) -> Optional[bytes]:
+        """获取图片二进制内容（经由本地缓存）"""
+        path = self.fetch_image(image_url)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"Failed to read cached image {path}: {e}")
+            return None
+
+    def content_hash(self, image_url: str) -> Optional[str]:
+        """
+        计算图片内容的 SHA-256（经由本地缓存，不重复下载）
+
+        Args:
+            image_url: 图片 URL
+
+        Returns:
+            str: 十六进制内容哈希，下载失败返回 None
+        """
+        path = self.fetch_image(image_url)
+        if not path:
+            return None
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+        except OSError as e:
+            logger.warning(f"Failed to hash cached image {path}: {e}")
+            return None
+        return digest.hexdigest()
+
+    # ==================== 视觉预处理 ====================
+    def prepare_vision_image(self, image_url: str) -> Optional[Dict]:
+        """
+        获取送入视觉模型的图片（按模型有效分辨率缩放并编码为 base64）
+
+        Args:
+            image_url: 图片 URL
+
+        Returns:
+            Dict: 包含 data、mime_type、width、height、original_width、original_height，失败返回 None
+        """
+        self._ensure_initialized()
+        path = self.fetch_image(image_url)
+        if not path:
+            return None
+        try:
+            return self._run_in_pool(_encode_for_vision, path, self._vision_max_pixels,
+                                     self._vision_max_bytes, self._vision_quality)
+        except Exception as e:
+            logger.warning(f"Failed to prepare vision image {image_url}: {e}")
+            return None
+
+    def _evict_if_needed(self, added: int):
+        """
+        累计缓存总大小，超过上限时按最近访问时间淘汰最旧的文件，直到低于上限的 90%
+
+        只在首次写入和超过上限时遍历缓存目录（同时校正多个进程共用目录时的累计误差），
+        其余下载只做一次加法
+
+        Args:
+            added: 本次写入的字节数
+        """
+        with self._cache_lock:
+            if self._cache_bytes is not None:
+                self._cache_bytes += added
+                if self._cache_bytes <= self._cache_max_bytes:
+                    return
+
+            entries, total = self._scan_cache()
+            if total > self._cache_max_bytes:
+                target = self._cache_max_bytes * 0.9
+                entries.sort()
+                for _, size, file_path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(file_path)
+                        total -= size
+                    except FileNotFoundError:
+                        continue
+            self._cache_bytes = total
+
+    def _scan_cache(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """遍历缓存目录，返回 ([(访问时间, 大小, 路径)], 总大小)，忽略下载中的 .part 文件"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self._cache_dir):
+            for name in files:
+                if name.endswith('.part'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+                total += stat.st_size
+        return entries, total
+
+    # ==================== 分格裁剪 ====================
+    def panel_object_key(self, image_url: str, bbox: List[int], max_side: int = None,
+                         image_format: str = 'JPEG', quality: int = None) -> str:
+        """
+        生成分格裁剪结果的确定性 OSS 对象键
+
+        同一张图片（忽略签名参数）+ 同一裁剪区域 + 同一编码参数总是得到同一个对象键
+        """
+        self._ensure_initialized()
+        max_side = self._panel_max_side if max_side is None else max_side
+        quality = self._panel_quality if quality is None else quality
+        source_key = self.cache_key(image_url)
+        spec = f"{source_key}:{','.join(str(int(v)) for v in bbox)}:{max_side}:{image_format}:{quality}"
+        digest = hashlib.sha256(spec.encode('utf-8')).hexdigest()
+        extension = IMAGE_FORMATS[image_format][0]
+        return f"panel/{source_key[:2]}/{digest}.{extension}"
+
+    @staticmethod
+    def _get_oss_service():
+        """获取 oss_service（未初始化时先初始化，与其他调用方一致），OSS 未配置时返回 None"""
+        from db import oss_service
+
+        try:
+            oss_service._ensure_initialized()
+        except RuntimeError as e:
+            logger.warning(f"OSS service not available: {e}")
+            return None
+        return oss_service if oss_service._picture_service is not None else None
+
+    def crop_panel(self, image_url: str, bbox: List[int], max_side: int = None,
+                   image_format: str = 'JPEG', quality: int = None) -> Dict:
+        """
+        裁剪漫画分格并上传到 OSS（已存在则直接复用）
+
+        Args:
+            image_url: 原始图片 URL
+            bbox: 分格边界框 [x1, y1, x2, y2]
+            max_side: 输出最长边（像素），默认 PANEL_MAX_SIDE
+            image_format: 输出格式（JPEG/PNG/WEBP）
+            quality: 编码质量，默认 PANEL_JPEG_QUALITY
+
+        Returns:
+            Dict: 包含 success, url, object_key, cached 的字典
+        """
+        self._ensure_initialized()
+        oss_service = self._get_oss_service()
+        if oss_service is None:
+            return {'success': False, 'error': 'OSS service not available'}
+
+        if image_format not in IMAGE_FORMATS:
+            return {'success': False, 'error': f'Unsupported image format: {image_format}'}
+
+        max_side = self._panel_max_side if max_side is None else max_side
+        quality = self._panel_quality if quality is None else quality
+        object_key = self.panel_object_key(image_url, bbox, max_side, image_format, quality)
+
+        try:
+            if oss_service.object_exists(object_key):
+                url_result = oss_service.get_picture_url(object_key)
+                if url_result.get('success'):
+                    return {'success': True, 'url': url_result['url'],
+                            'object_key': object_key, 'cached': True}
+
+            source_path = self.fetch_image(image_url)
+            if not source_path:
+                return {'success': False, 'error': 'Failed to download source image'}
+
+            content = self._run_in_pool(_crop_resize_encode, source_path, list(bbox),
+                                        max_side, image_format, quality)
+
+            upload_result = oss_service.upload_picture(
+                content, object_key, content_type=IMAGE_FORMATS[image_format][1])
+            if not upload_result.get('success'):
+                return {'success': False, 'error': upload_result.get('error')}
+
+            return {'success': True, 'url': upload_result['url'],
+                    'object_key': object_key, 'cached': False}
+        except Exception as e:
+            logger.error(f"Error cropping panel {bbox} from {image_url}: {e}")
+            return {'success': False, 'error': str(e)}
+
+    # ==================== 图片副本 ====================
+    @staticmethod
+    def rendition_object_key(object_key: str, name: str, image_format: str) -> str:
+        """
+        生成图片副本的对象键（同一原图的副本位于同一前缀下）
+
+        Args:
+            object_key: 原图对象键
+            name: 副本名称（如 thumb、preview）
+            image_format: 副本格式
+
+        Returns:
+            str: 格式 rendition/{原图对象键去扩展名}/{name}.{ext}
+        """
+        return f"{ImageProcessingService.rendition_prefix(object_key)}{name}.{IMAGE_FORMATS[image_format][0]}"
+
+    @staticmethod
+    def rendition_prefix(object_key: str) -> str:
+        """获取原图全部副本所在的对象键前缀 rendition/{原图对象键去扩展名}/"""
+        stem = object_key.rsplit('.', 1)[0]
+        return f"rendition/{stem}/"
+
+    def rendition_object_keys(self, object_key: str) -> List[str]:
+        """获取原图按当前配置应生成的副本对象键（配置变更前生成的副本需按前缀列出）"""
+        self._ensure_initialized()
+        return [self.rendition_object_key(object_key, name, image_format)
+                for name, _ in self._rendition_sizes for image_format in self._rendition_formats]
+
+    def generate_renditions(self, object_key: str) -> Dict:
+        """
+        为 OSS 中的图片生成缩略图、预览图等副本并上传到 OSS
+
+        Args:
+            object_key: 原图对象键
+
+        Returns:
+            Dict: 包含 success 和 renditions（name、format、object_key、content_type、width、height、size）
+        """
+        self._ensure_initialized()
+        oss_service = self._get_oss_service()
+        if oss_service is None:
+            return {'success': False, 'error': 'OSS service not available'}
+        if not self._rendition_sizes or not self._rendition_formats:
+            return {'success': True, 'renditions': []}
+
+        try:
+            url_result = oss_service.get_picture_url(object_key)
+            if not url_result.get('success'):
+                return {'success': False, 'error': url_result.get('error')}
+            source_path = self.fetch_image(url_result['url'])
+            if not source_path:
+                return {'success': False, 'error': 'Failed to download source image'}
+
+            encoded = self._run_in_pool(_render_renditions, source_path, self._rendition_sizes,
+                                        self._rendition_formats, self._rendition_quality)
+
+            renditions = []
+            for item in encoded:
+                key = self.rendition_object_key(object_key, item['name'], item['format'])
+                content_type = IMAGE_FORMATS[item['format']][1]
+                upload_result = oss_service.upload_picture(item['content'], key, content_type=content_type)
+                if not upload_result.get('success'):
+                    return {'success': False, 'error': upload_result.get('error')}
+                renditions.append({
+                    'name': item['name'],
+                    'format': item['format'].lower(),
+                    'object_key': key,
+                    'content_type': content_type,
+                    'width': item['width'],
+                    'height': item['height'],
+                    'size': len(item['content']),
+                })
+            return {'success': True, 'renditions': renditions}
+        except Exception as e:
+            logger.error(f"Error generating renditions for {object_key}: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def build_renditions(self, object_key: str) -> Dict:
+        """
+        生成图片副本并写入所有引用该原图的 asset_data.renditions
+
+        相同内容的图片共享原图对象，已有 asset 记录了副本时直接复用，不重复生成
+
+        Args:
+            object_key: 原图对象键
+
+        Returns:
+            Dict: 包含 success、renditions、reused 的字典
+        """
+        from db import asset_data_service
+
+        renditions = asset_data_service.fetch_object_renditions(object_key)
+        reused = renditions is not None
+        if not reused:
+            result = self.generate_renditions(object_key)
+            if not result.get('success'):
+                return result
+            renditions = result['renditions']
+
+        asset_data_service.set_object_renditions(object_key, renditions)
+        return {'success': True, 'renditions': renditions, 'reused': reused}
+
+    def _build_renditions_quietly(self, object_key: str) -> Dict:
+        try:
+            result = self.build_renditions(object_key)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        if not result.get('success'):
+            logger.warning(f"Failed to build renditions for {object_key}: {result.get('error')}")
+        return result
+
+    def submit_renditions(self, object_key: str) -> Optional[Future]:
+        """
+        在后台生成图片副本（编码在进程池中执行，不阻塞上传请求）
+
+        Args:
+            object_key: 原图对象键
+
+        Returns:
+            Future: 后台任务，未配置副本尺寸时返回 None
+        """
+        self._ensure_initialized()
+        if not self._rendition_sizes or not self._rendition_formats:
+            return None
+
+        if self._rendition_executor is None:
+            with self._lock:
+                if self._rendition_executor is None:
+                    self._rendition_executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix='picture-rendition')
+        return self._rendition_executor.submit(self._build_renditions_quietly, object_key)
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self._rendition_executor is not None:
+            self._rendition_executor.shutdown(wait=False, cancel_futures=True)
+            self._rendition_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局实例
+image_processing_service = ImageProcessingService()
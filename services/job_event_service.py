@@ -0,0 +1,473 @@
+"""
+生成任务事件服务类
+负责视频生成任务的状态事件发布、SSE 推送、后台执行和完成 Webhook 通知
+
+- 状态：queued / submitted / running / succeeded / failed，多图片任务附带 progress
+- 订阅：按 job_id 或 user_id 订阅事件流，支持 Last-Event-ID 断线续传
+- 跨进程：每个事件由后台线程写入 generation_jobs 集合；本进程没有该任务时轮询该集合（兼容 video_tasks），
+  任务暂未找到或存储不可用时推送非终态的 unknown 事件并继续轮询，超时后关闭
+- Webhook：任务结束时向调用方提供的 URL 推送结果，失败按指数退避重试；
+  提交和每次推送前解析域名，拒绝回环、链路本地、内网和保留地址（可用 WEBHOOK_ALLOWED_HOSTS 限定域名），不跟随重定向
+"""
+import hmac
+import json
+import socket
+import ipaddress
+import time
+import uuid
+import queue
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from flask import current_app
+
+from services.base_service import BaseService
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_SUBMITTED = 'submitted'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+# 跨进程订阅时任务暂未找到或任务存储不可用（非终态）
+STATUS_UNKNOWN = 'unknown'
+
+TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+def format_sse(event: Dict) -> str:
+    """将事件格式化为 SSE 消息"""
+    payload = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event['seq']}\nevent: {event['status']}\ndata: {payload}\n\n"
+
+
+class JobEventService(BaseService):
+    """生成任务事件服务类（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context():
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        self._job_workers = int(self._get_config('JOB_WORKERS', 4))
+        self._retention = int(self._get_config('JOB_EVENT_RETENTION', 3600))
+        self._heartbeat = int(self._get_config('SSE_HEARTBEAT_INTERVAL', 15))
+        self._webhook_secret = self._get_config('WEBHOOK_SECRET', '') or ''
+        self._webhook_max_retries = int(self._get_config('WEBHOOK_MAX_RETRIES', 5))
+        self._webhook_timeout = int(self._get_config('WEBHOOK_TIMEOUT', 5))
+        self._webhook_allowed_hosts = [h.strip().lower() for h in
+                                       str(self._get_config('WEBHOOK_ALLOWED_HOSTS', '') or '').split(',') if h.strip()]
+        self._store_poll_interval = float(self._get_config('JOB_STORE_POLL_INTERVAL', 2))
+        self._unknown_timeout = int(self._get_config('JOB_STREAM_UNKNOWN_TIMEOUT', 120))
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._jobs: Dict[str, Dict] = {}
+        self._events = deque(maxlen=int(self._get_config('JOB_EVENT_BUFFER', 2000)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._webhook_executor: Optional[ThreadPoolExecutor] = None
+        self._store_queue: Optional[queue.SimpleQueue] = None
+        self._initialized = True
+
+    # ==================== 任务与事件 ====================
+    def create_job(self, user_id: Optional[str], job_type: str, webhook_url: str = None,
+                   total: int = None) -> str:
+        """
+        创建任务并发布 queued 事件
+
+        Args:
+            user_id: 用户 ID
+            job_type: 任务类型（single_image_video / multi_image_video）
+            webhook_url: 任务结束时回调的 URL（可选）
+            total: 子任务总数（多图片任务）
+
+        Returns:
+            str: job_id
+        """
+        job_id = str(uuid.uuid4())
+        self.register_job(job_id, user_id, webhook_url, job_type)
+        progress = {'completed': 0, 'total': total} if total else None
+        self.publish(job_id, STATUS_QUEUED, progress=progress)
+        return job_id
+
+    def register_job(self, job_id: str, user_id: Optional[str], webhook_url: str = None,
+                     job_type: str = None) -> None:
+        """登记任务（恢复的任务在本进程重新登记，以便推送事件和 Webhook）"""
+        self._ensure_initialized()
+        with self._cond:
+            job = self._jobs.setdefault(job_id, {'user_id': user_id, 'job_type': job_type, 'webhook_url': None,
+                                                 'status': None, 'updated_at': time.time()})
+            job['webhook_url'] = job['webhook_url'] or webhook_url
+            job['user_id'] = job['user_id'] or user_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """获取本进程中任务的最新状态"""
+        self._ensure_initialized()
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def publish(self, job_id: Optional[str], status: str, user_id: str = None, **data) -> Optional[Dict]:
+        """
+        发布任务状态事件（终态事件同时触发 Webhook）
+
+        Args:
+            job_id: 任务 ID（为空时忽略）
+            status: 任务状态
+            user_id: 用户 ID（任务未登记时使用）
+            **data: 事件附加数据（progress, video_url, error 等）
+
+        Returns:
+            Dict: 发布的事件
+        """
+        if not job_id:
+            return None
+        self._ensure_initialized()
+
+        with self._cond:
+            job = self._jobs.setdefault(job_id, {'user_id': user_id, 'job_type': None, 'webhook_url': None,
+                                                 'status': None, 'updated_at': time.time()})
+            if job['status'] in TERMINAL_STATUSES:
+                return None
+            self._seq += 1
+            event = {'seq': self._seq, 'job_id': job_id, 'user_id': job['user_id'], 'status': status,
+                     'timestamp': datetime.now().isoformat()}
+            event.update({k: v for k, v in data.items() if v is not None})
+            job['status'] = status
+            job['updated_at'] = time.time()
+            self._events.append(event)
+            self._prune()
+            self._cond.notify_all()
+            webhook_url = job['webhook_url']
+            job_type = job['job_type']
+
+        metrics.inc('job_events', status=status)
+        self._persist(event, job_type)
+
+        if status in TERMINAL_STATUSES and webhook_url:
+            self._get_webhook_executor().submit(self._deliver_webhook, webhook_url, event)
+        return event
+
+    def publish_result(self, job_id: Optional[str], result: Dict, user_id: str = None) -> Optional[Dict]:
+        """根据任务结果字典发布终态事件（等待超时转入后台轮询的任务仍为 running）"""
+        if result.get('status') == STATUS_RUNNING:
+            return self.publish(job_id, STATUS_RUNNING, user_id=user_id, message=result.get('error'))
+        if result.get('success'):
+            return self.publish(job_id, STATUS_SUCCEEDED, user_id=user_id,
+                                video_url=result.get('video_url'),
+                                video_asset_id=result.get('video_asset_id'))
+        return self.publish(job_id, STATUS_FAILED, user_id=user_id, error=result.get('error'))
+
+    def progress_callback(self, job_id: Optional[str], step: float = 0.05,
+                          **progress) -> Callable[[int, Optional[int]], None]:
+        """
+        创建上传进度回调，按字节进度发布 running 事件
+
+        进度每推进 step（默认 5%）或上传完成时才发布一次，避免逐块回调刷屏
+
+        Args:
+            job_id: 任务 ID
+            step: 发布事件的最小进度间隔（0-1）
+            **progress: 附加到 progress 中的字段（如 stage, completed, total）
+
+        Returns:
+            Callable: (已上传字节数, 总字节数) 回调
+        """
+        lock = threading.Lock()
+        last = [-1.0]
+
+        def callback(consumed_bytes: int, total_bytes: Optional[int]):
+            if not job_id or not total_bytes:
+                return
+            ratio = min(1.0, consumed_bytes / total_bytes)
+            with lock:
+                if ratio < 1.0 and ratio - last[0] < step:
+                    return
+                last[0] = ratio
+            self.publish(job_id, STATUS_RUNNING, progress=dict(
+                progress, bytes_uploaded=consumed_bytes, bytes_total=total_bytes))
+
+        return callback
+
+    def _prune(self):
+        """清理已结束且超过保留时间的任务（调用方持有锁）"""
+        cutoff = time.time() - self._retention
+        for job_id in [k for k, job in self._jobs.items()
+                       if job['status'] in TERMINAL_STATUSES and job['updated_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    # ==================== 后台执行 ====================
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._job_workers,
+                                                        thread_name_prefix='generation-job')
+        return self._executor
+
+    def _get_webhook_executor(self) -> ThreadPoolExecutor:
+        if self._webhook_executor is None:
+            with self._lock:
+                if self._webhook_executor is None:
+                    self._webhook_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='job-webhook')
+        return self._webhook_executor
+
+    def run_job(self, job_id: str, func: Callable[[], Dict]) -> Dict:
+        """执行任务并根据结果发布终态事件（异常时发布 failed 事件后继续抛出）"""
+        try:
+            result = func()
+        except Exception as e:
+            self.publish(job_id, STATUS_FAILED, error=str(e))
+            raise
+        result['job_id'] = job_id
+        self.publish_result(job_id, result)
+        return result
+
+    def submit_job(self, job_id: str, func: Callable[[], Dict]) -> None:
+        """在后台线程池中执行任务（携带当前 Flask 应用上下文）"""
+        self._ensure_initialized()
+        app = current_app._get_current_object()
+
+        def run():
+            metrics.inc('jobs_queued', -1)
+            metrics.inc('jobs_running')
+            with app.app_context():
+                try:
+                    self.run_job(job_id, func)
+                except Exception as e:
+                    logger.error(f"Generation job {job_id} failed: {e}", exc_info=True)
+                finally:
+                    metrics.inc('jobs_running', -1)
+
+        metrics.inc('jobs_queued')
+        self._get_executor().submit(run)
+
+    # ==================== 任务存储 ====================
+    def _persist(self, event: Dict, job_type: str = None):
+        """将事件交给写入线程保存到 generation_jobs（按发布顺序写入，不阻塞请求线程）"""
+        if self._store_queue is None:
+            with self._lock:
+                if self._store_queue is None:
+                    store_queue = queue.SimpleQueue()
+                    threading.Thread(target=self._store_writer, args=(store_queue,),
+                                     name='job-store-writer', daemon=True).start()
+                    self._store_queue = store_queue
+        self._store_queue.put((event, job_type))
+
+    def _store_writer(self, store_queue: queue.SimpleQueue):
+        from db.mongo_generation_job import generation_job_service
+
+        retry_at = 0.0
+        while True:
+            event, job_type = store_queue.get()
+            # 存储不可用时暂停写入非终态事件，避免每个事件都等待连接超时
+            if time.time() < retry_at and event['status'] not in TERMINAL_STATUSES:
+                continue
+            try:
+                generation_job_service.save_event(event, job_type)
+            except Exception as e:
+                logger.warning(f"Failed to persist event for job {event['job_id']}: {e}")
+                retry_at = time.time() + 30
+
+    # ==================== Webhook ====================
+    def validate_webhook_url(self, url: str) -> Optional[str]:
+        """
+        校验 Webhook URL（防止 SSRF）
+
+        只允许 http(s)；配置 WEBHOOK_ALLOWED_HOSTS 时域名须在列表中（".example.com" 匹配子域名）；
+        域名解析出的所有地址都必须是公网地址
+
+        Args:
+            url: Webhook URL
+
+        Returns:
+            str: 不允许时返回原因，允许时返回 None
+        """
+        self._ensure_initialized()
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or '').lower()
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except (TypeError, ValueError, AttributeError):
+            return 'must be an http(s) URL'
+        if parts.scheme not in ('http', 'https') or not host:
+            return 'must be an http(s) URL'
+
+        if self._webhook_allowed_hosts and not any(
+                host == allowed or (allowed.startswith('.') and host.endswith(allowed))
+                for allowed in self._webhook_allowed_hosts):
+            return f'host {host} is not allowed'
+
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+        except (socket.gaierror, UnicodeError) as e:
+            return f'host {host} cannot be resolved: {e}'
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%', 1)[0])
+            if getattr(ip, 'ipv4_mapped', None):
+                ip = ip.ipv4_mapped
+            if not ip.is_global or ip.is_multicast:
+                return f'host {host} resolves to a non-public address'
+        return None
+
+    def _deliver_webhook(self, url: str, event: Dict) -> bool:
+        """推送终态事件到 Webhook，失败按指数退避重试（每次推送前重新校验地址，不跟随重定向）"""
+        body = json.dumps(event, ensure_ascii=False, default=str).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'X-Narloom-Event': event['status']}
+        if self._webhook_secret:
+            signature = hmac.new(self._webhook_secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            headers['X-Narloom-Signature'] = f"sha256={signature}"
+
+        for attempt in range(self._webhook_max_retries + 1):
+            rejected = self.validate_webhook_url(url)
+            if rejected:
+                logger.error(f"Webhook {url} rejected for job {event['job_id']}: {rejected}")
+                return False
+            try:
+                response = requests.post(url, data=body, headers=headers, timeout=self._webhook_timeout,
+                                         allow_redirects=False)
+                if 200 <= response.status_code < 300:
+                    return True
+                if 300 <= response.status_code < 400:
+                    logger.error(f"Webhook {url} returned redirect {response.status_code} for job "
+                                 f"{event['job_id']}, redirects are not followed")
+                    return False
+                logger.warning(f"Webhook {url} returned {response.status_code} for job {event['job_id']}")
+            except requests.RequestException as e:
+                logger.warning(f"Webhook {url} failed for job {event['job_id']}: {e}")
+            if attempt < self._webhook_max_retries:
+                time.sleep(min(2 ** attempt, 60))
+
+        logger.error(f"Webhook {url} gave up after {self._webhook_max_retries + 1} attempts for job {event['job_id']}")
+        return False
+
+    # ==================== 事件订阅 ====================
+    def stream(self, job_id: str = None, user_id: str = None,
+               last_event_id: int = 0) -> Iterator[str]:
+        """
+        订阅任务事件（SSE 消息生成器）
+
+        按 job_id 订阅时在任务结束后关闭；按 user_id 订阅时持续推送，定期发送心跳
+
+        Args:
+            job_id: 任务 ID
+            user_id: 用户 ID
+            last_event_id: 客户端已收到的最后事件序号（断线续传）
+
+        Yields:
+            str: SSE 消息
+        """
+        self._ensure_initialized()
+        cursor = last_event_id or 0
+
+        if job_id and self.get_job(job_id) is None:
+            yield from self._stream_from_store(job_id)
+            return
+
+        while True:
+            with self._cond:
+                events = [e for e in self._events if e['seq'] > cursor and
+                          (e['job_id'] == job_id if job_id else e['user_id'] == user_id)]
+                if not events:
+                    self._cond.wait(timeout=self._heartbeat)
+                    events = [e for e in self._events if e['seq'] > cursor and
+                              (e['job_id'] == job_id if job_id else e['user_id'] == user_id)]
+
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+
+            for event in events:
+                cursor = event['seq']
+                yield format_sse(event)
+                if job_id and event['status'] in TERMINAL_STATUSES:
+                    return
+
+    def _load_stored_job(self, job_id: str) -> Optional[Dict]:
+        """
+        从任务存储读取任务的最新状态（generation_jobs 优先，兼容只写入 video_tasks 的任务）
+
+        Returns:
+            Dict: 事件字段，任务不存在时返回 None（存储异常时抛出）
+        """
+        from db.mongo_generation_job import generation_job_service
+        from db.mongo_video_task import video_task_service
+
+        job = generation_job_service.fetch_job(job_id)
+        if job is not None:
+            return {key: job.get(key) for key in ('user_id', 'status', 'progress', 'task_id', 'video_url',
+                                                  'video_asset_id', 'error', 'message')}
+        task = video_task_service.fetch_task(job_id)
+        if task is not None:
+            return {'user_id': task.get('user_id'), 'status': task['status'], 'task_id': task.get('task_id'),
+                    'video_url': task.get('result_url'), 'error': task.get('error')}
+        return None
+
+    def _stream_from_store(self, job_id: str) -> Iterator[str]:
+        """
+        任务不在本进程时，轮询任务存储推送状态变化
+
+        任务暂未找到（其他进程尚未写入）或存储不可用时推送非终态的 unknown 事件并继续轮询，
+        超过 JOB_STREAM_UNKNOWN_TIMEOUT 仍未找到时关闭连接，不推送 failed
+        """
+        last = None
+        seq = 0
+        waited = 0.0
+        unknown_since = None
+        while True:
+            try:
+                state = self._load_stored_job(job_id)
+                reason = 'Job not found'
+            except Exception as e:
+                logger.warning(f"Failed to load generation job {job_id}: {e}")
+                state, reason = None, 'Job store unavailable'
+
+            if state is None:
+                state = {'status': STATUS_UNKNOWN, 'message': reason}
+                unknown_since = unknown_since or time.time()
+            else:
+                unknown_since = None
+
+            if state != last:
+                last = state
+                seq += 1
+                event = dict(state, seq=seq, job_id=job_id)
+                yield format_sse({k: v for k, v in event.items() if v is not None})
+                if state['status'] in TERMINAL_STATUSES:
+                    return
+                waited = 0.0
+            elif waited >= self._heartbeat:
+                yield ": keepalive\n\n"
+                waited = 0.0
+
+            if unknown_since and time.time() - unknown_since >= self._unknown_timeout:
+                return
+            time.sleep(self._store_poll_interval)
+            waited += self._store_poll_interval
+
+
+# 全局实例
+job_event_service = JobEventService()
@@ -0,0 +1,332 @@
+"""
+Prometheus 指标模块
+通过 /metrics 暴露请求延迟、数据库连接、DashScope 调用、生成任务、OSS 传输、缓存命中和令牌黑名单等指标
+
+- 需要 prometheus_client 包，未安装时所有记录函数为空操作，不注册 /metrics
+- 多进程（gunicorn 等 prefork 服务器）：启动前设置 PROMETHEUS_MULTIPROC_DIR（每次启动清空该目录），
+  各 worker 把指标写入该目录下的 mmap 文件，/metrics 汇总所有 worker；worker 退出时调用 child_exit
+- 生成任务状态分布、黑名单令牌数在抓取时从 MongoDB / MySQL 查询，与进程数无关
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import request, Response
+from pymongo import monitoring
+
+from services.request_timing import track, DASHSCOPE
+
+try:
+    from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram,
+                                   CONTENT_TYPE_LATEST, generate_latest, multiprocess)
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    CollectorRegistry = None
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'narloom'
+
+# 请求延迟桶（秒），视频生成等同步接口可能长达数分钟
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180, 600)
+DASHSCOPE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+OSS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _multiprocess_dir() -> Optional[str]:
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir')
+
+
+def _define_metrics(registry) -> dict:
+    """定义指标（多进程模式下各进程写入各自的 mmap 文件，Gauge 按存活进程求和）"""
+    return {
+        'http_duration': Histogram(
+            'http_request_duration_seconds', 'HTTP request latency by blueprint route',
+            ['method', 'blueprint', 'route'], namespace=NAMESPACE, registry=registry,
+            buckets=REQUEST_BUCKETS),
+        'http_requests': Counter(
+            'http_requests', 'HTTP requests by route and status code',
+            ['method', 'blueprint', 'route', 'status'], namespace=NAMESPACE, registry=registry),
+        'mysql_connections': Gauge(
+            'mysql_connections', 'Open MySQL connections',
+            namespace=NAMESPACE, registry=registry, multiprocess_mode='livesum'),
+        'mongo_pool_connections': Gauge(
+            'mongo_pool_connections', 'MongoDB pool connections by state',
+            ['state'], namespace=NAMESPACE, registry=registry, multiprocess_mode='livesum'),
+        'mongo_pool_checkout_wait': Histogram(
+            'mongo_pool_checkout_wait_seconds', 'Time spent waiting for a MongoDB pool connection',
+            namespace=NAMESPACE, registry=registry,
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)),
+        'mongo_pool_checkout_failures': Counter(
+            'mongo_pool_checkout_failures', 'Failed MongoDB pool checkouts by reason',
+            ['reason'], namespace=NAMESPACE, registry=registry),
+        'dashscope_duration': Histogram(
+            'dashscope_request_duration_seconds', 'DashScope API latency by model and operation',
+            ['model', 'operation'], namespace=NAMESPACE, registry=registry, buckets=DASHSCOPE_BUCKETS),
+        'dashscope_errors': Counter(
+            'dashscope_errors', 'DashScope API errors by model, operation and reason',
+            ['model', 'operation', 'reason'], namespace=NAMESPACE, registry=registry),
+        'jobs_queued': Gauge(
+            'generation_jobs_queued', 'Generation jobs waiting for a worker thread',
+            namespace=NAMESPACE, registry=registry, multiprocess_mode='livesum'),
+        'jobs_running': Gauge(
+            'generation_jobs_running', 'Generation jobs executing in worker threads',
+            namespace=NAMESPACE, registry=registry, multiprocess_mode='livesum'),
+        'job_events': Counter(
+            'generation_job_events', 'Generation job status transitions',
+            ['status'], namespace=NAMESPACE, registry=registry),
+        'oss_duration': Histogram(
+            'oss_request_duration_seconds', 'OSS request latency by HTTP method',
+            ['method'], namespace=NAMESPACE, registry=registry, buckets=OSS_BUCKETS),
+        'oss_requests': Counter(
+            'oss_requests', 'OSS requests by HTTP method and status code',
+            ['method', 'status'], namespace=NAMESPACE, registry=registry),
+        'oss_bytes': Counter(
+            'oss_transfer_bytes', 'Bytes transferred to and from OSS',
+            ['direction'], namespace=NAMESPACE, registry=registry),
+        'cache_lookups': Counter(
+            'cache_lookups', 'Cache lookups by cache and result',
+            ['cache', 'result'], namespace=NAMESPACE, registry=registry),
+    }
+
+
+class _StoreCollector:
+    """抓取时从数据库查询的指标（生成任务状态分布、黑名单令牌数）"""
+
+    def collect(self):
+        from db.mongo_video_task import video_task_service
+        from services.token_blacklist_service import token_blacklist_service
+
+        tasks = GaugeMetricFamily(f'{NAMESPACE}_video_tasks', 'Video generation tasks by status',
+                                  labels=['status'])
+        try:
+            for status, count in sorted(video_task_service.count_by_status().items()):
+                tasks.add_metric([status], count)
+        except Exception as e:
+            logger.warning(f"Failed to collect video task counts: {e}")
+        yield tasks
+
+        blacklist = GaugeMetricFamily(f'{NAMESPACE}_auth_blacklist_tokens',
+                                      'Unexpired entries in the token blacklist')
+        blacklist.add_metric([], token_blacklist_service.get_blacklisted_tokens_count())
+        yield blacklist
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """MongoDB 连接池指标（通过 monitoring.register 对之后创建的所有 MongoClient 生效）"""
+
+    def __init__(self, metrics_middleware):
+        self._metrics = metrics_middleware
+
+    def _gauge(self, state: str, amount: int):
+        self._metrics.inc('mongo_pool_connections', amount, state=state)
+
+    def connection_created(self, event):
+        self._gauge('open', 1)
+
+    def connection_closed(self, event):
+        self._gauge('open', -1)
+
+    def connection_checked_out(self, event):
+        self._gauge('checked_out', 1)
+        duration = getattr(event, 'duration', None)
+        if duration is not None:
+            self._metrics.observe('mongo_pool_checkout_wait', duration)
+
+    def connection_checked_in(self, event):
+        self._gauge('checked_out', -1)
+
+    def connection_check_out_failed(self, event):
+        self._metrics.inc('mongo_pool_checkout_failures', reason=str(event.reason))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+class DashScopeCall:
+    """DashScope 调用记录（调用方设置 status_code，非 2xx 计为错误）"""
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+
+
+class MetricsMiddleware:
+    """Prometheus 指标中间件"""
+
+    def __init__(self):
+        self._enabled = False
+        self._metrics = {}
+        self._registry = None
+        self._multiprocess_dir = None
+
+    def init_app(self, app):
+        """
+        注册请求钩子和 /metrics 接口
+
+        应在数据库客户端初始化之前调用，连接池监听器只对之后创建的 MongoClient 生效
+
+        Args:
+            app: Flask 应用
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if CollectorRegistry is None:
+            app.logger.info("Metrics disabled: prometheus_client is not installed")
+            return
+
+        if not self._metrics:
+            self._registry = CollectorRegistry()
+            self._metrics = _define_metrics(self._registry)
+            monitoring.register(MongoPoolMonitor(self))
+        self._multiprocess_dir = _multiprocess_dir()
+        self._enabled = True
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    # ==================== 记录 ====================
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """增加计数器或 Gauge（指标未启用时忽略）"""
+        metric = self._metrics.get(name)
+        if metric is not None:
+            (metric.labels(**labels) if labels else metric).inc(amount)
+
+    def observe(self, name: str, value: float, **labels):
+        """记录直方图观测值（指标未启用时忽略）"""
+        metric = self._metrics.get(name)
+        if metric is not None:
+            (metric.labels(**labels) if labels else metric).observe(value)
+
+    def record_cache(self, cache: str, result: str, count: int = 1):
+        """
+        记录缓存查找结果
+
+        Args:
+            cache: 缓存名称（entity.work、signed_url、vision 等）
+            result: hit / miss（或 shared_hit、coalesced 等细分结果）
+            count: 查找次数
+        """
+        if count:
+            self.inc('cache_lookups', count, cache=cache, result=result)
+
+    def record_oss(self, req, response, seconds: float):
+        """
+        记录一次 OSS 请求（由 OSS Session 调用）
+
+        Args:
+            req: oss2.http.Request
+            response: oss2.http.Response，请求异常时为 None
+            seconds: 耗时
+        """
+        if not self._metrics:
+            return
+        method = req.method
+        self.observe('oss_duration', seconds, method=method)
+        self.inc('oss_requests', method=method, status=str(response.status) if response is not None else 'error')
+
+        if isinstance(req.data, (bytes, bytearray)):
+            sent = len(req.data)
+        else:
+            sent = int(req.headers.get('Content-Length') or 0)
+        if sent:
+            self.inc('oss_bytes', sent, direction='upload')
+        if response is not None and method == 'GET':
+            received = int(response.headers.get('Content-Length') or 0)
+            if received:
+                self.inc('oss_bytes', received, direction='download')
+
+    @contextmanager
+    def dashscope_call(self, model: Optional[str], operation: str):
+        """
+        DashScope 调用计时（同时计入请求耗时分解）
+
+        使用示例:
+            with metrics.dashscope_call(model, 'chat') as call:
+                response = requests.post(...)
+                call.status_code = response.status_code
+        """
+        call = DashScopeCall()
+        model = model or 'unknown'
+        started = time.perf_counter()
+        try:
+            with track(DASHSCOPE):
+                yield call
+        except Exception as e:
+            self.inc('dashscope_errors', model=model, operation=operation, reason=type(e).__name__)
+            raise
+        finally:
+            self.observe('dashscope_duration', time.perf_counter() - started, model=model, operation=operation)
+        if call.status_code is not None and not 200 <= call.status_code < 300:
+            self.inc('dashscope_errors', model=model, operation=operation, reason=f'http_{call.status_code}')
+
+    # ==================== 请求钩子 ====================
+
+    def _before_request(self):
+        request.environ['narloom.metrics_started'] = time.perf_counter()
+
+    def _after_request(self, response):
+        started = request.environ.get('narloom.metrics_started')
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = {'method': request.method, 'blueprint': request.blueprint or '', 'route': route}
+        self.observe('http_duration', time.perf_counter() - started, **labels)
+        self.inc('http_requests', status=str(response.status_code), **labels)
+        return response
+
+    # ==================== 导出 ====================
+
+    def collect(self) -> bytes:
+        """
+        生成 Prometheus 文本格式的指标
+
+        Returns:
+            bytes: 多进程模式下为所有 worker 的汇总
+        """
+        registry = CollectorRegistry()
+        if self._multiprocess_dir:
+            multiprocess.MultiProcessCollector(registry, path=self._multiprocess_dir)
+        else:
+            registry.register(self._registry)
+        registry.register(_StoreCollector())
+        return generate_latest(registry)
+
+    def _metrics_view(self):
+        return Response(self.collect(), content_type=CONTENT_TYPE_LATEST)
+
+
+def child_exit(server, worker):
+    """
+    gunicorn child_exit 钩子：清理已退出 worker 的存活 Gauge 文件
+
+    在 gunicorn 配置中使用: from services.metrics import child_exit
+    """
+    if CollectorRegistry is not None and _multiprocess_dir():
+        multiprocess.mark_process_dead(worker.pid)
+
+
+# 全局实例
+metrics = MetricsMiddleware()
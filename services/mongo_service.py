@@ -6,6 +6,9 @@ from db.mongo_asset import asset_data_service, AssetDataService
 from db.mongo_work import work_details_service, WorkDetailsService
 from db.mongo_novel import novel_details_service, NovelDetailsService
 from db.mongo_anime import anime_details_service, AnimeDetailsService
+from db.mongo_vision_cache import vision_cache_service
+from db.mongo_video_task import video_task_service
+from db.mongo_generation_job import generation_job_service
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,9 @@ class MongoService:
         work_details_service.init_app(app)
         novel_details_service.init_app(app)
         anime_details_service.init_app(app)
+        vision_cache_service.init_app(app)
+        video_task_service.init_app(app)
+        generation_job_service.init_app(app)
 
     @property
     def _initialized(self):
@@ -46,6 +52,15 @@ class MongoService:
     def fetch_asset_data(self, *args, **kwargs):
         return asset_data_service.fetch_asset_data(*args, **kwargs)
 
+    def fetch_asset_by_object_key(self, *args, **kwargs):
+        return asset_data_service.fetch_asset_by_object_key(*args, **kwargs)
+
+    def fetch_asset_by_content_hash(self, *args, **kwargs):
+        return asset_data_service.fetch_asset_by_content_hash(*args, **kwargs)
+
+    def refresh_object_references(self, *args, **kwargs):
+        return asset_data_service.refresh_object_references(*args, **kwargs)
+
     def fetch_multiple_asset_data(self, *args, **kwargs):
         return asset_data_service.fetch_multiple_asset_data(*args, **kwargs)
 
@@ -62,6 +77,9 @@ class MongoService:
     def fetch_work_details(self, *args, **kwargs):
         return work_details_service.fetch_work_details(*args, **kwargs)
 
+    def fetch_multiple_work_details(self, *args, **kwargs):
+        return work_details_service.fetch_multiple_work_details(*args, **kwargs)
+
     def delete_work_details(self, *args, **kwargs):
         return work_details_service.delete_work_details(*args, **kwargs)
 
@@ -115,6 +133,9 @@ class MongoService:
     def fetch_anime_details_by_work(self, *args, **kwargs):
         return anime_details_service.fetch_anime_details_by_work(*args, **kwargs)
 
+    def fetch_multiple_anime_details(self, *args, **kwargs):
+        return anime_details_service.fetch_multiple_anime_details(*args, **kwargs)
+
     def delete_anime_details(self, *args, **kwargs):
         return anime_details_service.delete_anime_details(*args, **kwargs)
 
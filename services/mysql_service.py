@@ -77,6 +77,9 @@ class MySQLService:
     def fetch_assets(self, *args, **kwargs):
         return asset_service.fetch_assets(*args, **kwargs)
 
+    def fetch_assets_by_ids(self, *args, **kwargs):
+        return asset_service.fetch_assets_by_ids(*args, **kwargs)
+
     # --- Work 方法 ---
     def insert_work(self, *args, **kwargs):
         return work_service.insert_work(*args, **kwargs)
@@ -90,6 +93,9 @@ class MySQLService:
     def fetch_works_by_author_id(self, *args, **kwargs):
         return work_service.fetch_works_by_author_id(*args, **kwargs)
 
+    def fetch_works_by_ids(self, *args, **kwargs):
+        return work_service.fetch_works_by_ids(*args, **kwargs)
+
     def delete_work(self, *args, **kwargs):
         return work_service.delete_work(*args, **kwargs)
 
@@ -106,6 +112,12 @@ class MySQLService:
     def fetch_novels_by_work_id(self, *args, **kwargs):
         return novel_service.fetch_novels_by_work_id(*args, **kwargs)
 
+    def fetch_novels_by_ids(self, *args, **kwargs):
+        return novel_service.fetch_novels_by_ids(*args, **kwargs)
+
+    def fetch_novels_by_work_ids(self, *args, **kwargs):
+        return novel_service.fetch_novels_by_work_ids(*args, **kwargs)
+
     def delete_novel(self, *args, **kwargs):
         return novel_service.delete_novel(*args, **kwargs)
 
@@ -122,6 +134,12 @@ class MySQLService:
     def fetch_animes_by_work_id(self, *args, **kwargs):
         return anime_service.fetch_animes_by_work_id(*args, **kwargs)
 
+    def fetch_anime_by_ids(self, *args, **kwargs):
+        return anime_service.fetch_anime_by_ids(*args, **kwargs)
+
+    def fetch_anime_by_work_ids(self, *args, **kwargs):
+        return anime_service.fetch_anime_by_work_ids(*args, **kwargs)
+
     def delete_anime(self, *args, **kwargs):
         return anime_service.delete_anime(*args, **kwargs)
 
@@ -0,0 +1,183 @@
+"""
+请求耗时分解模块
+按请求统计 MySQL 查询、MongoDB 命令、OSS 请求和 DashScope 调用的次数与耗时，
+通过 Server-Timing 响应头和结构化日志字段输出
+
+- 计时挂在各数据源的最底层：MySQL 游标 execute、MongoDB CommandListener、OSS Session.do_request、
+  DashScope 的 requests 调用
+- 当前请求的统计保存在 ContextVar 中；请求之外（后台线程轮询等）的调用不记录
+- 线程池中执行的子任务通过 contextvars.copy_context() 继承当前请求的统计
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from flask import request
+from pymongo import monitoring
+
+logger = logging.getLogger('request_timing')
+
+# 统计类别
+MYSQL = 'mysql'
+MONGO = 'mongo'
+OSS = 'oss'
+DASHSCOPE = 'dashscope'
+CATEGORIES = (MYSQL, MONGO, OSS, DASHSCOPE)
+
+
+class RequestTimings:
+    """单个请求的耗时统计"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+
+    def record(self, category: str, seconds: float):
+        with self._lock:
+            self._counts[category] = self._counts.get(category, 0) + 1
+            self._seconds[category] = self._seconds.get(category, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        获取统计快照
+
+        Returns:
+            Dict: 类别 -> {count, ms}
+        """
+        with self._lock:
+            return {category: {'count': self._counts[category],
+                               'ms': round(self._seconds[category] * 1000, 2)}
+                    for category in self._counts}
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """获取当前请求的统计（请求之外为 None）"""
+    return _current.get()
+
+
+def record(category: str, seconds: float):
+    """记录一次调用耗时（请求之外不记录）"""
+    timings = _current.get()
+    if timings is not None:
+        timings.record(category, seconds)
+
+
+@contextmanager
+def track(category: str):
+    """
+    计时上下文管理器
+
+    使用示例:
+        with track(DASHSCOPE):
+            response = requests.post(...)
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(category, time.perf_counter() - started)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """MongoDB 命令计时（传给 MongoClient(event_listeners=...)）"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record(MONGO, event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        record(MONGO, event.duration_micros / 1_000_000)
+
+
+mongo_command_timer = MongoCommandTimer()
+
+
+class RequestTimingMiddleware:
+    """请求耗时中间件（Server-Timing 响应头 + 结构化日志）"""
+
+    def __init__(self):
+        self._enabled = False
+        self._slow_ms = 1000
+
+    def init_app(self, app):
+        """
+        注册请求钩子
+
+        Args:
+            app: Flask 应用
+        """
+        self._enabled = bool(app.config.get('REQUEST_TIMING_ENABLED', True))
+        self._slow_ms = int(app.config.get('REQUEST_TIMING_SLOW_MS', 1000))
+        if not self._enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        request.environ['narloom.timing_token'] = _current.set(RequestTimings())
+
+    def _after_request(self, response):
+        timings = _current.get()
+        if timings is None:
+            return response
+
+        breakdown = timings.snapshot()
+        total_ms = timings.elapsed_ms()
+        response.headers['Server-Timing'] = self._server_timing(breakdown, total_ms)
+
+        fields = {
+            'request_method': request.method,
+            'request_path': request.path,
+            'status_code': response.status_code,
+            'duration_ms': total_ms,
+        }
+        for category in CATEGORIES:
+            stats = breakdown.get(category, {'count': 0, 'ms': 0.0})
+            fields[f'{category}_count'] = stats['count']
+            fields[f'{category}_ms'] = stats['ms']
+
+        summary = ' '.join(f"{c}={fields[f'{c}_count']}/{fields[f'{c}_ms']}ms" for c in CATEGORIES)
+        level = logging.WARNING if total_ms >= self._slow_ms else logging.INFO
+        logger.log(level, f"{request.method} {request.path} {response.status_code} {total_ms}ms {summary}",
+                   extra=fields)
+        return response
+
+    def _teardown_request(self, exc=None):
+        token = request.environ.pop('narloom.timing_token', None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # 令牌在其他上下文中创建（如测试客户端复用请求上下文），直接清空
+                _current.set(None)
+
+    @staticmethod
+    def _server_timing(breakdown: Dict[str, Dict], total_ms: float) -> str:
+        """构建 Server-Timing 响应头（如 mysql;dur=3.2;desc="2 queries", total;dur=15.1）"""
+        units = {MYSQL: 'queries', MONGO: 'ops', OSS: 'requests', DASHSCOPE: 'calls'}
+        metrics = [f'{category};dur={breakdown[category]["ms"]};desc="{breakdown[category]["count"]} {units[category]}"'
+                   for category in CATEGORIES if category in breakdown]
+        metrics.append(f'total;dur={total_ms}')
+        return ', '.join(metrics)
+
+
+# 全局实例
+request_timing = RequestTimingMiddleware()
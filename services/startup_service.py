@@ -0,0 +1,259 @@
+"""
+启动与就绪服务
+管理依赖服务（MySQL、MongoDB、OSS 等）的初始化方式、初始化耗时，以及存活/就绪探针
+
+初始化方式（SERVICE_INIT_MODE）：
+- background（默认）：create_app 只登记服务，后台线程预热；预热完成前请求仍可触发各服务的首次使用初始化
+- lazy：不预热，各服务在首次使用时初始化
+- eager：在 create_app 中同步初始化（原有行为），关键服务失败时抛出异常
+
+启动任务（如恢复未完成的视频任务）在 background / lazy 模式下由后台线程执行，eager 模式下同步执行
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.response_helper import api_response
+
+logger = logging.getLogger(__name__)
+
+MODE_BACKGROUND = 'background'
+MODE_LAZY = 'lazy'
+MODE_EAGER = 'eager'
+MODES = (MODE_BACKGROUND, MODE_LAZY, MODE_EAGER)
+
+STATE_PENDING = 'pending'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+
+class StartupService:
+    """服务初始化登记、后台预热与就绪状态"""
+
+    def __init__(self):
+        self._app = None
+        self._mode = MODE_BACKGROUND
+        self._retry_interval = 5.0
+        self._retry_max_interval = 60.0
+        self._lock = threading.Lock()
+        self._services: Dict[str, Dict] = OrderedDict()
+        self._tasks = []
+        self._thread: Optional[threading.Thread] = None
+        self._generation = 0
+        self._started = time.perf_counter()
+        self._app_init_ms: Optional[float] = None
+        self._warmup_ms: Optional[float] = None
+
+    def init_app(self, app):
+        """
+        读取初始化方式并注册 /rest/v1/health/live、/rest/v1/health/ready
+
+        Args:
+            app: Flask 应用
+        """
+        self._app = app
+        self._started = time.perf_counter()
+        mode = str(app.config.get('SERVICE_INIT_MODE', MODE_BACKGROUND)).lower()
+        if mode not in MODES:
+            app.logger.warning(f"Unknown SERVICE_INIT_MODE {mode!r}, using {MODE_BACKGROUND}")
+            mode = MODE_BACKGROUND
+        self._mode = mode
+        self._retry_interval = float(app.config.get('SERVICE_WARMUP_RETRY_INTERVAL', 5))
+        with self._lock:
+            # 重复 create_app（测试）时让上一次的预热线程退出
+            self._generation += 1
+            self._services = OrderedDict()
+            self._tasks = []
+            self._app_init_ms = None
+            self._warmup_ms = None
+
+        app.add_url_rule('/rest/v1/health/live', 'health_live', self._live_view)
+        app.add_url_rule('/rest/v1/health/ready', 'health_ready', self._ready_view)
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    # ==================== 登记 ====================
+
+    def register(self, name: str, init: Callable[[], None], ready: Callable[[], bool],
+                 critical: bool = True):
+        """
+        登记依赖服务（eager 模式下立即初始化）
+
+        Args:
+            name: 服务名称
+            init: 初始化函数（在应用上下文中调用，需可重复调用）
+            ready: 返回服务是否已初始化（首次使用时的初始化同样会反映在这里）
+            critical: 是否影响就绪状态
+        """
+        with self._lock:
+            self._services[name] = {
+                'init': init, 'ready': ready, 'critical': critical,
+                'state': STATE_PENDING, 'duration_ms': None, 'attempts': 0, 'error': None,
+            }
+        if self._mode == MODE_EAGER:
+            if not self._initialize(name) and critical:
+                raise RuntimeError(f"Service {name} failed to initialize: {self._services[name]['error']}")
+
+    def defer(self, name: str, func: Callable[[], None]):
+        """
+        登记启动任务（eager 模式下立即执行，否则在后台线程中服务预热之后执行）
+
+        Args:
+            name: 任务名称
+            func: 任务函数（在应用上下文中调用）
+        """
+        if self._mode == MODE_EAGER:
+            self._run_task(name, func)
+        else:
+            self._tasks.append((name, func))
+
+    def start(self):
+        """create_app 结束时调用：记录应用初始化耗时，按初始化方式启动后台预热线程"""
+        self._app_init_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        logger.info(f"Application created in {self._app_init_ms}ms (service init mode: {self._mode})")
+
+        if self._mode == MODE_EAGER or (self._mode == MODE_LAZY and not self._tasks):
+            return
+        self._thread = threading.Thread(target=self._warm_up, args=(self._generation,),
+                                        name='service-warmup', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待后台预热线程结束（测试和脚本使用）"""
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    # ==================== 初始化 ====================
+
+    def _initialize(self, name: str) -> bool:
+        """初始化单个服务并记录耗时"""
+        entry = self._services.get(name)
+        if entry is None:
+            return False
+        started = time.perf_counter()
+        try:
+            with self._app.app_context():
+                entry['init']()
+            if not entry['ready']():
+                raise RuntimeError('service reported not initialized')
+            state, error = STATE_READY, None
+        except Exception as e:
+            state, error = STATE_FAILED, str(e)
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        with self._lock:
+            entry.update(state=state, error=error, duration_ms=duration_ms, attempts=entry['attempts'] + 1)
+        if state == STATE_READY:
+            logger.info(f"Service {name} initialized in {duration_ms}ms")
+        else:
+            logger.warning(f"Service {name} failed to initialize after {duration_ms}ms: {error}")
+        return state == STATE_READY
+
+    def _run_task(self, name: str, func: Callable[[], None]):
+        started = time.perf_counter()
+        try:
+            with self._app.app_context():
+                func()
+            logger.info(f"Startup task {name} finished in {round((time.perf_counter() - started) * 1000, 2)}ms")
+        except Exception as e:
+            logger.error(f"Startup task {name} failed: {e}", exc_info=True)
+
+    def _warm_up(self, generation: int):
+        """后台预热：依次初始化各服务，关键服务失败时按退避间隔重试，全部就绪后执行启动任务"""
+        services, tasks = self._services, list(self._tasks)
+        started = time.perf_counter()
+        if self._mode == MODE_BACKGROUND:
+            for name in list(services):
+                if not self._is_ready(name):
+                    self._initialize(name)
+
+            interval = self._retry_interval
+            while generation == self._generation:
+                pending = [name for name, entry in services.items()
+                           if entry['critical'] and not self._is_ready(name)]
+                if not pending:
+                    break
+                time.sleep(interval)
+                for name in pending:
+                    if generation == self._generation:
+                        self._initialize(name)
+                interval = min(interval * 2, self._retry_max_interval)
+            if generation != self._generation:
+                return
+            self._warmup_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.info(f"Service warm-up finished in {self._warmup_ms}ms")
+
+        for name, func in tasks:
+            self._run_task(name, func)
+
+    def _is_ready(self, name: str) -> bool:
+        try:
+            return bool(self._services[name]['ready']())
+        except Exception:
+            return False
+
+    # ==================== 探针 ====================
+
+    def readiness(self) -> Tuple[bool, Dict]:
+        """
+        获取就绪状态
+
+        lazy 模式不等待服务初始化，除非关键服务已初始化失败；其他模式要求所有关键服务已初始化
+
+        Returns:
+            Tuple: (是否就绪, {mode, app_init_ms, warmup_ms, services})
+        """
+        with self._lock:
+            entries = [(name, dict(entry)) for name, entry in self._services.items()]
+
+        services = {}
+        ready = True
+        for name, entry in entries:
+            service_ready = self._is_ready(name)
+            state = STATE_READY if service_ready else entry['state']
+            services[name] = {
+                'state': state,
+                'critical': entry['critical'],
+                'duration_ms': entry['duration_ms'],
+                'attempts': entry['attempts'],
+                'error': None if service_ready else entry['error'],
+            }
+            if entry['critical'] and not service_ready:
+                if self._mode != MODE_LAZY or state == STATE_FAILED:
+                    ready = False
+
+        return ready, {
+            'mode': self._mode,
+            'app_init_ms': self._app_init_ms,
+            'warmup_ms': self._warmup_ms,
+            'services': services,
+        }
+
+    def _live_view(self):
+        return api_response(
+            success=True,
+            message='Service is alive',
+            data={'status': 'alive', 'pid': os.getpid(),
+                  'uptime_seconds': round(time.perf_counter() - self._started, 3)}
+        )
+
+    def _ready_view(self):
+        ready, data = self.readiness()
+        return api_response(
+            success=ready,
+            message='Service is ready' if ready else 'Service is not ready',
+            data=data,
+            status_code=200 if ready else 503,
+            count=len(data['services'])
+        )
+
+
+# 全局实例
+startup_service = StartupService()
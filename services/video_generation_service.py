@@ -5,15 +5,27 @@
 import os
 import json
 import requests
-import base64
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from flask import current_app, stream_with_context, Response
 from datetime import datetime
 import uuid
 import time
+import socket
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 from .ai_service import qwen_ai_service
+from .image_processing_service import image_processing_service
+from .video_stitching_service import video_stitching_service
+from .generation_dedup_service import generation_dedup_service
+from .job_event_service import job_event_service
+from .metrics import metrics
+from utils.logging_helper import lazy_json
+from db.mongo_vision_cache import vision_cache_service
+from db.mongo_video_task import (
+    video_task_service, STATUS_QUEUED, STATUS_SUBMITTED, STATUS_RUNNING
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +37,32 @@ class VideoGenerationService:
     _initialized = False
     _api_key = None
     _api_base = None
+    _purged_prompt_versions = set()  # 本进程已清理过旧缓存的 (task, prompt_version)
+    _task_lease_seconds = 60          # 视频任务租约时长（每次轮询续租）
+    _task_resume_max_wait = 1800      # 后台恢复轮询的最长等待时间
+    _recovery_executor = None         # 后台恢复轮询线程池
+
+    # 视觉分析提示词模板（模板内容变更会改变提示词版本，旧缓存自动失效）
+    ANALYZE_SYSTEM_PROMPT = """你是一位专业的漫画分析专家。请分析这张漫画图片，并提供以下信息：
+
+1. 分格检测：识别漫画中的所有分格（panel），按照从左上到右下的顺序编号
+2. 每个分格的详细描述：
+   - 分格位置（边界框坐标）
+   - 分格中的画面内容
+   - 分格中的人物和动作
+   - 分格中的文字内容（如果有）
+3. 整体场景描述
+4. 建议的动态化方向：如何让静态画面产生自然的动态效果
+
+请以 JSON 格式返回分析结果。"""
+
+    PANEL_DETECT_SYSTEM_PROMPT = """请检测这张漫画图片中的所有分格，返回每个分格的边界框坐标（bbox_2d 格式：[x1, y1, x2, y2]）。
+按照从左上到右下的顺序排列分格。
+只返回 JSON 数组，格式为：{"panels": [{"index": 1, "bbox": [x1, y1, x2, y2], "description": "分格内容简述"}, ...]}"""
+
+    # 图片按模型分辨率缩放后，文本结果中的坐标无法在返回后映射，告知模型原图尺寸
+    ORIGINAL_SIZE_NOTE = ("图片已缩放为 {width}x{height} 以便分析，原图尺寸为 {original_width}x{original_height}。"
+                          "回答中的坐标、位置和尺寸请按原图尺寸给出。")
 
     def __new__(cls):
         if cls._instance is None:
@@ -43,6 +81,8 @@ class VideoGenerationService:
         self._api_key = qwen_ai_service.api_key
         # 万象视频生成 API 使用 dashscope 标准 API
         self._api_base = "https://dashscope.aliyuncs.com/api/v1"
+        self._task_lease_seconds = int(current_app.config.get('VIDEO_TASK_LEASE_SECONDS', 60))
+        self._task_resume_max_wait = int(current_app.config.get('VIDEO_TASK_RESUME_MAX_WAIT', 1800))
         self._initialized = True
 
     # ==================== 模型配置管理 ====================
@@ -89,18 +129,7 @@ class VideoGenerationService:
         vision_model = model_config["vision_model"]
 
         # 构建系统提示词
-        system_prompt = """你是一位专业的漫画分析专家。请分析这张漫画图片，并提供以下信息：
-
-1. 分格检测：识别漫画中的所有分格（panel），按照从左上到右下的顺序编号
-2. 每个分格的详细描述：
-   - 分格位置（边界框坐标）
-   - 分格中的画面内容
-   - 分格中的人物和动作
-   - 分格中的文字内容（如果有）
-3. 整体场景描述
-4. 建议的动态化方向：如何让静态画面产生自然的动态效果
-
-请以 JSON 格式返回分析结果。"""
+        system_prompt = self.ANALYZE_SYSTEM_PROMPT
 
         # 如果有历史对话，添加到上下文中
         context_messages = []
@@ -113,16 +142,27 @@ class VideoGenerationService:
 
         # 调用视觉模型
         try:
-            result = self._call_vision_model(
-                model=vision_model,
-                system_prompt=system_prompt,
-                image_url=image_url,
-                context=context_messages
-            )
+            if context_messages:
+                # 带对话上下文的分析结果依赖上下文，不走缓存
+                result = self._call_vision_model(
+                    model=vision_model,
+                    system_prompt=system_prompt,
+                    image_url=image_url,
+                    context=context_messages
+                )
+                cache_hit = False
+            else:
+                result, cache_hit = self._call_vision_model_cached(
+                    task="analyze",
+                    model=vision_model,
+                    system_prompt=system_prompt,
+                    image_url=image_url
+                )
             return {
                 "success": True,
                 "analysis": result,
-                "model_used": vision_model
+                "model_used": vision_model,
+                "cache_hit": cache_hit
             }
         except Exception as e:
             return {
@@ -144,21 +184,19 @@ class VideoGenerationService:
         model_config = self.get_current_model_config()
         panel_model = model_config["panel_detect_model"]
 
-        system_prompt = """请检测这张漫画图片中的所有分格，返回每个分格的边界框坐标（bbox_2d 格式：[x1, y1, x2, y2]）。
-按照从左上到右下的顺序排列分格。
-只返回 JSON 数组，格式为：{"panels": [{"index": 1, "bbox": [x1, y1, x2, y2], "description": "分格内容简述"}, ...]}"""
-
         try:
-            result = self._call_vision_model(
+            result, cache_hit = self._call_vision_model_cached(
+                task="panel_detect",
                 model=panel_model,
-                system_prompt=system_prompt,
+                system_prompt=self.PANEL_DETECT_SYSTEM_PROMPT,
                 image_url=image_url,
                 expect_json=True
             )
             return {
                 "success": True,
                 "panels": result.get("panels", []),
-                "model_used": panel_model
+                "model_used": panel_model,
+                "cache_hit": cache_hit
             }
         except Exception as e:
             return {
@@ -170,26 +208,30 @@ class VideoGenerationService:
     # ==================== 视频生成 ====================
     def call_video_api(self, payload: Dict, api_endpoint: str,
                         session_id: str = None,
-                        conversation_history=None) -> Dict[str, Any]:
+                        conversation_history=None,
+                        user_id: str = None,
+                        job_id: str = None) -> Dict[str, Any]:
         """
         调用视频生成 API（统一入口）
 
+        相同模型 + 端点 + payload 的请求按指纹去重：进行中的请求合并到同一个任务，
+        已成功的结果在 TTL 内直接复用，不重复提交付费任务
+
         Args:
             payload: 完整的 API payload（包含 model, input, parameters）
             api_endpoint: API 端点路径（如 /services/aigc/video-generation/video-synthesis）
             session_id: 会话 ID（可选，用于记录 session）
             conversation_history: 对话历史服务（可选，用于记录 session）
+            user_id: 用户 ID（可选，用于去重命中统计）
+            job_id: 调用方已创建的任务 ID（可选，由调用方发布终态事件；为空时自动创建）
 
         Returns:
-            Dict: 生成的视频信息
+            Dict: 生成的视频信息（dedup 字段标识 submitted / coalesced / cached）
         """
-        # 构建请求头
-        headers = self._build_dashscope_headers(async_mode=True)
-        api_base = "https://dashscope.aliyuncs.com/api/v1"
-
         model = payload.get("model", "wan2.6-i2v")
 
-        logger.info(f"Video generation payload: {json.dumps(payload, ensure_ascii=False)}")
+        logger.info(f"Video generation request: model={model}, endpoint={api_endpoint}")
+        logger.debug("Video generation payload: %s", lazy_json(payload))
 
         # 记录发送给大模型的请求 payload
         if session_id and conversation_history:
@@ -203,30 +245,80 @@ class VideoGenerationService:
                 }
             )
 
-        # 提交任务
-        submit_response = requests.post(
-            f"{api_base}{api_endpoint}",
-            headers=headers,
-            json=payload,
-            timeout=30
+        fingerprint = generation_dedup_service.fingerprint(model, api_endpoint, payload)
+        result, source = generation_dedup_service.run(
+            fingerprint, user_id,
+            lambda: self._submit_video_task(payload, api_endpoint, model, user_id, fingerprint, job_id)
         )
+        result["dedup"] = source
+
+        if job_id:
+            # 合并或复用的结果属于其他任务，统一返回调用方的任务 ID
+            result["job_id"] = job_id
+        else:
+            job_event_service.publish_result(result.get("job_id"), result, user_id=user_id)
+
+        # 记录大模型返回的响应
+        if session_id and conversation_history:
+            conversation_history.add_message(
+                session_id=session_id,
+                role='assistant',
+                content="视频生成任务完成" if result.get("success") else "视频生成 API 调用失败",
+                metadata={
+                    'api_response': result,
+                    'task_id': result.get("task_id"),
+                    'model_used': model
+                }
+            )
+
+        return result
+
+    def _submit_video_task(self, payload: Dict, api_endpoint: str, model: str,
+                           user_id: str = None, fingerprint: str = None,
+                           job_id: str = None) -> Dict[str, Any]:
+        """
+        提交视频生成任务并轮询直到完成
+
+        任务在提交前写入 video_tasks 集合（job_id 即持久化任务 ID），
+        提交后记录 DashScope task_id，进程重启后可由 recover_video_tasks 恢复轮询
+
+        Returns:
+            Dict: 任务结果（包含 job_id）
+        """
+        headers = self._build_dashscope_headers(async_mode=True)
+        api_base = "https://dashscope.aliyuncs.com/api/v1"
+
+        if not job_id:
+            job_id = str(uuid.uuid4())
+            job_event_service.publish(job_id, STATUS_QUEUED, user_id=user_id)
+
+        job = job_event_service.get_job(job_id) or {}
+        # 任务存储不可用时仍发布事件，只是不写入 video_tasks
+        persisted = bool(self._task_store(
+            'insert_task', job_id, user_id, model, api_endpoint, api_base, payload,
+            self._worker_id(), self._task_lease_seconds, fingerprint, job.get('webhook_url')))
+        store_id = job_id if persisted else None
+
+        # 提交任务
+        with metrics.dashscope_call(model, 'video_submit') as call:
+            submit_response = requests.post(
+                f"{api_base}{api_endpoint}",
+                headers=headers,
+                json=payload,
+                timeout=30
+            )
+            call.status_code = submit_response.status_code
 
         logger.info(f"Submit response status: {submit_response.status_code}")
 
         if submit_response.status_code not in [200, 201]:
-            error_result = {
+            error = f"Video generation API error: {submit_response.status_code} - {submit_response.text}"
+            self._task_store('mark_failed', store_id, error)
+            return {
                 "success": False,
-                "error": f"Video generation API error: {submit_response.status_code} - {submit_response.text}"
+                "error": error,
+                "job_id": job_id
             }
-            # 记录 API 调用失败的响应
-            if session_id and conversation_history:
-                conversation_history.add_message(
-                    session_id=session_id,
-                    role='assistant',
-                    content="视频生成 API 调用失败",
-                    metadata={'api_response': error_result}
-                )
-            return error_result
 
         task_result = submit_response.json()
 
@@ -236,43 +328,102 @@ class VideoGenerationService:
                    task_result.get("request_id"))
 
         if not task_id:
-            error_result = {
+            error = f"No task_id in response: {json.dumps(task_result)}"
+            self._task_store('mark_failed', store_id, error)
+            return {
                 "success": False,
-                "error": f"No task_id in response: {json.dumps(task_result)}"
+                "error": error,
+                "job_id": job_id
             }
-            # 记录无效响应的错误
-            if session_id and conversation_history:
-                conversation_history.add_message(
-                    session_id=session_id,
-                    role='assistant',
-                    content="视频生成 API 响应无效",
-                    metadata={'api_response': error_result}
-                )
-            return error_result
+
+        self._task_store('mark_submitted', store_id, task_id)
+        job_event_service.publish(job_id, STATUS_SUBMITTED, task_id=task_id)
 
         # 轮询任务状态
-        poll_result = self._poll_task_status(task_id, api_base, model)
+        return self._poll_task_status(task_id, api_base, model, job_id=job_id, persist=persisted)
 
-        # 记录大模型返回的响应
-        if session_id and conversation_history:
-            conversation_history.add_message(
-                session_id=session_id,
-                role='assistant',
-                content="视频生成任务完成",
-                metadata={
-                    'api_response': poll_result,
-                    'task_id': task_id,
-                    'model_used': model
-                }
-            )
+    @staticmethod
+    def _worker_id() -> str:
+        """当前进程标识（用于任务租约）"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _task_store(method: str, job_id: Optional[str], *args) -> Any:
+        """
+        调用 video_tasks 存储（存储不可用时记录警告，不影响视频生成）
+
+        Returns:
+            存储方法的返回值，job_id 为空或调用失败时返回 None
+        """
+        if not job_id:
+            return None
+        try:
+            return getattr(video_task_service, method)(job_id, *args)
+        except Exception as e:
+            logger.warning(f"Video task store {method} failed for job {job_id}: {e}")
+            return None
+
+    def recover_video_tasks(self) -> int:
+        """
+        恢复未完成的视频生成任务（启动时调用）
+
+        只恢复租约已过期（持有进程已退出）的任务；已提交的任务在后台继续轮询，
+        提交前中断的任务无法确认是否已提交，标记为失败而不重复提交付费任务
 
-        return poll_result
+        Returns:
+            int: 恢复轮询的任务数量
+        """
+        try:
+            tasks = video_task_service.fetch_recoverable_tasks()
+        except Exception as e:
+            logger.warning(f"Video task recovery skipped: {e}")
+            return 0
+
+        resumed = 0
+        for task in tasks:
+            claimed = self._task_store('claim_task', task['job_id'], self._worker_id(),
+                                       self._task_lease_seconds)
+            if not claimed:
+                continue
+            if not claimed.get('task_id'):
+                self._task_store('mark_failed', claimed['job_id'], 'Interrupted before submission')
+                continue
+            self._get_recovery_executor().submit(self._resume_video_task, claimed)
+            resumed += 1
+
+        if resumed:
+            logger.info(f"Resumed polling for {resumed} video generation tasks")
+        return resumed
+
+    def _get_recovery_executor(self) -> ThreadPoolExecutor:
+        """懒加载后台恢复轮询线程池"""
+        if VideoGenerationService._recovery_executor is None:
+            VideoGenerationService._recovery_executor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix='video-task-recovery')
+        return VideoGenerationService._recovery_executor
+
+    def _resume_video_task(self, task: Dict) -> Dict:
+        """在后台继续轮询已提交的任务，结束时发布终态事件（触发 Webhook）"""
+        job_event_service.register_job(task['job_id'], task.get('user_id'), task.get('webhook_url'))
+        try:
+            result = self._poll_task_status(
+                task['task_id'], task.get('api_base') or self._api_base, task.get('model'),
+                job_id=task['job_id'], max_wait_time=self._task_resume_max_wait,
+                resume_on_timeout=False
+            )
+        except Exception as e:
+            logger.error(f"Error resuming video task {task['job_id']}: {e}")
+            result = {"success": False, "error": str(e), "job_id": task['job_id']}
+        job_event_service.publish_result(task['job_id'], result)
+        return result
 
     def generate_single_image_anime(self,
                                      image_url: str,
                                      prompt: str,
                                      duration: int = 5,
-                                     motion_strength: float = 0.5) -> Dict[str, Any]:
+                                     motion_strength: float = 0.5,
+                                     user_id: str = None,
+                                     job_id: str = None) -> Dict[str, Any]:
         """
         为单张图片生成动画（不进行分格裁剪）- 简化版，供外部直接调用
 
@@ -281,6 +432,8 @@ class VideoGenerationService:
             prompt: 动画生成提示词
             duration: 视频时长（秒）
             motion_strength: 运动强度 0-1
+            user_id: 用户 ID（可选，用于去重命中统计）
+            job_id: 任务 ID（可选，由调用方创建并负责发布终态事件）
 
         Returns:
             Dict: 生成的视频信息
@@ -303,7 +456,9 @@ class VideoGenerationService:
 
         return self.call_video_api(
             payload=payload,
-            api_endpoint='/services/aigc/video-generation/video-synthesis'
+            api_endpoint='/services/aigc/video-generation/video-synthesis',
+            user_id=user_id,
+            job_id=job_id
         )
 
     def generate_start_end_frame_anime(self,
@@ -311,7 +466,8 @@ class VideoGenerationService:
                                         end_image_url: str,
                                         prompt: str,
                                         duration: int = 5,
-                                        motion_strength: float = 0.5) -> Dict[str, Any]:
+                                        motion_strength: float = 0.5,
+                                        user_id: str = None) -> Dict[str, Any]:
         """
         为两张图片生成动画（首帧 + 尾帧）- 简化版，供外部直接调用
 
@@ -321,6 +477,7 @@ class VideoGenerationService:
             prompt: 动画生成提示词
             duration: 视频时长（秒）
             motion_strength: 运动强度 0-1
+            user_id: 用户 ID（可选，用于去重命中统计）
 
         Returns:
             Dict: 生成的视频信息
@@ -344,7 +501,8 @@ class VideoGenerationService:
 
         return self.call_video_api(
             payload=payload,
-            api_endpoint='/services/aigc/image2video/video-synthesis'
+            api_endpoint='/services/aigc/image2video/video-synthesis',
+            user_id=user_id
         )
 
     def generate_panel_animation(self,
@@ -411,7 +569,7 @@ class VideoGenerationService:
 
     def generate_multi_panel_anime(self,
                                     image_url: str,
-                                    panels: List[Dict],
+                                    panels: Optional[List[Dict]],
                                     prompts: List[str],
                                     transition_style: str = "smooth") -> Dict[str, Any]:
         """
@@ -419,13 +577,22 @@ class VideoGenerationService:
 
         Args:
             image_url: 原始图片 URL
-            panels: 分格列表
+            panels: 分格列表（为 None 时自动检测分格，命中缓存则不调用视觉模型）
             prompts: 每个分格对应的动画提示词
             transition_style: 转场风格 ("smooth", "fade", "slide", "zoom")
 
         Returns:
             Dict: 生成的视频信息
         """
+        if panels is None:
+            detect_result = self.detect_comic_panels(image_url)
+            if not detect_result.get("success"):
+                return {
+                    "success": False,
+                    "error": f"Panel detection failed: {detect_result.get('error')}"
+                }
+            panels = detect_result.get("panels", [])
+
         # 1. 为每个分格生成动画
         panel_videos = []
         for i, (panel, prompt) in enumerate(zip(panels, prompts)):
@@ -578,7 +745,7 @@ class VideoGenerationService:
         """调用视觉模型"""
         headers = self._build_dashscope_headers(async_mode=False)
 
-        # 将图片 URL 转换为 base64 编码（避免 URL 签名问题）
+        # 将图片 URL 转换为 base64 编码（避免 URL 签名问题），超过模型有效分辨率时先缩放
         image_data = self._image_url_to_base64(image_url)
 
         messages = [{"role": "system", "content": system_prompt}]
@@ -587,11 +754,18 @@ class VideoGenerationService:
 
         # 使用 base64 编码的图片数据
         if image_data:
+            text = "请分析这张图片"
+            resized = (image_data["width"], image_data["height"]) != (image_data["original_width"],
+                                                                      image_data["original_height"])
+            if resized and not expect_json:
+                # JSON 结果中的分格坐标在返回后映射回原图（_scale_panel_bboxes），文本结果由模型按原图尺寸给出
+                text += "\n" + self.ORIGINAL_SIZE_NOTE.format(**image_data)
             messages.append({
                 "role": "user",
                 "content": [
-                    {"type": "text", "text": "请分析这张图片"},
-                    {"type": "image_url", "image_url": f"data:image/jpeg;base64,{image_data}"}
+                    {"type": "text", "text": text},
+                    {"type": "image_url",
+                     "image_url": f"data:{image_data['mime_type']};base64,{image_data['data']}"}
                 ]
             })
         else:
@@ -613,12 +787,14 @@ class VideoGenerationService:
         # 使用 DashScope 兼容模式 API
         api_base = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
-        response = requests.post(
-            f"{api_base}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
+        with metrics.dashscope_call(model, 'vision') as call:
+            response = requests.post(
+                f"{api_base}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=60
+            )
+            call.status_code = response.status_code
 
         if response.status_code != 200:
             raise Exception(f"Vision API error: {response.status_code} - {response.text}")
@@ -627,130 +803,144 @@ class VideoGenerationService:
         content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
         if expect_json:
-            return json.loads(content)
+            parsed = json.loads(content)
+            if image_data:
+                # 模型返回的坐标基于缩放后的图片，映射回原图尺寸
+                self._scale_panel_bboxes(parsed, image_data)
+            return parsed
         return content
 
-    def _image_url_to_base64(self, image_url: str) -> Optional[str]:
+    @staticmethod
+    def _scale_panel_bboxes(result: Any, image_data: Dict) -> None:
         """
-        将图片 URL 转换为 base64 编码
+        将 JSON 结果中 panels[].bbox 的坐标从缩放后的图片映射回原图尺寸
 
         Args:
-            image_url: 图片 URL
-
-        Returns:
-            base64 编码字符串，失败返回 None
+            result: 视觉模型返回的 JSON 结果（原地修改）
+            image_data: 送入模型的图片信息（包含 width、height、original_width、original_height）
         """
-        try:
-            # 下载图片
-            response = requests.get(image_url, timeout=10)
-            if response.status_code == 200:
-                return base64.b64encode(response.content).decode('utf-8')
-        except Exception as e:
-            current_app.logger.warning(f"Failed to download image for base64 conversion: {e}")
-        return None
+        if not isinstance(result, dict) or not isinstance(result.get("panels"), list):
+            return
+        width, height = image_data["width"], image_data["height"]
+        original_width, original_height = image_data["original_width"], image_data["original_height"]
+        if (width, height) == (original_width, original_height):
+            return
 
-    def _call_video_generation_api_for_merge(self, payload: Dict) -> Dict:
+        scale_x = original_width / float(width)
+        scale_y = original_height / float(height)
+        for panel in result["panels"]:
+            bbox = panel.get("bbox") if isinstance(panel, dict) else None
+            if not isinstance(bbox, list) or len(bbox) != 4:
+                continue
+            try:
+                x1, y1, x2, y2 = [float(v) for v in bbox]
+            except (TypeError, ValueError):
+                continue
+            panel["bbox"] = [
+                min(original_width, max(0, round(x1 * scale_x))),
+                min(original_height, max(0, round(y1 * scale_y))),
+                min(original_width, max(0, round(x2 * scale_x))),
+                min(original_height, max(0, round(y2 * scale_y))),
+            ]
+
+    @staticmethod
+    def _prompt_version(system_prompt: str) -> str:
+        """根据提示词模板内容计算提示词版本"""
+        return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+
+    def _call_vision_model_cached(self,
+                                  task: str,
+                                  model: str,
+                                  system_prompt: str,
+                                  image_url: str,
+                                  expect_json: bool = False) -> Tuple[Any, bool]:
         """
-        调用视频合并 API
+        调用视觉模型（按图片内容哈希 + 模型 + 提示词版本缓存结果）
+
+        缓存不可用（MongoDB 未配置、图片下载失败等）时直接调用视觉模型
 
         Args:
-            payload: 视频合并请求参数
+            task: 任务名称（analyze / panel_detect）
+            model: 视觉模型
+            system_prompt: 系统提示词
+            image_url: 图片 URL
+            expect_json: 是否要求返回 JSON
 
         Returns:
-            Dict: 包含 success, video_url 等信息的字典
+            Tuple: (分析结果, 是否命中缓存)
         """
-        # 构建请求头
-        headers = self._build_dashscope_headers(async_mode=True)
-
-        api_base = "https://dashscope.aliyuncs.com/api/v1"
+        # 文本结果的提示包含原图尺寸说明，说明变更时旧的文本缓存同样失效
+        prompt_version = self._prompt_version(system_prompt if expect_json else system_prompt + self.ORIGINAL_SIZE_NOTE)
+        content_hash = None
+        cache_key = None
 
         try:
-            # 提交视频合并任务
-            # 注意：这是模拟实现，实际需要 API 支持
-            submit_response = requests.post(
-                f"{api_base}/services/aigc/video-generation/video-concatenate",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-
-            if submit_response.status_code not in [200, 201]:
-                # API 不支持合并时，返回降级结果
-                logger.warning(f"Video concatenate API not available ({submit_response.status_code})")
-                return {
-                    'success': False,
-                    'error': f'Video concatenate API not available: {submit_response.status_code}'
-                }
+            content_hash = image_processing_service.content_hash(image_url)
+            if content_hash:
+                self._purge_stale_vision_cache(task, prompt_version)
+                cache_key = vision_cache_service.build_cache_key(content_hash, model, task, prompt_version)
+                cached = vision_cache_service.fetch_result(cache_key)
+                if cached is not None:
+                    logger.info(f"Vision cache hit: task={task}, model={model}")
+                    metrics.record_cache('vision', 'hit')
+                    return cached, True
+                metrics.record_cache('vision', 'miss')
+        except Exception as e:
+            logger.warning(f"Vision cache lookup failed: {e}")
+            cache_key = None
+
+        result = self._call_vision_model(
+            model=model,
+            system_prompt=system_prompt,
+            image_url=image_url,
+            expect_json=expect_json
+        )
 
-            task_result = submit_response.json()
-            task_id = task_result.get('output', {}).get('task_id')
+        if cache_key:
+            try:
+                vision_cache_service.save_result(
+                    cache_key=cache_key,
+                    content_hash=content_hash,
+                    model=model,
+                    task=task,
+                    prompt_version=prompt_version,
+                    result=result,
+                    image_url=image_url
+                )
+            except Exception as e:
+                logger.warning(f"Vision cache save failed: {e}")
 
-            # 轮询任务状态
-            return self._poll_task_status(task_id, api_base, headers)
+        return result, False
 
-        except requests.RequestException as e:
-            logger.error(f"Request error during video merge: {e}")
-            return {
-                'success': False,
-                'error': f'Request error: {str(e)}'
-            }
+    def _purge_stale_vision_cache(self, task: str, prompt_version: str):
+        """清理提示词模板变更前的旧缓存（每个进程每个版本只执行一次）"""
+        if (task, prompt_version) in self._purged_prompt_versions:
+            return
+        deleted = vision_cache_service.delete_stale_results(task, prompt_version)
+        self._purged_prompt_versions.add((task, prompt_version))
+        if deleted:
+            logger.info(f"Purged {deleted} stale vision cache entries for task {task}")
 
-    def _poll_task_status(self, task_id: str, api_base: str, headers: Dict) -> Dict:
+    def _image_url_to_base64(self, image_url: str) -> Optional[Dict]:
         """
-        轮询任务状态直到完成
+        将图片 URL 转换为 base64 编码（按视觉模型有效分辨率缩放，保留真实 MIME 类型）
 
         Args:
-            task_id: 任务 ID
-            api_base: API 基础 URL
-            headers: 请求头
+            image_url: 图片 URL
 
         Returns:
-            Dict: 包含任务结果的字典
+            Dict: 包含 data（base64）、mime_type、width、height、original_width、original_height，失败返回 None
         """
-        max_wait_time = 180  # 最多等待 180 秒
-        start_time = time.time()
-        poll_interval = 5  # 每 5 秒轮询一次
-
-        # 构建轮询请求头
-        poll_headers = self._build_dashscope_headers(async_mode=False)
-
-        while time.time() - start_time < max_wait_time:
-            time.sleep(poll_interval)
-
-            status_url = f"{api_base}/tasks/{task_id}"
-
-            status_response = requests.get(
-                status_url,
-                headers=poll_headers,
-                timeout=30
-            )
-
-            if status_response.status_code == 200:
-                status_result = status_response.json()
-                output = status_result.get("output", {})
-                status = output.get("task_status")
-
-                if status in ["succeeded", "COMPLETED", "SUCCEEDED"]:
-                    video_url = output.get("video_url") or output.get("output_video_url")
-                    return {
-                        'success': True,
-                        'video_url': video_url,
-                        'task_id': task_id
-                    }
-                elif status in ["failed", "FAILED", "timeout"]:
-                    return {
-                        'success': False,
-                        'error': f"Task failed with status: {status}",
-                        'task_id': task_id
-                    }
-
-        return {
-            'success': False,
-            'error': 'Task timeout after 180 seconds',
-            'task_id': task_id
-        }
+        try:
+            # 经由本地磁盘缓存获取图片，同一张图片只下载一次；缩放与编码在进程池中完成
+            return image_processing_service.prepare_vision_image(image_url)
+        except Exception as e:
+            current_app.logger.warning(f"Failed to download image for base64 conversion: {e}")
+        return None
 
-    def _poll_task_status(self, task_id: str, api_base: str, model: str = None) -> Dict:
+    def _poll_task_status(self, task_id: str, api_base: str, model: str = None,
+                          job_id: str = None, max_wait_time: int = 180,
+                          resume_on_timeout: bool = True, persist: bool = True) -> Dict:
         """
         轮询任务状态直到完成
 
@@ -758,13 +948,18 @@ class VideoGenerationService:
             task_id: 任务 ID
             api_base: API 基础 URL
             model: 使用的模型
+            job_id: 持久化任务 ID（可选，提供时同步更新 video_tasks 状态）
+            max_wait_time: 最长等待时间（秒）
+            resume_on_timeout: 超时后是否转入后台继续轮询（任务仍在 DashScope 运行）
+            persist: 是否同步更新 video_tasks（任务存储不可用时为 False，仍发布状态事件）
 
         Returns:
             Dict: 包含任务结果的字典
         """
-        max_wait_time = 180  # 最多等待 180 秒
         start_time = time.time()
         poll_interval = 5  # 每 5 秒轮询一次
+        store_id = job_id if persist else None
+        last_status = None
 
         # 构建轮询请求头
         poll_headers = self._build_dashscope_headers(async_mode=False)
@@ -774,11 +969,13 @@ class VideoGenerationService:
 
             status_url = f"{api_base}/tasks/{task_id}"
 
-            status_response = requests.get(
-                status_url,
-                headers=poll_headers,
-                timeout=30
-            )
+            with metrics.dashscope_call(model, 'task_status') as call:
+                status_response = requests.get(
+                    status_url,
+                    headers=poll_headers,
+                    timeout=30
+                )
+                call.status_code = status_response.status_code
 
             if status_response.status_code == 200:
                 status_result = status_response.json()
@@ -787,36 +984,66 @@ class VideoGenerationService:
 
                 if status in ["succeeded", "COMPLETED", "SUCCEEDED"]:
                     video_url = output.get("video_url") or output.get("output_video_url")
-                    return {
+                    result = {
                         'success': True,
                         'video_url': video_url,
                         'task_id': task_id,
-                        'model_used': model
+                        'model_used': model,
+                        'job_id': job_id
                     }
-                elif status in ["failed", "FAILED"]:
+                    self._task_store('mark_succeeded', store_id, video_url, result)
+                    return result
+                elif status in ["failed", "FAILED", "CANCELED", "UNKNOWN"]:
                     error_msg = (output.get("task_error", {}).get("message") or
                                  output.get("message") or
                                  status_result.get("message", "Video generation failed"))
                     logger.error(f"Task failed: {error_msg}")
+                    self._task_store('mark_failed', store_id, error_msg)
                     return {
                         'success': False,
                         'error': error_msg,
-                        'task_id': task_id
+                        'task_id': task_id,
+                        'job_id': job_id
                     }
+
+                task_status = STATUS_RUNNING if status == "RUNNING" else STATUS_SUBMITTED
+                self._task_store('record_poll', store_id, task_status, self._task_lease_seconds)
+                if task_status != last_status:
+                    job_event_service.publish(job_id, task_status, task_id=task_id)
+                    last_status = task_status
             elif status_response.status_code == 404:
                 logger.error(f"Task {task_id} not found. API endpoint may be incorrect.")
+                self._task_store('mark_failed', store_id, f"Task not found at {status_url}")
                 return {
                     "success": False,
-                    "error": f"Task not found at {status_url}"
+                    "error": f"Task not found at {status_url}",
+                    "job_id": job_id
                 }
             else:
                 logger.warning(f"Status check failed with status: {status_response.status_code}, body: {status_response.text}")
 
         logger.error(f"Task {task_id} timed out after {max_wait_time} seconds")
+        if store_id and resume_on_timeout:
+            # 任务仍在 DashScope 运行，转入后台继续轮询，结果写入 video_tasks
+            job = job_event_service.get_job(job_id) or {}
+            self._get_recovery_executor().submit(self._resume_video_task, {
+                'job_id': job_id, 'task_id': task_id, 'api_base': api_base, 'model': model,
+                'user_id': job.get('user_id'), 'webhook_url': job.get('webhook_url')
+            })
+            return {
+                "success": False,
+                "error": "Video generation timeout",
+                "task_id": task_id,
+                "job_id": job_id,
+                "status": STATUS_RUNNING
+            }
+
+        self._task_store('mark_failed', store_id, "Video generation timeout")
         return {
             "success": False,
             "error": "Video generation timeout",
-            "task_id": task_id
+            "task_id": task_id,
+            "job_id": job_id
         }
 
     def _crop_image_region(self, image_url: str, bbox: List[int]) -> str:
@@ -833,20 +1060,44 @@ class VideoGenerationService:
             crop_param = f"x-oss-process=image/crop,x_{x1},y_{y1},w_{width},h_{height}"
             return f"{image_url}{separator}{crop_param}"
 
-        # 否则返回原 URL（实际部署时需要实现真正的裁剪逻辑）
+        # 否则本地裁剪并上传到 OSS（确定性对象键，重复分格直接复用）
+        crop_result = image_processing_service.crop_panel(image_url, bbox)
+        if crop_result.get("success"):
+            return crop_result["url"]
+
+        logger.warning(f"Local panel crop unavailable, using original image: {crop_result.get('error')}")
         return image_url
 
     def _stitch_videos(self, videos: List[Dict], transition_style: str) -> Dict:
-        """拼接多个视频片段"""
-        # 这里需要调用视频拼接服务
-        # 目前返回一个占位结果
+        """
+        拼接多个视频片段（本地 ffmpeg 拼接并上传 OSS）
+
+        Args:
+            videos: 视频片段列表（包含 video_url）
+            transition_style: 转场风格 ("smooth", "fade", "slide", "zoom", "none")
+
+        Returns:
+            Dict: 包含 video_url, object_key, duration 的字典
+        """
+        first = videos[0]
+        if len(videos) == 1:
+            return {"video_url": first.get("video_url"), "duration": first.get("duration")}
+
+        result = video_stitching_service.stitch(
+            [video.get("video_url") for video in videos],
+            transition=transition_style
+        )
+        if not result.get("success"):
+            raise RuntimeError(f"Video stitching failed: {result.get('error')}")
+
         return {
-            "video_url": videos[0].get("video_url"),  # 暂时返回第一个视频
-            "duration": len(videos) * 3  # 假设每个视频 3 秒
+            "video_url": result.get("video_url"),
+            "object_key": result.get("object_key"),
+            "duration": result.get("duration")
         }
 
     def merge_videos(self, video_urls: List[str], transition_type: str = 'fade',
-                     transition_duration: float = 0.5) -> Dict:
+                     transition_duration: float = 0.5, progress_callback=None) -> Dict:
         """
         合并多个视频成一个视频
 
@@ -854,6 +1105,7 @@ class VideoGenerationService:
             video_urls: 视频 URL 列表
             transition_type: 转场类型 (fade, slide, zoom, none)
             transition_duration: 转场时长（秒）
+            progress_callback: 拼接结果上传进度回调 (已上传字节数, 总字节数)
 
         Returns:
             Dict: 包含合并后视频信息的字典
@@ -872,47 +1124,28 @@ class VideoGenerationService:
                 'message': 'Single video, no merge needed'
             }
 
-        try:
-            # 构建视频合并请求
-            # 使用万象或即梦的视频拼接 API
-            payload = {
-                "model": "wan2.6-i2v",  # 或其他支持视频拼接的模型
-                "input": {
-                    "video_urls": video_urls
-                },
-                "parameters": {
-                    "transition_type": transition_type,
-                    "transition_duration": transition_duration,
-                    "output_format": "mp4"
-                }
-            }
-
-            # 调用视频生成 API 进行合并
-            # 注意：这里需要实际的 API 支持，目前是模拟实现
-            result = self._call_video_generation_api_for_merge(payload)
-
-            if result.get("success"):
-                return {
-                    'success': True,
-                    'video_url': result.get('video_url'),
-                    'model_used': result.get('model_used', 'wan2.6-i2v')
-                }
-            else:
-                # 如果 API 不支持合并，返回简化的结果
-                logger.info(f"Video merge API not available, using fallback")
-                return {
-                    'success': True,
-                    'video_url': video_urls[0],  # 返回第一个视频作为占位
-                    'message': 'Video merge using fallback (first video)'
-                }
+        result = video_stitching_service.stitch(
+            video_urls,
+            transition=transition_type,
+            transition_duration=transition_duration,
+            progress_callback=progress_callback
+        )
 
-        except Exception as e:
-            logger.error(f"Error merging videos: {e}")
+        if not result.get('success'):
+            logger.error(f"Error merging videos: {result.get('error')}")
             return {
                 'success': False,
-                'error': str(e)
+                'error': result.get('error')
             }
 
+        return {
+            'success': True,
+            'video_url': result.get('video_url'),
+            'object_key': result.get('object_key'),
+            'duration': result.get('duration'),
+            'stream_copy': result.get('stream_copy')
+        }
+
 
 # 全局实例
 video_generation_service = VideoGenerationService()
@@ -0,0 +1,339 @@
+"""
+视频拼接服务类
+负责将多个视频片段在本地用 ffmpeg 拼接为一个视频，并分片上传到 OSS
+
+- 输入：OSS / 视频生成服务返回的 URL 由 ffmpeg 直接流式读取，本地临时文件直接读取
+- 转场：支持 fade / slide / zoom / none，转场使用 xfade + acrossfade 滤镜重新编码
+- 直接拼接：无转场且所有片段编码参数一致时使用 concat 分离器 + stream copy，不重新编码
+- 并发：ffmpeg 子进程在固定大小的线程池中执行，限制同时运行的编码进程数量
+"""
+import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from services.base_service import BaseService
+
+logger = logging.getLogger(__name__)
+
+# 转场类型对应的 xfade 转场名称（smooth 为视频生成接口使用的默认风格，按 fade 处理）
+TRANSITIONS = {
+    'fade': 'fade',
+    'smooth': 'fade',
+    'slide': 'slideleft',
+    'zoom': 'zoomin',
+    'none': None,
+}
+
+# ffmpeg 读取网络输入允许的协议
+NETWORK_PROTOCOLS = 'file,http,https,tcp,tls,crypto'
+
+
+def _is_network_input(source: str) -> bool:
+    return source.startswith('http://') or source.startswith('https://')
+
+
+def parse_probe_result(probe: Dict) -> Dict:
+    """
+    解析 ffprobe 输出，提取拼接所需的片段参数
+
+    Args:
+        probe: ffprobe -print_format json -show_streams -show_format 的输出
+
+    Returns:
+        Dict: 包含 duration、video（编码参数）、audio（编码参数，无音轨为 None）的字典
+    """
+    video = None
+    audio = None
+    for stream in probe.get('streams', []):
+        if stream.get('codec_type') == 'video' and video is None:
+            video = {
+                'codec': stream.get('codec_name'),
+                'width': int(stream.get('width') or 0),
+                'height': int(stream.get('height') or 0),
+                'pix_fmt': stream.get('pix_fmt'),
+                'fps': stream.get('r_frame_rate') or '24/1',
+            }
+        elif stream.get('codec_type') == 'audio' and audio is None:
+            audio = {
+                'codec': stream.get('codec_name'),
+                'sample_rate': stream.get('sample_rate'),
+                'channels': stream.get('channels'),
+            }
+
+    try:
+        duration = float(probe.get('format', {}).get('duration') or 0)
+    except (TypeError, ValueError):
+        duration = 0.0
+
+    return {'duration': duration, 'video': video, 'audio': audio}
+
+
+def can_stream_copy(clips: List[Dict]) -> bool:
+    """所有片段的视频、音频编码参数一致时可直接拼接（不重新编码）"""
+    first = clips[0]
+    return all(clip['video'] == first['video'] and clip['audio'] == first['audio'] for clip in clips[1:])
+
+
+def build_concat_copy_command(ffmpeg: str, list_path: str, output_path: str) -> List[str]:
+    """构建 concat 分离器 + stream copy 的 ffmpeg 命令"""
+    return [
+        ffmpeg, '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-protocol_whitelist', NETWORK_PROTOCOLS,
+        '-i', list_path,
+        '-c', 'copy', '-movflags', '+faststart',
+        output_path,
+    ]
+
+
+def build_transition_command(ffmpeg: str, sources: List[str], clips: List[Dict],
+                             transition: str, transition_duration: float,
+                             output_path: str) -> List[str]:
+    """
+    构建带转场（或需要统一编码参数）的 ffmpeg 命令
+
+    所有片段先缩放、补边到第一个片段的分辨率和帧率，再按转场类型用 xfade/acrossfade
+    串联；转场为 none 时使用 concat 滤镜。只有所有片段都带音轨时才保留音频。
+
+    Args:
+        ffmpeg: ffmpeg 可执行文件路径
+        sources: 输入 URL 或本地路径列表
+        clips: parse_probe_result 解析出的片段参数列表
+        transition: 转场类型（fade / slide / zoom / none）
+        transition_duration: 转场时长（秒）
+        output_path: 输出文件路径
+
+    Returns:
+        List[str]: ffmpeg 命令参数列表
+    """
+    base = clips[0]['video']
+    width, height = base['width'] - base['width'] % 2, base['height'] - base['height'] % 2
+    fps = base['fps']
+    with_audio = all(clip['audio'] for clip in clips)
+    xfade_name = TRANSITIONS.get(transition)
+
+    command = [ffmpeg, '-y', '-hide_banner', '-loglevel', 'error']
+    for source in sources:
+        if _is_network_input(source):
+            command += ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+        command += ['-i', source]
+
+    filters = []
+    for i in range(len(sources)):
+        filters.append(
+            f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},"
+            f"format=yuv420p,settb=AVTB[v{i}]"
+        )
+        if with_audio:
+            filters.append(f"[{i}:a]aresample=48000,aformat=channel_layouts=stereo[a{i}]")
+
+    if xfade_name:
+        video_label, audio_label = 'v0', 'a0'
+        offset = 0.0
+        for i in range(1, len(sources)):
+            offset += clips[i - 1]['duration'] - transition_duration
+            filters.append(
+                f"[{video_label}][v{i}]xfade=transition={xfade_name}:"
+                f"duration={transition_duration:.3f}:offset={offset:.3f}[vx{i}]"
+            )
+            video_label = f'vx{i}'
+            if with_audio:
+                filters.append(f"[{audio_label}][a{i}]acrossfade=d={transition_duration:.3f}[ax{i}]")
+                audio_label = f'ax{i}'
+    else:
+        streams = ''.join(f"[v{i}][a{i}]" if with_audio else f"[v{i}]" for i in range(len(sources)))
+        outputs = '[vc][ac]' if with_audio else '[vc]'
+        filters.append(f"{streams}concat=n={len(sources)}:v=1:a={1 if with_audio else 0}{outputs}")
+        video_label, audio_label = 'vc', 'ac'
+
+    command += ['-filter_complex', ';'.join(filters), '-map', f'[{video_label}]']
+    if with_audio:
+        command += ['-map', f'[{audio_label}]', '-c:a', 'aac', '-b:a', '128k']
+    else:
+        command += ['-an']
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '20', '-pix_fmt', 'yuv420p',
+        '-movflags', '+faststart', output_path,
+    ]
+    return command
+
+
+class VideoStitchingService(BaseService):
+    """视频拼接服务类（单例模式）"""
+
+    _instance = None
+    _lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def init_app(self, app):
+        with app.app_context():
+            self._initialize()
+
+    def _initialize(self):
+        if self._initialized:
+            return
+
+        self._ffmpeg = self._get_config('FFMPEG_PATH', 'ffmpeg') or 'ffmpeg'
+        self._ffprobe = self._get_config('FFPROBE_PATH', 'ffprobe') or 'ffprobe'
+        self._max_workers = int(self._get_config('VIDEO_STITCH_WORKERS', 2))
+        self._timeout = int(self._get_config('VIDEO_STITCH_TIMEOUT', 300))
+        self._tmp_dir = self._get_config('VIDEO_STITCH_TMP_DIR') or tempfile.gettempdir()
+
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._initialized = True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """懒加载拼接任务线程池（每个任务占用一个 ffmpeg 子进程）"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                        thread_name_prefix='video-stitch')
+        return self._executor
+
+    def is_available(self) -> bool:
+        """ffmpeg 与 ffprobe 是否可用"""
+        self._ensure_initialized()
+        return bool(shutil.which(self._ffmpeg) and shutil.which(self._ffprobe))
+
+    def _run(self, command: List[str]) -> str:
+        """执行子进程命令，失败时抛出 RuntimeError"""
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=self._timeout)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(command[0])} failed: {completed.stderr.strip()[-500:]}")
+        return completed.stdout
+
+    def probe(self, source: str) -> Dict:
+        """
+        读取视频片段的时长与编码参数（ffprobe 只读取容器头部）
+
+        Args:
+            source: 视频 URL 或本地路径
+
+        Returns:
+            Dict: parse_probe_result 解析结果
+        """
+        command = [self._ffprobe, '-v', 'error', '-print_format', 'json',
+                   '-show_streams', '-show_format']
+        if _is_network_input(source):
+            command += ['-protocol_whitelist', NETWORK_PROTOCOLS]
+        clip = parse_probe_result(json.loads(self._run(command + [source])))
+        if clip['video'] is None or clip['duration'] <= 0:
+            raise ValueError(f"Not a valid video input: {source.split('?')[0]}")
+        return clip
+
+    def stitch(self, sources: List[str], transition: str = 'fade',
+               transition_duration: float = 0.5, object_key: str = None,
+               progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict:
+        """
+        拼接多个视频片段并上传到 OSS
+
+        Args:
+            sources: 视频 URL 或本地路径列表（按播放顺序）
+            transition: 转场类型（fade / slide / zoom / none）
+            transition_duration: 转场时长（秒）
+            object_key: 输出视频的 OSS 对象键，默认自动生成
+            progress_callback: 结果上传进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            Dict: 包含 success, video_url, object_key, duration, stream_copy 的字典
+        """
+        self._ensure_initialized()
+
+        if not sources:
+            return {'success': False, 'error': 'No video sources provided'}
+        if transition not in TRANSITIONS:
+            return {'success': False, 'error': f'Unsupported transition: {transition}'}
+        if not self.is_available():
+            return {'success': False, 'error': 'ffmpeg is not available'}
+
+        future = self._get_executor().submit(self._stitch_job, list(sources), transition,
+                                             float(transition_duration or 0), object_key, progress_callback)
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Error stitching {len(sources)} videos: {e}")
+            return {'success': False, 'error': str(e)}
+
+    def _stitch_job(self, sources: List[str], transition: str,
+                    transition_duration: float, object_key: Optional[str],
+                    progress_callback: Callable[[int, Optional[int]], None] = None) -> Dict:
+        """在拼接线程池中执行：探测片段、运行 ffmpeg、分片上传结果"""
+        from db import oss_service
+
+        clips = [self.probe(source) for source in sources]
+
+        work_dir = tempfile.mkdtemp(prefix='stitch_', dir=self._tmp_dir)
+        try:
+            output_path = os.path.join(work_dir, 'output.mp4')
+            stream_copy = TRANSITIONS[transition] is None and can_stream_copy(clips)
+
+            if stream_copy:
+                list_path = os.path.join(work_dir, 'inputs.txt')
+                with open(list_path, 'w', encoding='utf-8') as f:
+                    for source in sources:
+                        escaped = source.replace("'", "'\\''")
+                        f.write(f"file '{escaped}'\n")
+                command = build_concat_copy_command(self._ffmpeg, list_path, output_path)
+                duration = sum(clip['duration'] for clip in clips)
+            else:
+                if TRANSITIONS[transition]:
+                    # 转场时长不能超过最短片段的一半
+                    shortest = min(clip['duration'] for clip in clips)
+                    transition_duration = max(0.1, min(transition_duration, shortest / 2))
+                    duration = sum(clip['duration'] for clip in clips) - transition_duration * (len(clips) - 1)
+                else:
+                    duration = sum(clip['duration'] for clip in clips)
+                command = build_transition_command(self._ffmpeg, sources, clips, transition,
+                                                   transition_duration, output_path)
+
+            self._run(command)
+
+            object_key = object_key or self.generate_object_key()
+            upload_result = oss_service.upload_video_multipart(output_path, object_key,
+                                                               progress_callback=progress_callback)
+            if not upload_result.get('success'):
+                return {'success': False, 'error': f"Failed to upload stitched video: {upload_result.get('error')}"}
+
+            return {
+                'success': True,
+                'video_url': upload_result.get('url'),
+                'object_key': object_key,
+                'duration': round(duration, 3),
+                'transition': transition,
+                'stream_copy': stream_copy
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def generate_object_key() -> str:
+        """生成拼接结果的 OSS 对象键"""
+        now = datetime.now()
+        return f"video/stitched/{now.year}/{now.month:02d}/{str(uuid4())[:8]}.mp4"
+
+    def shutdown(self):
+        """关闭拼接线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局实例
+video_stitching_service = VideoStitchingService()
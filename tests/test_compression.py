@@ -0,0 +1,109 @@
+"""
+测试响应压缩中间件。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gzip
+import json
+import zlib
+import pytest
+from flask import Flask, Response
+from utils.compression import CompressionMiddleware, _parse_levels
+from utils.decorators import no_compression
+from utils.response_helper import api_response
+
+ROWS = [{'novel_id': f'n{i}', 'content': '第一章 内容' * 20} for i in range(50)]
+
+
+@pytest.fixture
+def middleware():
+    return CompressionMiddleware()
+
+
+@pytest.fixture
+def app(middleware):
+    app = Flask(__name__)
+    app.config['COMPRESSION_MIN_SIZE'] = 512
+    middleware.init_app(app)
+
+    @app.route('/novels')
+    def novels():
+        return api_response(success=True, data=ROWS, count=len(ROWS))
+
+    @app.route('/small')
+    def small():
+        return api_response(success=True, data={'ok': True})
+
+    @app.route('/video')
+    @no_compression
+    def video():
+        return Response(b'{"a": 1}' * 200, mimetype='application/json')
+
+    @app.route('/events')
+    def events():
+        def stream():
+            for i in range(3):
+                yield f"id: {i}\ndata: {json.dumps({'status': 'running', 'step': i})}\n\n"
+        return Response(stream(), mimetype='text/event-stream')
+
+    return app
+
+
+class TestCompression:
+    """测试压缩协商与阈值"""
+
+    def test_gzip_large_json(self, app, middleware):
+        """测试大 JSON 响应按 Accept-Encoding 压缩"""
+        with app.test_client() as client:
+            response = client.get('/novels', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        body = response.get_data()
+        assert int(response.headers['Content-Length']) == len(body)
+        assert json.loads(gzip.decompress(body))['count'] == 50
+
+        stats = middleware.get_stats()['encodings']['gzip']
+        assert stats['responses'] == 1
+        assert stats['bytes_out'] == len(body)
+        assert 0 < stats['ratio'] < 0.2
+        print("OK Gzip large JSON test passed")
+
+    def test_skips(self, app, middleware):
+        """测试小响应、未声明编码、q=0 和路由关闭时不压缩"""
+        with app.test_client() as client:
+            small = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+            plain = client.get('/novels')
+            refused = client.get('/novels', headers={'Accept-Encoding': 'gzip;q=0'})
+            opt_out = client.get('/video', headers={'Accept-Encoding': 'gzip'})
+
+        for response in (small, plain, refused, opt_out):
+            assert 'Content-Encoding' not in response.headers
+        assert json.loads(plain.get_data())['count'] == 50
+        assert middleware.get_stats()['skipped'] == {'too_small': 1, 'not_accepted': 2, 'opt_out': 1}
+        print("OK Skips test passed")
+
+    def test_sse_stream_flushes_each_event(self, app, middleware):
+        """测试 SSE 流式压缩，每个事件都可以立即解压"""
+        with app.test_client() as client:
+            response = client.get('/events', headers={'Accept-Encoding': 'gzip'})
+            chunks = list(response.response)
+            response.close()
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+
+        decompressor = zlib.decompressobj(31)
+        first_event = decompressor.decompress(chunks[0]).decode('utf-8')
+        assert first_event.startswith('id: 0\ndata: ') and first_event.endswith('\n\n')
+        text = first_event + ''.join(decompressor.decompress(c).decode('utf-8') for c in chunks[1:])
+        assert text.count('\n\n') == 3
+        assert middleware.get_stats()['encodings']['gzip']['streamed'] == 1
+        print("OK SSE stream flushes each event test passed")
+
+    def test_parse_levels(self):
+        """测试压缩级别配置解析"""
+        assert _parse_levels('zstd:3, gzip:9') == {'zstd': 3, 'gzip': 9}
+        print("OK Parse levels test passed")
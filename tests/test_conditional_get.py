@@ -0,0 +1,127 @@
+"""
+测试条件 GET 装饰器（ETag / If-None-Match）。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from flask import Flask, g
+from services.entity_cache_service import EntityCacheService, entity_version
+from utils.decorators import conditional_get
+from utils.response_helper import api_response, error_response
+
+UPDATED_AT = datetime(2026, 3, 31, 8, 30, 15)
+
+
+@pytest.fixture
+def cache():
+    service = EntityCacheService()
+    service._initialized = False
+    service._initialize()
+    return service
+
+
+@pytest.fixture
+def app(cache):
+    app = Flask(__name__)
+    app.calls = []
+
+    @app.route('/list')
+    @conditional_get('private, max-age=60')
+    def list_items():
+        app.calls.append('list')
+        g.last_modified = UPDATED_AT
+        return api_response(success=True, data=[{'id': 1}])
+
+    @app.route('/item')
+    @conditional_get('private, no-cache',
+                     version=lambda args: cache.get_version('work', args.get('work_id')))
+    def get_item():
+        app.calls.append('item')
+        work = cache.get_or_load('work', 'w1', lambda: {'work_id': 'w1', 'updated_at': UPDATED_AT})
+        return api_response(success=True, data=work)
+
+    @app.route('/missing')
+    @conditional_get()
+    def missing():
+        return error_response('Work not found', 404)
+
+    return app
+
+
+class TestConditionalGet:
+    """测试 ETag 与 304 响应"""
+
+    def test_body_etag(self, app):
+        """测试没有版本标识时按响应体计算弱 ETag"""
+        with app.test_client() as client:
+            first = client.get('/list')
+            second = client.get('/list', headers={'If-None-Match': first.headers['ETag']})
+
+        assert first.status_code == 200
+        assert first.headers['ETag'].startswith('W/"')
+        assert first.headers['Cache-Control'] == 'private, max-age=60'
+        assert first.headers['Last-Modified'] == 'Tue, 31 Mar 2026 08:30:15 GMT'
+        assert second.status_code == 304
+        assert second.get_data() == b''
+        assert second.headers['ETag'] == first.headers['ETag']
+        print("OK Body ETag test passed")
+
+    def test_cached_version_skips_view(self, app):
+        """测试缓存中有版本标识时直接返回 304，不执行视图函数"""
+        with app.test_client() as client:
+            first = client.get('/item?work_id=w1')
+            second = client.get('/item?work_id=w1', headers={'If-None-Match': first.headers['ETag']})
+            stale = client.get('/item?work_id=w1', headers={'If-None-Match': 'W/"outdated"'})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert stale.status_code == 200
+        assert app.calls == ['item', 'item']
+        print("OK Cached version skips view test passed")
+
+    def test_cached_version_requires_shared_tier(self, cache):
+        """测试未配置共享层时 cached_version 不使用进程内版本标识，配置后才直接返回缓存的版本"""
+        from utils import resource_helper
+
+        cache.get_or_load('work', 'w1', lambda: {'work_id': 'w1', 'updated_at': UPDATED_AT})
+        version = resource_helper.cached_version('work', 'work_id')
+        with patch.object(resource_helper, 'entity_cache_service', cache):
+            assert not cache.is_shared()
+            assert version({'work_id': 'w1'}) is None
+
+            with patch.object(cache, '_redis', object()), \
+                    patch.object(cache, '_shared_version', return_value=None):
+                assert version({'work_id': 'w1'}) == cache.get_version('work', 'w1')
+        print("OK Cached version requires shared tier test passed")
+
+    def test_error_response_untouched(self, app):
+        """测试错误响应不附加 ETag"""
+        with app.test_client() as client:
+            response = client.get('/missing')
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
+        print("OK Error response untouched test passed")
+
+
+class TestEntityVersion:
+    """测试实体版本标识"""
+
+    def test_version_follows_content(self, cache):
+        """测试版本标识随内容变化，未缓存时返回 None"""
+        assert cache.get_version('work', 'w1') is None
+
+        cache.get_or_load('work', 'w1', lambda: {'title': 'old', 'updated_at': UPDATED_AT})
+        old_version, last_modified = cache.get_version('work', 'w1')
+        cache.invalidate('work', 'w1')
+        cache.get_or_load('work', 'w1', lambda: {'title': 'new', 'updated_at': UPDATED_AT})
+        new_version, _ = cache.get_version('work', 'w1')
+
+        assert last_modified == UPDATED_AT
+        assert old_version != new_version
+        assert old_version.split('-')[0] == new_version.split('-')[0]
+        assert entity_version({'title': 'new', 'updated_at': UPDATED_AT})[0] == new_version
+        print("OK Version follows content test passed")
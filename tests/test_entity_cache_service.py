@@ -0,0 +1,277 @@
+"""
+测试实体读穿缓存服务类。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pickle
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from services import entity_cache_service as cache_module
+from services.entity_cache_service import EntityCacheService, invalidates_cache, _parse_ttls
+
+
+@pytest.fixture
+def service():
+    service = EntityCacheService()
+    service._initialized = False
+    service._initialize()
+    return service
+
+
+class TestReadThrough:
+    """测试读穿加载与命中"""
+
+    def test_second_read_hits_cache(self, service):
+        """测试第二次读取命中缓存，返回值互不影响"""
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {'work_id': 'w1', 'asset_ids': []}
+
+        first = service.get_or_load('work', 'w1', loader)
+        first['asset_ids'].append('mutated')
+        second = service.get_or_load('work', 'w1', loader)
+
+        assert len(calls) == 1
+        assert second == {'work_id': 'w1', 'asset_ids': []}
+        stats = service.get_stats()['work']
+        assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+        print("OK Second read hits cache test passed")
+
+    def test_missing_entity_not_cached(self, service):
+        """测试实体不存在时不缓存"""
+        calls = []
+        service.get_or_load('asset', 'a1', lambda: calls.append(1))
+        service.get_or_load('asset', 'a1', lambda: calls.append(1))
+        assert len(calls) == 2
+        print("OK Missing entity not cached test passed")
+
+    def test_per_entity_ttl(self, service):
+        """测试按实体类型的 TTL 过期"""
+        service._ttls = {'anime': 10}
+        calls = []
+        with patch('services.entity_cache_service.time.time', return_value=1000.0):
+            service.get_or_load('anime', 'n1', lambda: calls.append(1) or {'anime_id': 'n1'})
+        with patch('services.entity_cache_service.time.time', return_value=1009.0):
+            service.get_or_load('anime', 'n1', lambda: calls.append(1) or {'anime_id': 'n1'})
+        with patch('services.entity_cache_service.time.time', return_value=1011.0):
+            service.get_or_load('anime', 'n1', lambda: calls.append(1) or {'anime_id': 'n1'})
+        assert len(calls) == 2
+        print("OK Per entity TTL test passed")
+
+    def test_lru_limit(self, service):
+        """测试超过条目上限时淘汰最久未使用的条目"""
+        service._max_entries = 2
+        for entity_id in ('a', 'b'):
+            service.get_or_load('asset', entity_id, lambda: {'id': entity_id})
+        service.get_or_load('asset', 'a', lambda: None)
+        service.get_or_load('asset', 'c', lambda: {'id': 'c'})
+
+        assert [key for key in service._entries] == [('asset', 'a'), ('asset', 'c')]
+        print("OK LRU limit test passed")
+
+    def test_parse_ttls(self):
+        """测试 TTL 配置解析"""
+        assert _parse_ttls('asset:300, work:120') == {'asset': 300, 'work': 120}
+        print("OK Parse TTLs test passed")
+
+
+class TestSingleFlight:
+    """测试并发未命中合并"""
+
+    def test_concurrent_misses_load_once(self, service):
+        """测试并发未命中只加载一次"""
+        calls = []
+        started = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {'work_id': 'w1'}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.get_or_load('work', 'w1', loader)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait(1)
+        for t in threads[1:]:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == [{'work_id': 'w1'}] * 5
+        assert service.get_stats()['work']['coalesced'] == 4
+        print("OK Concurrent misses load once test passed")
+
+    def test_invalidation_during_load_not_cached(self, service):
+        """测试加载期间发生写入时，旧结果不写入缓存"""
+        def loader():
+            service.invalidate('asset', 'a1')
+            return {'version': 'stale'}
+
+        assert service.get_or_load('asset', 'a1', loader) == {'version': 'stale'}
+        assert service.get_or_load('asset', 'a1', lambda: {'version': 'fresh'}) == {'version': 'fresh'}
+        print("OK Invalidation during load not cached test passed")
+
+
+class TestInvalidation:
+    """测试写操作失效"""
+
+    def test_decorated_write_invalidates(self, service):
+        """测试写方法执行后删除对应实体缓存"""
+        class Store:
+            @invalidates_cache('work', 'work_id')
+            def update_work(self, work_id, data):
+                return True
+
+        service.get_or_load('work', 'w1', lambda: {'title': 'old'})
+        with patch.object(cache_module, 'entity_cache_service', service):
+            Store().update_work('w1', {'title': 'new'})
+
+        assert service.get_or_load('work', 'w1', lambda: {'title': 'new'}) == {'title': 'new'}
+        assert service.get_stats()['work']['invalidations'] == 1
+        print("OK Decorated write invalidates test passed")
+
+    def test_failed_write_still_invalidates(self, service):
+        """测试写操作失败时仍删除缓存"""
+        class Store:
+            @invalidates_cache('asset', 'asset_id')
+            def delete_asset_data(self, asset_id):
+                raise RuntimeError('mongo down')
+
+        service.get_or_load('asset', 'a1', lambda: {'asset_id': 'a1'})
+        with patch.object(cache_module, 'entity_cache_service', service):
+            with pytest.raises(RuntimeError):
+                Store().delete_asset_data(asset_id='a1')
+
+        assert ('asset', 'a1') not in service._entries
+        print("OK Failed write still invalidates test passed")
+
+
+class FakeRedis:
+    """内存中的 Redis（只实现共享层用到的命令）"""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError('redis down')
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def eval(self, script, numkeys, data_key, version_key, version, data, ttl):
+        self._check()
+        if int(self.data.get(version_key) or 0) == int(version):
+            self.data[data_key] = data
+            return 1
+        return 0
+
+    def pipeline(self, transaction=True):
+        redis, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name, args))
+
+            def execute(self):
+                redis._check()
+                for name, args in calls:
+                    getattr(redis, name)(*args)
+
+        return Pipeline()
+
+
+@pytest.fixture
+def workers():
+    """共享同一个 Redis 的两个 worker 进程内缓存"""
+    redis = FakeRedis()
+
+    def create():
+        worker = object.__new__(EntityCacheService)
+        with patch.object(EntityCacheService, '_connect_redis', return_value=redis):
+            worker._initialized = False
+            worker._initialize()
+        return worker
+
+    return create(), create(), redis
+
+
+class TestSharedTier:
+    """测试 Redis 共享层"""
+
+    def test_invalidation_visible_to_other_workers(self, workers):
+        """测试一个 worker 的写入失效后，其他 worker 的进程内条目和 ETag 版本不再使用"""
+        worker_a, worker_b, _ = workers
+        worker_a.get_or_load('asset', 'a1', lambda: {'name': 'old'})
+        assert worker_b.get_or_load('asset', 'a1', lambda: {'name': 'unused'}) == {'name': 'old'}
+        assert worker_b.get_stats()['asset']['shared_hits'] == 1
+        assert worker_b.get_version('asset', 'a1') is not None
+
+        worker_a.invalidate('asset', 'a1')
+
+        assert worker_b.get_version('asset', 'a1') is None
+        assert worker_b.get_or_load('asset', 'a1', lambda: {'name': 'new'}) == {'name': 'new'}
+        print("OK Invalidation visible to other workers test passed")
+
+    def test_stale_load_not_written_to_shared(self, workers):
+        """测试加载期间其他 worker 写入时，旧值不写回共享层"""
+        worker_a, worker_b, redis = workers
+
+        def loader():
+            worker_b.invalidate('work', 'w1')
+            return {'title': 'stale'}
+
+        assert worker_a.get_or_load('work', 'w1', loader) == {'title': 'stale'}
+        assert redis.data.get(worker_a._redis_key('work', 'w1')) is None
+        assert worker_b.get_or_load('work', 'w1', lambda: {'title': 'fresh'}) == {'title': 'fresh'}
+        assert worker_a.get_or_load('work', 'w1', lambda: {'title': 'unused'}) == {'title': 'fresh'}
+        print("OK Stale load not written to shared test passed")
+
+    def test_json_round_trip_without_pickle(self, workers):
+        """测试共享层以 JSON 保存并还原 datetime，非 JSON 数据不反序列化"""
+        worker_a, worker_b, redis = workers
+        value = {'asset_id': 'a1', 'updated_at': datetime(2026, 4, 18, 10, 0, 0, 123456)}
+        worker_a.get_or_load('asset', 'a1', lambda: value)
+
+        raw = redis.data[worker_a._redis_key('asset', 'a1')]
+        assert json.loads(raw)['value']['updated_at'] == {'__datetime__': '2026-04-18T10:00:00.123456'}
+        assert worker_b.get_or_load('asset', 'a1', lambda: None) == value
+        assert worker_b.get_version('asset', 'a1') == worker_a.get_version('asset', 'a1')
+
+        redis.data[worker_a._redis_key('asset', 'a2')] = pickle.dumps({'asset_id': 'evil'})
+        assert worker_b.get_or_load('asset', 'a2', lambda: {'asset_id': 'a2'}) == {'asset_id': 'a2'}
+        print("OK JSON round trip without pickle test passed")
+
+    def test_redis_down_uses_local_cache(self, workers):
+        """测试共享层不可用时按本地 TTL 使用进程内缓存"""
+        worker_a, _, redis = workers
+        worker_a.get_or_load('anime', 'n1', lambda: {'anime_id': 'n1'})
+        redis.down = True
+
+        calls = []
+        assert worker_a.get_or_load('anime', 'n1', lambda: calls.append(1)) == {'anime_id': 'n1'}
+        assert calls == []
+        print("OK Redis down uses local cache test passed")
@@ -0,0 +1,160 @@
+"""
+测试视频生成请求去重服务类。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+import pytest
+from services.generation_dedup_service import GenerationDedupService
+
+ENDPOINT = '/services/aigc/video-generation/video-synthesis'
+
+
+def _payload(image_url="https://bucket.oss-cn-hangzhou.aliyuncs.com/a.jpg?Expires=1&Signature=x",
+             prompt="漫画图片，动起来", duration=5):
+    return {
+        "model": "wan2.6-i2v",
+        "input": {"img_url": image_url, "prompt": prompt},
+        "parameters": {"duration": duration, "resolution": "720P", "motion_strength": 0.5}
+    }
+
+
+@pytest.fixture
+def service():
+    service = GenerationDedupService()
+    service._initialized = False
+    service._initialize()
+    return service
+
+
+class TestFingerprint:
+    """测试请求指纹"""
+
+    def test_fingerprint_normalizes_payload(self):
+        """测试签名参数、空白、整数值浮点数不影响指纹"""
+        fp1 = GenerationDedupService.fingerprint("wan2.6-i2v", ENDPOINT, _payload())
+        fp2 = GenerationDedupService.fingerprint("wan2.6-i2v", ENDPOINT, _payload(
+            image_url="https://bucket.oss-cn-hangzhou.aliyuncs.com/a.jpg?Expires=2&Signature=y",
+            prompt=" 漫画图片，动起来 ", duration=5.0))
+        assert fp1 == fp2
+        print("OK Fingerprint normalizes payload test passed")
+
+    def test_fingerprint_differs_by_parameters(self):
+        """测试时长或端点不同时指纹不同"""
+        fp1 = GenerationDedupService.fingerprint("wan2.6-i2v", ENDPOINT, _payload())
+        fp2 = GenerationDedupService.fingerprint("wan2.6-i2v", ENDPOINT, _payload(duration=6))
+        fp3 = GenerationDedupService.fingerprint("wan2.6-i2v", '/other', _payload())
+        assert len({fp1, fp2, fp3}) == 3
+        print("OK Fingerprint differs by parameters test passed")
+
+
+class TestDedupRun:
+    """测试请求合并与结果复用"""
+
+    def test_completed_result_reused(self, service):
+        """测试 TTL 内复用已成功的结果"""
+        calls = []
+
+        def submit():
+            calls.append(1)
+            return {"success": True, "video_url": "https://video.mp4"}
+
+        first, source1 = service.run("fp", "user-1", submit)
+        second, source2 = service.run("fp", "user-1", submit)
+
+        assert (source1, source2) == ("submitted", "cached")
+        assert second["video_url"] == "https://video.mp4"
+        assert len(calls) == 1
+        print("OK Completed result reused test passed")
+
+    def test_failed_result_not_cached(self, service):
+        """测试失败结果不缓存"""
+        service.run("fp", "user-1", lambda: {"success": False, "error": "boom"})
+        _, source = service.run("fp", "user-1", lambda: {"success": True})
+
+        assert source == "submitted"
+        print("OK Failed result not cached test passed")
+
+    def test_in_flight_requests_coalesced(self, service):
+        """测试进行中的相同请求合并到同一个任务"""
+        started = threading.Event()
+        calls = []
+
+        def submit():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return {"success": True, "video_url": "https://video.mp4"}
+
+        results = {}
+        owner = threading.Thread(target=lambda: results.update(owner=service.run("fp", "user-1", submit)))
+        owner.start()
+        started.wait(1)
+        results['dup'] = service.run("fp", "user-2", submit)
+        owner.join()
+
+        assert len(calls) == 1
+        assert results['owner'][1] == "submitted"
+        assert results['dup'][1] == "coalesced"
+        assert results['dup'][0]["video_url"] == "https://video.mp4"
+        print("OK In-flight requests coalesced test passed")
+
+    def test_owner_mutation_not_visible_to_waiters(self, service):
+        """测试所有者修改返回结果（写入自己的 job_id）不影响合并等待方"""
+        started, release = threading.Event(), threading.Event()
+
+        def submit():
+            started.set()
+            release.wait(1)
+            return {"success": True, "video_url": "https://video.mp4", "job_id": "job-owner"}
+
+        results = {}
+
+        def owner_run():
+            result, _ = service.run("fp", "user-1", submit)
+            result["job_id"] = "job-owner-caller"
+            result["dedup"] = "submitted"
+            results['owner'] = result
+
+        owner = threading.Thread(target=owner_run)
+        owner.start()
+        started.wait(1)
+        waiter = threading.Thread(target=lambda: results.update(dup=service.run("fp", "user-2", submit)[0]))
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join()
+        waiter.join()
+
+        assert results['owner']["job_id"] == "job-owner-caller"
+        assert results['dup'] == {"success": True, "video_url": "https://video.mp4", "job_id": "job-owner"}
+        print("OK Owner mutation not visible to waiters test passed")
+
+    def test_stats_per_user(self, service):
+        """测试按用户统计命中率"""
+        submit = lambda: {"success": True}
+        service.run("fp", "user-1", submit)
+        service.run("fp", "user-1", submit)
+        service.run("fp", "user-2", submit)
+
+        stats = service.get_stats()
+        assert stats["user-1"] == {"requests": 2, "submitted": 1, "coalesced": 0, "cached": 1, "hit_rate": 0.5}
+        assert stats["user-2"]["hit_rate"] == 1.0
+        assert list(service.get_stats("user-2").keys()) == ["user-2"]
+        print("OK Stats per user test passed")
+
+    def test_stats_bounded(self, service):
+        """测试用户统计按 LRU 保留，任意 user_id 不会让统计无限增长"""
+        service._max_entries = 2
+        submit = lambda: {"success": False}
+        service.run("fp", "user-1", submit)
+        service.run("fp", "user-2", submit)
+        service.run("fp", "user-1", submit)
+        service.run("fp", "user-3", submit)
+
+        assert list(service.get_stats().keys()) == ["user-1", "user-3"]
+        assert service.get_stats("user-1")["user-1"]["requests"] == 2
+        print("OK Stats bounded test passed")
@@ -0,0 +1,338 @@
+"""
+测试图片处理服务类。
+"""
+import sys
+import os
+import io
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch, MagicMock
+import pytest
+from PIL import Image
+from services.image_processing_service import (
+    ImageProcessingService, image_processing_service, _crop_resize_encode, _encode_for_vision,
+    _render_renditions, _parse_rendition_sizes
+)
+import base64
+
+
+def _make_image_file(tmp_path, size=(400, 300), color=(200, 50, 50)):
+    """生成测试图片文件"""
+    path = os.path.join(str(tmp_path), 'source.png')
+    Image.new('RGB', size, color).save(path, format='PNG')
+    return path
+
+
+class TestCacheKey:
+    """测试缓存键计算"""
+
+    def test_cache_key_ignores_signature_params(self):
+        """测试签名参数不影响缓存键"""
+        url1 = "https://bucket.oss-cn-hangzhou.aliyuncs.com/comic/a.jpg?Expires=1&OSSAccessKeyId=k&Signature=s1"
+        url2 = "https://bucket.oss-cn-hangzhou.aliyuncs.com/comic/a.jpg?Expires=2&OSSAccessKeyId=k&Signature=s2"
+        assert ImageProcessingService.cache_key(url1) == ImageProcessingService.cache_key(url2)
+        print("OK Cache key ignores signature params test passed")
+
+    def test_cache_key_keeps_processing_params(self):
+        """测试处理参数参与缓存键"""
+        url1 = "https://bucket.oss-cn-hangzhou.aliyuncs.com/comic/a.jpg"
+        url2 = "https://bucket.oss-cn-hangzhou.aliyuncs.com/comic/a.jpg?x-oss-process=image/resize,w_100"
+        assert ImageProcessingService.cache_key(url1) != ImageProcessingService.cache_key(url2)
+        print("OK Cache key keeps processing params test passed")
+
+
+class TestCropResizeEncode:
+    """测试裁剪、缩放、编码"""
+
+    def test_crop_region(self, tmp_path):
+        """测试按 bbox 裁剪"""
+        path = _make_image_file(tmp_path)
+        content = _crop_resize_encode(path, [100, 100, 300, 250], 0, 'JPEG', 90)
+
+        with Image.open(io.BytesIO(content)) as img:
+            assert img.format == 'JPEG'
+            assert img.size == (200, 150)
+        print("OK Crop region test passed")
+
+    def test_resize_to_max_side(self, tmp_path):
+        """测试缩放到最长边"""
+        path = _make_image_file(tmp_path, size=(2000, 1000))
+        content = _crop_resize_encode(path, None, 500, 'PNG', 90)
+
+        with Image.open(io.BytesIO(content)) as img:
+            assert img.size == (500, 250)
+        print("OK Resize to max side test passed")
+
+    def test_bbox_clamped_to_image(self, tmp_path):
+        """测试 bbox 超出图片范围时被截断"""
+        path = _make_image_file(tmp_path)
+        content = _crop_resize_encode(path, [300, 200, 900, 900], 0, 'JPEG', 90)
+
+        with Image.open(io.BytesIO(content)) as img:
+            assert img.size == (100, 100)
+        print("OK Bbox clamped test passed")
+
+    def test_invalid_bbox(self, tmp_path):
+        """测试无效 bbox"""
+        path = _make_image_file(tmp_path)
+        with pytest.raises(ValueError):
+            _crop_resize_encode(path, [300, 200, 100, 100], 0, 'JPEG', 90)
+        print("OK Invalid bbox test passed")
+
+
+class TestEncodeForVision:
+    """测试视觉模型输入预处理"""
+
+    def test_downscale_to_pixel_budget(self, tmp_path):
+        """测试超过像素上限时等比缩放并编码为 JPEG"""
+        path = _make_image_file(tmp_path, size=(2000, 1000))
+        result = _encode_for_vision(path, 500 * 250, 10 * 1024 * 1024, 85)
+
+        assert result['mime_type'] == 'image/jpeg'
+        assert (result['original_width'], result['original_height']) == (2000, 1000)
+        assert result['width'] * result['height'] <= 500 * 250
+        with Image.open(io.BytesIO(base64.b64decode(result['data']))) as img:
+            assert img.format == 'JPEG'
+            assert img.size == (result['width'], result['height'])
+        print("OK Downscale to pixel budget test passed")
+
+    def test_small_image_keeps_original_format(self, tmp_path):
+        """测试未超限的图片保留原格式和 MIME 类型"""
+        path = _make_image_file(tmp_path, size=(200, 100))
+        result = _encode_for_vision(path, 1000 * 1000, 10 * 1024 * 1024, 85)
+
+        assert result['mime_type'] == 'image/png'
+        assert (result['width'], result['height']) == (200, 100)
+        with open(path, 'rb') as f:
+            assert base64.b64decode(result['data']) == f.read()
+        print("OK Small image keeps original format test passed")
+
+
+class TestDiskCache:
+    """测试本地下载缓存"""
+
+    def _service(self, tmp_path, max_bytes=1024 * 1024):
+        service = ImageProcessingService()
+        service._initialize()
+        service._cache_dir = str(tmp_path)
+        service._cache_max_bytes = max_bytes
+        service._cache_bytes = None
+        return service
+
+    def _response(self, mock_get, chunks, headers=None):
+        response = MagicMock()
+        response.status_code = 200
+        response.headers = headers or {}
+        response.iter_content.return_value = chunks
+        response.__enter__.return_value = response
+        mock_get.return_value = response
+        return response
+
+    @patch('services.image_processing_service.requests.get')
+    def test_fetch_image_downloads_once(self, mock_get, tmp_path):
+        """测试同一图片只下载一次"""
+        self._response(mock_get, [b'image-bytes'])
+
+        service = self._service(tmp_path)
+        url = "https://example.com/a.jpg?Expires=1&Signature=x"
+
+        assert service.get_image_bytes(url) == b'image-bytes'
+        assert service.get_image_bytes("https://example.com/a.jpg?Expires=2&Signature=y") == b'image-bytes'
+        assert mock_get.call_count == 1
+        print("OK Fetch image downloads once test passed")
+
+    def test_evict_oldest_entries(self, tmp_path):
+        """测试超过容量上限时淘汰最旧的文件"""
+        service = self._service(tmp_path, max_bytes=10)
+
+        old_path = os.path.join(str(tmp_path), 'old')
+        new_path = os.path.join(str(tmp_path), 'new')
+        with open(old_path, 'wb') as f:
+            f.write(b'x' * 8)
+        with open(new_path, 'wb') as f:
+            f.write(b'y' * 8)
+        os.utime(old_path, (1, 1))
+
+        service._evict_if_needed(8)
+
+        assert not os.path.exists(old_path)
+        assert os.path.exists(new_path)
+        assert service._cache_bytes == 8
+        print("OK Evict oldest entries test passed")
+
+    @patch('services.image_processing_service.requests.get')
+    def test_cache_size_tracked_incrementally(self, mock_get, tmp_path):
+        """测试缓存大小增量累计：只在首次写入和超过上限时遍历缓存目录"""
+        service = self._service(tmp_path, max_bytes=100)
+        self._response(mock_get, [b'x' * 30])
+
+        with patch('services.image_processing_service.os.walk', wraps=os.walk) as mock_walk:
+            assert service.fetch_image("https://example.com/1.jpg")
+            assert service.fetch_image("https://example.com/2.jpg")
+            assert service.fetch_image("https://example.com/3.jpg")
+            assert mock_walk.call_count == 1
+            assert service._cache_bytes == 90
+
+            assert service.fetch_image("https://example.com/4.jpg")
+            assert mock_walk.call_count == 2
+
+        # 淘汰到上限的 90% 以下，避免每次下载都触发淘汰
+        assert service._cache_bytes <= 90
+        assert len(service._scan_cache()[0]) == 3
+        print("OK Cache size tracked incrementally test passed")
+
+    @patch('services.image_processing_service.requests.get')
+    def test_download_stops_at_max_bytes(self, mock_get, tmp_path):
+        """测试下载超过大小上限时停止并丢弃，声明的长度超限时不开始下载"""
+        service = self._service(tmp_path)
+        response = self._response(mock_get, iter([b'x' * 60, b'x' * 60, b'x' * 60]))
+
+        with patch.object(service, '_download_max_bytes', 100):
+            assert service.fetch_image("https://example.com/huge.jpg") is None
+            assert next(response.iter_content.return_value) == b'x' * 60  # 第三块未被读取
+            assert service._scan_cache()[1] == 0
+            assert not any(name.endswith('.part') for _, _, files in os.walk(str(tmp_path)) for name in files)
+
+            self._response(mock_get, [b'x' * 10], headers={'Content-Length': '1000'})
+            assert service.fetch_image("https://example.com/declared.jpg") is None
+        print("OK Download stops at max bytes test passed")
+
+
+class TestCropPanel:
+    """测试分格裁剪上传"""
+
+    def test_panel_object_key_is_deterministic(self):
+        """测试分格对象键确定性"""
+        url = "https://example.com/comic.jpg"
+        key1 = image_processing_service.panel_object_key(url, [0, 0, 100, 100])
+        key2 = image_processing_service.panel_object_key(url + "?Signature=abc", [0, 0, 100, 100])
+        key3 = image_processing_service.panel_object_key(url, [0, 0, 100, 101])
+
+        assert key1 == key2
+        assert key1 != key3
+        assert key1.startswith("panel/")
+        print("OK Panel object key deterministic test passed")
+
+    @patch('db.oss_service')
+    def test_crop_panel_reuses_existing_object(self, mock_oss):
+        """测试已存在的分格直接复用"""
+        mock_oss._initialized = True
+        mock_oss._picture_service = MagicMock()
+        mock_oss.object_exists.return_value = True
+        mock_oss.get_picture_url.return_value = {'success': True, 'url': 'https://cdn/panel.jpg'}
+
+        result = image_processing_service.crop_panel("https://example.com/comic.jpg", [0, 0, 100, 100])
+
+        assert result['success'] is True
+        assert result['cached'] is True
+        assert result['url'] == 'https://cdn/panel.jpg'
+        mock_oss.upload_picture.assert_not_called()
+        print("OK Crop panel reuses existing object test passed")
+
+    def test_crop_panel_without_oss(self):
+        """测试 OSS 未配置时返回失败"""
+        with patch('db.oss_service') as mock_oss:
+            mock_oss._picture_service = None
+            result = image_processing_service.crop_panel("https://example.com/comic.jpg", [0, 0, 100, 100])
+
+        assert result['success'] is False
+        mock_oss._ensure_initialized.assert_called_once()
+        mock_oss.upload_picture.assert_not_called()
+        print("OK Crop panel without OSS test passed")
+
+    @patch('db.oss_service')
+    def test_crop_panel_initializes_oss_on_first_use(self, mock_oss):
+        """测试 OSS 尚未初始化（lazy 模式）时先初始化再裁剪，而不是直接返回失败"""
+        mock_oss._initialized = False
+        mock_oss._picture_service = MagicMock()
+        mock_oss.object_exists.return_value = True
+        mock_oss.get_picture_url.return_value = {'success': True, 'url': 'https://cdn/panel.jpg'}
+
+        result = image_processing_service.crop_panel("https://example.com/comic.jpg", [0, 0, 100, 100])
+
+        assert result['success'] is True
+        mock_oss._ensure_initialized.assert_called_once()
+        print("OK Crop panel initializes OSS on first use test passed")
+
+
+class TestRenditions:
+    """测试缩略图、预览图副本"""
+
+    def test_parse_rendition_sizes(self):
+        """测试解析副本尺寸配置"""
+        assert _parse_rendition_sizes('thumb:320, preview:1280') == [('thumb', 320), ('preview', 1280)]
+        assert _parse_rendition_sizes('') == []
+        print("OK Parse rendition sizes test passed")
+
+    def test_render_sizes_and_formats(self, tmp_path):
+        """测试每个尺寸按每种格式编码，不放大小图"""
+        path = _make_image_file(tmp_path, size=(2000, 1000))
+        renditions = _render_renditions(path, [('thumb', 320), ('huge', 4000)], ['WEBP', 'JPEG'], 80)
+
+        assert [(r['name'], r['format'], r['width'], r['height']) for r in renditions] == [
+            ('thumb', 'WEBP', 320, 160), ('thumb', 'JPEG', 320, 160),
+            ('huge', 'WEBP', 2000, 1000), ('huge', 'JPEG', 2000, 1000),
+        ]
+        with Image.open(io.BytesIO(renditions[0]['content'])) as img:
+            assert img.format == 'WEBP'
+        print("OK Render sizes and formats test passed")
+
+    def test_small_image_skips_duplicate_sizes(self, tmp_path):
+        """测试小图的多个尺寸缩放结果相同时只生成一次，srcset 中同一宽度只出现一次"""
+        path = _make_image_file(tmp_path, size=(300, 200))
+        renditions = _render_renditions(path, [('thumb', 320), ('preview', 1280)], ['WEBP'], 80)
+        assert [(r['name'], r['width']) for r in renditions] == [('thumb', 300)]
+
+        from api.routes import pictures
+        asset_data_map = {'asset-1': {'renditions': [
+            {'object_key': 'r/thumb.webp', 'content_type': 'image/webp', 'width': 300},
+            {'object_key': 'r/preview.webp', 'content_type': 'image/webp', 'width': 300},
+        ]}}
+        with patch.object(pictures, 'oss_service') as mock_oss:
+            mock_oss.get_picture_urls.return_value = {'urls': {'r/thumb.webp': 'u1', 'r/preview.webp': 'u2'}}
+            pictures._attach_renditions(asset_data_map)
+        assert asset_data_map['asset-1']['srcset'] == {'image/webp': 'u1 300w'}
+        print("OK Small image skips duplicate sizes test passed")
+
+    def test_rendition_keys_follow_source(self):
+        """测试副本对象键位于原图对应前缀下"""
+        key = ImageProcessingService.rendition_object_key('comic/sha256/ab/abcdef.png', 'thumb', 'WEBP')
+        assert key == 'rendition/comic/sha256/ab/abcdef/thumb.webp'
+        print("OK Rendition keys follow source test passed")
+
+    @patch('db.asset_data_service')
+    def test_build_reuses_existing_renditions(self, mock_assets):
+        """测试共享原图的副本直接复用"""
+        existing = [{'name': 'thumb', 'object_key': 'rendition/comic/a/thumb.webp'}]
+        mock_assets.fetch_object_renditions.return_value = existing
+
+        with patch.object(image_processing_service, 'generate_renditions') as mock_generate:
+            result = image_processing_service.build_renditions('comic/a.png')
+
+        assert result['reused'] is True
+        mock_generate.assert_not_called()
+        mock_assets.set_object_renditions.assert_called_once_with('comic/a.png', existing)
+        print("OK Build reuses existing renditions test passed")
+
+    @patch('db.oss_service')
+    def test_generate_uploads_renditions(self, mock_oss, tmp_path):
+        """测试生成副本并上传"""
+        mock_oss._initialized = True
+        mock_oss._picture_service = MagicMock()
+        mock_oss.get_picture_url.return_value = {'success': True, 'url': 'https://cdn/a.png'}
+        mock_oss.upload_picture.return_value = {'success': True}
+        path = _make_image_file(tmp_path, size=(1000, 500))
+
+        service = ImageProcessingService()
+        service._initialize()
+        with patch.object(service, 'fetch_image', return_value=path), \
+                patch.object(service, '_run_in_pool', side_effect=lambda func, *args: func(*args)), \
+                patch.object(service, '_rendition_sizes', [('thumb', 100)]), \
+                patch.object(service, '_rendition_formats', ['WEBP']):
+            result = service.generate_renditions('comic/a.png')
+
+        assert result['success'] is True
+        assert result['renditions'][0]['object_key'] == 'rendition/comic/a/thumb.webp'
+        assert (result['renditions'][0]['width'], result['renditions'][0]['height']) == (100, 50)
+        assert mock_oss.upload_picture.call_args.kwargs['content_type'] == 'image/webp'
+        print("OK Generate uploads renditions test passed")
@@ -0,0 +1,279 @@
+"""
+测试生成任务事件服务类。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+import requests
+from services.job_event_service import JobEventService, format_sse
+
+
+@pytest.fixture
+def service():
+    service = JobEventService()
+    service._initialized = False
+    service._initialize()
+    service._heartbeat = 1
+    return service
+
+
+def _parse(messages):
+    """解析 SSE 消息中的事件数据"""
+    return [json.loads(m.split('data: ', 1)[1]) for m in messages if m.startswith('id:')]
+
+
+class TestJobEvents:
+    """测试事件发布与订阅"""
+
+    def test_format_sse(self):
+        """测试 SSE 消息格式"""
+        message = format_sse({'seq': 3, 'job_id': 'job-1', 'status': 'running'})
+        assert message.startswith('id: 3\nevent: running\ndata: ')
+        assert message.endswith('\n\n')
+        print("OK Format SSE test passed")
+
+    def test_stream_job_until_terminal(self, service):
+        """测试按 job_id 订阅时按顺序推送事件，终态后关闭"""
+        job_id = service.create_job('user-1', 'multi_image_video', total=2)
+        service.publish(job_id, 'running', progress={'completed': 1, 'total': 2, 'stage': 'generating'})
+        service.publish_result(job_id, {'success': True, 'video_url': 'https://video.mp4'})
+
+        events = _parse(list(service.stream(job_id=job_id)))
+
+        assert [e['status'] for e in events] == ['queued', 'running', 'succeeded']
+        assert events[0]['progress'] == {'completed': 0, 'total': 2}
+        assert events[2]['video_url'] == 'https://video.mp4'
+        assert events[0]['seq'] < events[1]['seq'] < events[2]['seq']
+        print("OK Stream job until terminal test passed")
+
+    def test_events_after_terminal_ignored(self, service):
+        """测试终态之后的事件被忽略"""
+        job_id = service.create_job('user-1', 'single_image_video')
+        service.publish(job_id, 'failed', error='boom')
+
+        assert service.publish(job_id, 'running') is None
+        assert service.get_job(job_id)['status'] == 'failed'
+        print("OK Events after terminal ignored test passed")
+
+    def test_stream_resumes_from_last_event_id(self, service):
+        """测试 Last-Event-ID 续传只推送之后的事件"""
+        job_id = service.create_job('user-1', 'single_image_video')
+        submitted = service.publish(job_id, 'submitted')
+        service.publish(job_id, 'succeeded', video_url='https://video.mp4')
+
+        events = _parse(list(service.stream(job_id=job_id, last_event_id=submitted['seq'])))
+
+        assert [e['status'] for e in events] == ['succeeded']
+        print("OK Stream resumes from last event id test passed")
+
+    def test_stream_waits_for_live_event(self, service):
+        """测试订阅后等待新事件推送"""
+        job_id = service.create_job('user-1', 'single_image_video')
+        timer = threading.Timer(0.1, service.publish, args=(job_id, 'succeeded'))
+        timer.start()
+
+        events = _parse(list(service.stream(job_id=job_id)))
+        timer.join()
+
+        assert events[-1]['status'] == 'succeeded'
+        print("OK Stream waits for live event test passed")
+
+
+class TestCrossProcessStream:
+    """测试任务不在本进程时按任务存储推送"""
+
+    @patch('services.job_event_service.time.sleep')
+    def test_unknown_until_stored(self, mock_sleep, service):
+        """测试任务暂未写入或存储异常时推送 unknown 事件并继续轮询，不推送 failed"""
+        states = [None, RuntimeError('connection refused'),
+                  {'status': 'running', 'progress': {'completed': 1, 'total': 3}},
+                  {'status': 'succeeded', 'video_url': 'https://video.mp4'}]
+
+        def load(job_id):
+            state = states.pop(0)
+            if isinstance(state, Exception):
+                raise state
+            return state
+
+        with patch.object(service, '_load_stored_job', side_effect=load):
+            events = _parse(list(service.stream(job_id='job-other-worker')))
+
+        assert [e['status'] for e in events] == ['unknown', 'unknown', 'running', 'succeeded']
+        assert events[0]['message'] == 'Job not found'
+        assert events[1]['message'] == 'Job store unavailable'
+        assert events[2]['progress'] == {'completed': 1, 'total': 3}
+        assert events[3]['video_url'] == 'https://video.mp4'
+        print("OK Unknown until stored test passed")
+
+    @patch('services.job_event_service.time.sleep')
+    def test_unknown_timeout_closes_stream(self, mock_sleep, service):
+        """测试任务一直未找到时超时关闭连接"""
+        service._unknown_timeout = 0
+        with patch.object(service, '_load_stored_job', return_value=None):
+            events = _parse(list(service.stream(job_id='job-missing')))
+
+        assert [e['status'] for e in events] == ['unknown']
+        print("OK Unknown timeout closes stream test passed")
+
+    def test_events_persisted(self, service):
+        """测试每个事件（含多图片任务）按发布顺序写入 generation_jobs"""
+        saved = []
+        done = threading.Event()
+
+        def save_event(event, job_type=None):
+            saved.append((event['status'], job_type))
+            if event['status'] == 'succeeded':
+                done.set()
+
+        with patch('db.mongo_generation_job.generation_job_service.save_event', side_effect=save_event):
+            job_id = service.create_job('user-1', 'multi_image_video', total=2)
+            service.publish(job_id, 'running', progress={'completed': 1, 'total': 2})
+            service.publish_result(job_id, {'success': True, 'video_url': 'https://video.mp4'})
+            assert done.wait(timeout=5)
+
+        assert saved == [('queued', 'multi_image_video'), ('running', 'multi_image_video'),
+                         ('succeeded', 'multi_image_video')]
+        print("OK Events persisted test passed")
+
+
+class TestJobExecution:
+    """测试任务执行"""
+
+    def test_run_job_publishes_result(self, service):
+        """测试执行完成后发布终态事件并返回 job_id"""
+        job_id = service.create_job('user-1', 'single_image_video')
+        result = service.run_job(job_id, lambda: {'success': False, 'error': 'API error'})
+
+        assert result['job_id'] == job_id
+        job = service.get_job(job_id)
+        assert job['status'] == 'failed'
+        print("OK Run job publishes result test passed")
+
+    def test_run_job_exception_publishes_failed(self, service):
+        """测试执行异常时发布 failed 事件并继续抛出"""
+        job_id = service.create_job('user-1', 'single_image_video')
+
+        def boom():
+            raise RuntimeError('stitching failed')
+
+        with pytest.raises(RuntimeError):
+            service.run_job(job_id, boom)
+
+        events = _parse(list(service.stream(job_id=job_id)))
+        assert events[-1]['status'] == 'failed'
+        assert events[-1]['error'] == 'stitching failed'
+        print("OK Run job exception publishes failed test passed")
+
+
+PUBLIC_ADDRESS = [(2, 1, 6, '', ('93.184.216.34', 443))]
+
+
+def _resolve_to(address):
+    return [(2, 1, 6, '', (address, 443))]
+
+
+class TestWebhook:
+    """测试完成 Webhook"""
+
+    @patch('services.job_event_service.socket.getaddrinfo', return_value=PUBLIC_ADDRESS)
+    @patch('services.job_event_service.time.sleep')
+    @patch('services.job_event_service.requests.post')
+    def test_webhook_retries_until_success(self, mock_post, mock_sleep, mock_dns, service):
+        """测试 Webhook 失败后按指数退避重试"""
+        service._webhook_secret = 'secret'
+        mock_post.side_effect = [
+            requests.ConnectionError('refused'),
+            MagicMock(status_code=503),
+            MagicMock(status_code=200),
+        ]
+
+        delivered = service._deliver_webhook('https://hooks.example.com/done',
+                                             {'seq': 1, 'job_id': 'job-1', 'status': 'succeeded'})
+
+        assert delivered is True
+        assert mock_post.call_count == 3
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2]
+        headers = mock_post.call_args.kwargs['headers']
+        assert headers['X-Narloom-Signature'].startswith('sha256=')
+        assert mock_post.call_args.kwargs['allow_redirects'] is False
+        print("OK Webhook retries until success test passed")
+
+    @patch('services.job_event_service.socket.getaddrinfo', return_value=PUBLIC_ADDRESS)
+    @patch('services.job_event_service.time.sleep')
+    @patch('services.job_event_service.requests.post')
+    def test_webhook_gives_up(self, mock_post, mock_sleep, mock_dns, service):
+        """测试超过重试次数后放弃"""
+        service._webhook_max_retries = 2
+        mock_post.return_value = MagicMock(status_code=500)
+
+        delivered = service._deliver_webhook('https://hooks.example.com/done',
+                                             {'seq': 1, 'job_id': 'job-1', 'status': 'failed'})
+
+        assert delivered is False
+        assert mock_post.call_count == 3
+        print("OK Webhook gives up test passed")
+
+    @pytest.mark.parametrize('address', ['127.0.0.1', '169.254.169.254', '10.0.0.5', '192.168.1.10',
+                                         '::1', '::ffff:172.16.0.1', '0.0.0.0'])
+    def test_webhook_rejects_internal_address(self, address, service):
+        """测试解析到回环、链路本地、内网和保留地址的 Webhook 被拒绝"""
+        with patch('services.job_event_service.socket.getaddrinfo', return_value=_resolve_to(address)):
+            assert 'non-public' in service.validate_webhook_url('https://hooks.example.com/done')
+        assert service.validate_webhook_url('ftp://hooks.example.com/done') == 'must be an http(s) URL'
+        print("OK Webhook rejects internal address test passed")
+
+    @patch('services.job_event_service.requests.post')
+    def test_webhook_rechecked_at_delivery(self, mock_post, service):
+        """测试推送前重新解析域名（DNS 变更为内网地址时不推送），重定向不跟随"""
+        service._webhook_allowed_hosts = ['.example.com']
+        assert 'not allowed' in service.validate_webhook_url('https://hooks.attacker.io/done')
+
+        event = {'seq': 1, 'job_id': 'job-1', 'status': 'succeeded'}
+        with patch('services.job_event_service.socket.getaddrinfo', return_value=_resolve_to('10.1.2.3')):
+            assert service._deliver_webhook('https://hooks.example.com/done', event) is False
+        mock_post.assert_not_called()
+
+        mock_post.return_value = MagicMock(status_code=302)
+        with patch('services.job_event_service.socket.getaddrinfo', return_value=PUBLIC_ADDRESS):
+            assert service._deliver_webhook('https://hooks.example.com/done', event) is False
+        assert mock_post.call_count == 1
+        print("OK Webhook rechecked at delivery test passed")
+
+    def test_terminal_event_triggers_webhook(self, service):
+        """测试终态事件提交 Webhook 推送"""
+        executor = MagicMock()
+        service._webhook_executor = executor
+        job_id = service.create_job('user-1', 'single_image_video', 'https://hooks.example.com/done')
+
+        service.publish(job_id, 'running')
+        executor.submit.assert_not_called()
+
+        event = service.publish(job_id, 'succeeded', video_url='https://video.mp4')
+        executor.submit.assert_called_once_with(service._deliver_webhook,
+                                                'https://hooks.example.com/done', event)
+        print("OK Terminal event triggers webhook test passed")
+
+
+class TestUploadProgress:
+    """测试上传进度回调"""
+
+    def test_progress_callback_throttled(self, service):
+        """测试按进度间隔发布 running 事件"""
+        job_id = service.create_job('user-1', 'multi_image_video', total=2)
+        callback = service.progress_callback(job_id, step=0.25, stage='uploading')
+
+        for consumed in range(0, 101, 5):
+            callback(consumed, 100)
+
+        service.publish(job_id, 'succeeded')
+        events = _parse(list(service.stream(job_id=job_id)))
+        uploads = [e['progress'] for e in events if e['status'] == 'running']
+
+        assert [p['bytes_uploaded'] for p in uploads] == [0, 25, 50, 75, 100]
+        assert all(p['stage'] == 'uploading' and p['bytes_total'] == 100 for p in uploads)
+        print("OK Progress callback throttled test passed")
@@ -0,0 +1,94 @@
+"""
+测试 JSON Provider（orjson 序列化）。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import decimal
+from datetime import date, datetime
+from unittest.mock import patch
+import pytest
+from bson import ObjectId
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
+from utils import json_provider
+from utils.json_provider import FastJSONProvider, init_json_provider
+from utils.response_helper import api_response
+
+ROW = {
+    'work_id': 'w1',
+    'title': '作品标题',
+    'created_at': datetime(2026, 3, 31, 8, 30, 15, 123456),
+    'published_on': date(2026, 4, 1),
+    'price': decimal.Decimal('9.90'),
+    'tags': {'a'},
+    '_id': ObjectId('65f0c0ffee0000000000abcd'),
+}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    init_json_provider(app)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return api_response(success=True, data=request.get_json())
+
+    return app
+
+
+class TestFastJSONProvider:
+    """测试快速 JSON Provider"""
+
+    def test_response_serializes_rows(self, app):
+        """测试 datetime 输出 ISO 8601（精确到秒），其他常见类型可序列化"""
+        assert isinstance(app.json, FastJSONProvider)
+        with app.app_context():
+            response, status = api_response(success=True, data=[ROW], count=1)
+
+        body = json.loads(response.get_data())
+        assert status == 200
+        assert response.mimetype == 'application/json'
+        assert body['data'][0] == {
+            'work_id': 'w1',
+            'title': '作品标题',
+            'created_at': '2026-03-31T08:30:15',
+            'published_on': '2026-04-01',
+            'price': '9.90',
+            'tags': ['a'],
+            '_id': '65f0c0ffee0000000000abcd',
+        }
+        print("OK Response serializes rows test passed")
+
+    def test_stdlib_fallback_matches(self, app):
+        """测试未安装 orjson 时输出格式一致"""
+        with app.app_context():
+            fast = json.loads(app.json.dumps(ROW))
+            with patch.object(json_provider, 'orjson', None):
+                fallback = json.loads(app.json.dumps(ROW))
+                response = app.json.response(ROW)
+        assert fast == fallback
+        assert json.loads(response.get_data()) == fast
+        print("OK Stdlib fallback matches test passed")
+
+    def test_request_json_round_trip(self, app):
+        """测试请求体解析经由 Provider"""
+        with app.test_client() as client:
+            response = client.post('/echo', data='{"ids": ["w1", "w2"], "名称": "测试"}',
+                                   content_type='application/json')
+            invalid = client.post('/echo', data='{bad json', content_type='application/json')
+
+        assert json.loads(response.get_data())['data'] == {'ids': ['w1', 'w2'], '名称': '测试'}
+        assert invalid.status_code == 400
+        print("OK Request JSON round trip test passed")
+
+    def test_stdlib_config_keeps_default(self):
+        """测试 JSON_PROVIDER=stdlib 时使用 Flask 默认 Provider"""
+        app = Flask(__name__)
+        app.config['JSON_PROVIDER'] = 'stdlib'
+        init_json_provider(app)
+        assert type(app.json) is DefaultJSONProvider
+        print("OK Stdlib config keeps default test passed")
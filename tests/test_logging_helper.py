@@ -0,0 +1,105 @@
+"""
+测试后台日志写入（QueueHandler + JSON 格式）。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import logging
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from flask import Flask
+from utils import logging_helper
+from utils.decorators import audit_log
+from utils.logging_helper import DebugSamplingFilter, lazy_json, setup_logging, shutdown_logging
+from utils.response_helper import api_response
+
+
+@pytest.fixture
+def app(tmp_path):
+    root_level = logging.getLogger().level
+    app = Flask(__name__)
+    app.config.update(LOG_DIR=str(tmp_path), LOG_CONSOLE=False, LOG_LEVEL='INFO')
+    setup_logging(app)
+
+    @app.route('/generate', methods=['POST'])
+    @audit_log(action_name='generate_video')
+    def generate():
+        return api_response(success=True, data={})
+
+    yield app
+    shutdown_logging()
+    logging.getLogger().setLevel(root_level)
+
+
+def read_entries(tmp_path):
+    """停止写入线程后读取日志文件"""
+    shutdown_logging()
+    with open(tmp_path / 'narloom.log', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestLogging:
+    """测试结构化日志输出"""
+
+    def test_json_lines_with_extra_and_exception(self, app, tmp_path):
+        """测试 extra 字段输出为顶层字段，异常单独输出"""
+        logger = logging.getLogger('request_timing')
+        logger.info('GET /work 200', extra={'status_code': 200, 'duration_ms': 1.5,
+                                            'started_at': datetime(2026, 4, 18, 10, 0, 0)})
+        try:
+            raise ValueError('bad input')
+        except ValueError:
+            logging.getLogger('services.test').error('Failed: %s', 'w1', exc_info=True)
+
+        entries = read_entries(tmp_path)
+        assert entries[0]['logger'] == 'request_timing'
+        assert entries[0]['message'] == 'GET /work 200'
+        assert entries[0]['status_code'] == 200
+        assert entries[0]['started_at'] == '2026-04-18T10:00:00'
+        assert entries[1]['level'] == 'ERROR'
+        assert entries[1]['message'] == 'Failed: w1'
+        assert 'ValueError: bad input' in entries[1]['exception']
+        print("OK JSON lines with extra and exception test passed")
+
+    def test_lazy_json_only_when_enabled(self, app, tmp_path):
+        """测试级别未启用时不序列化大对象"""
+        payload = {'model': 'wan2.6-i2v', 'input': {'prompt': '镜头缓慢推进'}}
+        logger = logging.getLogger('services.video_generation_service')
+        with patch.object(logging_helper, '_dumps', wraps=logging_helper._dumps) as dumps:
+            logger.debug('Video generation payload: %s', lazy_json(payload))
+            assert dumps.call_count == 0
+            logger.info('Video generation payload: %s', lazy_json(payload))
+            assert any(call.args[0] == payload for call in dumps.call_args_list)
+
+        entries = read_entries(tmp_path)
+        assert len(entries) == 1
+        assert json.loads(entries[0]['message'].split(': ', 1)[1]) == payload
+        print("OK Lazy JSON only when enabled test passed")
+
+    def test_audit_request_data(self, app, tmp_path):
+        """测试审计日志的请求体由写入线程解析为 JSON 对象"""
+        with app.test_client() as client:
+            client.post('/generate', json={'asset_id': 'a1', 'duration': 5})
+
+        audit = [e for e in read_entries(tmp_path) if e['logger'] == 'audit']
+        assert audit[0]['action'] == 'generate_video'
+        assert audit[0]['request_data'] == {'asset_id': 'a1', 'duration': 5}
+        print("OK Audit request data test passed")
+
+    def test_debug_sampling(self):
+        """测试 DEBUG 日志按比例采样，INFO 不采样"""
+        def record(level):
+            return logging.LogRecord('test', level, __file__, 1, 'msg', None, None)
+
+        dropped = DebugSamplingFilter(0.0)
+        assert not dropped.filter(record(logging.DEBUG))
+        assert dropped.filter(record(logging.INFO))
+
+        sampled = DebugSamplingFilter(0.25)
+        with patch.object(logging_helper.random, 'random', side_effect=[0.1, 0.5, 0.2, 0.9]):
+            kept = [sampled.filter(record(logging.DEBUG)) for _ in range(4)]
+        assert kept == [True, False, True, False]
+        print("OK Debug sampling test passed")
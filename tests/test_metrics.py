@@ -0,0 +1,126 @@
+"""
+测试 Prometheus 指标。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+import requests
+from flask import Flask, Blueprint
+from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+from db.mongo_video_task import video_task_service
+from services.metrics import MetricsMiddleware
+from services.token_blacklist_service import token_blacklist_service
+from utils.response_helper import api_response
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def middleware():
+    return MetricsMiddleware()
+
+
+@pytest.fixture
+def app(middleware):
+    app = Flask(__name__)
+    middleware.init_app(app)
+    bp = Blueprint('work', __name__, url_prefix='/rest/v1/work')
+
+    @bp.route('/getWorkById')
+    def get_work():
+        return api_response(success=True, data={'work_id': 'w1'})
+
+    app.register_blueprint(bp)
+    return app
+
+
+def scrape(client) -> str:
+    with patch.object(video_task_service, 'count_by_status', return_value={'running': 2, 'succeeded': 5}), \
+            patch.object(token_blacklist_service, 'get_blacklisted_tokens_count', return_value=3):
+        response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    return response.get_data(as_text=True)
+
+
+class TestMetrics:
+    """测试指标记录与导出"""
+
+    def test_request_latency_by_route(self, app):
+        """测试按蓝图路由模板记录请求延迟，抓取时查询任务状态和黑名单数量"""
+        with app.test_client() as client:
+            client.get('/rest/v1/work/getWorkById?work_id=w1')
+            client.get('/rest/v1/work/getWorkById?work_id=w2')
+            client.get('/unknown')
+            text = scrape(client)
+
+        labels = 'blueprint="work",method="GET",route="/rest/v1/work/getWorkById"'
+        assert f'narloom_http_request_duration_seconds_count{{{labels}}} 2.0' in text
+        assert f'narloom_http_requests_total{{{labels},status="200"}} 2.0' in text
+        assert 'route="unmatched",status="404"' in text
+        assert 'narloom_video_tasks{status="running"} 2.0' in text
+        assert 'narloom_auth_blacklist_tokens 3.0' in text
+        print("OK Request latency by route test passed")
+
+    def test_dashscope_errors_by_model(self, app, middleware):
+        """测试 DashScope 调用按模型记录延迟，HTTP 错误和异常计为错误"""
+        with middleware.dashscope_call('qwen-vl-max', 'vision') as call:
+            call.status_code = 200
+        with middleware.dashscope_call('wan2.6-i2v', 'video_submit') as call:
+            call.status_code = 429
+        with pytest.raises(requests.Timeout):
+            with middleware.dashscope_call('wan2.6-i2v', 'task_status'):
+                raise requests.Timeout()
+
+        with app.test_client() as client:
+            text = scrape(client)
+        assert 'narloom_dashscope_request_duration_seconds_count{model="qwen-vl-max",operation="vision"} 1.0' in text
+        assert 'narloom_dashscope_errors_total{model="wan2.6-i2v",operation="video_submit",reason="http_429"} 1.0' in text
+        assert 'reason="Timeout"' in text
+        assert 'operation="vision",reason=' not in text
+        print("OK DashScope errors by model test passed")
+
+    def test_oss_transfer_and_cache(self, app, middleware):
+        """测试 OSS 传输字节数、连接池和缓存查找"""
+        upload = SimpleNamespace(method='PUT', data=b'x' * 1000, headers={})
+        download = SimpleNamespace(method='GET', data=None, headers={})
+        middleware.record_oss(upload, SimpleNamespace(status=200, headers={}), 0.05)
+        middleware.record_oss(download, SimpleNamespace(status=200, headers={'Content-Length': '4096'}), 0.02)
+        middleware.record_oss(download, None, 0.5)
+        middleware.record_cache('signed_url', 'hit', 3)
+        middleware.record_cache('signed_url', 'miss', 0)
+        middleware.inc('mongo_pool_connections', state='open')
+
+        with app.test_client() as client:
+            text = scrape(client)
+        assert 'narloom_oss_transfer_bytes_total{direction="upload"} 1000.0' in text
+        assert 'narloom_oss_transfer_bytes_total{direction="download"} 4096.0' in text
+        assert 'narloom_oss_requests_total{method="GET",status="error"} 1.0' in text
+        assert 'narloom_cache_lookups_total{cache="signed_url",result="hit"} 3.0' in text
+        assert 'result="miss"' not in text
+        assert 'narloom_mongo_pool_connections{state="open"} 1.0' in text
+        print("OK OSS transfer and cache test passed")
+
+    def test_multiprocess_aggregation(self, tmp_path):
+        """测试多进程模式下各 worker 的指标汇总"""
+        script = (
+            "from flask import Flask\n"
+            "from services.metrics import metrics\n"
+            "metrics.init_app(Flask(__name__))\n"
+            "metrics.record_cache('vision', 'hit')\n"
+            "metrics.inc('jobs_running')\n"
+        )
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, check=True)
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+        text = generate_latest(registry).decode('utf-8')
+        assert 'narloom_cache_lookups_total{cache="vision",result="hit"} 2.0' in text
+        print("OK Multiprocess aggregation test passed")
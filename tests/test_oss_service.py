@@ -0,0 +1,108 @@
+"""
+测试 OSS 服务首次使用时的初始化。
+"""
+import sys
+import os
+import io
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch
+import pytest
+from flask import Flask, current_app
+from db.storage.oss import OSSService
+
+
+class FakeStorageService:
+    """模拟底层存储服务：记录初始化时的应用，前 failures 次初始化失败"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.apps = []
+        self._initialized = False
+
+    def init_app(self, app):
+        with app.app_context():
+            self.apps.append(current_app.name)
+            if len(self.apps) <= self.failures:
+                raise RuntimeError("Aliyun OSS configuration incomplete")
+            self._initialized = True
+
+
+@pytest.fixture
+def oss():
+    """保存并恢复 OSSService 单例的类级状态"""
+    saved = {name: OSSService.__dict__.get(name)
+             for name in ('_initialized_flag', '_app', '_picture_service', '_video_service')}
+    OSSService._initialized_flag = False
+    OSSService._app = None
+    yield OSSService()
+    for name, value in saved.items():
+        setattr(OSSService, name, value)
+    OSSService._instance.__dict__.pop('_picture_service', None)
+    OSSService._instance.__dict__.pop('_video_service', None)
+
+
+def _run_in_thread(func):
+    errors = []
+
+    def target():
+        try:
+            func()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    return errors
+
+
+class TestLazyInitialization:
+    """测试 lazy 模式下首次使用时的初始化"""
+
+    def test_first_use_outside_app_context(self, oss):
+        """测试在应用上下文之外的工作线程中首次使用时，用记录的应用初始化"""
+        app = Flask('narloom-test')
+        oss.bind_app(app)
+        picture, video = FakeStorageService(), FakeStorageService()
+
+        with patch('db.storage.picture.picture_service', picture), \
+                patch('db.storage.video.video_service', video):
+            errors = _run_in_thread(oss._ensure_initialized)
+
+        assert errors == []
+        assert oss._initialized
+        assert picture.apps == ['narloom-test'] and video.apps == ['narloom-test']
+        print("OK First use outside app context test passed")
+
+    def test_failed_init_retried(self, oss):
+        """测试底层服务初始化失败时不标记为已初始化，下次使用时重试"""
+        oss.bind_app(Flask('narloom-test'))
+        picture, video = FakeStorageService(failures=2), FakeStorageService()
+
+        with patch('db.storage.picture.picture_service', picture), \
+                patch('db.storage.video.video_service', video):
+            oss._ensure_initialized()
+            assert not oss._initialized
+            # 仍未配置时抛出 RuntimeError，而不是一直保持不可用
+            with pytest.raises(RuntimeError, match='not available'):
+                oss.upload_picture(b'data', 'comic/a.png')
+            assert not oss._initialized
+
+            oss._ensure_initialized()
+
+        assert oss._initialized
+        assert len(picture.apps) == 3
+        print("OK Failed init retried test passed")
+
+    def test_stream_upload_without_oss(self, oss):
+        """测试 OSS 未配置时流式上传抛出 RuntimeError（调用方据此返回 503），而不是 AttributeError"""
+        oss.bind_app(Flask('narloom-test'))
+        picture, video = FakeStorageService(failures=10), FakeStorageService()
+
+        with patch('db.storage.picture.picture_service', picture), \
+                patch('db.storage.video.video_service', video):
+            with pytest.raises(RuntimeError, match='not available'):
+                oss.upload_picture_stream(io.BytesIO(b'data'), 'comic/a.png')
+        print("OK Stream upload without OSS test passed")
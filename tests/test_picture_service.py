@@ -0,0 +1,343 @@
+"""
+测试 OSS 图片存储服务类（签名 URL 缓存）。
+"""
+import sys
+import os
+import io
+import hashlib
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch, MagicMock
+import pytest
+import oss2
+from db.storage.picture import PictureService
+
+NOW = 1700000000.5
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('ALIYUN_OSS_ENDPOINT', 'oss-cn-shanghai.aliyuncs.com')
+    monkeypatch.setenv('ALIYUN_OSS_ACCESS_KEY_ID', 'test-key-id')
+    monkeypatch.setenv('ALIYUN_OSS_ACCESS_KEY_SECRET', 'test-key-secret')
+    monkeypatch.setenv('ALIYUN_OSS_BUCKET_NAME', 'narloom-test')
+    service = PictureService()
+    service._initialized = False
+    service._initialize()
+    service._cdn_domain = ''
+    yield service
+    service._initialized = False
+    service._bucket = None
+    service._auth = None
+
+
+class TestSignedUrl:
+    """测试签名 URL 生成与缓存"""
+
+    @pytest.mark.parametrize('object_key', ['comic/u1/2026/04/abc.jpg', 'comic/用户 1/a+b?.png'])
+    def test_signature_matches_sdk(self, service, object_key):
+        """测试批量签名结果与 bucket.sign_url 一致"""
+        with patch('db.storage.picture.time.time', return_value=NOW), \
+                patch('oss2.auth.time.time', return_value=NOW):
+            url = service._get_file_url(object_key, 3600)
+            expires_at = int(url.split('Expires=')[1].split('&')[0])
+            expected = service._bucket.sign_url('GET', object_key, expires_at - int(NOW))
+
+        assert url == expected
+        assert expires_at >= NOW + 3600
+        assert expires_at % 300 == 0
+        print("OK Signature matches SDK test passed")
+
+    def test_cache_reused_within_bucket(self, service):
+        """测试同一过期时间桶内复用签名 URL"""
+        with patch('db.storage.picture.time.time', return_value=NOW):
+            url1 = service._get_file_url('comic/a.jpg')
+        with patch('db.storage.picture.time.time', return_value=NOW + 10):
+            url2 = service._get_file_url('comic/a.jpg')
+
+        assert url1 == url2
+        stats = service.get_url_cache_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        print("OK Cache reused within bucket test passed")
+
+    def test_cache_refreshed_next_bucket(self, service):
+        """测试时间桶推进后生成新的 URL，剩余有效期不少于 expires"""
+        with patch('db.storage.picture.time.time', return_value=NOW):
+            url1 = service._get_file_url('comic/a.jpg', 600)
+        with patch('db.storage.picture.time.time', return_value=NOW + 300):
+            url2 = service._get_file_url('comic/a.jpg', 600)
+
+        assert url1 != url2
+        assert int(url2.split('Expires=')[1].split('&')[0]) >= NOW + 300 + 600
+        print("OK Cache refreshed next bucket test passed")
+
+    def test_cache_size_limit(self, service):
+        """测试超过条目上限时淘汰最久未使用的 URL"""
+        service._url_cache_size = 2
+        with patch('db.storage.picture.time.time', return_value=NOW):
+            service._get_file_urls(['comic/a.jpg', 'comic/b.jpg', 'comic/c.jpg'])
+
+        assert [k[0] for k in service._url_cache] == ['comic/b.jpg', 'comic/c.jpg']
+        print("OK Cache size limit test passed")
+
+    def test_cdn_domain_skips_signing(self, service):
+        """测试配置 CDN 域名时不签名"""
+        service._cdn_domain = 'cdn.example.com'
+        urls = service._get_file_urls(['comic/a.jpg'])
+
+        assert urls == {'comic/a.jpg': 'https://cdn.example.com/comic/a.jpg'}
+        assert len(service._url_cache) == 0
+        print("OK CDN domain skips signing test passed")
+
+    def test_list_pictures_signs_in_batch(self, service):
+        """测试列表只调用一次批量签名"""
+        objects = [MagicMock(key=f'comic/{i}.jpg', size=1, last_modified=0, etag='e') for i in range(3)]
+        service._bucket = MagicMock()
+        service._bucket.list_objects.return_value = MagicMock(object_list=objects, is_truncated=False)
+
+        with patch.object(service, '_get_file_urls', wraps=lambda keys: {k: f'url/{k}' for k in keys}) as batch:
+            result = service.list_pictures()
+
+        batch.assert_called_once_with(['comic/0.jpg', 'comic/1.jpg', 'comic/2.jpg'])
+        assert [p['url'] for p in result['pictures']] == ['url/comic/0.jpg', 'url/comic/1.jpg', 'url/comic/2.jpg']
+        print("OK List pictures signs in batch test passed")
+
+
+class TestBatchDelete:
+    """测试分块并发批量删除"""
+
+    def test_chunks_to_api_limit(self, service):
+        """测试按上限分块并汇总已删除的键"""
+        service._delete_chunk_size = 2
+        service._bucket = MagicMock()
+        service._bucket.batch_delete_objects.side_effect = lambda keys: MagicMock(deleted_keys=list(keys))
+        keys = [f'comic/{i}.jpg' for i in range(5)]
+
+        result = service.delete_pictures_batch(keys + ['comic/0.jpg', ''])
+
+        assert result['success'] is True
+        assert sorted(result['deleted_keys']) == sorted(keys)
+        chunks = [c.args[0] for c in service._bucket.batch_delete_objects.call_args_list]
+        assert sorted(len(c) for c in chunks) == [1, 2, 2]
+        print("OK Chunks to API limit test passed")
+
+    def test_reports_per_key_failures(self, service):
+        """测试分块失败和未删除的键逐个报告"""
+        service._delete_chunk_size = 2
+        service._bucket = MagicMock()
+
+        def batch_delete(keys):
+            if 'comic/2.jpg' in keys:
+                raise RuntimeError('RequestTimeout')
+            return MagicMock(deleted_keys=[k for k in keys if k != 'comic/1.jpg'])
+
+        service._bucket.batch_delete_objects.side_effect = batch_delete
+
+        result = service.delete_pictures_batch([f'comic/{i}.jpg' for i in range(4)])
+
+        assert result['success'] is False
+        assert result['deleted_keys'] == ['comic/0.jpg']
+        failed = {item['object_key']: item['error'] for item in result['failed']}
+        assert failed == {
+            'comic/1.jpg': 'Not reported as deleted',
+            'comic/2.jpg': 'RequestTimeout',
+            'comic/3.jpg': 'RequestTimeout'
+        }
+        print("OK Reports per-key failures test passed")
+
+    def test_empty_list(self, service):
+        """测试空列表不调用 OSS"""
+        service._bucket = MagicMock()
+        result = service.delete_pictures_batch([])
+
+        assert result['success'] is True
+        service._bucket.batch_delete_objects.assert_not_called()
+        print("OK Empty list test passed")
+
+
+class TestUploadRouting:
+    """测试按大小选择上传方式"""
+
+    def test_small_content_uses_put_object(self, service):
+        """测试小文件使用 put_object"""
+        service._bucket = MagicMock()
+        service._bucket.put_object.return_value = MagicMock(status=200)
+        callback = MagicMock()
+
+        result = service.upload_picture(b'x' * 100, 'comic/a.jpg', progress_callback=callback)
+
+        assert result['success'] is True
+        service._bucket.put_object.assert_called_once()
+        assert service._bucket.put_object.call_args.kwargs['progress_callback'] is callback
+        service._bucket.init_multipart_upload.assert_not_called()
+        print("OK Small content uses put_object test passed")
+
+    def test_large_content_uploads_parts_in_parallel(self, service):
+        """测试大文件分片上传，分片按序完成并汇报进度"""
+        service._multipart_threshold = 1000
+        service._part_size = 100 * 1024
+        service._bucket = MagicMock()
+        service._bucket.init_multipart_upload.return_value = MagicMock(upload_id='upload-1')
+        service._bucket.upload_part.side_effect = lambda key, upload_id, number, data: MagicMock(etag=f'etag-{number}')
+        progress = []
+        content = b'x' * (250 * 1024)
+
+        with patch('db.storage.picture.oss2.determine_part_size', return_value=100 * 1024):
+            result = service.upload_picture(content, 'video/a.mp4', 'video/mp4',
+                                            progress_callback=lambda done, total: progress.append((done, total)))
+
+        assert result['success'] is True
+        service._bucket.put_object.assert_not_called()
+        parts = service._bucket.complete_multipart_upload.call_args.args[2]
+        assert [(p.part_number, p.etag) for p in parts] == [(1, 'etag-1'), (2, 'etag-2'), (3, 'etag-3')]
+        assert progress[-1] == (len(content), len(content))
+        print("OK Large content uploads parts in parallel test passed")
+
+    def test_multipart_failure_aborts_upload(self, service):
+        """测试分片上传失败时取消上传"""
+        service._multipart_threshold = 10
+        service._bucket = MagicMock()
+        service._bucket.init_multipart_upload.return_value = MagicMock(upload_id='upload-1')
+        service._bucket.upload_part.side_effect = RuntimeError('connection reset')
+
+        result = service.upload_picture(b'x' * 100, 'video/a.mp4')
+
+        assert result['success'] is False
+        service._bucket.abort_multipart_upload.assert_called_once_with('video/a.mp4', 'upload-1')
+        print("OK Multipart failure aborts upload test passed")
+
+    def test_file_upload_resumes_after_failure(self, service, tmp_path):
+        """测试断点续传上传失败后重试（复用同一个断点存储）"""
+        path = tmp_path / 'video.mp4'
+        path.write_bytes(b'x' * 2048)
+        service._multipart_threshold = 1024
+        service._bucket = MagicMock()
+
+        with patch('db.storage.picture.oss2.resumable_upload',
+                   side_effect=[RuntimeError('timeout'), MagicMock(status=200)]) as resumable:
+            result = service.upload_picture_from_file(str(path), 'video/a.mp4', 'video/mp4')
+
+        assert result['success'] is True
+        assert result['size'] == 2048
+        assert resumable.call_count == 2
+        assert resumable.call_args.kwargs['store'] is service._resumable_store
+        assert resumable.call_args.kwargs['headers'] == {'Content-Type': 'video/mp4'}
+        print("OK File upload resumes after failure test passed")
+
+    def test_stream_put_computes_size_and_hash(self, service):
+        """测试流式上传一次读取即得到大小和 SHA-256"""
+        service._bucket = MagicMock()
+        service._bucket.put_object.side_effect = lambda key, data, **kwargs: (data.read(), MagicMock(status=200))[1]
+        content = b'picture-bytes' * 100
+
+        result = service.upload_picture_stream(io.BytesIO(content), 'comic/a.png', 'image/png')
+
+        assert result['success'] is True
+        assert result['size'] == len(content)
+        assert result['sha256'] == hashlib.sha256(content).hexdigest()
+        assert service._bucket.put_object.call_args.args[1].len == len(content)
+        print("OK Stream put computes size and hash test passed")
+
+    def test_stream_multipart_reads_parts_sequentially(self, service):
+        """测试大文件流按分片读取上传"""
+        service._multipart_threshold = 1000
+        service._part_size = 100 * 1024
+        service._bucket = MagicMock()
+        service._bucket.init_multipart_upload.return_value = MagicMock(upload_id='upload-1')
+        service._bucket.upload_part.side_effect = lambda key, upload_id, number, data: MagicMock(etag=f'etag-{number}')
+        content = os.urandom(250 * 1024)
+
+        with patch('db.storage.picture.oss2.determine_part_size', return_value=100 * 1024):
+            result = service.upload_picture_stream(io.BytesIO(content), 'comic/a.png', 'image/png')
+
+        assert result['success'] is True
+        assert result['size'] == len(content)
+        assert result['sha256'] == hashlib.sha256(content).hexdigest()
+        sizes = [len(c.args[3]) for c in service._bucket.upload_part.call_args_list]
+        assert sorted(sizes) == [50 * 1024, 100 * 1024, 100 * 1024]
+        print("OK Stream multipart reads parts sequentially test passed")
+
+
+class TestDirectUpload:
+    """测试浏览器直传签名"""
+
+    def test_post_policy_scoped_and_signed(self, service):
+        """测试 PostObject Policy 限定对象键、类型和大小，签名可验证"""
+        import base64, hashlib, hmac, json
+
+        result = service.generate_post_policy('comic/u1/a.png', 'image/png', 1024, expires=600)
+
+        fields = result['fields']
+        assert result['url'] == 'https://narloom-test.oss-cn-shanghai.aliyuncs.com'
+        assert fields['key'] == 'comic/u1/a.png'
+        policy = json.loads(base64.b64decode(fields['policy']))
+        assert ['eq', '$key', 'comic/u1/a.png'] in policy['conditions']
+        assert ['eq', '$Content-Type', 'image/png'] in policy['conditions']
+        assert ['content-length-range', 1, 1024] in policy['conditions']
+        expected = base64.b64encode(hmac.new(b'test-key-secret', fields['policy'].encode(),
+                                             hashlib.sha1).digest()).decode()
+        assert fields['Signature'] == expected
+        print("OK Post policy scoped and signed test passed")
+
+    def test_put_url_signs_content_type(self, service):
+        """测试 PUT 签名 URL 包含 Content-Type"""
+        with patch.object(service._bucket, 'sign_url', return_value='https://signed') as sign_url:
+            result = service.generate_put_url('comic/u1/a.png', 'image/png', expires=600)
+
+        sign_url.assert_called_once_with('PUT', 'comic/u1/a.png', 600, headers={'Content-Type': 'image/png'})
+        assert result['url'] == 'https://signed'
+        assert result['headers'] == {'Content-Type': 'image/png'}
+        print("OK PUT URL signs content type test passed")
+
+
+class TestObjectStream:
+    """测试分块流式读取"""
+
+    def _result(self, content, status=206):
+        result = MagicMock(status=status, content_length=len(content), content_type='video/mp4', etag='ABC')
+        result.headers = {'Content-Range': f'bytes 100-{100 + len(content) - 1}/5000',
+                          'Last-Modified': 'Mon, 19 Oct 2026 00:00:00 GMT'}
+        result.read.side_effect = io.BytesIO(content).read
+        return result
+
+    def test_range_streamed_in_chunks(self, service):
+        """测试按范围请求并分块返回，迭代结束后释放连接"""
+        content = b'v' * 1000
+        result = self._result(content)
+        service._bucket = MagicMock()
+        service._bucket.get_object.return_value = result
+
+        stream = service.get_object_stream('video/a.mp4', byte_range=(100, 1099), chunk_size=300)
+
+        assert stream['status'] == 206
+        assert stream['content_range'] == 'bytes 100-1099/5000'
+        assert service._bucket.get_object.call_args.kwargs['byte_range'] == (100, 1099)
+        chunks = list(stream['chunks'])
+        assert [len(c) for c in chunks] == [300, 300, 300, 100]
+        result.close.assert_called_once()
+        print("OK Range streamed in chunks test passed")
+
+    def test_if_none_match_not_modified(self, service):
+        """测试 ETag 未变化时返回 not_modified"""
+        service._bucket = MagicMock()
+        service._bucket.get_object.side_effect = oss2.exceptions.NotModified(
+            304, {'ETag': '"ABC"'}, '', {})
+
+        stream = service.get_object_stream('video/a.mp4', if_none_match='"ABC"')
+
+        assert stream['not_modified'] is True
+        assert stream['etag'] == 'ABC'
+        assert service._bucket.get_object.call_args.kwargs['headers']['If-None-Match'] == '"ABC"'
+        print("OK If-None-Match not modified test passed")
+
+    def test_invalid_range(self, service):
+        """测试范围越界返回 range_not_satisfiable"""
+        service._bucket = MagicMock()
+        service._bucket.get_object.side_effect = oss2.exceptions.ServerError(
+            416, {}, '', {'Code': 'InvalidRange', 'ActualObjectSize': '5000'})
+
+        stream = service.get_object_stream('video/a.mp4', byte_range=(9000, None))
+
+        assert stream['range_not_satisfiable'] is True
+        assert stream['size'] == '5000'
+        print("OK Invalid range test passed")
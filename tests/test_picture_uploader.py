@@ -0,0 +1,299 @@
+"""
+测试浏览器直传 OSS 的上传凭证与完成回调。
+"""
+import sys
+import os
+import io
+import hashlib
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch, MagicMock
+import pytest
+from flask import Flask
+from utils import picture_uploader
+from utils.picture_uploader import create_direct_upload, complete_direct_upload
+
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test-secret'
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def mock_oss():
+    with patch.object(picture_uploader, 'oss_service') as oss:
+        oss.generate_object_key.return_value = 'comic/user-1/2026/04/abcd1234.png'
+        oss.generate_post_policy.return_value = {'url': 'https://bucket', 'fields': {}, 'expires_at': 'soon'}
+        oss.get_picture_url.return_value = {'success': True, 'url': 'https://bucket/comic/user-1/a.png?Signature=x'}
+        yield oss
+
+
+def _token(mock_oss):
+    upload_info, error = create_direct_upload('user-1', 'page1.png', 'image/png')
+    assert error is None
+    return upload_info['upload_token']
+
+
+class TestCreateDirectUpload:
+    """测试签发上传凭证"""
+
+    def test_create_post_policy(self, app_context, mock_oss):
+        """测试签发 PostObject 凭证"""
+        upload_info, error = create_direct_upload('user-1', 'page1.png', 'image/png', file_size=2048)
+
+        assert error is None
+        assert upload_info['method'] == 'post'
+        assert upload_info['object_key'] == 'comic/user-1/2026/04/abcd1234.png'
+        assert upload_info['upload_token']
+        mock_oss.generate_object_key.assert_called_once_with('user-1', 'png')
+        print("OK Create post policy test passed")
+
+    def test_rejects_invalid_request(self, app_context, mock_oss):
+        """测试拒绝非图片类型和超限大小"""
+        _, error = create_direct_upload('user-1', 'a.exe', 'application/octet-stream')
+        assert error[1] == 400
+
+        _, error = create_direct_upload('user-1', 'a.png', 'image/png', file_size=100 * 1024 * 1024)
+        assert error[1] == 400
+
+        mock_oss.generate_post_policy.assert_not_called()
+        print("OK Rejects invalid request test passed")
+
+
+class TestCompleteDirectUpload:
+    """测试完成上传回调"""
+
+    @patch.object(picture_uploader, 'create_picture_asset')
+    @patch.object(picture_uploader, 'MongoService')
+    def test_complete_creates_asset(self, mock_mongo, mock_create, app_context, mock_oss):
+        """测试校验通过后创建 asset"""
+        mock_mongo.return_value.fetch_asset_by_object_key.return_value = None
+        mock_oss.get_object_meta.return_value = {'success': True, 'size': 2048, 'content_type': 'image/png'}
+        mock_create.return_value = ('https://bucket/comic/user-1/a.png', 'asset-1', None)
+
+        result, error = complete_direct_upload(_token(mock_oss), 'user-1')
+
+        assert error is None
+        assert result['asset_id'] == 'asset-1'
+        assert result['file_size'] == 2048
+        mock_create.assert_called_once_with('user-1', None, 'comic/user-1/2026/04/abcd1234.png',
+                                            'https://bucket/comic/user-1/a.png?Signature=x', 'page1.png', 2048)
+        print("OK Complete creates asset test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_complete_rejects_mismatched_object(self, mock_mongo, app_context, mock_oss):
+        """测试类型不符的对象被删除"""
+        mock_mongo.return_value.fetch_asset_by_object_key.return_value = None
+        mock_oss.get_object_meta.return_value = {'success': True, 'size': 2048, 'content_type': 'text/html'}
+
+        result, error = complete_direct_upload(_token(mock_oss), 'user-1')
+
+        assert result is None
+        assert error[1] == 400
+        mock_oss.delete_picture.assert_called_once_with('comic/user-1/2026/04/abcd1234.png')
+        print("OK Complete rejects mismatched object test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_complete_is_idempotent(self, mock_mongo, app_context, mock_oss):
+        """测试重复完成返回已创建的 asset"""
+        mock_mongo.return_value.fetch_asset_by_object_key.return_value = {
+            'asset_id': 'asset-1', 'asset_data': {'oss_url': 'https://bucket/a.png', 'file_size': 2048}}
+
+        result, error = complete_direct_upload(_token(mock_oss), 'user-1')
+
+        assert error is None
+        assert result['asset_id'] == 'asset-1'
+        mock_oss.get_object_meta.assert_not_called()
+        print("OK Complete is idempotent test passed")
+
+    def test_complete_rejects_other_user_and_tampered_token(self, app_context, mock_oss):
+        """测试其他用户或篡改的凭证被拒绝"""
+        token = _token(mock_oss)
+
+        _, error = complete_direct_upload(token, 'user-2')
+        assert error[1] == 403
+
+        _, error = complete_direct_upload(token[:-2] + 'xx', 'user-1')
+        assert error[1] == 400
+        print("OK Complete rejects other user and tampered token test passed")
+
+
+class TestStreamPictureFile:
+    """测试表单上传流式写入 OSS 与内容去重"""
+
+    CONTENT = b'picture-bytes' * 100
+    CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+    CONTENT_KEY = f'comic/sha256/{CONTENT_HASH[:2]}/{CONTENT_HASH}.png'
+    EXISTING_KEY = 'comic/user-2/2026/03/old.png'
+
+    def _file(self):
+        return MagicMock(filename='page1.png', content_type='image/png', stream=io.BytesIO(self.CONTENT))
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_new_content_uploaded_to_content_key(self, mock_mongo, app_context, mock_oss):
+        """测试新内容上传到内容寻址对象键，按内容哈希查询成功时不再检查 OSS"""
+        file = self._file()
+        mock_mongo.return_value.fetch_asset_by_content_hash.return_value = None
+        mock_oss.generate_content_object_key.return_value = self.CONTENT_KEY
+        mock_oss.upload_picture_stream.return_value = {
+            'success': True, 'object_key': self.CONTENT_KEY,
+            'url': 'https://bucket/a.png', 'size': len(self.CONTENT), 'sha256': self.CONTENT_HASH
+        }
+
+        result, error = picture_uploader.stream_picture_file(file, 'user-1')
+
+        assert error is None
+        assert result['deduplicated'] is False
+        assert result['size'] == len(self.CONTENT)
+        mock_oss.generate_content_object_key.assert_called_with(self.CONTENT_HASH, 'png')
+        mock_oss.get_object_meta.assert_not_called()
+        call = mock_oss.upload_picture_stream.call_args.kwargs
+        assert call['stream'] is file.stream
+        assert call['object_key'] == self.CONTENT_KEY
+        # 计算哈希后流已复位
+        assert file.stream.tell() == 0
+        print("OK New content uploaded to content key test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_existing_content_skips_upload(self, mock_mongo, app_context, mock_oss):
+        """测试相同内容已存在时跳过上传"""
+        mock_mongo.return_value.fetch_asset_by_content_hash.return_value = {
+            'asset_id': 'asset-0', 'asset_data': {'oss_object_key': self.EXISTING_KEY}
+        }
+        mock_oss.get_object_meta.return_value = {'success': True, 'size': len(self.CONTENT)}
+
+        result, error = picture_uploader.stream_picture_file(self._file(), 'user-1')
+
+        assert error is None
+        assert result['deduplicated'] is True
+        assert result['object_key'] == self.EXISTING_KEY
+        assert result['sha256'] == self.CONTENT_HASH
+        mock_oss.upload_picture_stream.assert_not_called()
+        print("OK Existing content skips upload test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_lookup_failure_checks_content_key(self, mock_mongo, app_context, mock_oss):
+        """测试按内容哈希查询失败时检查内容寻址对象键，已存在则跳过上传"""
+        mock_mongo.return_value.fetch_asset_by_content_hash.side_effect = Exception('mongo down')
+        mock_oss.generate_content_object_key.return_value = self.CONTENT_KEY
+        mock_oss.get_object_meta.return_value = {'success': True, 'size': len(self.CONTENT)}
+
+        result, error = picture_uploader.stream_picture_file(self._file(), 'user-1')
+
+        assert error is None
+        assert result['object_key'] == self.CONTENT_KEY
+        mock_oss.get_object_meta.assert_called_once_with(self.CONTENT_KEY)
+        mock_oss.upload_picture_stream.assert_not_called()
+        print("OK Lookup failure checks content key test passed")
+
+    def _dedup_result(self):
+        return {'success': True, 'object_key': self.EXISTING_KEY, 'url': 'https://bucket/old.png',
+                'size': len(self.CONTENT), 'sha256': self.CONTENT_HASH, 'deduplicated': True}
+
+    @patch.object(picture_uploader, 'image_processing_service')
+    @patch.object(picture_uploader, 'MySQLService')
+    @patch.object(picture_uploader, 'MongoService')
+    def test_reused_object_only_inserts_metadata(self, mock_mongo, mock_mysql, mock_images,
+                                                 app_context, mock_oss):
+        """测试复用已有对象时只插入元数据、刷新引用数，不写入 OSS"""
+        mock_mysql.return_value.insert_asset.return_value = {'asset_id': 'asset-1'}
+        mock_oss.get_object_meta.return_value = {'success': True, 'size': len(self.CONTENT)}
+
+        url, asset_id, error = picture_uploader.create_streamed_picture_asset(
+            'user-1', None, self._dedup_result(), self._file())
+
+        assert error is None and asset_id == 'asset-1'
+        assert url == 'https://bucket/old.png'
+        inserted = mock_mongo.return_value.insert_asset_data.call_args.args[1]
+        assert inserted['oss_object_key'] == self.EXISTING_KEY
+        mock_mongo.return_value.refresh_object_references.assert_called_once_with([self.EXISTING_KEY])
+        mock_oss.get_object_meta.assert_called_once_with(self.EXISTING_KEY)
+        mock_oss.upload_picture_stream.assert_not_called()
+        print("OK Reused object only inserts metadata test passed")
+
+    @patch.object(picture_uploader, 'image_processing_service')
+    @patch.object(picture_uploader, 'MySQLService')
+    @patch.object(picture_uploader, 'MongoService')
+    def test_reused_object_deleted_concurrently(self, mock_mongo, mock_mysql, mock_images,
+                                                app_context, mock_oss):
+        """测试复用的对象在插入 asset_data 前被并发删除时，从上传文件重新写回同一对象键"""
+        mock_mysql.return_value.insert_asset.return_value = {'asset_id': 'asset-1'}
+        mock_oss.get_object_meta.return_value = {'success': False, 'not_found': True}
+        mock_oss.upload_picture_stream.return_value = {'success': True, 'object_key': self.EXISTING_KEY}
+        file = self._file()
+        file.stream.read()
+
+        url, asset_id, error = picture_uploader.create_streamed_picture_asset(
+            'user-1', None, self._dedup_result(), file)
+
+        assert error is None and asset_id == 'asset-1'
+        call = mock_oss.upload_picture_stream.call_args.kwargs
+        assert call['object_key'] == self.EXISTING_KEY
+        assert call['stream'] is file.stream and file.stream.tell() == 0
+        mock_images.submit_renditions.assert_called_with(self.EXISTING_KEY)
+        print("OK Reused object deleted concurrently test passed")
+
+
+class TestReleasePictureObjects:
+    """测试按引用数删除 OSS 对象"""
+
+    @patch.object(picture_uploader, 'image_processing_service')
+    @patch.object(picture_uploader, 'MongoService')
+    def test_only_unreferenced_objects_deleted(self, mock_mongo, mock_images, app_context, mock_oss):
+        """测试仍被引用的对象保留，未引用对象及其副本删除"""
+        mock_mongo.return_value.refresh_object_references.return_value = {'shared.png': 2, 'single.png': 0}
+        mock_images.rendition_prefix.return_value = 'rendition/single/'
+        mock_oss.list_pictures.return_value = {
+            'success': True, 'is_truncated': False,
+            'pictures': [{'object_key': 'rendition/single/thumb.webp'}]
+        }
+        mock_oss.delete_pictures_batch.return_value = {'success': True, 'deleted_keys': ['single.png'], 'failed': []}
+
+        result = picture_uploader.release_picture_objects(['shared.png', 'single.png', 'shared.png'])
+
+        mock_mongo.return_value.refresh_object_references.assert_called_once_with(['shared.png', 'single.png'])
+        mock_images.rendition_prefix.assert_called_once_with('single.png')
+        mock_oss.delete_pictures_batch.assert_called_once_with(['single.png', 'rendition/single/thumb.webp'])
+        assert result['retained_keys'] == ['shared.png']
+        print("OK Only unreferenced objects deleted test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_renditions_from_previous_config_deleted(self, mock_mongo, app_context, mock_oss):
+        """测试按前缀列出副本删除：修改副本配置前生成的副本也一并删除，列出失败时退回当前配置"""
+        mock_mongo.return_value.refresh_object_references.return_value = {'comic/a.png': 0}
+        mock_oss.list_pictures.side_effect = [
+            {'success': True, 'is_truncated': True, 'next_marker': 'm1',
+             'pictures': [{'object_key': 'rendition/comic/a/thumb.jpg'}]},
+            {'success': True, 'is_truncated': False,
+             'pictures': [{'object_key': 'rendition/comic/a/thumb.webp'}]},
+        ]
+        mock_oss.delete_pictures_batch.return_value = {'success': True, 'deleted_keys': [], 'failed': []}
+
+        picture_uploader.release_picture_objects(['comic/a.png'])
+
+        assert mock_oss.list_pictures.call_args_list[0].kwargs['prefix'] == 'rendition/comic/a/'
+        assert mock_oss.list_pictures.call_args_list[1].kwargs['marker'] == 'm1'
+        mock_oss.delete_pictures_batch.assert_called_once_with(
+            ['comic/a.png', 'rendition/comic/a/thumb.jpg', 'rendition/comic/a/thumb.webp'])
+
+        mock_oss.list_pictures.side_effect = None
+        mock_oss.list_pictures.return_value = {'success': False, 'error': 'timeout', 'pictures': []}
+        with patch.object(picture_uploader.image_processing_service, 'rendition_object_keys',
+                          return_value=['rendition/comic/a/thumb.webp']):
+            picture_uploader.release_picture_objects(['comic/a.png'])
+        assert mock_oss.delete_pictures_batch.call_args.args[0] == ['comic/a.png', 'rendition/comic/a/thumb.webp']
+        print("OK Renditions from previous config deleted test passed")
+
+    @patch.object(picture_uploader, 'MongoService')
+    def test_all_referenced_skips_delete(self, mock_mongo, app_context, mock_oss):
+        """测试全部仍被引用时不调用删除"""
+        mock_mongo.return_value.refresh_object_references.return_value = {'shared.png': 1}
+
+        result = picture_uploader.release_picture_objects(['shared.png'])
+
+        mock_oss.delete_pictures_batch.assert_not_called()
+        assert result['deleted_keys'] == []
+        print("OK All referenced skips delete test passed")
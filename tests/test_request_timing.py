@@ -0,0 +1,100 @@
+"""
+测试请求耗时分解（Server-Timing）。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from flask import Flask
+from db.base_service import TimedDictCursor
+from services import request_timing as timing
+from services.request_timing import RequestTimingMiddleware, mongo_command_timer, track, MYSQL, OSS
+from utils.response_helper import api_response
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['REQUEST_TIMING_SLOW_MS'] = 1000
+    RequestTimingMiddleware().init_app(app)
+
+    @app.route('/work')
+    def get_work():
+        with track(MYSQL):
+            pass
+        with track(MYSQL):
+            pass
+        mongo_command_timer.succeeded(SimpleNamespace(duration_micros=2500))
+        return api_response(success=True, data={'work_id': 'w1'})
+
+    @app.route('/batch')
+    def batch():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, timing.record, OSS, 0.01)
+                       for _ in range(3)]
+            for future in futures:
+                future.result()
+        return api_response(success=True, data=[])
+
+    return app
+
+
+class TestRequestTiming:
+    """测试 Server-Timing 响应头与日志字段"""
+
+    def test_server_timing_header(self, app, caplog):
+        """测试按数据源输出调用次数和耗时"""
+        with caplog.at_level(logging.INFO, logger='request_timing'):
+            with app.test_client() as client:
+                response = client.get('/work')
+
+        header = response.headers['Server-Timing']
+        assert header.startswith('mysql;dur=')
+        assert 'desc="2 queries"' in header
+        assert 'mongo;dur=2.5;desc="1 ops"' in header
+        assert 'oss' not in header and 'total;dur=' in header
+
+        record = caplog.records[-1]
+        assert record.request_path == '/work'
+        assert record.status_code == 200
+        assert (record.mysql_count, record.mongo_count, record.oss_count) == (2, 1, 0)
+        assert record.mongo_ms == 2.5
+        print("OK Server-Timing header test passed")
+
+    def test_worker_threads_count_toward_request(self, app):
+        """测试线程池子任务复制上下文后计入当前请求"""
+        with app.test_client() as client:
+            response = client.get('/batch')
+        assert 'oss;dur=' in response.headers['Server-Timing']
+        assert 'desc="3 requests"' in response.headers['Server-Timing']
+        print("OK Worker threads count toward request test passed")
+
+    def test_no_recording_outside_request(self, app):
+        """测试请求之外的调用不记录，请求结束后上下文被清理"""
+        with app.test_client() as client:
+            client.get('/work')
+        mongo_command_timer.succeeded(SimpleNamespace(duration_micros=1000))
+        with track(MYSQL):
+            pass
+        assert timing.current_timings() is None
+        print("OK No recording outside request test passed")
+
+    def test_timed_cursor(self, app):
+        """测试 MySQL 游标 execute 计入统计"""
+        with app.test_request_context('/'):
+            token = timing._current.set(timing.RequestTimings())
+            try:
+                with patch('pymysql.cursors.DictCursor.execute', return_value=1) as execute:
+                    cursor = TimedDictCursor.__new__(TimedDictCursor)
+                    assert cursor.execute('SELECT 1') == 1
+                execute.assert_called_once_with('SELECT 1', None)
+                assert timing.current_timings().snapshot()[MYSQL]['count'] == 1
+            finally:
+                timing._current.reset(token)
+        print("OK Timed cursor test passed")
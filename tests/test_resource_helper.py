@@ -0,0 +1,124 @@
+"""
+测试资源辅助函数（批量读取）。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from flask import Flask
+from utils import resource_helper
+from utils.resource_helper import get_full_entities
+
+
+def _row(id_field, entity_id, **fields):
+    return dict({id_field: entity_id, 'created_at': '2026-01-01 00:00:00',
+                 'updated_at': '2026-01-01 00:00:00'}, **fields)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['BATCH_FETCH_WORKERS'] = 2
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def services():
+    mocks = {name: MagicMock() for name in (
+        'work_service', 'novel_service', 'anime_service', 'asset_service',
+        'work_details_service', 'anime_details_service', 'asset_data_service')}
+    for mock in mocks.values():
+        for method in ('fetch_works_by_ids', 'fetch_novels_by_ids', 'fetch_novels_by_work_ids',
+                       'fetch_anime_by_ids', 'fetch_anime_by_work_ids', 'fetch_assets_by_ids'):
+            getattr(mock, method).return_value = []
+    with patch.multiple(resource_helper, **mocks):
+        yield mocks
+
+
+class TestGetFullEntities:
+    """测试批量获取作品页面数据"""
+
+    def test_single_query_per_entity(self, app, services):
+        """测试每种实体只执行一次 IN 查询，结果按请求顺序合并 MongoDB 数据"""
+        services['work_service'].fetch_works_by_ids.return_value = [
+            _row('work_id', 'w2', title='B'), _row('work_id', 'w1', title='A')]
+        services['work_details_service'].fetch_multiple_work_details.return_value = {
+            'w1': {'work_id': 'w1', 'asset_ids': ['a1']}}
+        services['anime_service'].fetch_anime_by_ids.return_value = [_row('anime_id', 'n1', work_id='w1')]
+        services['anime_details_service'].fetch_multiple_anime_details.return_value = {
+            'n1': {'anime_id': 'n1', 'video_assets': [{'asset_id': 'v1'}]}}
+
+        result = get_full_entities(work_ids=['w1', 'w2', 'w1', 'w3'], anime_ids=['n1'])
+
+        services['work_service'].fetch_works_by_ids.assert_called_once_with(['w1', 'w2', 'w3'])
+        services['work_details_service'].fetch_multiple_work_details.assert_called_once_with(['w1', 'w2', 'w3'])
+        services['anime_details_service'].fetch_multiple_anime_details.assert_called_once_with(['n1'], [])
+        services['asset_data_service'].fetch_multiple_asset_data.assert_not_called()
+        assert [w['work_id'] for w in result['works']] == ['w1', 'w2']
+        assert result['works'][0]['asset_ids'] == ['a1']
+        assert result['works'][1]['asset_ids'] == []
+        assert result['animes'][0]['video_assets'] == [{'asset_id': 'v1'}]
+        assert result['missing']['works'] == ['w3']
+        print("OK Single query per entity test passed")
+
+    def test_expand_work(self, app, services):
+        """测试 expand 时按 work_id 批量读取章节、镜头和关联资产"""
+        services['work_service'].fetch_works_by_ids.return_value = [_row('work_id', 'w1')]
+        services['work_details_service'].fetch_multiple_work_details.return_value = {
+            'w1': {'work_id': 'w1', 'asset_ids': ['a1', 'a2']}}
+        services['novel_service'].fetch_novels_by_work_ids.return_value = [
+            _row('novel_id', 'c1', work_id='w1', novel_number=1)]
+        services['anime_service'].fetch_anime_by_work_ids.return_value = [_row('anime_id', 'n1', work_id='w1')]
+        services['anime_details_service'].fetch_multiple_anime_details.return_value = {}
+        services['asset_service'].fetch_assets_by_ids.side_effect = lambda ids: [
+            _row('asset_id', i, user_id='u1', work_id='w1', asset_type='character') for i in ids]
+        services['asset_data_service'].fetch_multiple_asset_data.side_effect = lambda ids: {
+            i: {'name': i} for i in ids}
+
+        result = get_full_entities(work_ids=['w1'], asset_ids=['a2'], expand=True)
+
+        services['novel_service'].fetch_novels_by_work_ids.assert_called_once_with(['w1'])
+        services['anime_details_service'].fetch_multiple_anime_details.assert_called_once_with([], ['w1'])
+        services['asset_data_service'].fetch_multiple_asset_data.assert_any_call(['a1'])
+        assert [n['novel_id'] for n in result['novels']] == ['c1']
+        assert [n['anime_id'] for n in result['animes']] == ['n1']
+        assert [a['asset_id'] for a in result['assets']] == ['a2', 'a1']
+        assert result['assets'][1]['asset_data'] == {'name': 'a1'}
+        assert result['missing'] == {'works': [], 'novels': [], 'animes': [], 'assets': []}
+        print("OK Expand work test passed")
+
+    def test_mongo_runs_concurrently_with_mysql(self, app, services):
+        """测试 MongoDB 查询在线程池中与 MySQL 查询并发执行"""
+        mongo_started = threading.Event()
+        threads = {}
+
+        def fetch_work_details(ids):
+            threads['mongo'] = threading.current_thread().name
+            mongo_started.set()
+            return {}
+
+        def fetch_works(ids):
+            threads['mysql'] = threading.current_thread().name
+            assert mongo_started.wait(1)
+            return []
+
+        services['work_details_service'].fetch_multiple_work_details.side_effect = fetch_work_details
+        services['work_service'].fetch_works_by_ids.side_effect = fetch_works
+
+        get_full_entities(work_ids=['w1'])
+
+        assert threads['mongo'].startswith('batch-fetch')
+        assert threads['mysql'] == threading.current_thread().name
+        print("OK Mongo runs concurrently with MySQL test passed")
+
+    def test_invalid_ids(self, app, services):
+        """测试 ID 列表格式无效或超过上限"""
+        with pytest.raises(ValueError):
+            get_full_entities(work_ids='w1')
+        with pytest.raises(ValueError):
+            get_full_entities(asset_ids=['a1', 'a2', 'a3'], max_ids=2)
+        print("OK Invalid ids test passed")
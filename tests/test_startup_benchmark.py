@@ -0,0 +1,79 @@
+"""
+测试启动性能基准与延迟导入。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch
+from benchmarks.startup_benchmark import (load_history, parse_importtime, print_report, run_once,
+                                          save_record, summarize_imports)
+from utils.lazy_import import lazy_import
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      4000 |       4500 |     oss2.models
+import time:       500 |       5000 |   oss2
+import time:      1000 |       6000 | db.storage.picture
+"""
+
+
+class TestStartupBenchmark:
+    """测试启动基准与延迟导入"""
+
+    def test_parse_importtime(self):
+        """测试解析 -X importtime 输出并按顶层包汇总自身耗时"""
+        entries = parse_importtime(IMPORTTIME_OUTPUT)
+        assert [e['module'] for e in entries] == ['_io', 'oss2.models', 'oss2', 'db.storage.picture']
+        assert entries[0]['depth'] == 1 and entries[1]['depth'] == 2 and entries[3]['depth'] == 0
+        assert entries[3]['cumulative_us'] == 6000
+
+        packages = summarize_imports(entries, top=2)
+        assert packages == [{'package': 'oss2', 'ms': 4.5, 'modules': 2},
+                            {'package': 'db', 'ms': 1.0, 'modules': 1}]
+        print("OK Parse importtime test passed")
+
+    def test_cold_start_defers_oss2(self):
+        """测试冷启动处理首个请求后未导入 oss2"""
+        sample = run_once(importtime=True)
+        assert sample['status_code'] == 200
+        assert sample['time_to_first_request_ms'] >= sample['import_ms'] + sample['create_app_ms']
+        assert sample['rss_mb'] > 0
+        assert 'pymongo' in sample['loaded_modules']
+        assert 'oss2' not in sample['loaded_modules']
+        assert not any(e['module'].split('.')[0] == 'oss2' for e in sample['imports'])
+        print("OK Cold start defers oss2 test passed")
+
+    def test_history_comparison(self, tmp_path, capsys):
+        """测试历史记录追加写入，报告显示与上一次记录的差异"""
+        path = str(tmp_path / 'history.jsonl')
+        base = {'commit': 'abc1234', 'python': '3.11.7', 'init_mode': 'lazy', 'runs': 3,
+                'loaded_modules': ['pymongo'], 'imports': [], 'slowest_modules': []}
+        for metric in ('import_ms', 'create_app_ms', 'first_request_ms', 'time_to_first_request_ms', 'rss_mb'):
+            base[metric] = base[f'{metric}_min'] = 100.0
+        save_record(path, base)
+        save_record(path, dict(base, commit='def5678', import_ms=80.0))
+
+        previous, current = load_history(path)
+        print_report(current, previous)
+        output = capsys.readouterr().out
+        assert '-20.00 (-20.0%) vs abc1234' in output
+        assert 'oss2' in output.split('未导入:')[1]
+        print("OK History comparison test passed")
+
+    def test_lazy_import(self):
+        """测试延迟导入在首次访问属性时才导入，且可 patch 代理上的属性"""
+        sys.modules.pop('wave', None)
+        wave = lazy_import('wave')
+        assert 'wave' not in sys.modules
+        assert 'not loaded' in repr(wave)
+
+        assert wave.Error.__module__ == 'wave'
+        assert 'wave' in sys.modules
+
+        import oss2
+        from db.storage import picture
+        with patch('db.storage.picture.oss2.determine_part_size', return_value=1024):
+            assert picture.oss2.determine_part_size(10 * 1024 * 1024, preferred_size=100) == 1024
+        assert picture.oss2.determine_part_size is oss2.determine_part_size
+        print("OK Lazy import test passed")
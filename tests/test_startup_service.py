@@ -0,0 +1,124 @@
+"""
+测试服务启动方式与存活/就绪探针。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from services.startup_service import StartupService
+
+
+class FakeService:
+    """模拟依赖服务：前 failures 次初始化失败"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self._initialized = False
+
+    def init(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("Can't connect to MySQL server")
+        self._initialized = True
+
+
+def create_app(mode, retry_interval=0.01):
+    app = Flask(__name__)
+    app.config.update(SERVICE_INIT_MODE=mode, SERVICE_WARMUP_RETRY_INTERVAL=retry_interval)
+    startup = StartupService()
+    startup.init_app(app)
+    return app, startup
+
+
+def register(startup, name, service, critical=True):
+    startup.register(name, init=service.init, ready=lambda: service._initialized, critical=critical)
+
+
+class TestStartupService:
+    """测试服务初始化方式与就绪状态"""
+
+    def test_background_warm_up(self):
+        """测试后台预热记录各服务初始化耗时，完成后执行启动任务并就绪"""
+        app, startup = create_app('background')
+        mysql, oss = FakeService(), FakeService()
+        register(startup, 'mysql', mysql)
+        register(startup, 'oss', oss, critical=False)
+        recovered = []
+        startup.defer('video_task_recovery', lambda: recovered.append(mysql._initialized))
+        assert mysql.calls == 0
+
+        startup.start()
+        assert startup.wait(timeout=5)
+
+        with app.test_client() as client:
+            response = client.get('/rest/v1/health/ready')
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        assert data['mode'] == 'background'
+        assert data['app_init_ms'] is not None and data['warmup_ms'] is not None
+        assert data['services']['mysql']['state'] == 'ready'
+        assert data['services']['mysql']['duration_ms'] is not None
+        assert data['services']['oss']['critical'] is False
+        assert recovered == [True]
+        print("OK Background warm-up test passed")
+
+    def test_critical_failure_retried(self):
+        """测试关键服务初始化失败时就绪探针返回 503，重试成功后恢复"""
+        app, startup = create_app('background')
+        mysql = FakeService(failures=2)
+        register(startup, 'mysql', mysql)
+
+        startup._initialize('mysql')
+        with app.test_client() as client:
+            response = client.get('/rest/v1/health/ready')
+            assert response.status_code == 503
+            service = response.get_json()['data']['services']['mysql']
+            assert service['state'] == 'failed'
+            assert "Can't connect" in service['error']
+
+            startup.start()
+            assert startup.wait(timeout=5)
+            response = client.get('/rest/v1/health/ready')
+        assert response.status_code == 200
+        assert response.get_json()['data']['services']['mysql']['attempts'] == 3
+        print("OK Critical failure retried test passed")
+
+    def test_lazy_mode(self):
+        """测试 lazy 模式不初始化服务，首次使用前即就绪，存活探针始终可用"""
+        app, startup = create_app('lazy')
+        mysql = FakeService()
+        register(startup, 'mysql', mysql)
+        startup.start()
+        assert startup.wait(timeout=5)
+
+        with app.test_client() as client:
+            assert client.get('/rest/v1/health/live').status_code == 200
+            response = client.get('/rest/v1/health/ready')
+            assert response.status_code == 200
+            assert response.get_json()['data']['services']['mysql']['state'] == 'pending'
+            assert mysql.calls == 0
+
+            # 首次使用时的初始化反映在就绪状态中
+            mysql.init()
+            response = client.get('/rest/v1/health/ready')
+        assert response.get_json()['data']['services']['mysql']['state'] == 'ready'
+        print("OK Lazy mode test passed")
+
+    def test_eager_mode(self):
+        """测试 eager 模式同步初始化，关键服务失败时抛出异常，非关键服务失败不影响启动"""
+        app, startup = create_app('eager')
+        mysql = FakeService()
+        register(startup, 'mysql', mysql)
+        assert mysql._initialized
+
+        register(startup, 'oss', FakeService(failures=1), critical=False)
+        with pytest.raises(RuntimeError, match='mongo.asset_data'):
+            register(startup, 'mongo.asset_data', FakeService(failures=1))
+
+        ready, data = startup.readiness()
+        assert not ready
+        assert data['services']['oss']['state'] == 'failed'
+        print("OK Eager mode test passed")
@@ -572,8 +572,15 @@ class TestHelperMethods:
         assert "&x-oss-process=image/crop" in result
         print("OK Crop image region with query params test passed")
 
-    def test_stitch_videos(self):
+    @patch('services.video_generation_service.video_stitching_service')
+    def test_stitch_videos(self, mock_stitching):
         """测试拼接视频片段"""
+        mock_stitching.stitch.return_value = {
+            "success": True,
+            "video_url": "https://oss/stitched.mp4",
+            "object_key": "video/stitched/2026/10/abc.mp4",
+            "duration": 9.5
+        }
         service = VideoGenerationService()
 
         videos = [
@@ -583,11 +590,24 @@ class TestHelperMethods:
 
         result = service._stitch_videos(videos, "smooth")
 
-        assert result["video_url"] == "https://video1.mp4"
-        assert result["preview_url"] == "https://preview1.gif"
-        assert result["duration"] == 6  # 2 个视频 * 3 秒
+        assert result["video_url"] == "https://oss/stitched.mp4"
+        assert result["duration"] == 9.5
+        mock_stitching.stitch.assert_called_once_with(
+            ["https://video1.mp4", "https://video2.mp4"], transition="smooth")
         print("OK Stitch videos test passed")
 
+    @patch('services.video_generation_service.video_stitching_service')
+    def test_merge_videos_stitching_failure(self, mock_stitching):
+        """测试拼接失败时不再返回第一个视频作为占位"""
+        mock_stitching.stitch.return_value = {"success": False, "error": "ffmpeg is not available"}
+        service = VideoGenerationService()
+
+        result = service.merge_videos(["https://video1.mp4", "https://video2.mp4"])
+
+        assert result["success"] is False
+        assert "ffmpeg" in result["error"]
+        print("OK Merge videos stitching failure test passed")
+
     def test_stitch_videos_empty_list(self):
         """测试拼接空视频列表"""
         service = VideoGenerationService()
@@ -599,6 +619,174 @@ class TestHelperMethods:
         print("OK Stitch videos empty list test passed (expected IndexError)")
 
 
+class TestVisionCache:
+    """测试视觉分析结果缓存"""
+
+    @patch('services.video_generation_service.vision_cache_service')
+    @patch('services.video_generation_service.image_processing_service')
+    @patch('services.video_generation_service.requests.post')
+    def test_detect_comic_panels_cache_hit(self, mock_post, mock_image, mock_cache):
+        """测试分格检测命中缓存时不调用视觉模型"""
+        mock_image.content_hash.return_value = "a" * 64
+        mock_cache.build_cache_key.return_value = "cache-key"
+        mock_cache.delete_stale_results.return_value = 0
+        mock_cache.fetch_result.return_value = {"panels": [{"index": 1, "bbox": [0, 0, 10, 10]}]}
+
+        service = VideoGenerationService()
+        result = service.detect_comic_panels("https://example.com/image.jpg")
+
+        assert result["success"] is True
+        assert result["cache_hit"] is True
+        assert len(result["panels"]) == 1
+        mock_post.assert_not_called()
+        print("OK Detect comic panels cache hit test passed")
+
+    @patch('services.video_generation_service.vision_cache_service')
+    @patch('services.video_generation_service.image_processing_service')
+    @patch('services.video_generation_service.requests.post')
+    def test_detect_comic_panels_cache_miss_saves(self, mock_post, mock_image, mock_cache):
+        """测试分格检测未命中缓存时保存结果"""
+        mock_image.content_hash.return_value = "b" * 64
+        mock_image.prepare_vision_image.return_value = {
+            "data": "aW1hZ2U=", "mime_type": "image/png",
+            "width": 100, "height": 100, "original_width": 100, "original_height": 100
+        }
+        mock_cache.build_cache_key.return_value = "cache-key"
+        mock_cache.delete_stale_results.return_value = 0
+        mock_cache.fetch_result.return_value = None
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": '{"panels": []}'}}]
+        }
+        mock_post.return_value = mock_response
+
+        service = VideoGenerationService()
+        result = service.detect_comic_panels("https://example.com/image.jpg")
+
+        assert result["success"] is True
+        assert result["cache_hit"] is False
+        assert mock_cache.save_result.called
+        assert mock_cache.save_result.call_args.kwargs["task"] == "panel_detect"
+        image_content = mock_post.call_args.kwargs["json"]["messages"][-1]["content"][1]
+        assert image_content["image_url"].startswith("data:image/png;base64,")
+        print("OK Detect comic panels cache miss test passed")
+
+    def test_scale_panel_bboxes_to_original(self):
+        """测试缩放后图片上的分格坐标映射回原图"""
+        result = {"panels": [{"index": 1, "bbox": [10, 20, 500, 400]}]}
+        image_data = {"width": 500, "height": 400, "original_width": 2000, "original_height": 1600}
+
+        VideoGenerationService._scale_panel_bboxes(result, image_data)
+
+        assert result["panels"][0]["bbox"] == [40, 80, 2000, 1600]
+        print("OK Scale panel bboxes test passed")
+
+    @patch('services.video_generation_service.image_processing_service')
+    @patch('services.video_generation_service.requests.post')
+    def test_text_result_asks_for_original_coordinates(self, mock_post, mock_image):
+        """测试图片缩放后，文本结果的请求告知模型原图尺寸，JSON 结果仍在返回后映射坐标"""
+        mock_image.prepare_vision_image.return_value = {
+            "data": "aW1hZ2U=", "mime_type": "image/png",
+            "width": 500, "height": 400, "original_width": 2000, "original_height": 1600
+        }
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": '{"panels": [{"index": 1, "bbox": [10, 20, 500, 400]}]}'}}]
+        }
+        mock_post.return_value = mock_response
+        service = VideoGenerationService()
+
+        service._call_vision_model(model="qwen-vl-max", system_prompt="分析图片",
+                                   image_url="https://example.com/image.jpg")
+        text = mock_post.call_args.kwargs["json"]["messages"][-1]["content"][0]["text"]
+        assert "原图尺寸为 2000x1600" in text
+
+        result = service._call_vision_model(model="qwen-vl-max", system_prompt="分析图片",
+                                            image_url="https://example.com/image.jpg", expect_json=True)
+        text = mock_post.call_args.kwargs["json"]["messages"][-1]["content"][0]["text"]
+        assert text == "请分析这张图片"
+        assert result["panels"][0]["bbox"] == [40, 80, 2000, 1600]
+        print("OK Text result asks for original coordinates test passed")
+
+    def test_prompt_version_changes_with_template(self):
+        """测试提示词模板变更时提示词版本变化"""
+        v1 = VideoGenerationService._prompt_version(VideoGenerationService.PANEL_DETECT_SYSTEM_PROMPT)
+        v2 = VideoGenerationService._prompt_version(VideoGenerationService.PANEL_DETECT_SYSTEM_PROMPT + " ")
+        assert v1 != v2
+        print("OK Prompt version test passed")
+
+
+class TestVideoTaskPersistence:
+    """测试视频生成任务持久化与恢复"""
+
+    PAYLOAD = {
+        "model": "wan2.6-i2v",
+        "input": {"img_url": "https://example.com/image.jpg", "prompt": "动起来"},
+        "parameters": {"duration": 5}
+    }
+
+    @patch('services.video_generation_service.time.sleep')
+    @patch('services.video_generation_service.video_task_service')
+    @patch('services.video_generation_service.requests.get')
+    @patch('services.video_generation_service.requests.post')
+    def test_submit_records_task_lifecycle(self, mock_post, mock_get, mock_tasks, mock_sleep):
+        """测试提交、轮询、完成各阶段写入 video_tasks"""
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {"output": {"task_id": "ds-task"}})
+        mock_get.side_effect = [
+            MagicMock(status_code=200, json=lambda: {"output": {"task_status": "RUNNING"}}),
+            MagicMock(status_code=200, json=lambda: {
+                "output": {"task_status": "SUCCEEDED", "video_url": "https://video.mp4"}}),
+        ]
+
+        service = VideoGenerationService()
+        result = service._submit_video_task(self.PAYLOAD, "/video-synthesis", "wan2.6-i2v", "user-1")
+
+        assert result["success"] is True
+        assert result["job_id"]
+        assert mock_tasks.insert_task.call_args.args[0] == result["job_id"]
+        mock_tasks.mark_submitted.assert_called_once_with(result["job_id"], "ds-task")
+        assert mock_tasks.record_poll.call_args.args[1] == "running"
+        assert mock_tasks.mark_succeeded.call_args.args[1] == "https://video.mp4"
+        print("OK Submit records task lifecycle test passed")
+
+    @patch('services.video_generation_service.video_task_service')
+    @patch('services.video_generation_service.requests.post')
+    def test_task_store_unavailable(self, mock_post, mock_tasks):
+        """测试任务存储不可用时不影响提交"""
+        mock_tasks.insert_task.side_effect = RuntimeError("MongoDB configuration incomplete")
+        mock_post.return_value = MagicMock(status_code=500, text="error")
+
+        service = VideoGenerationService()
+        result = service._submit_video_task(self.PAYLOAD, "/video-synthesis", "wan2.6-i2v")
+
+        assert result["success"] is False
+        # 任务 ID 仍用于事件推送，但不再写入 video_tasks
+        assert result["job_id"]
+        mock_tasks.mark_failed.assert_not_called()
+        print("OK Task store unavailable test passed")
+
+    @patch('services.video_generation_service.video_task_service')
+    def test_recover_video_tasks(self, mock_tasks):
+        """测试启动恢复：已提交的任务后台轮询，提交前中断的任务标记失败"""
+        submitted = {"job_id": "job-1", "task_id": "ds-task", "model": "wan2.6-i2v"}
+        interrupted = {"job_id": "job-2", "task_id": None}
+        mock_tasks.fetch_recoverable_tasks.return_value = [submitted, interrupted]
+        mock_tasks.claim_task.side_effect = [submitted, interrupted]
+
+        service = VideoGenerationService()
+        executor = MagicMock()
+        with patch.object(service, '_get_recovery_executor', return_value=executor):
+            resumed = service.recover_video_tasks()
+
+        assert resumed == 1
+        executor.submit.assert_called_once_with(service._resume_video_task, submitted)
+        mock_tasks.mark_failed.assert_called_once_with("job-2", "Interrupted before submission")
+        print("OK Recover video tasks test passed")
+
+
 def run_all_tests():
     """运行所有测试"""
     print("\n=== Running Video Generation Service Tests ===\n")
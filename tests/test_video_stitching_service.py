@@ -0,0 +1,102 @@
+"""
+测试视频拼接服务类。
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch
+from services.video_stitching_service import (
+    video_stitching_service, parse_probe_result, can_stream_copy,
+    build_concat_copy_command, build_transition_command
+)
+
+
+def _probe(codec='h264', width=1280, height=720, duration='5.0', audio=True):
+    """生成 ffprobe 输出"""
+    streams = [{'codec_type': 'video', 'codec_name': codec, 'width': width, 'height': height,
+                'pix_fmt': 'yuv420p', 'r_frame_rate': '24/1'}]
+    if audio:
+        streams.append({'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channels': 2})
+    return {'streams': streams, 'format': {'duration': duration}}
+
+
+class TestProbeParsing:
+    """测试片段参数解析"""
+
+    def test_parse_probe_result(self):
+        """测试解析时长与编码参数"""
+        clip = parse_probe_result(_probe())
+
+        assert clip['duration'] == 5.0
+        assert clip['video']['codec'] == 'h264'
+        assert clip['video']['width'] == 1280
+        assert clip['audio']['codec'] == 'aac'
+        print("OK Parse probe result test passed")
+
+    def test_can_stream_copy(self):
+        """测试编码参数一致时才能直接拼接"""
+        same = [parse_probe_result(_probe()), parse_probe_result(_probe(duration='3.0'))]
+        different = [parse_probe_result(_probe()), parse_probe_result(_probe(width=720, height=1280))]
+
+        assert can_stream_copy(same) is True
+        assert can_stream_copy(different) is False
+        print("OK Can stream copy test passed")
+
+
+class TestCommandBuilding:
+    """测试 ffmpeg 命令构建"""
+
+    def test_concat_copy_command(self):
+        """测试直接拼接命令使用 stream copy"""
+        command = build_concat_copy_command('ffmpeg', '/tmp/inputs.txt', '/tmp/out.mp4')
+
+        assert command[command.index('-c') + 1] == 'copy'
+        assert command[command.index('-f') + 1] == 'concat'
+        print("OK Concat copy command test passed")
+
+    def test_fade_transition_offsets(self):
+        """测试转场偏移按片段时长累计"""
+        clips = [parse_probe_result(_probe(duration=d)) for d in ('5.0', '4.0', '6.0')]
+        command = build_transition_command(
+            'ffmpeg', ['https://a.mp4', '/tmp/b.mp4', '/tmp/c.mp4'], clips, 'fade', 0.5, '/tmp/out.mp4')
+        graph = command[command.index('-filter_complex') + 1]
+
+        assert 'xfade=transition=fade:duration=0.500:offset=4.500' in graph
+        assert 'xfade=transition=fade:duration=0.500:offset=8.000' in graph
+        assert 'acrossfade' in graph
+        # 只有网络输入添加重连参数
+        assert command.count('-reconnect') == 1
+        print("OK Fade transition offsets test passed")
+
+    def test_slide_without_audio(self):
+        """测试片段缺少音轨时去掉音频"""
+        clips = [parse_probe_result(_probe()), parse_probe_result(_probe(audio=False))]
+        command = build_transition_command('ffmpeg', ['/tmp/a.mp4', '/tmp/b.mp4'], clips,
+                                           'slide', 0.5, '/tmp/out.mp4')
+        graph = command[command.index('-filter_complex') + 1]
+
+        assert 'transition=slideleft' in graph
+        assert 'acrossfade' not in graph
+        assert '-an' in command
+        print("OK Slide without audio test passed")
+
+
+class TestStitch:
+    """测试拼接入口"""
+
+    def test_stitch_unsupported_transition(self):
+        """测试不支持的转场类型"""
+        result = video_stitching_service.stitch(['/tmp/a.mp4', '/tmp/b.mp4'], transition='spin')
+
+        assert result['success'] is False
+        print("OK Stitch unsupported transition test passed")
+
+    def test_stitch_without_ffmpeg(self):
+        """测试 ffmpeg 不可用时返回失败"""
+        with patch('services.video_stitching_service.shutil.which', return_value=None):
+            result = video_stitching_service.stitch(['/tmp/a.mp4', '/tmp/b.mp4'])
+
+        assert result['success'] is False
+        assert 'ffmpeg' in result['error']
+        print("OK Stitch without ffmpeg test passed")
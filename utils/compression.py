@@ -0,0 +1,320 @@
+"""
+响应压缩模块
+按 Accept-Encoding 协商 zstd / br / gzip，对 JSON、文本和 SSE 响应压缩
+
+- 普通响应：超过 COMPRESSION_MIN_SIZE 才压缩，压缩后不变小时保留原文
+- 流式响应（SSE、大文件流）：逐块压缩；SSE 每个事件后同步刷新，事件不会积压在压缩缓冲区
+- 已压缩的媒体（图片、视频）按 Content-Type 跳过，路由也可以用 no_compression 装饰器显式关闭
+- br 需要 brotli（或 brotlicffi）包，zstd 需要 zstandard 包，未安装时只协商 gzip
+- 按编码统计压缩率和 CPU 耗时，用于调整压缩级别
+"""
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from flask import request, current_app
+
+from utils.response_helper import api_response
+
+logger = logging.getLogger(__name__)
+
+# 默认可压缩的 Content-Type
+DEFAULT_MIMETYPES = (
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+    'text/plain', 'text/html', 'text/css', 'text/csv', 'text/xml', 'text/event-stream',
+)
+
+SSE_MIMETYPE = 'text/event-stream'
+
+
+def _parse_levels(value: str) -> Dict[str, int]:
+    """解析压缩级别配置，格式 encoding:level,...（如 gzip:6,br:5,zstd:3）"""
+    levels = {}
+    for item in (value or '').split(','):
+        encoding, _, level = item.strip().partition(':')
+        if encoding and level:
+            levels[encoding.strip()] = int(level)
+    return levels
+
+
+class _GzipCodec:
+    encoding = 'gzip'
+    default_level = 6
+
+    @staticmethod
+    def compress(data: bytes, level: int) -> bytes:
+        return zlib.compress(data, level, wbits=31)
+
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def _brotli_codec():
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+
+    class _BrotliCodec:
+        encoding = 'br'
+        default_level = 5
+
+        @staticmethod
+        def compress(data: bytes, level: int) -> bytes:
+            return brotli.compress(data, quality=level)
+
+        def __init__(self, level: int):
+            self._obj = brotli.Compressor(quality=level)
+
+        def process(self, data: bytes) -> bytes:
+            return self._obj.process(data)
+
+        def flush(self) -> bytes:
+            return self._obj.flush()
+
+        def finish(self) -> bytes:
+            return self._obj.finish()
+
+    return _BrotliCodec
+
+
+def _zstd_codec():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    class _ZstdCodec:
+        encoding = 'zstd'
+        default_level = 3
+
+        @staticmethod
+        def compress(data: bytes, level: int) -> bytes:
+            return zstandard.ZstdCompressor(level=level).compress(data)
+
+        def __init__(self, level: int):
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+        def process(self, data: bytes) -> bytes:
+            return self._obj.compress(data)
+
+        def flush(self) -> bytes:
+            return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        def finish(self) -> bytes:
+            return self._obj.flush()
+
+    return _ZstdCodec
+
+
+class CompressionMiddleware:
+    """响应压缩中间件（after_request 钩子）"""
+
+    def __init__(self):
+        self._codecs = {}
+        self._preference = []
+        self._levels: Dict[str, int] = {}
+        self._mimetypes = frozenset(DEFAULT_MIMETYPES)
+        self._min_size = 1024
+        self._enabled = False
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+        self._skipped: Dict[str, int] = {}
+
+    def init_app(self, app):
+        """
+        注册压缩钩子和统计接口
+
+        Args:
+            app: Flask 应用
+        """
+        self._enabled = bool(app.config.get('COMPRESSION_ENABLED', True))
+        self._min_size = int(app.config.get('COMPRESSION_MIN_SIZE', 1024))
+        self._levels = _parse_levels(app.config.get('COMPRESSION_LEVELS', 'zstd:3,br:5,gzip:6'))
+        mimetypes = app.config.get('COMPRESSION_MIMETYPES')
+        if mimetypes:
+            self._mimetypes = frozenset(m.strip() for m in mimetypes.split(',') if m.strip())
+
+        available = {codec.encoding: codec for codec in (_zstd_codec(), _brotli_codec(), _GzipCodec) if codec}
+        order = app.config.get('COMPRESSION_ALGORITHMS', 'zstd,br,gzip')
+        self._preference = [e.strip() for e in order.split(',') if e.strip() in available]
+        self._codecs = {encoding: available[encoding] for encoding in self._preference}
+        unavailable = [e.strip() for e in order.split(',') if e.strip() and e.strip() not in available]
+        if unavailable:
+            app.logger.info(f"Compression encodings unavailable (package not installed): {', '.join(unavailable)}")
+
+        app.after_request(self._after_request)
+        app.add_url_rule('/rest/v1/getCompressionStats', 'compression_stats', self._stats_view)
+
+    # ==================== 压缩 ====================
+
+    def _after_request(self, response):
+        if not self._enabled or not self._codecs:
+            return response
+
+        compressible = response.mimetype in self._mimetypes
+        if compressible:
+            response.vary.add('Accept-Encoding')
+
+        reason = self._skip_reason(response, compressible)
+        if reason:
+            if reason != 'not_compressible':
+                self._record_skip(reason)
+            return response
+
+        encoding = request.accept_encodings.best_match(self._preference)
+        if not encoding:
+            self._record_skip('not_accepted')
+            return response
+
+        if response.is_streamed:
+            return self._compress_stream(response, encoding)
+        return self._compress_body(response, encoding)
+
+    def _skip_reason(self, response, compressible: bool) -> Optional[str]:
+        """判断是否跳过压缩，返回跳过原因"""
+        if not compressible:
+            return 'not_compressible'
+        if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304):
+            return 'no_body'
+        if 'Content-Encoding' in response.headers or 'no-transform' in response.headers.get('Cache-Control', ''):
+            return 'already_encoded'
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, 'no_compression', False):
+            return 'opt_out'
+        if not response.is_streamed and response.calculate_content_length() < self._min_size:
+            return 'too_small'
+        return None
+
+    def _compress_body(self, response, encoding: str):
+        data = response.get_data()
+        codec = self._codecs[encoding]
+        started = time.thread_time()
+        compressed = codec.compress(data, self._level(codec))
+        cpu_time = time.thread_time() - started
+
+        if len(compressed) >= len(data):
+            self._record_skip('no_gain')
+            return response
+
+        response.set_data(compressed)
+        self._set_encoding_headers(response, encoding)
+        self._record(encoding, len(data), len(compressed), cpu_time, streamed=False)
+        return response
+
+    def _compress_stream(self, response, encoding: str):
+        codec = self._codecs[encoding]
+        sync_flush = response.mimetype == SSE_MIMETYPE
+        response.response = self._stream_chunks(response.response, codec(self._level(codec)), encoding, sync_flush)
+        response.headers.pop('Content-Length', None)
+        self._set_encoding_headers(response, encoding)
+        return response
+
+    def _stream_chunks(self, chunks: Iterable, compressor, encoding: str, sync_flush: bool):
+        """逐块压缩流式响应（SSE 每块后同步刷新）"""
+        bytes_in = bytes_out = 0
+        cpu_time = 0.0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                started = time.thread_time()
+                output = compressor.process(chunk)
+                if sync_flush:
+                    output += compressor.flush()
+                cpu_time += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(output)
+                if output:
+                    yield output
+
+            started = time.thread_time()
+            output = compressor.finish()
+            cpu_time += time.thread_time() - started
+            bytes_out += len(output)
+            if output:
+                yield output
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._record(encoding, bytes_in, bytes_out, cpu_time, streamed=True)
+
+    def _set_encoding_headers(self, response, encoding: str):
+        response.headers['Content-Encoding'] = encoding
+        # 强 ETag 只对应未压缩的表示
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+
+    def _level(self, codec) -> int:
+        return self._levels.get(codec.encoding, codec.default_level)
+
+    # ==================== 统计 ====================
+
+    def _record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_time: float, streamed: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(encoding, {
+                'responses': 0, 'streamed': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0
+            })
+            stats['responses'] += 1
+            stats['streamed'] += int(streamed)
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['cpu_seconds'] += cpu_time
+
+    def _record_skip(self, reason: str):
+        with self._stats_lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取压缩统计
+
+        Returns:
+            Dict: encodings（按编码：responses, streamed, bytes_in, bytes_out, ratio, cpu_seconds,
+                  cpu_ms_per_mb, level）、skipped（按原因的跳过次数）、available（可协商的编码）
+        """
+        with self._stats_lock:
+            stats = {encoding: dict(values) for encoding, values in self._stats.items()}
+            skipped = dict(self._skipped)
+
+        for encoding, values in stats.items():
+            values['ratio'] = round(values['bytes_out'] / values['bytes_in'], 4) if values['bytes_in'] else 0.0
+            megabytes = values['bytes_in'] / (1024 * 1024)
+            values['cpu_ms_per_mb'] = round(values['cpu_seconds'] * 1000 / megabytes, 2) if megabytes else 0.0
+            values['cpu_seconds'] = round(values['cpu_seconds'], 6)
+            values['level'] = self._level(self._codecs[encoding]) if encoding in self._codecs else None
+        return {'encodings': stats, 'skipped': skipped, 'available': list(self._preference)}
+
+    def reset_stats(self):
+        """清空压缩统计"""
+        with self._stats_lock:
+            self._stats.clear()
+            self._skipped.clear()
+
+    def _stats_view(self):
+        stats = self.get_stats()
+        return api_response(
+            success=True,
+            message='Compression stats fetched successfully',
+            data=stats,
+            count=len(stats['encodings'])
+        )
+
+
+# 全局实例
+compression = CompressionMiddleware()
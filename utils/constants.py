@@ -26,6 +26,10 @@ class AssetDataType:
     OSS_OBJECT_KEY = 'oss_object_key'
     ORIGINAL_FILENAME = 'original_filename'
     FILE_SIZE = 'file_size'
+    CONTENT_HASH = 'content_hash'
+    REF_COUNT = 'ref_count'
+    RENDITIONS = 'renditions'
+    SRCSET = 'srcset'
     UPLOAD_TIMESTAMP = 'upload_timestamp'
     PARAMETERS = 'parameters'
     CREATED_AT = 'created_at'
@@ -179,6 +183,8 @@ class MongoCollections:
     NOVEL_DETAILS = 'novel_details'
     ANIME_DETAILS = 'anime_details'
     ASSET_DATA = 'asset_data'
+    VISION_CACHE = 'vision_cache'
+    VIDEO_TASKS = 'video_tasks'
 
 
 # ==================== 分页常量 ====================
@@ -3,11 +3,13 @@
 提供常用的装饰器功能
 """
 from functools import wraps
-from flask import request, current_app, g
+from flask import request, current_app, g, make_response
+import hashlib
 import logging
 import jwt
 
 from utils.response_helper import error_response, api_response
+from utils.logging_helper import lazy_json
 
 
 def handle_errors(f):
@@ -132,15 +134,16 @@ def audit_log(action_name: str):
         @wraps(f)
         def decorated(*args, **kwargs):
             logger = logging.getLogger('audit')
-            import json
+            if not logger.isEnabledFor(logging.INFO):
+                return f(*args, **kwargs)
 
             user_id = g.current_user_id if hasattr(g, 'current_user_id') else 'anonymous'
 
-            # 获取请求数据
-            try:
-                request_data = request.get_json() or request.form.to_dict()
-            except:
-                request_data = None
+            # 获取请求数据（JSON 请求体取原始字节，由日志写入线程解析，请求线程不做序列化）
+            if request.is_json:
+                request_data = request.get_data(cache=True) or None
+            else:
+                request_data = request.form.to_dict() or None
 
             logger.info(
                 f"Audit: {action_name}",
@@ -149,7 +152,7 @@ def audit_log(action_name: str):
                     'action': action_name,
                     'method': request.method,
                     'path': request.path,
-                    'request_data': json.dumps(request_data) if request_data else None
+                    'request_data': lazy_json(request_data) if request_data else None
                 }
             )
 
@@ -158,6 +161,83 @@ def audit_log(action_name: str):
     return decorator
 
 
+def conditional_get(cache_control='private, no-cache', version=None):
+    """
+    条件 GET 装饰器（弱 ETag、If-None-Match、Last-Modified、Cache-Control）
+
+    功能:
+    - version 返回缓存中的版本标识时，If-None-Match 匹配直接返回 304，不执行视图函数（不访问数据库）
+    - 否则执行视图函数，ETag 取版本标识，没有版本标识时取响应体哈希；匹配时返回 304
+    - Last-Modified 取版本标识中的 updated_at，或视图函数设置的 g.last_modified
+    - 只处理 200 响应，错误响应原样返回
+
+    Args:
+        cache_control: Cache-Control 响应头
+        version: 可选，(request.args) -> (版本标识, updated_at) 或 None
+
+    使用示例:
+        @work_bp.route('/getWorkById', methods=['GET'])
+        @handle_errors
+        @conditional_get('private, no-cache', version=lambda args: ...)
+        def get_work():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if_none_match = request.if_none_match
+            cached = version(request.args) if version is not None and if_none_match else None
+            if cached and if_none_match.contains_weak(cached[0]):
+                return _not_modified(cached[0], cached[1], cache_control)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+
+            current = version(request.args) if version is not None else None
+            if current:
+                etag, last_modified = current
+            else:
+                etag = hashlib.sha1(response.get_data()).hexdigest()[:16]
+                last_modified = g.get('last_modified')
+
+            if if_none_match and if_none_match.contains_weak(etag):
+                return _not_modified(etag, last_modified, cache_control)
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated
+    return decorator
+
+
+def _not_modified(etag, last_modified, cache_control):
+    """构建 304 响应"""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def no_compression(f):
+    """
+    关闭响应压缩的装饰器（用于已压缩的媒体或需要原样透传的响应）
+
+    使用示例:
+        @anime_bp.route('/streamVideo', methods=['GET'])
+        @handle_errors
+        @no_compression
+        def stream_video():
+            ...
+    """
+    f.no_compression = True
+    return f
+
+
 def service_initialized(service_instance):
     """检查服务是否已初始化的装饰器"""
     def decorator(f):
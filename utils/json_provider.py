@@ -0,0 +1,92 @@
+"""
+JSON 序列化模块
+为 Flask 提供基于 orjson 的 JSON Provider（jsonify、request.get_json 均经由 app.json）
+
+- datetime/date 原生序列化为 ISO 8601（精确到秒，如 2026-03-31T00:00:00），db 层不再逐行 strftime
+- 未安装 orjson 时回退到标准库 json，输出格式保持一致
+- JSON_PROVIDER=stdlib 时使用 Flask 默认 Provider
+"""
+import json
+import decimal
+from datetime import date, datetime
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+try:
+    from bson import ObjectId
+except ImportError:  # pragma: no cover
+    ObjectId = None
+
+
+def _default(o: Any) -> Any:
+    """序列化 orjson/json 不支持的类型"""
+    if isinstance(o, datetime):
+        return o.isoformat(timespec='seconds')
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if ObjectId is not None and isinstance(o, ObjectId):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """基于 orjson 的 JSON Provider（未安装 orjson 时使用标准库并保持相同的 datetime 格式）"""
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_OMIT_MICROSECONDS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None:
+            body = json.dumps(obj, default=_default, ensure_ascii=self.ensure_ascii,
+                              sort_keys=self.sort_keys, indent=2 if indent else None,
+                              separators=None if indent else (',', ':'))
+            body = f"{body}\n"
+        else:
+            body = orjson.dumps(obj, default=_default, option=self._orjson_options(indent)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app) -> None:
+    """
+    根据 JSON_PROVIDER 配置设置 Flask JSON Provider
+
+    Args:
+        app: Flask 应用（JSON_PROVIDER: orjson（默认）或 stdlib）
+    """
+    if str(app.config.get('JSON_PROVIDER', 'orjson')).lower() == 'stdlib':
+        return
+    app.json = FastJSONProvider(app)
+    if orjson is None:
+        app.logger.warning("orjson is not installed, JSON responses use the standard library encoder")
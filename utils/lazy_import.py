@@ -0,0 +1,47 @@
+"""
+延迟导入模块
+导入耗时较大、只在部分接口中使用的依赖（如 oss2）在首次访问属性时才导入，缩短应用启动时间
+
+使用示例:
+    oss2 = lazy_import('oss2')
+    bucket = oss2.Bucket(...)  # 此时才真正导入 oss2
+"""
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """首次访问属性时导入的模块代理（线程安全；测试中可直接 patch 代理上的属性）"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    返回延迟导入的模块代理
+
+    Args:
+        name: 模块名称
+
+    Returns:
+        LazyModule: 模块代理
+    """
+    return LazyModule(name)
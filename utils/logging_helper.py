@@ -0,0 +1,198 @@
+"""
+日志模块
+日志经 QueueHandler 放入内存队列，由 QueueListener 后台线程写入 logs/narloom.log，请求线程不做文件 I/O
+
+- 输出格式：json（每行一个 JSON 对象，extra 字段作为顶层字段）或 text
+- 大对象用 lazy_json 包装：作为消息参数时只在级别启用时才序列化，作为 extra 字段时在写入线程中序列化
+- DEBUG 日志可按 LOG_DEBUG_SAMPLE_RATE 采样，未采样的记录不进入队列
+"""
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Any, Optional
+
+from utils.json_provider import _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# LogRecord 自带的属性，其余属性视为 extra 字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def _dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, default=_default, ensure_ascii=False)
+
+
+class LazyJSON:
+    """延迟序列化的日志参数（bytes 按 JSON 请求体解析，失败时按文本输出）"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def to_python(self) -> Any:
+        if isinstance(self.value, (bytes, bytearray)):
+            try:
+                return json.loads(self.value)
+            except ValueError:
+                return self.value.decode('utf-8', errors='replace')
+        return self.value
+
+    def __str__(self) -> str:
+        return _dumps(self.to_python())
+
+
+def lazy_json(value: Any) -> LazyJSON:
+    """
+    包装需要序列化的大对象
+
+    使用示例:
+        logger.debug("Video generation payload: %s", lazy_json(payload))
+        logger.info("Audit", extra={'request_data': lazy_json(request.get_data())})
+    """
+    return LazyJSON(value)
+
+
+class JSONFormatter(logging.Formatter):
+    """结构化 JSON 日志格式（timestamp, level, logger, message, extra 字段, exception）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value.to_python() if isinstance(value, LazyJSON) else value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        try:
+            return _dumps(entry)
+        except TypeError:
+            return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """按比例采样 DEBUG 及以下级别的日志，其他级别全部保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _BackgroundQueueHandler(QueueHandler):
+    """
+    放入队列前只合并消息和异常文本，extra 字段保持原值，由写入线程格式化
+
+    标准 QueueHandler.prepare 会把异常堆栈拼进消息，JSON 输出无法单独给出 exception 字段
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def setup_logging(app):
+    """
+    配置后台日志写入（根日志器 -> 队列 -> 文件/控制台）
+
+    重复调用（测试中多次 create_app）时替换上一次的监听器
+
+    Args:
+        app: Flask 应用
+    """
+    global _listener, _queue_handler
+
+    level = logging.getLevelName(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    logs_dir = app.config.get('LOG_DIR') or os.path.join(app.root_path, 'logs')
+    os.makedirs(logs_dir, exist_ok=True)
+
+    file_handler = TimedRotatingFileHandler(
+        os.path.join(logs_dir, 'narloom.log'),
+        when='D',
+        interval=1,
+        backupCount=7,
+        encoding='utf-8'
+    )
+    if str(app.config.get('LOG_FORMAT', 'json')).lower() == 'text':
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    else:
+        file_handler.setFormatter(JSONFormatter())
+    handlers = [file_handler]
+
+    if app.config.get('LOG_CONSOLE', True):
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+        handlers.append(console_handler)
+
+    shutdown_logging()
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    _queue_handler = _BackgroundQueueHandler(log_queue)
+    _queue_handler.addFilter(DebugSamplingFilter(float(app.config.get('LOG_DEBUG_SAMPLE_RATE', 1.0))))
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    # 应用日志经根日志器输出，移除 Flask 默认的控制台处理器避免重复
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(level)
+
+
+def shutdown_logging():
+    """停止后台写入线程（写完队列中剩余的日志）并移除队列处理器"""
+    global _listener, _queue_handler
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,19 +1,32 @@
 """
 图片上传工具函数
-提供统一的图片上传到 OSS 并创建 asset 记录的功能
+提供统一的图片上传到 OSS 并创建 asset 记录的功能，以及浏览器直传 OSS 的签名和完成回调
 """
-from flask import request
+from flask import request, current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from utils.response_helper import error_response
 from utils.constants import (
     AssetType, AssetDataType, RequestParams,
-    Defaults, FileTypes
+    Defaults, FileTypes, OSSConfig
 )
 from db import MySQLService, MongoService, oss_service
+from services.image_processing_service import image_processing_service
 from datetime import datetime
+import hashlib
+import io
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 直传上传凭证签名的 salt
+DIRECT_UPLOAD_SALT = 'narloom-direct-upload'
+
+# 允许直传的图片类型
+ALLOWED_IMAGE_TYPES = (FileTypes.IMAGE_JPEG, FileTypes.IMAGE_PNG, FileTypes.IMAGE_GIF, FileTypes.IMAGE_WEBP)
+
+# 本地计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def upload_picture_file(file, user_id, work_id=None, return_error_response=True):
     """
@@ -30,65 +43,450 @@ def upload_picture_file(file, user_id, work_id=None, return_error_response=True)
         - 成功：(url, asset_id, None)
         - 失败：(None, None, error_response) 或 (None, None, None)
 
+    Raises:
+        ValueError: 当文件无效时
+    """
+    upload_result, error = stream_picture_file(file, user_id, return_error_response)
+    if error:
+        return None, None, error
+
+    return create_streamed_picture_asset(user_id, work_id, upload_result, file, return_error_response)
+
+
+def create_streamed_picture_asset(user_id, work_id, upload_result, file, return_error_response=True):
+    """
+    为 stream_picture_file 上传（或复用）的图片创建 asset 记录
+
+    复用已有对象时（deduplicated 为 True）只插入元数据并刷新引用数；记录创建后再次确认对象仍在 OSS 中，
+    已被并发的 release_picture_objects 删除时，从仍在本地的上传文件重新写回同一对象键
+
+    Args:
+        user_id: 用户 ID
+        work_id: 作品 ID（可选）
+        upload_result: stream_picture_file 的结果
+        file: 上传的 Werkzeug FileStorage 对象
+        return_error_response: 是否返回 error_response（False 时抛出异常）
+
+    Returns:
+        tuple: (picture_url, asset_id, error_response)
+    """
+    picture_url, asset_id, error = create_picture_asset(
+        user_id, work_id, upload_result['object_key'], upload_result['url'], file.filename,
+        upload_result['size'], return_error_response, content_hash=upload_result['sha256'])
+    if error:
+        return None, None, error
+
+    if upload_result['deduplicated']:
+        _restore_reused_object(file, upload_result['object_key'])
+    return picture_url, asset_id, None
+
+
+def stream_picture_file(file, user_id, return_error_response=True):
+    """
+    将上传的图片文件分块流式写入 OSS（不整体读入内存），按内容 SHA-256 去重
+
+    上传前先分块计算本地暂存文件的 SHA-256 和大小；相同内容已存在时不再上传，
+    返回已有对象（deduplicated 为 True），由 create_streamed_picture_asset 只插入元数据。
+    新内容上传到内容寻址对象键 comic/sha256/{hash[:2]}/{hash}.{ext}；
+    不可 seek 的流无法预先计算哈希，上传到该用户的对象键（上传时计算哈希）
+
+    Args:
+        file: Werkzeug FileStorage 对象
+        user_id: 用户 ID
+        return_error_response: 是否返回 error_response（False 时抛出异常）
+
+    Returns:
+        tuple: (upload_result, error_response)
+        - upload_result 包含 object_key, url, size, sha256, deduplicated
+
     Raises:
         ValueError: 当文件无效时
     """
     if not file or file.filename == '':
         if return_error_response:
-            return None, None, error_response('No file provided', 400)
+            return None, error_response('No file provided', 400)
         raise ValueError('No file provided')
 
-    # 读取文件内容
-    file_content = file.read()
     file_extension = file.filename.split('.')[-1].lower() if '.' in file.filename else Defaults.IMAGE_EXTENSION
 
-    # 生成 OSS 对象键
-    object_key = oss_service.generate_object_key(user_id, file_extension)
-
     # 上传到 OSS
     try:
-        upload_result = oss_service.upload_picture(
-            file_content=file_content,
+        digest = _hash_stream(file.stream)
+        if digest:
+            content_hash, size = digest
+            # 相同内容已存在时只需插入元数据，不再上传
+            existing = _find_existing_content(content_hash, size, file_extension)
+            if existing:
+                return existing, None
+            object_key = oss_service.generate_content_object_key(content_hash, file_extension)
+        else:
+            object_key = oss_service.generate_object_key(user_id, file_extension)
+        upload_result = oss_service.upload_picture_stream(
+            stream=file.stream,
             object_key=object_key,
             content_type=file.content_type or FileTypes.IMAGE_JPEG
         )
     except RuntimeError as e:
         logger.error(f"OSS service not available: {e}")
         if return_error_response:
-            return None, None, error_response('Picture upload service not available (OSS not configured)', 503)
+            return None, error_response('Picture upload service not available (OSS not configured)', 503)
         raise RuntimeError('OSS service not available')
 
     if not upload_result.get('success'):
         if return_error_response:
-            return None, None, error_response(f"Failed to upload picture: {upload_result.get('error')}", 500)
+            return None, error_response(f"Failed to upload picture: {upload_result.get('error')}", 500)
         raise RuntimeError(f"Failed to upload picture: {upload_result.get('error')}")
 
+    upload_result['deduplicated'] = False
+    return upload_result, None
+
+
+def _hash_stream(stream):
+    """
+    分块计算可 seek 文件流（Werkzeug 暂存在本地的上传文件）的 SHA-256 和大小，计算后将流复位
+
+    Returns:
+        tuple: (sha256, size)，流不可 seek 时返回 None
+    """
+    try:
+        position = stream.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        sha256.update(chunk)
+        size += len(chunk)
+    stream.seek(position)
+    return sha256.hexdigest(), size
+
+
+def _find_existing_content(content_hash, size, file_extension):
+    """
+    查找内容相同的已存储图片
+
+    按 asset_data.content_hash 查找已有 asset 引用的对象，并确认对象仍在 OSS 中；
+    只有按内容哈希查询失败时才检查内容寻址对象键（查询成功且无引用时该对象键即使存在也会被覆盖写入）
+
+    Args:
+        content_hash: 文件内容 SHA-256
+        size: 文件大小（字节）
+        file_extension: 文件扩展名
+
+    Returns:
+        dict: 与 upload_picture_stream 结构相同的结果，未找到时返回 None
+    """
+    try:
+        existing = MongoService().fetch_asset_by_content_hash(content_hash)
+        if not existing:
+            return None
+        object_key = existing.get('asset_data', {}).get(AssetDataType.OSS_OBJECT_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to look up picture by content hash: {e}")
+        object_key = None
+
+    if not object_key:
+        object_key = oss_service.generate_content_object_key(content_hash, file_extension)
+
+    # 确认对象仍在 OSS 中（引用可能刚被删除）
+    meta = oss_service.get_object_meta(object_key)
+    if not meta.get('success') or meta.get('size') != size:
+        return None
+
+    url_result = oss_service.get_picture_url(object_key)
+    return {
+        'success': True,
+        'object_key': object_key,
+        'url': url_result.get('url', ''),
+        'size': size,
+        'sha256': content_hash,
+        'deduplicated': True
+    }
+
+
+def _restore_reused_object(file, object_key):
+    """
+    确认复用的 OSS 对象在 asset 记录创建后仍存在，已被删除时从上传文件重新写回
+
+    查找已有对象与插入 asset_data 之间，并发的 release_picture_objects 可能已统计到 0 个引用并删除该对象
+
+    Args:
+        file: 上传的 Werkzeug FileStorage 对象
+        object_key: 复用的 OSS 对象键
+    """
+    try:
+        meta = oss_service.get_object_meta(object_key)
+        if meta.get('success') or not meta.get('not_found'):
+            return
+
+        logger.info(f"Reused picture object {object_key} was deleted concurrently, uploading it again")
+        file.stream.seek(0)
+        upload_result = oss_service.upload_picture_stream(
+            stream=file.stream,
+            object_key=object_key,
+            content_type=file.content_type or FileTypes.IMAGE_JPEG
+        )
+        if not upload_result.get('success'):
+            logger.error(f"Failed to restore picture object {object_key}: {upload_result.get('error')}")
+            return
+        image_processing_service.submit_renditions(object_key)
+    except Exception as e:
+        logger.error(f"Failed to restore picture object {object_key}: {e}")
+
+
+def release_picture_objects(object_keys):
+    """
+    释放 asset 对 OSS 图片对象的引用：刷新引用数，只删除已无 asset 引用的对象及其副本
+
+    副本按 OSS 中该原图的副本前缀列出后删除，不依赖当前的副本尺寸/格式配置，也不依赖已删除的 asset_data 记录。
+    调用方需先删除 asset_data 记录。统计引用数后立即删除，缩短与并发复用之间的窗口；
+    复用方在插入 asset_data 后会再次确认对象仍存在（见 _restore_reused_object）
+
+    Args:
+        object_keys: OSS 对象键列表
+
+    Returns:
+        dict: delete_pictures_batch 的结果，另含 retained_keys（仍被引用而保留的对象键）
+    """
+    keys = list(dict.fromkeys(k for k in object_keys if k))
+    if not keys:
+        return {'success': True, 'deleted_keys': [], 'failed': [], 'retained_keys': []}
+
+    counts = MongoService().refresh_object_references(keys)
+    unreferenced = [key for key in keys if not counts.get(key)]
+    retained = [key for key in keys if counts.get(key)]
+
+    if unreferenced:
+        delete_keys = list(unreferenced)
+        for key in unreferenced:
+            delete_keys.extend(_stored_rendition_keys(key))
+        result = oss_service.delete_pictures_batch(delete_keys)
+    else:
+        result = {'success': True, 'deleted_keys': [], 'failed': []}
+    result['retained_keys'] = retained
+    return result
+
+
+def _stored_rendition_keys(object_key):
+    """
+    列出 OSS 中原图已生成的全部副本对象键（包括按旧配置生成的副本）
+
+    列出失败时退回按当前配置推算的副本对象键
+
+    Args:
+        object_key: 原图对象键
+
+    Returns:
+        list: 副本对象键列表
+    """
+    prefix = image_processing_service.rendition_prefix(object_key)
+    keys, marker = [], ''
+    while True:
+        listed = oss_service.list_pictures(prefix=prefix, max_codes=1000, marker=marker)
+        if not listed.get('success'):
+            logger.warning(f"Failed to list renditions of {object_key}: {listed.get('error')}")
+            return list(dict.fromkeys(keys + image_processing_service.rendition_object_keys(object_key)))
+        keys.extend(item['object_key'] for item in listed['pictures'])
+        marker = listed.get('next_marker')
+        if not listed.get('is_truncated') or not marker:
+            return keys
+
+
+def create_picture_asset(user_id, work_id, object_key, url, original_filename, file_size,
+                         return_error_response=True, content_hash=None):
+    """
+    为已上传到 OSS 的图片创建 asset 记录（MySQL + MongoDB asset_data）
+
+    Args:
+        user_id: 用户 ID
+        work_id: 作品 ID（可选）
+        object_key: OSS 对象键
+        url: 图片 URL（签名参数会被去除）
+        original_filename: 原始文件名
+        file_size: 文件大小（字节）
+        return_error_response: 是否返回 error_response（False 时抛出异常）
+        content_hash: 文件内容 SHA-256（可选）
+
+    Returns:
+        tuple: (picture_url, asset_id, error_response)
+    """
     # 创建 asset 记录
     mysql_row = MySQLService().insert_asset(user_id, AssetType.PICTURE, work_id)
     asset_id = mysql_row['asset_id']
 
     # 处理 OSS URL，只保留 API 部分
-    oss_url_for_db = upload_result['url'].split('?')[0]
+    oss_url_for_db = url.split('?')[0]
 
     # 创建 asset_data 记录
     asset_data = {
         AssetDataType.TYPE: AssetType.PICTURE,
         AssetDataType.OSS_URL: oss_url_for_db,
         AssetDataType.OSS_OBJECT_KEY: object_key,
-        AssetDataType.ORIGINAL_FILENAME: file.filename,
-        AssetDataType.FILE_SIZE: len(file_content),
+        AssetDataType.ORIGINAL_FILENAME: original_filename,
+        AssetDataType.FILE_SIZE: file_size,
+        AssetDataType.REF_COUNT: 1,
         AssetDataType.UPLOAD_TIMESTAMP: datetime.now().isoformat()
     }
+    if content_hash:
+        asset_data[AssetDataType.CONTENT_HASH] = content_hash
 
     try:
         MongoService().insert_asset_data(asset_id, asset_data)
     except Exception as e:
         logger.error(f"Error inserting asset data to MongoDB: {str(e)}")
-        # 回滚：删除 MySQL 和 OSS 中的数据
+        # 回滚：删除 MySQL 中的数据，OSS 对象无其他引用时一并删除
         MySQLService().delete_asset(asset_id)
-        oss_service.delete_picture(object_key)
+        try:
+            release_picture_objects([object_key])
+        except Exception as release_error:
+            logger.warning(f"Failed to release picture object {object_key}: {release_error}")
         if return_error_response:
             return None, None, error_response('Failed to create asset record', 500)
         raise
 
+    # 更新共享该对象的 asset 的引用数
+    try:
+        MongoService().refresh_object_references([object_key])
+    except Exception as e:
+        logger.warning(f"Failed to refresh references for {object_key}: {e}")
+
+    # 后台生成缩略图、预览图副本
+    try:
+        image_processing_service.submit_renditions(object_key)
+    except Exception as e:
+        logger.warning(f"Failed to schedule renditions for {object_key}: {e}")
+
     return oss_url_for_db, asset_id, None
+
+
+def _get_upload_serializer():
+    """获取直传上传凭证的签名器（使用应用 SECRET_KEY）"""
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=DIRECT_UPLOAD_SALT)
+
+
+def create_direct_upload(user_id, filename, content_type, work_id=None, file_size=None, method='post'):
+    """
+    为浏览器直传 OSS 签发上传凭证
+
+    生成该用户的对象键，并返回限定该对象键的 PostObject 签名表单（method=post）或 PUT 签名 URL（method=put），
+    以及完成上传后调用 completeUpload 所需的 upload_token
+
+    Args:
+        user_id: 用户 ID
+        filename: 原始文件名
+        content_type: 文件类型（仅允许图片）
+        work_id: 作品 ID（可选）
+        file_size: 文件大小（可选，用于提前校验）
+        method: post / put
+
+    Returns:
+        tuple: (upload_info, error_response)
+    """
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        return None, error_response(f'Unsupported content type: {content_type}', 400)
+    if method not in ('post', 'put'):
+        return None, error_response('method must be post or put', 400)
+
+    max_size = OSSConfig.MAX_IMAGE_SIZE
+    if file_size is not None and not 0 < file_size <= max_size:
+        return None, error_response(f'file_size must be between 1 and {max_size} bytes', 400)
+
+    file_extension = filename.split('.')[-1].lower() if '.' in filename else Defaults.IMAGE_EXTENSION
+    expires = current_app.config.get('DIRECT_UPLOAD_EXPIRES', 600)
+
+    try:
+        object_key = oss_service.generate_object_key(user_id, file_extension)
+        if method == 'put':
+            target = oss_service.generate_put_url(object_key, content_type, expires)
+        else:
+            target = oss_service.generate_post_policy(object_key, content_type, max_size, expires)
+    except RuntimeError as e:
+        logger.error(f"OSS service not available: {e}")
+        return None, error_response('Picture upload service not available (OSS not configured)', 503)
+
+    upload_token = _get_upload_serializer().dumps({
+        'user_id': user_id,
+        'work_id': work_id,
+        'object_key': object_key,
+        'filename': filename,
+        'content_type': content_type
+    })
+
+    return dict(target, method=method, object_key=object_key, max_size=max_size,
+                upload_token=upload_token), None
+
+
+def complete_direct_upload(upload_token, user_id):
+    """
+    完成浏览器直传：校验 OSS 中的对象（存在、大小、类型）并创建 asset 记录
+
+    重复调用时返回已创建的 asset；校验失败的对象会从 OSS 中删除
+
+    Args:
+        upload_token: create_direct_upload 返回的上传凭证
+        user_id: 用户 ID（必须与签发凭证的用户一致）
+
+    Returns:
+        tuple: (result, error_response)
+    """
+    try:
+        payload = _get_upload_serializer().loads(
+            upload_token, max_age=current_app.config.get('DIRECT_UPLOAD_TOKEN_TTL', 3600))
+    except SignatureExpired:
+        return None, error_response('Upload token expired', 400)
+    except BadSignature:
+        return None, error_response('Invalid upload token', 400)
+
+    if payload['user_id'] != user_id:
+        return None, error_response('Unauthorized: This upload does not belong to the user', 403)
+
+    object_key = payload['object_key']
+
+    # 幂等：已完成的上传直接返回
+    existing = MongoService().fetch_asset_by_object_key(object_key)
+    if existing:
+        asset_data = existing.get('asset_data', {})
+        return {
+            RequestParams.ASSET_ID: existing['asset_id'],
+            'url': asset_data.get(AssetDataType.OSS_URL),
+            RequestParams.OSS_OBJECT_KEY: object_key,
+            RequestParams.ORIGINAL_FILENAME: asset_data.get(AssetDataType.ORIGINAL_FILENAME),
+            RequestParams.FILE_SIZE: asset_data.get(AssetDataType.FILE_SIZE)
+        }, None
+
+    try:
+        meta = oss_service.get_object_meta(object_key)
+    except RuntimeError as e:
+        logger.error(f"OSS service not available: {e}")
+        return None, error_response('Picture upload service not available (OSS not configured)', 503)
+
+    if not meta.get('success'):
+        if meta.get('not_found'):
+            return None, error_response('Uploaded object not found', 404)
+        return None, error_response(f"Failed to verify upload: {meta.get('error')}", 500)
+
+    size = meta.get('size') or 0
+    content_type = (meta.get('content_type') or '').split(';')[0].strip().lower()
+    error = None
+    if not 0 < size <= OSSConfig.MAX_IMAGE_SIZE:
+        error = f'Uploaded file size {size} exceeds limit of {OSSConfig.MAX_IMAGE_SIZE} bytes'
+    elif content_type != payload['content_type']:
+        error = f"Uploaded content type {content_type} does not match {payload['content_type']}"
+    if error:
+        oss_service.delete_picture(object_key)
+        return None, error_response(error, 400)
+
+    url_result = oss_service.get_picture_url(object_key)
+    picture_url, asset_id, error = create_picture_asset(
+        user_id, payload['work_id'], object_key, url_result.get('url', ''), payload['filename'], size)
+    if error:
+        return None, error
+
+    return {
+        RequestParams.ASSET_ID: asset_id,
+        'url': picture_url,
+        RequestParams.OSS_OBJECT_KEY: object_key,
+        RequestParams.ORIGINAL_FILENAME: payload['filename'],
+        RequestParams.FILE_SIZE: size
+    }, None
@@ -2,14 +2,24 @@
 资源辅助函数模块
 提供常用的资源操作辅助函数，减少路由代码重复
 """
-from db import MySQLService, MongoService
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app
+from db import (MySQLService, MongoService, asset_service, work_service, novel_service, anime_service,
+                asset_data_service, work_details_service, anime_details_service)
+from services.entity_cache_service import entity_cache_service, ENTITY_ASSET, ENTITY_WORK, ENTITY_ANIME
+
+# 批量读取的 MongoDB 查询线程池（MySQL 共享单连接，只在请求线程中串行执行）
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
 
 
 # ========== 资源获取辅助函数 ==========
 
 def get_full_asset_by_id(asset_id):
     """
-    获取完整的资产信息（MySQL + MongoDB）
+    获取完整的资产信息（MySQL + MongoDB，经由读穿缓存）
 
     Args:
         asset_id: 资产 ID
@@ -17,12 +27,18 @@ def get_full_asset_by_id(asset_id):
     Returns:
         dict: 完整的资产信息，如果不存在则返回 None
     """
+    return entity_cache_service.get_or_load(ENTITY_ASSET, asset_id, lambda: _load_full_asset(asset_id))
+
+
+def _load_full_asset(asset_id):
     mysql_row = MySQLService().fetch_asset_by_id(asset_id)
     if not mysql_row:
         return None
 
-    asset_data = MongoService().fetch_asset_data(asset_id) or {}
+    return _assemble_asset(mysql_row, MongoService().fetch_asset_data(asset_id))
 
+
+def _assemble_asset(mysql_row, asset_data):
     return {
         'asset_id': mysql_row['asset_id'],
         'user_id': mysql_row['user_id'],
@@ -30,13 +46,13 @@ def get_full_asset_by_id(asset_id):
         'asset_type': mysql_row['asset_type'],
         'created_at': mysql_row['created_at'],
         'updated_at': mysql_row['updated_at'],
-        'asset_data': asset_data
+        'asset_data': asset_data or {}
     }
 
 
 def get_full_work_by_id(work_id):
     """
-    获取完整的作品信息（MySQL + MongoDB）
+    获取完整的作品信息（MySQL + MongoDB，经由读穿缓存）
 
     Args:
         work_id: 作品 ID
@@ -44,11 +60,18 @@ def get_full_work_by_id(work_id):
     Returns:
         dict: 完整的作品信息，如果不存在则返回 None
     """
+    return entity_cache_service.get_or_load(ENTITY_WORK, work_id, lambda: _load_full_work(work_id))
+
+
+def _load_full_work(work_id):
     work = MySQLService().fetch_work_by_id(work_id)
     if not work:
         return None
 
-    work_details = MongoService().fetch_work_details(work_id)
+    return _assemble_work(work, MongoService().fetch_work_details(work_id))
+
+
+def _assemble_work(work, work_details):
     if work_details:
         work['asset_ids'] = work_details.get('asset_ids', [])
         work['novel_ids'] = work_details.get('novel_ids', [])
@@ -61,6 +84,56 @@ def get_full_work_by_id(work_id):
     return work
 
 
+def get_full_anime_by_id(anime_id):
+    """
+    获取完整的 anime 镜头信息（MySQL + MongoDB anime_details，经由读穿缓存）
+
+    Args:
+        anime_id: 镜头 ID
+
+    Returns:
+        dict: 包含 asset_ids、video_assets、picture_assets 的镜头信息，如果不存在则返回 None
+    """
+    return entity_cache_service.get_or_load(ENTITY_ANIME, anime_id, lambda: _load_full_anime(anime_id))
+
+
+def _load_full_anime(anime_id):
+    anime = anime_service.fetch_anime_by_id(anime_id)
+    if not anime:
+        return None
+
+    return _assemble_anime(anime, anime_details_service.fetch_anime_details(anime_id))
+
+
+def _assemble_anime(anime, details):
+    details = details or {}
+    anime['asset_ids'] = details.get('asset_ids', [])
+    anime['video_assets'] = details.get('video_assets', [])
+    anime['picture_assets'] = details.get('picture_assets', [])
+    return anime
+
+
+def cached_version(entity, id_param):
+    """
+    构建条件 GET 的版本函数（从读穿缓存读取实体版本标识，不访问数据库）
+
+    只在配置共享层时使用缓存的版本标识：未配置 Redis 时进程内缓存只在单个 worker 内失效，
+    其他 worker 的写入不会改变本 worker 的版本标识，此时返回 None，由 conditional_get 执行视图并按响应体计算 ETag
+
+    Args:
+        entity: 实体类型（asset/work/anime）
+        id_param: 请求参数中实体 ID 的参数名
+
+    Returns:
+        callable: (request.args) -> (版本标识, updated_at) 或 None
+    """
+    def version(args):
+        if not entity_cache_service.is_shared():
+            return None
+        return entity_cache_service.get_version(entity, args.get(id_param))
+    return version
+
+
 def get_full_novel_by_id(novel_id):
     """
     获取完整的小说章节信息
@@ -74,6 +147,135 @@ def get_full_novel_by_id(novel_id):
     return MySQLService().fetch_novel_by_id(novel_id)
 
 
+# ========== 批量读取辅助函数 ==========
+
+def get_full_entities(work_ids=None, novel_ids=None, anime_ids=None, asset_ids=None,
+                      expand=False, max_ids=200):
+    """
+    批量获取作品、小说章节、anime 镜头和资产（一次请求重建作品页面）
+
+    每种实体只执行一次 MySQL IN 查询和一次 MongoDB $in 查询；
+    MongoDB 查询在线程池中并发执行，同时在请求线程中串行执行 MySQL 查询
+
+    Args:
+        work_ids: 作品 ID 列表
+        novel_ids: 小说章节 ID 列表
+        anime_ids: anime 镜头 ID 列表
+        asset_ids: 资产 ID 列表
+        expand: 为 True 时同时返回 work_ids 下的所有章节、镜头和关联资产
+        max_ids: 每种实体 ID 数量上限
+
+    Returns:
+        dict: works、novels、animes、assets 列表，以及 missing（未找到的 ID，按实体类型）
+
+    Raises:
+        ValueError: ID 列表格式无效或超过上限时抛出
+    """
+    work_ids = _normalize_ids(work_ids, 'work_ids', max_ids)
+    novel_ids = _normalize_ids(novel_ids, 'novel_ids', max_ids)
+    anime_ids = _normalize_ids(anime_ids, 'anime_ids', max_ids)
+    asset_ids = _normalize_ids(asset_ids, 'asset_ids', max_ids)
+    expand_work_ids = work_ids if expand else []
+
+    work_details_future = _submit_batch(work_details_service.fetch_multiple_work_details, work_ids)
+    anime_details_future = _submit_batch(anime_details_service.fetch_multiple_anime_details,
+                                         anime_ids, expand_work_ids)
+    asset_data_future = _submit_batch(asset_data_service.fetch_multiple_asset_data, asset_ids)
+
+    work_rows = work_service.fetch_works_by_ids(work_ids)
+    novel_rows = novel_service.fetch_novels_by_ids(novel_ids) + novel_service.fetch_novels_by_work_ids(expand_work_ids)
+    anime_rows = anime_service.fetch_anime_by_ids(anime_ids) + anime_service.fetch_anime_by_work_ids(expand_work_ids)
+    asset_rows = asset_service.fetch_assets_by_ids(asset_ids)
+
+    work_details = work_details_future.result()
+    asset_data = asset_data_future.result()
+
+    if expand:
+        # 作品关联的资产需要等 work_details 返回后再批量读取
+        requested = set(asset_ids)
+        linked_ids = [asset_id for details in work_details.values()
+                      for asset_id in details.get('asset_ids', []) if asset_id not in requested]
+        linked_ids = list(dict.fromkeys(linked_ids))
+        linked_data_future = _submit_batch(asset_data_service.fetch_multiple_asset_data, linked_ids)
+        asset_rows += asset_service.fetch_assets_by_ids(linked_ids)
+        asset_data.update(linked_data_future.result())
+
+    anime_details = anime_details_future.result()
+
+    works = _order_by_ids([_assemble_work(row, work_details.get(row['work_id'])) for row in work_rows],
+                          'work_id', work_ids)
+    animes = _order_by_ids([_assemble_anime(row, anime_details.get(row['anime_id'])) for row in anime_rows],
+                           'anime_id', anime_ids)
+    assets = _order_by_ids([_assemble_asset(row, asset_data.get(row['asset_id'])) for row in asset_rows],
+                           'asset_id', asset_ids)
+    novels = _order_by_ids(novel_rows, 'novel_id', novel_ids)
+
+    return {
+        'works': works,
+        'novels': novels,
+        'animes': animes,
+        'assets': assets,
+        'missing': {
+            'works': _missing_ids(works, 'work_id', work_ids),
+            'novels': _missing_ids(novels, 'novel_id', novel_ids),
+            'animes': _missing_ids(animes, 'anime_id', anime_ids),
+            'assets': _missing_ids(assets, 'asset_id', asset_ids),
+        }
+    }
+
+
+def _normalize_ids(ids, field_name, max_ids):
+    """校验并去重 ID 列表（保持顺序）"""
+    if ids is None:
+        return []
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        raise ValueError(f"{field_name} must be a list of strings")
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if len(ids) > max_ids:
+        raise ValueError(f"{field_name} exceeds the limit of {max_ids} ids")
+    return ids
+
+
+def _get_batch_executor():
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=int(current_app.config.get('BATCH_FETCH_WORKERS', 4)),
+                    thread_name_prefix='batch-fetch')
+    return _batch_executor
+
+
+def _submit_batch(func, *id_lists):
+    """在线程池中执行 MongoDB 批量查询（携带当前 Flask 应用上下文和请求耗时统计），ID 列表均为空时不提交"""
+    if not any(id_lists):
+        future = Future()
+        future.set_result({})
+        return future
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return func(*id_lists)
+
+    return _get_batch_executor().submit(contextvars.copy_context().run, run)
+
+
+def _order_by_ids(items, id_field, ids):
+    """按请求的 ID 顺序排列，展开得到的其他条目保持查询顺序排在后面（同时去重）"""
+    by_id = {}
+    for item in items:
+        by_id.setdefault(item[id_field], item)
+    ordered = [by_id.pop(i) for i in ids if i in by_id]
+    return ordered + list(by_id.values())
+
+
+def _missing_ids(items, id_field, ids):
+    found = {item[id_field] for item in items}
+    return [i for i in ids if i not in found]
+
+
 # ========== 数据构建辅助函数 ==========
 
 def build_novel_data(data):